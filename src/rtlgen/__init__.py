@@ -12,10 +12,28 @@ from rtlgen.data_type import DataType
 from rtlgen.expr import Expr
 import rtlgen.entity
 import rtlgen.lfsm
+import rtlgen.fsm
 import rtlgen.inst
 import rtlgen.lut
+import rtlgen.lut_decomp
 import rtlgen.dff
+import rtlgen.register_bank
 import rtlgen.mux
+import rtlgen.adder
+import rtlgen.multiplier
+import rtlgen.rebalance
+import rtlgen.xor_share
+import rtlgen.encoder
+import rtlgen.shifter
+import rtlgen.timing
+import rtlgen.pipeline
+import rtlgen.retime
+import rtlgen.area
+import rtlgen.strength
+import rtlgen.width
+import rtlgen.share
+import rtlgen.sweep
+import rtlgen.check
 import rtlgen.process
 import rtlgen.vhdl_writer
 import rtlgen.verilog_writer
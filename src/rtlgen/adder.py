@@ -0,0 +1,328 @@
+#! /usr/bin/env python3
+
+"""並列プレフィックス加算器を作るクラス
+
+:file: adder.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import random
+from rtlgen.entity import Entity
+from rtlgen.expr import Expr
+from rtlgen.data_type import DataType
+from rtlgen.evaluator import Evaluator
+from rtlgen.bit_util import bit_of
+from rtlgen.rtlerror import RtlError
+
+
+class PrefixAdder:
+    """並列プレフィックス加算器を表すクラス
+
+    :param int bit_width: ビット幅
+    :param str style: プレフィックス網の構造
+
+    style は以下のいずれか
+    * 'kogge_stone': 段数 log2(n)，ファンアウト 2，セル数 n log2(n)
+    * 'brent_kung':  段数 2 log2(n) - 1，セル数 2n
+    * 'sklansky':    段数 log2(n)，セル数 (n/2) log2(n)，ファンアウト大
+    * 'han_carlson': 奇数ビットのみ Kogge-Stone で作り，最後に偶数ビットを
+                     求める．段数 log2(n) + 1
+
+    プレフィックス網はビット位置の対 (i, j) (j < i) のリストを段ごとに
+    持つ．(i, j) は位置 i の (G, P) に位置 j の (G, P) を合成することを
+    表す．
+    """
+
+    def __init__(self, bit_width, *, style='sklansky'):
+        if bit_width < 1:
+            emsg = f'bit_width({bit_width}) must be positive'
+            raise RtlError(emsg)
+        self.__bit_width = bit_width
+        self.__style = style
+        if style == 'kogge_stone':
+            self.__level_list = PrefixAdder.__kogge_stone(bit_width)
+        elif style == 'brent_kung':
+            self.__level_list = PrefixAdder.__brent_kung(bit_width)
+        elif style == 'sklansky':
+            self.__level_list = PrefixAdder.__sklansky(bit_width)
+        elif style == 'han_carlson':
+            self.__level_list = PrefixAdder.__han_carlson(bit_width)
+        else:
+            emsg = f'{style}: unknown style'
+            raise RtlError(emsg)
+        self.__a = None
+        self.__b = None
+        self.__cin = None
+        self.__sum = None
+        self.__cout = None
+        self.__ent = None
+
+    @property
+    def bit_width(self):
+        """ビット幅を返す．"""
+        return self.__bit_width
+
+    @property
+    def style(self):
+        """プレフィックス網の構造を返す．"""
+        return self.__style
+
+    @property
+    def level_list(self):
+        """プレフィックス網の段ごとの (i, j) のリストを返す．"""
+        return self.__level_list
+
+    @property
+    def depth(self):
+        """プレフィックス網の段数を返す．"""
+        return len(self.__level_list)
+
+    @property
+    def cell_num(self):
+        """プレフィックス網のセル数を返す．"""
+        return sum(len(level) for level in self.__level_list)
+
+    def report(self):
+        """段数と面積の見積もりを辞書で返す．
+
+        ゲート数は2入力ゲートの数である．
+        * 前処理(g, p): AND と XOR が n 個ずつ
+        * プレフィックスセル: AND-OR で G を，AND で P を求める．
+        * 後処理: 和の XOR が n 個
+        論理段数は前処理1段 + プレフィックス網 2段/セル + 後処理1段 とする．
+        """
+        n = self.__bit_width
+        cells = self.cell_num
+        return {
+            'style': self.__style,
+            'bit_width': n,
+            'prefix_depth': self.depth,
+            'prefix_cells': cells,
+            'and_gates': n + 2 * cells,
+            'or_gates': cells,
+            'xor_gates': 2 * n,
+            'logic_depth': 2 * self.depth + 2,
+        }
+
+    def build(self, ent, a, b, *, cin=None, name=None):
+        """加算器をエンティティ中に作る．
+
+        :param Entity ent: エンティティ
+        :param Expr a: 第1オペランド
+        :param Expr b: 第2オペランド
+        :param Expr cin: キャリー入力(ビット型，省略可)
+        :param str name: 和の出力の名前
+        :return: 和の出力のネットを返す．
+
+        キャリー出力は cout で得られる．
+        """
+        if self.__ent is not None:
+            raise RtlError('build() has already been called')
+        n = self.__bit_width
+        for src in (a, b):
+            if Evaluator.bit_width(src.data_type) != n:
+                emsg = 'operand width mismatch'
+                raise RtlError(emsg)
+        self.__ent = ent
+        self.__a = a
+        self.__b = b
+        self.__cin = cin
+        if not a.is_simple():
+            a = ent.add_net(data_type=a.data_type, src=a)
+        if not b.is_simple():
+            b = ent.add_net(data_type=b.data_type, src=b)
+
+        bit_type = DataType.bit_type()
+
+        def new_net(src):
+            return ent.add_net(data_type=bit_type, src=src)
+
+        # 前処理
+        p_list = []
+        g_list = []
+        for i in range(n):
+            a_i = bit_of(a, i)
+            b_i = bit_of(b, i)
+            p_list.append(new_net(Expr.make_xor(a_i, b_i)))
+            g_list.append(new_net(Expr.make_and(a_i, b_i)))
+        # G[i] と P[i] は位置 i から下位方向のグループ generate/propagate
+        gg_list = list(g_list)
+        pp_list = list(p_list)
+        if cin is not None:
+            gg_list[0] = new_net(Expr.make_or(g_list[0],
+                                              Expr.make_and(p_list[0], cin)))
+        # プレフィックス網
+        for level in self.__level_list:
+            new_gg = list(gg_list)
+            new_pp = list(pp_list)
+            for i, j in level:
+                new_gg[i] = new_net(
+                    Expr.make_or(gg_list[i],
+                                 Expr.make_and(pp_list[i], gg_list[j])))
+                new_pp[i] = new_net(Expr.make_and(pp_list[i], pp_list[j]))
+            gg_list = new_gg
+            pp_list = new_pp
+        # 後処理
+        s_list = []
+        for i in range(n):
+            if i == 0:
+                if cin is None:
+                    s_list.append(p_list[0])
+                else:
+                    s_list.append(new_net(Expr.make_xor(p_list[0], cin)))
+            else:
+                s_list.append(new_net(Expr.make_xor(p_list[i],
+                                                    gg_list[i - 1])))
+        s_list.reverse()
+        self.__sum = ent.add_net(name=name,
+                                 data_type=DataType.bitvector_type(n),
+                                 src=Expr.concat(s_list))
+        self.__cout = gg_list[n - 1]
+        return self.__sum
+
+    @property
+    def sum(self):
+        """和の出力のネットを返す．"""
+        return self.__sum
+
+    @property
+    def output(self):
+        """和の出力のネットを返す．"""
+        return self.__sum
+
+    @property
+    def cout(self):
+        """キャリー出力のネットを返す．"""
+        return self.__cout
+
+    def self_check(self, *, num_samples=256, seed=0):
+        """シミュレーションにより + 演算子の結果と比較する．
+
+        :param int num_samples: 乱数パタンの数
+        :param int seed: 乱数の種
+        :return: 不一致のパタン (a, b, cin) のリストを返す．
+
+        ビット幅が小さい場合は全パタンを調べる．
+        オペランドは入力として値を与えられる式(ネット)でなければならない．
+        """
+        if self.__ent is None:
+            raise RtlError('build() has not been called')
+        n = self.__bit_width
+        evaluator = Evaluator(self.__ent)
+        cin_range = [0] if self.__cin is None else [0, 1]
+        if n * 2 + len(cin_range) - 1 <= 12:
+            pat_list = [(a, b, c)
+                        for a in range(1 << n)
+                        for b in range(1 << n)
+                        for c in cin_range]
+        else:
+            rng = random.Random(seed)
+            pat_list = [(rng.getrandbits(n), rng.getrandbits(n),
+                         rng.choice(cin_range))
+                        for _ in range(num_samples)]
+        error_list = []
+        for a, b, c in pat_list:
+            input_list = [(self.__a, a), (self.__b, b)]
+            if self.__cin is not None:
+                input_list.append((self.__cin, c))
+            s, cout = evaluator.eval_list([self.__sum, self.__cout],
+                                          input_list)
+            exp_val = a + b + c
+            if s != exp_val & ((1 << n) - 1) or cout != exp_val >> n:
+                error_list.append((a, b, c))
+        return error_list
+
+    @staticmethod
+    def __log2(n):
+        """ceil(log2(n)) を返す．"""
+        return DataType.bitlen(n)
+
+    @staticmethod
+    def __kogge_stone(n):
+        level_list = []
+        span = 1
+        while span < n:
+            level_list.append([(i, i - span) for i in range(span, n)])
+            span *= 2
+        return level_list
+
+    @staticmethod
+    def __sklansky(n):
+        level_list = []
+        for l in range(PrefixAdder.__log2(n)):
+            level = []
+            for i in range(n):
+                if (i >> l) & 1:
+                    level.append((i, ((i >> l) << l) - 1))
+            level_list.append(level)
+        return level_list
+
+    @staticmethod
+    def __brent_kung(n):
+        level_list = []
+        # 上りの木
+        l = 0
+        while (1 << l) < n:
+            step = 1 << (l + 1)
+            level = [(i, i - (1 << l)) for i in range(step - 1, n, step)]
+            if level:
+                level_list.append(level)
+            l += 1
+        # 下りの木
+        for l in range(l - 2, -1, -1):
+            step = 1 << (l + 1)
+            level = [(i, i - (1 << l))
+                     for i in range(3 * (1 << l) - 1, n, step)]
+            if level:
+                level_list.append(level)
+        return level_list
+
+    @staticmethod
+    def __han_carlson(n):
+        if n == 1:
+            return []
+        level_list = []
+        # 奇数ビットに隣の偶数ビットを合成する．
+        level_list.append([(i, i - 1) for i in range(1, n, 2)])
+        # 奇数ビットのみの Kogge-Stone
+        span = 2
+        while span < n:
+            level = [(i, i - span) for i in range(1, n, 2) if i - span >= 0]
+            if level:
+                level_list.append(level)
+            span *= 2
+        # 偶数ビットを求める．
+        level = [(i, i - 1) for i in range(2, n, 2)]
+        if level:
+            level_list.append(level)
+        return level_list
+
+
+def add_prefix_adder(self, a, b, *,
+                     cin=None,
+                     style='sklansky',
+                     name=None):
+    """並列プレフィックス加算器を追加する．
+
+    :param Expr a: 第1オペランド
+    :param Expr b: 第2オペランド
+    :param Expr cin: キャリー入力(ビット型，省略可)
+    :param str style: プレフィックス網の構造
+    :param str name: 和の出力の名前
+    :return: 生成した PrefixAdder を返す．
+
+    和は PrefixAdder.sum，キャリー出力は PrefixAdder.cout で得られる．
+    style については PrefixAdder を参照のこと．
+    """
+    bw = Evaluator.bit_width(a.data_type)
+    if bw is None:
+        emsg = 'operand must be a bit or bitvector'
+        raise RtlError(emsg)
+    adder = PrefixAdder(bw, style=style)
+    adder.build(self, a, b, cin=cin, name=name)
+    return adder
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.add_prefix_adder = add_prefix_adder
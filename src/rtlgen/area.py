@@ -0,0 +1,288 @@
+#! /usr/bin/env python3
+
+"""回路の規模を見積もるクラス
+
+:file: area.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.entity_mgr import EntityMgr
+from rtlgen.expr import OpBase, BinaryOp, BitSelect, PartSelect, Concat
+from rtlgen.expr import Constant, OpType
+from rtlgen.process import ClockedProcess
+from rtlgen.lut import Lut
+from rtlgen.statement import AssignBase, IfStatement, CaseStatement
+from rtlgen.evaluator import Evaluator
+from rtlgen.timing import DelayModel
+from rtlgen.traverse import expr_gen, expr_root_list, process_gen
+from rtlgen.traverse import sub_block_list
+
+
+class AreaReport:
+    """回路の規模の見積もりを表すクラス
+
+    * op_dict:    (OpType, ビット幅) をキーにした演算子の数の辞書
+    * flop_bits:  フリップフロップのビット数
+    * mux_inputs: if 文，case 文の分岐の数(マルチプレクサの入力数)
+    * lut_bits:   LUT の表のビット数
+    * inst_num:   インスタンスの数(階層をたどった総数)
+
+    ビット幅はオペランドのビット幅の最大値である．
+    """
+
+    def __init__(self):
+        self.__op_dict = {}
+        self.__flop_bits = 0
+        self.__mux_inputs = 0
+        self.__lut_bits = 0
+        self.__inst_num = 0
+
+    @property
+    def op_dict(self):
+        """(OpType, ビット幅) をキーにした演算子の数の辞書を返す．"""
+        return self.__op_dict
+
+    @property
+    def op_num(self):
+        """演算子の総数を返す．"""
+        return sum(self.__op_dict.values())
+
+    def op_count(self, op_type):
+        """ビット幅によらない演算子の数を返す．
+
+        :param OpType op_type: 演算子の種類
+        """
+        ans = 0
+        for (key_type, _), num in self.__op_dict.items():
+            if key_type == op_type:
+                ans += num
+        return ans
+
+    @property
+    def flop_bits(self):
+        """フリップフロップのビット数を返す．"""
+        return self.__flop_bits
+
+    @property
+    def mux_inputs(self):
+        """マルチプレクサの入力数を返す．"""
+        return self.__mux_inputs
+
+    @property
+    def lut_bits(self):
+        """LUT の表のビット数を返す．"""
+        return self.__lut_bits
+
+    @property
+    def inst_num(self):
+        """インスタンスの数を返す．"""
+        return self.__inst_num
+
+    def add_op(self, op_type, width, num=1):
+        """演算子を加える．"""
+        key = (op_type, width)
+        self.__op_dict[key] = self.__op_dict.get(key, 0) + num
+
+    def add_flop_bits(self, num):
+        """フリップフロップを加える．"""
+        self.__flop_bits += num
+
+    def add_mux_inputs(self, num):
+        """マルチプレクサの入力を加える．"""
+        self.__mux_inputs += num
+
+    def add_lut_bits(self, num):
+        """LUT のビットを加える．"""
+        self.__lut_bits += num
+
+    def add_inst_num(self, num):
+        """インスタンスを加える．"""
+        self.__inst_num += num
+
+    def merge(self, other, times=1):
+        """other の times 倍を加える．
+
+        :param AreaReport other: 加える見積もり
+        :param int times: 倍数
+        """
+        for (op_type, width), num in other.op_dict.items():
+            self.add_op(op_type, width, num * times)
+        self.__flop_bits += other.flop_bits * times
+        self.__mux_inputs += other.mux_inputs * times
+        self.__lut_bits += other.lut_bits * times
+        self.__inst_num += other.inst_num * times
+
+
+class AreaEstimator:
+    """回路の規模を見積もるクラス
+
+    エンティティごとに継続的代入文とプロセス中の式の演算子，
+    クロック付きプロセス(Dff, RegisterBank, ShiftRegister など)で
+    代入されるビット数，if 文と case 文の分岐の数，Lut の表の大きさを
+    数え，インスタンスの階層をたどって合計する．
+    同じ部分式は一度だけ数える．定数のビット選択，範囲選択，
+    連結は配線のみなので数えない．
+    エンティティごとの結果はキャッシュされるので，同じエンティティの
+    インスタンスがいくつあっても一度しか数えない．
+    エンティティを変更した場合は clear() でキャッシュを消去すること．
+    """
+
+    def __init__(self):
+        # エンティティをキーにして自身のみの見積もりを保持する辞書
+        self.__local_dict = {}
+        # エンティティをキーにして階層全体の見積もりを保持する辞書
+        self.__total_dict = {}
+
+    def clear(self):
+        """キャッシュを消去する．"""
+        self.__local_dict = {}
+        self.__total_dict = {}
+
+    def local(self, ent):
+        """インスタンスの中身を含まない見積もりを返す．
+
+        :param Entity ent: 対象のエンティティ
+        :rtype: AreaReport
+        """
+        if ent not in self.__local_dict:
+            self.__local_dict[ent] = self.__estimate(ent)
+        return self.__local_dict[ent]
+
+    def total(self, ent):
+        """インスタンスの中身を含む見積もりを返す．
+
+        :param Entity ent: 対象のエンティティ
+        :rtype: AreaReport
+        """
+        # 子のエンティティから順に求める．
+        stack = [(ent, False)]
+        while stack:
+            cur, expanded = stack.pop()
+            if cur in self.__total_dict:
+                continue
+            child_dict = {}
+            for item in cur.item_gen:
+                if item.is_inst:
+                    child = item.entity
+                    child_dict[child] = child_dict.get(child, 0) + 1
+            if not expanded:
+                stack.append((cur, True))
+                for child in child_dict:
+                    if child not in self.__total_dict:
+                        stack.append((child, False))
+                continue
+            report = AreaReport()
+            report.merge(self.local(cur))
+            for child, num in child_dict.items():
+                report.merge(self.__total_dict[child], num)
+                report.add_inst_num(num)
+            self.__total_dict[cur] = report
+        return self.__total_dict[ent]
+
+    def __estimate(self, ent):
+        report = AreaReport()
+        # 演算子
+        root_list = [expr for expr, _ in expr_root_list(ent)]
+        for expr in expr_gen(root_list):
+            if isinstance(expr, OpBase):
+                if isinstance(expr, BinaryOp):
+                    if expr.op_type in (OpType.LSFT, OpType.RSFT) and \
+                       isinstance(expr.operand2, Constant):
+                        continue
+                    width = max(_width(expr.operand1),
+                                _width(expr.operand2))
+                else:
+                    width = _width(expr.operand1)
+                report.add_op(expr.op_type, width)
+            elif isinstance(expr, BitSelect) and \
+                 not isinstance(expr.index, Constant):
+                report.add_op(OpType.BSEL, _width(expr.primary))
+        # フリップフロップとマルチプレクサ
+        for proc in process_gen(ent):
+            self.__count_process(proc, report)
+        # LUT
+        for item in ent.item_gen:
+            if isinstance(item, Lut):
+                report.add_lut_bits((1 << item.input_bw) * item.output_bw)
+        return report
+
+    def __count_process(self, proc, report):
+        clocked = isinstance(proc, ClockedProcess)
+        lhs_set = set()
+        with proc.process_body() as body:
+            stack = [(body, clocked and proc.asyncctl is not None)]
+        while stack:
+            block, async_top = stack.pop()
+            for stmt in block.statement_gen:
+                if isinstance(stmt, AssignBase):
+                    if clocked and id(stmt.lhs) not in lhs_set:
+                        lhs_set.add(id(stmt.lhs))
+                        report.add_flop_bits(_lhs_width(stmt.lhs))
+                    continue
+                sub_list = sub_block_list(stmt)
+                if isinstance(stmt, IfStatement) and async_top:
+                    # 非同期リセットの if 文はマルチプレクサではない．
+                    async_top = False
+                elif isinstance(stmt, IfStatement):
+                    report.add_mux_inputs(2)
+                elif isinstance(stmt, CaseStatement):
+                    report.add_mux_inputs(len(sub_list))
+                for sub_block in sub_list:
+                    stack.append((sub_block, False))
+
+
+def _width(expr):
+    width = Evaluator.bit_width(expr.data_type)
+    if width is None:
+        return DelayModel.INT_WIDTH
+    return width
+
+
+def _lhs_width(lhs):
+    """左辺式のビット幅を返す．"""
+    if isinstance(lhs, BitSelect):
+        return 1
+    if isinstance(lhs, PartSelect):
+        return abs(lhs.left - lhs.right) + 1
+    if isinstance(lhs, Concat):
+        return sum(_lhs_width(src) for src in lhs.src_list)
+    return _width(lhs)
+
+
+def estimate_area(self, *, estimator=None):
+    """インスタンスの中身を含めた回路の規模を見積もる．
+
+    :param AreaEstimator estimator: 見積もりに用いるオブジェクト
+    :rtype: AreaReport
+
+    estimator を共有すると，エンティティごとの結果が再利用される．
+    詳細は AreaEstimator を参照のこと．
+    """
+    if estimator is None:
+        estimator = AreaEstimator()
+    return estimator.total(self)
+
+
+def mgr_estimate_area(self, top, *, estimator=None):
+    """top から使われている全てのエンティティの規模を見積もる．
+
+    :param Entity top: 最上位のエンティティ
+    :param AreaEstimator estimator: 見積もりに用いるオブジェクト
+    :return: エンティティ名をキーにして AreaReport を保持する辞書を返す．
+
+    各 AreaReport はインスタンスの中身を含めた値である．
+    """
+    if estimator is None:
+        estimator = AreaEstimator()
+    ans = {}
+    for ent in EntityMgr.get_entity_list(top):
+        ans[ent.name] = estimator.total(ent)
+    return ans
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.estimate_area = estimate_area
+# EntityMgr にメンバ関数(インスタンスメソッド)を追加する．
+EntityMgr.estimate_area = mgr_estimate_area
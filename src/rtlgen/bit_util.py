@@ -0,0 +1,120 @@
+#! /usr/bin/env python3
+
+"""ビット単位の回路を組み立てるための関数群
+
+:file: bit_util.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+
+ビットは式(ビット型)か定数を表す 0 か 1 の int で表す．
+fold_xxx() は定数の畳み込みを行い，結果が式の場合はネットにする．
+"""
+
+from rtlgen.expr import Expr
+from rtlgen.data_type import DataType
+from rtlgen.evaluator import Evaluator
+from rtlgen.rtlerror import RtlError
+
+
+def bit_of(expr, pos):
+    """式の pos ビット目を返す．
+
+    :param Expr expr: 対象の式(ビット型かビットベクタ型)
+    :param int pos: ビット位置
+    """
+    if expr.data_type.is_bit_type:
+        return expr
+    return Expr.bit_select(expr, pos)
+
+
+def expr_bit_list(ent, expr):
+    """式のビットのリストを LSB から順に返す．
+
+    :param Entity ent: エンティティ
+    :param Expr expr: 対象の式(ビット型かビットベクタ型)
+
+    単純でない式はネットにしてからビットを選択する．
+    """
+    bw = Evaluator.bit_width(expr.data_type)
+    if bw is None:
+        emsg = 'operand must be a bit or bitvector'
+        raise RtlError(emsg)
+    if not expr.is_simple():
+        expr = ent.add_net(data_type=expr.data_type, src=expr)
+    return [bit_of(expr, i) for i in range(bw)]
+
+
+def const_bit(val):
+    """0 か 1 の定数を表す式を返す．"""
+    return Expr.make_constant(data_type=DataType.bit_type(), val=val)
+
+
+def to_expr(bit):
+    """int のビットを定数の式にする．"""
+    if isinstance(bit, int):
+        return const_bit(bit)
+    return bit
+
+
+def to_net(ent, bit):
+    """単純でない式をネットにする．
+
+    int のビットはそのまま返す．
+    """
+    if isinstance(bit, int) or bit.is_simple():
+        return bit
+    return ent.add_net(data_type=DataType.bit_type(), src=bit)
+
+
+def new_vector(ent, bit_list, *, name=None):
+    """ビットのリスト(LSB から)を連結したビットベクタ型のネットを作る．
+
+    :param Entity ent: エンティティ
+    :param list bit_list: ビットのリスト(int も可)
+    :param str name: ネットの名前
+    """
+    bit_list = [to_expr(bit) for bit in bit_list]
+    n = len(bit_list)
+    return ent.add_net(name=name, data_type=DataType.bitvector_type(n),
+                       src=Expr.concat(list(reversed(bit_list))))
+
+
+def fold_not(ent, x):
+    """~x を作る．"""
+    if isinstance(x, int):
+        return 1 - x
+    return to_net(ent, Expr.make_not(x))
+
+
+def fold_and(ent, x, y):
+    """x & y を作る．"""
+    if isinstance(x, int):
+        return y if x else 0
+    if isinstance(y, int):
+        return x if y else 0
+    return to_net(ent, Expr.make_and(x, y))
+
+
+def fold_or(ent, x, y):
+    """x | y を作る．"""
+    if isinstance(x, int):
+        return 1 if x else y
+    if isinstance(y, int):
+        return 1 if y else x
+    return to_net(ent, Expr.make_or(x, y))
+
+
+def fold_xor(ent, x, y):
+    """x ^ y を作る．"""
+    if isinstance(x, int):
+        return fold_not(ent, y) if x else y
+    if isinstance(y, int):
+        return fold_not(ent, x) if y else x
+    return to_net(ent, Expr.make_xor(x, y))
+
+
+def fold_mux(ent, s, ns, a, b):
+    """s ? a : b を作る．ns は ~s である．"""
+    if isinstance(a, int) and isinstance(b, int) and a == b:
+        return a
+    return fold_or(ent, fold_and(ent, s, a), fold_and(ent, ns, b))
@@ -0,0 +1,296 @@
+#! /usr/bin/env python3
+
+"""組み合わせ回路のループと多重駆動を検査するクラス
+
+:file: check.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.expr import Constant, BitSelect, PartSelect, Concat
+from rtlgen.net import Net
+from rtlgen.port import Port
+from rtlgen.var import Var
+from rtlgen.process import Process, ClockedProcess
+from rtlgen.inst import Inst
+from rtlgen.lut import Lut
+from rtlgen.statement import AssignBase, IfStatement, CaseStatement
+from rtlgen.traverse import operand_list, sub_block_list, scc_list
+
+
+class CheckReport:
+    """設計の検査結果を表すクラス
+
+    * loop_list:         組み合わせ回路のループのリスト．
+                         各ループはループ上の信号名のリストで表す．
+    * multi_driver_list: 複数の駆動元を持つ信号の (名前, 駆動元の数) のリスト
+    """
+
+    def __init__(self):
+        self.__loop_list = []
+        self.__multi_driver_list = []
+
+    @property
+    def loop_list(self):
+        """組み合わせ回路のループのリストを返す．"""
+        return self.__loop_list
+
+    @property
+    def multi_driver_list(self):
+        """複数の駆動元を持つ信号の (名前, 駆動元の数) のリストを返す．"""
+        return self.__multi_driver_list
+
+    @property
+    def is_ok(self):
+        """ループも多重駆動もない時 True を返す．"""
+        return not self.__loop_list and not self.__multi_driver_list
+
+    def add_loop(self, name_list):
+        """ループを加える．"""
+        self.__loop_list.append(name_list)
+
+    def add_multi_driver(self, name, num):
+        """多重駆動の信号を加える．"""
+        self.__multi_driver_list.append((name, num))
+
+
+class DesignChecker:
+    """組み合わせ回路のループと多重駆動を検査するクラス
+
+    :param Entity ent: 対象のエンティティ
+
+    信号(ネット，ポート，変数)の駆動元は継続的代入文，プロセス，
+    インスタンスの出力，Lut の出力と，エンティティの入力ポート
+    そのものである．
+    一つの信号が複数の駆動元から代入されている場合を多重駆動とする．
+    ただし，定数のビット選択，範囲選択で重ならない範囲に代入している
+    場合は除く．同じプロセス中の複数の代入文は一つの駆動元とみなす．
+    双方向ポートに接続された信号は対象としない．
+
+    組み合わせ回路の依存関係は TimingAnalyzer と同じく，
+    継続的代入文の右辺と，組み合わせプロセス中の代入文の右辺および
+    それを囲む if 文，case 文の条件式とし，Lut の出力は入力に依存する
+    ものとする．インスタンスの内部はたどらない．
+    依存関係のグラフの強連結成分をもとめてループを検出するので，
+    計算量は回路の大きさに比例する．
+    """
+
+    def __init__(self, ent):
+        ent.make_names()
+        self.__ent = ent
+        # 信号の id をキーにして信号を保持する辞書(挿入順を保つ)
+        self.__signal_dict = {}
+        # 信号の id をキーにして組み合わせ回路の駆動元の式のリストを
+        # 保持する辞書
+        self.__driver_dict = {}
+        # 信号の id をキーにして (駆動元の id, 範囲) のリストを保持する辞書
+        self.__source_dict = {}
+
+        for port in ent.port_gen:
+            if port.is_input and not port.is_inout:
+                self.__add_source(port, port, None)
+        for ca in ent.cont_assign_gen:
+            for signal, rng in _lhs_target_list(ca.lhs):
+                self.__add_source(signal, ca, rng)
+                self.__add_driver(signal, [ca.rhs])
+        for item in ent.item_gen:
+            if isinstance(item, Process):
+                comb = not isinstance(item, ClockedProcess)
+                for lhs, src_list in _assign_list(item):
+                    for signal, rng in _lhs_target_list(lhs):
+                        self.__add_source(signal, item, rng)
+                        if comb:
+                            self.__add_driver(signal, src_list)
+            elif isinstance(item, Inst):
+                for oport, iport in item.port_gen:
+                    if iport.is_output and not iport.is_inout:
+                        self.__add_source(oport, item, None)
+            elif isinstance(item, Lut):
+                self.__add_source(item.output, item, None)
+                self.__add_driver(item.output, [item.input])
+
+    def run(self):
+        """検査を行う．
+
+        :return: CheckReport を返す．
+        """
+        report = CheckReport()
+        self.__check_loop(report)
+        self.__check_multi_driver(report)
+        return report
+
+    def __add_source(self, signal, source, rng):
+        key = id(signal)
+        self.__signal_dict.setdefault(key, signal)
+        self.__source_dict.setdefault(key, []).append((id(source), rng))
+
+    def __add_driver(self, signal, src_list):
+        key = id(signal)
+        self.__signal_dict.setdefault(key, signal)
+        self.__driver_dict.setdefault(key, []).extend(src_list)
+
+    def __succ_list(self, expr):
+        """依存する式のリストを返す．"""
+        if isinstance(expr, (Net, Port, Var)):
+            return self.__driver_dict.get(id(expr), [])
+        if isinstance(expr, _CondNode):
+            return expr.src_list
+        return operand_list(expr)
+
+    def __check_loop(self, report):
+        """組み合わせ回路のループを検出する．"""
+        root_list = [self.__signal_dict[key] for key in self.__driver_dict]
+        for member_list in scc_list(root_list, self.__succ_list):
+            node = member_list[0]
+            if len(member_list) == 1 and \
+               all(src is not node for src in self.__succ_list(node)):
+                continue
+            name_list = [member.name for member in reversed(member_list)
+                         if isinstance(member, (Net, Port, Var))]
+            report.add_loop(name_list)
+
+    def __check_multi_driver(self, report):
+        """多重駆動を検出する．"""
+        inout_set = set()
+        for port in self.__ent.port_gen:
+            if port.is_inout:
+                inout_set.add(id(port))
+        for item in self.__ent.item_gen:
+            if isinstance(item, Inst):
+                for oport, iport in item.port_gen:
+                    if iport.is_inout:
+                        inout_set.add(id(oport))
+        for key, source_list in self.__source_dict.items():
+            if key in inout_set:
+                continue
+            # 駆動元の id をキーにして範囲のリストを保持する辞書
+            range_dict = {}
+            for src_key, rng in source_list:
+                range_dict.setdefault(src_key, []).append(rng)
+            if len(range_dict) < 2:
+                continue
+            if _overlaps(range_dict):
+                signal = self.__signal_dict[key]
+                report.add_multi_driver(signal.name, len(range_dict))
+
+
+def _overlaps(range_dict):
+    """異なる駆動元の範囲が重なっている時 True を返す．"""
+    interval_list = []
+    for src_key, rng_list in range_dict.items():
+        for rng in rng_list:
+            if rng is None:
+                return True
+            interval_list.append((rng[0], rng[1], src_key))
+    interval_list.sort()
+    max_right = None
+    max_src = None
+    for left, right, src_key in interval_list:
+        if max_right is not None and left <= max_right and \
+           src_key != max_src:
+            return True
+        if max_right is None or right > max_right:
+            max_right = right
+            max_src = src_key
+    return False
+
+
+def _lhs_target_list(lhs):
+    """左辺式に含まれる信号と代入される範囲のリストを返す．
+
+    範囲は (LSB, MSB) のタプルで表し，全体もしくは不定の場合は None とする．
+    """
+    ans = []
+    stack = [lhs]
+    while stack:
+        expr = stack.pop()
+        if isinstance(expr, BitSelect):
+            if isinstance(expr.primary, (Net, Port, Var)) and \
+               isinstance(expr.index, Constant):
+                pos = expr.index.value
+                ans.append((expr.primary, (pos, pos)))
+            else:
+                stack.append(expr.primary)
+        elif isinstance(expr, PartSelect):
+            if isinstance(expr.primary, (Net, Port, Var)):
+                rng = (min(expr.left, expr.right), max(expr.left, expr.right))
+                ans.append((expr.primary, rng))
+            else:
+                stack.append(expr.primary)
+        elif isinstance(expr, Concat):
+            stack.extend(expr.src_list)
+        else:
+            ans.append((expr, None))
+    return ans
+
+
+class _CondNode:
+    """if 文，case 文の条件式を表す依存関係のグラフのノード
+
+    条件式と，外側の if 文，case 文のノードに依存する．
+    """
+
+    def __init__(self, cond, parent):
+        if parent is None:
+            self.src_list = [cond]
+        else:
+            self.src_list = [cond, parent]
+
+
+def _assign_list(proc):
+    """プロセス中の代入文の左辺と，右辺および条件式のリストを返す．
+
+    条件式は最も内側の if 文，case 文のノード(_CondNode)で表す．
+    可変のビット選択の添字も右辺と同様に扱う．
+    """
+    ans = []
+    with proc.process_body() as body:
+        stack = [(body, None)]
+    while stack:
+        block, cond_node = stack.pop()
+        for stmt in block.statement_gen:
+            if isinstance(stmt, AssignBase):
+                src_list = [stmt.rhs]
+                if cond_node is not None:
+                    src_list.append(cond_node)
+                for expr in _index_list(stmt.lhs):
+                    src_list.append(expr)
+                ans.append((stmt.lhs, src_list))
+            elif isinstance(stmt, (IfStatement, CaseStatement)):
+                sub_cond_node = _CondNode(stmt.cond, cond_node)
+                for sub_block in sub_block_list(stmt):
+                    stack.append((sub_block, sub_cond_node))
+    return ans
+
+
+def _index_list(lhs):
+    """左辺式中の可変のビット選択の添字のリストを返す．"""
+    ans = []
+    stack = [lhs]
+    while stack:
+        expr = stack.pop()
+        if isinstance(expr, BitSelect):
+            if not isinstance(expr.index, Constant):
+                ans.append(expr.index)
+            stack.append(expr.primary)
+        elif isinstance(expr, PartSelect):
+            stack.append(expr.primary)
+        elif isinstance(expr, Concat):
+            stack.extend(expr.src_list)
+    return ans
+
+
+def check_design(self):
+    """組み合わせ回路のループと多重駆動を検査する．
+
+    :return: CheckReport を返す．
+
+    無名のネットには make_names() で名前をつける．
+    詳細は DesignChecker を参照のこと．
+    """
+    return DesignChecker(self).run()
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.check_design = check_design
@@ -17,6 +17,7 @@ class ContAssign:
         rhs = lhs.coerce(rhs)
         self.__lhs = lhs
         self.__rhs = rhs
+        self.__index = None
 
     @property
     def lhs(self):
@@ -27,3 +28,19 @@ class ContAssign:
     def rhs(self):
         """右辺式を返す．"""
         return self.__rhs
+
+    def set_rhs(self, rhs):
+        """右辺式を置き換える．
+
+        :param Expr rhs: 新しい右辺式
+        """
+        self.__rhs = self.__lhs.coerce(rhs)
+        if self.__index is not None:
+            self.__index.update(self)
+
+    def set_index(self, index):
+        """信号の索引を設定する．
+
+        :param SignalIndex index: 索引(None の時は登録を解除する)
+        """
+        self.__index = index
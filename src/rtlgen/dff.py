@@ -8,9 +8,9 @@
 """
 
 from rtlgen.process import ClockedProcess
-from rtlgen.data_type import BitType
+from rtlgen.data_type import BitType, DataType
 from rtlgen.entity import Entity
-from rtlgen.expr import Expr
+from rtlgen.expr import Expr, Concat
 
 
 class Dff(ClockedProcess):
@@ -94,16 +94,41 @@ class Dff(ClockedProcess):
         """データ入力のネットを返す．"""
         return self.__data_in
 
+    def set_data_in(self, data_in):
+        """データ入力を置き換える．
+
+        :param Expr data_in: 新しいデータ入力(型は元と同じでなければならない)
+
+        動作を表す代入文の右辺も置き換える．
+        """
+        with self.body() as body:
+            stmt = list(body.statement_gen)[0]
+        if self.enable is not None:
+            with stmt.then_body() as then_body:
+                stmt = list(then_body.statement_gen)[0]
+        stmt.set_rhs(data_in)
+        self.__data_in = data_in
+
     @property
     def reset(self):
         """リセットのネットを返す．"""
         return self.asyncctl
 
+    @property
+    def reset_val(self):
+        """リセット値を返す．"""
+        return self.__reset_val
+
     @property
     def enable(self):
         """イネーブルのネットを返す．"""
         return self.__enable
 
+    @property
+    def enable_pol(self):
+        """イネーブルの極性を返す．"""
+        return self.__enable_pol
+
     @property
     def q(self):
         """データ出力のネットを返す．"""
@@ -115,6 +140,144 @@ class Dff(ClockedProcess):
         return self.__q
 
 
+class ShiftRegister(ClockedProcess):
+    """シフトレジスタを表すクラス
+
+    :param str name: 名前
+    :param Expr data_in: データ入力
+    :param int delay: 段数
+    :param Expr clock: クロック入力
+    :param str clock_pol: クロックのアクティブエッジを表す文字列
+                  'positive' か 'negative'
+    :param Expr reset: リセット入力
+    :param str reset_pol: リセットの極性を表す文字列
+                  'positive' か 'negative'
+    :param int reset_val: 各段のリセット値
+    :param Expr enable: イネーブル入力
+    :param str enable_pol: イネーブル信号の極性を表す文字列
+                  'positive' か 'negative'
+    :param bool srl: リセットなしの記述を生成する時に True にする．
+
+    全段を一本のベクタ型のレジスタ(data_in のビット幅 x delay)で表し，
+    一つのプロセスの中で連結演算を用いてシフトする．
+    下位側が入力に近い段となる．
+    data_in が符号付きの場合はレジスタも符号付きで宣言する．
+    段数によらず生成されるオブジェクト数は一定である．
+    srl が True の場合はリセットを持たない記述となり，
+    FPGA のシフトレジスタ用 LUT(SRL) や RAM に推論されやすくなる．
+    """
+
+    def __init__(self, parent, *,
+                 name=None,
+                 data_in,
+                 delay=1,
+                 clock,
+                 clock_pol="positive",
+                 reset=None,
+                 reset_pol=None,
+                 reset_val=0,
+                 enable=None,
+                 enable_pol=None,
+                 srl=False):
+        if srl:
+            reset = None
+            reset_pol = None
+        super().__init__(parent, name=name,
+                         clock=clock, clock_pol=clock_pol,
+                         asyncctl=reset, asyncctl_pol=reset_pol)
+        assert delay >= 1
+        self.__data_in = data_in
+        self.__delay = delay
+        self.__reset_val = reset_val
+        self.__enable = enable
+        self.__enable_pol = enable_pol
+        self.__width = Concat.src_size(data_in)
+        if delay == 1:
+            reg_type = data_in.data_type
+        elif data_in.data_type.is_signedbitvector_type:
+            reg_type = DataType.signed_bitvector_type(self.__width * delay)
+        else:
+            reg_type = DataType.bitvector_type(self.__width * delay)
+        self.__reg = self.add_net(reg_type, reg_type=True)
+
+        # リセット動作を表す statement を作る．
+        if self.reset is not None:
+            rval = Expr.make_constant(data_type=data_in.data_type,
+                                      val=reset_val)
+            if delay > 1:
+                rval = Expr.multi_concat(delay, [rval])
+            with self.asyncctl_body() as _:
+                _.add_assign(self.__reg, rval)
+        # 動作を表す statement を作る．
+        if delay == 1:
+            next_val = data_in
+        else:
+            msb = self.__width * (delay - 1) - 1
+            next_val = Expr.concat([Expr.part_select(self.__reg, msb, 0),
+                                    data_in])
+        if enable is None:
+            with self.body() as _:
+                _.add_assign(self.__reg, next_val)
+        else:
+            if enable_pol == "positive":
+                val = 1
+            else:
+                val = 0
+            cond = Expr.make_eq(enable, Expr.make_constant(val=val))
+            with self.body() as _:
+                if_stmt = _.add_if(cond)
+                with if_stmt.then_body() as _:
+                    _.add_assign(self.__reg, next_val)
+
+    @property
+    def data_in(self):
+        """データ入力を返す．"""
+        return self.__data_in
+
+    @property
+    def delay(self):
+        """段数を返す．"""
+        return self.__delay
+
+    @property
+    def reset(self):
+        """リセットのネットを返す．"""
+        return self.asyncctl
+
+    @property
+    def reset_val(self):
+        """各段のリセット値を返す．"""
+        return self.__reset_val
+
+    @property
+    def enable(self):
+        """イネーブルのネットを返す．"""
+        return self.__enable
+
+    @property
+    def register(self):
+        """全段を表すレジスタのネットを返す．"""
+        return self.__reg
+
+    def tap(self, stage):
+        """stage 段目の出力を表す式を返す．
+
+        :param int stage: 段番号(1 から delay まで)
+        """
+        assert 1 <= stage <= self.__delay
+        if self.__delay == 1:
+            return self.__reg
+        w = self.__width
+        if self.__data_in.data_type.is_bit_type:
+            return Expr.bit_select(self.__reg, stage - 1)
+        return Expr.part_select(self.__reg, w * stage - 1, w * (stage - 1))
+
+    @property
+    def output(self):
+        """最終段の出力を表す式を返す．"""
+        return self.tap(self.__delay)
+
+
 def add_dff(self, *,
             name=None,
             data_in=None,
@@ -156,12 +319,55 @@ def add_dff(self, *,
     return dff
 
 
+def add_shift_register(self, data_in, delay=1, *,
+                       name=None,
+                       clock=None,
+                       clock_pol=None,
+                       reset=None,
+                       reset_pol=None,
+                       reset_val=0,
+                       enable=None,
+                       enable_pol=None,
+                       srl=False):
+    """シフトレジスタを追加する．
+
+    :param Expr data_in: データ入力
+    :param int delay: 段数
+    :param str name: 名前
+    :param Expr clock: クロック入力
+    :param str clock_pol: クロックのアクティブエッジを表す文字列
+    :param Expr reset: リセット入力
+    :param str reset_pol: リセットの極性を表す文字列
+    :param int reset_val: 各段のリセット値
+    :param Expr enable: イネーブル入力
+    :param str enable_pol: イネーブル信号の極性を表す文字列
+    :param bool srl: リセットなしの記述を生成する時に True にする．
+    :return: 生成した ShiftRegister を返す．
+    """
+    if clock is None:
+        clock = self.default_clock
+    if clock_pol is None:
+        clock_pol = self.default_clock_pol
+    if reset is None:
+        reset = self.default_reset
+    if reset_pol is None:
+        reset_pol = self.default_reset_pol
+    sreg = ShiftRegister(self, name=name, data_in=data_in, delay=delay,
+                         clock=clock, clock_pol=clock_pol,
+                         reset=reset, reset_pol=reset_pol,
+                         reset_val=reset_val,
+                         enable=enable, enable_pol=enable_pol,
+                         srl=srl)
+    return sreg
+
+
 def add_delay(self, data_in, delay=1, *,
               name=None,
               clock=None,
               clock_pol=None,
               reset=None,
-              reset_pol=None):
+              reset_pol=None,
+              srl=False):
     """遅延ユニットを作る．
 
     :param Expr data_in: データ入力
@@ -171,6 +377,9 @@ def add_delay(self, data_in, delay=1, *,
     :param str clock_pol: クロックのアクティブエッジを表す文字列
     :param Expr reset: リセット入力
     :param str reset_pol: リセットの極性を表す文字列
+    :param bool srl: リセットなしの記述を生成する時に True にする．
+
+    全段を一つの ShiftRegister で実現する．
     """
     if clock is None:
         clock = self.default_clock
@@ -180,19 +389,19 @@ def add_delay(self, data_in, delay=1, *,
         reset = self.default_reset
     if reset_pol is None:
         reset_pol = self.default_reset_pol
-    tmp_net = data_in
-    rval = Expr.make_constant(data_type=data_in.data_type, val=0)
-    for _ in range(delay):
-        dff = Dff(self, data_in=tmp_net,
-                  clock=clock, clock_pol=clock_pol,
-                  reset=reset, reset_pol=reset_pol,
-                  reset_val=rval)
-        tmp_net = dff.output
     out = self.add_net(name=name, data_type=data_in.data_type)
-    self.connect(out, tmp_net)
+    if delay == 0:
+        self.connect(out, data_in)
+        return out
+    sreg = ShiftRegister(self, data_in=data_in, delay=delay,
+                         clock=clock, clock_pol=clock_pol,
+                         reset=reset, reset_pol=reset_pol,
+                         srl=srl)
+    self.connect(out, sreg.output)
     return out
 
 
 # Entity クラスにメンバ関数(インスタンスメソッド)を追加する．
 Entity.add_dff = add_dff
+Entity.add_shift_register = add_shift_register
 Entity.add_delay = add_delay
@@ -0,0 +1,157 @@
+#! /usr/bin/env python3
+
+"""プライオリティエンコーダ等を作る関数
+
+:file: encoder.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.data_type import DataType
+from rtlgen.multiplier import CompressorTree
+from rtlgen.bit_util import expr_bit_list, to_expr, to_net
+from rtlgen.bit_util import new_vector, fold_not, fold_or, fold_and, fold_mux
+
+
+def add_priority_encoder(self, src, *,
+                         lsb_first=False,
+                         name=None):
+    """プライオリティエンコーダを追加する．
+
+    :param Expr src: 入力
+    :param bool lsb_first: 最下位ビットを優先する時 True にする．
+    :param str name: インデックスの出力の名前
+    :return: (index, valid) を返す．
+
+    * index: 最上位(lsb_first=True の場合は最下位)の1のビットの位置
+    * valid: src に1のビットがある時 1 となる．
+    valid が 0 の時の index の値は不定である．
+    """
+    bit_list = expr_bit_list(self, src)
+    valid, idx_list = _find_one(self, bit_list, msb_first=not lsb_first)
+    index = new_vector(self, idx_list, name=name)
+    return index, to_expr(to_net(self, valid))
+
+
+def add_find_first_set(self, src, *, name=None):
+    """最下位の1のビットの位置を求める回路を追加する．
+
+    :param Expr src: 入力
+    :param str name: インデックスの出力の名前
+    :return: (index, valid) を返す．
+
+    add_priority_encoder(src, lsb_first=True) と同じである．
+    """
+    return add_priority_encoder(self, src, lsb_first=True, name=name)
+
+
+def add_leading_zero_counter(self, src, *, ones=False, name=None):
+    """先頭(最上位側)の0の数を数える回路を追加する．
+
+    :param Expr src: 入力
+    :param bool ones: 0 の代わりに 1 の数を数える時 True にする．
+    :param str name: 出力の名前
+    :return: 数を表すネットを返す．
+
+    出力のビット幅は log2(n + 1) で，全て0の場合は n となる．
+    入力の下位に0を詰めて 2^k ビットにすると，最上位の1の位置 p に
+    対して先頭の0の数は ~p となる．
+    """
+    bit_list = expr_bit_list(self, src)
+    if ones:
+        bit_list = [fold_not(self, bit) for bit in bit_list]
+    n = len(bit_list)
+    k = DataType.bitlen(n)
+    bit_list = [0] * ((1 << k) - n) + bit_list
+    valid, idx_list = _find_one(self, bit_list, msb_first=True)
+    valid_n = fold_not(self, valid)
+    count_list = []
+    for i in range(DataType.bitlen(n + 1)):
+        if i < k:
+            inv_p = fold_not(self, idx_list[i])
+            if (n >> i) & 1:
+                count_list.append(fold_or(self, valid_n, inv_p))
+            else:
+                count_list.append(fold_and(self, valid, inv_p))
+        else:
+            count_list.append(valid_n)
+    return new_vector(self, count_list, name=name)
+
+
+def add_popcount(self, src, *, style='dadda', name=None):
+    """1のビットの数を数える回路を追加する．
+
+    :param Expr src: 入力
+    :param str style: 加算木の構造(CompressorTree を参照)
+    :param str name: 出力の名前
+    :return: 数を表すネットを返す．
+
+    全てのビットを CompressorTree の最下位の列に加えて圧縮する．
+    出力のビット幅は log2(n + 1) となる．
+    """
+    bit_list = expr_bit_list(self, src)
+    n = len(bit_list)
+    tree = CompressorTree(self, DataType.bitlen(n + 1), style=style)
+    for bit in bit_list:
+        tree.add_bit(0, bit)
+    return tree.build(name=name)
+
+
+def _find_one(ent, bit_list, *, msb_first):
+    """1のビットの位置を二分木で求める．
+
+    :param Entity ent: エンティティ
+    :param list bit_list: ビットのリスト(LSB から，0 の int も可)
+    :param bool msb_first: 最上位の1を求める時 True にする．
+    :return: (valid, idx_list) を返す．
+
+    2つの部分木の結果 (v_hi, idx_hi), (v_lo, idx_lo) から
+    v = v_hi | v_lo
+    idx = {v_hi, v_hi ? idx_hi : idx_lo}  (msb_first の場合)
+    idx = {~v_lo, v_lo ? idx_lo : idx_hi}  (それ以外)
+    を求める．段数は log2(n)，各段のマルチプレクサの幅は段数に等しい．
+    """
+    n = len(bit_list)
+    k = DataType.bitlen(n)
+    node_list = [(bit, []) for bit in bit_list] + [(0, [])] * ((1 << k) - n)
+    while len(node_list) > 1:
+        next_list = []
+        for i in range(0, len(node_list), 2):
+            v_lo, idx_lo = node_list[i]
+            v_hi, idx_hi = node_list[i + 1]
+            if msb_first:
+                v1, idx1, v2, idx2 = v_hi, idx_hi, v_lo, idx_lo
+            else:
+                v1, idx1, v2, idx2 = v_lo, idx_lo, v_hi, idx_hi
+            v = fold_or(ent, v1, v2)
+            if msb_first and (isinstance(v1, int) or isinstance(v2, int)):
+                nv1 = None
+            else:
+                nv1 = fold_not(ent, v1)
+            if isinstance(v1, int):
+                # v1 が 0 の時は常に第2の部分木の結果を選ぶ．
+                idx = list(idx2)
+            elif isinstance(v2, int):
+                # v2 が 0 の時の idx は不定でよい．
+                idx = list(idx1)
+            else:
+                idx = [fold_mux(ent, v1, nv1, a, b)
+                       for a, b in zip(idx1, idx2)]
+            if msb_first:
+                idx.append(v1)
+            else:
+                idx.append(nv1)
+            next_list.append((v, idx))
+        node_list = next_list
+    valid, idx_list = node_list[0]
+    if not idx_list:
+        idx_list = [0]
+    return valid, idx_list
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.add_priority_encoder = add_priority_encoder
+Entity.add_find_first_set = add_find_first_set
+Entity.add_leading_zero_counter = add_leading_zero_counter
+Entity.add_popcount = add_popcount
@@ -13,6 +13,7 @@ from rtlgen.item_mgr import ItemMgr
 from rtlgen.net import Net
 from rtlgen.var import Var
 from rtlgen.cont_assign import ContAssign
+from rtlgen.signal_index import SignalIndex
 from rtlgen.data_type import BitType
 from rtlgen.rtlerror import RtlError
 
@@ -36,6 +37,7 @@ class Entity:
         self.__default_clock_pol = "positive"
         self.__default_reset = None
         self.__default_reset_pol = "positive"
+        self.__signal_index = None
 
     @property
     def name(self):
@@ -208,6 +210,28 @@ class Entity:
         :param Item item: 登録する要素
         """
         self.__item_mgr.reg_item(item)
+        if self.__signal_index is not None:
+            self.__signal_index.add_item(item)
+
+    def del_item(self, item):
+        """要素を削除する．
+
+        :param Item item: 削除する要素
+
+        要素の持つネットは削除されない．
+        """
+        self.del_items([item])
+
+    def del_items(self, item_list):
+        """複数の要素をまとめて削除する．
+
+        :param list[Item] item_list: 削除する要素のリスト
+
+        要素の持つネットは削除されない．
+        """
+        self.__item_mgr.del_items(item_list)
+        if self.__signal_index is not None:
+            self.__signal_index.remove_items(item_list)
 
     @property
     def net_num(self):
@@ -247,6 +271,17 @@ class Entity:
             self.connect(net, src)
         return net
 
+    def del_nets(self, net_list):
+        """複数のネットをまとめて削除する．
+
+        :param list[Net] net_list: 削除するネットのリスト
+
+        ネットを参照している式は変更されない．
+        """
+        self.__item_mgr.del_nets(net_list)
+        if self.__signal_index is not None:
+            self.__signal_index.remove_signals(net_list)
+
     @property
     def var_num(self):
         """変数の数を返す．
@@ -298,6 +333,34 @@ class Entity:
         """
         ca = ContAssign(lhs, rhs)
         self.__cont_assign_list.append(ca)
+        if self.__signal_index is not None:
+            self.__signal_index.add_cont_assign(ca)
+
+    @property
+    def signal_index(self):
+        """信号の駆動元と参照元の索引を返す．
+
+        :rtype: SignalIndex
+
+        最初に呼ばれた時に作られ，以降は変更に合わせて更新される．
+        """
+        if self.__signal_index is None:
+            self.__signal_index = SignalIndex(self)
+        return self.__signal_index
+
+    def driver_list(self, signal):
+        """信号を駆動する継続的代入文，代入文，要素のリストを返す．
+
+        :param Expr signal: 対象の信号(Net, Port, Var)
+        """
+        return self.signal_index.driver_list(signal)
+
+    def reader_list(self, signal):
+        """信号を参照する継続的代入文，ステートメント，要素のリストを返す．
+
+        :param Expr signal: 対象の信号(Net, Port, Var)
+        """
+        return self.signal_index.reader_list(signal)
 
     @property
     def item_num(self):
@@ -390,8 +453,9 @@ class Entity:
         ent_set.add(self)
         ent_list.append(self)
 
-        for item in self.__item_list:
-            item.entity.gen_entity_sub(ent_list, ent_set)
+        for item in self.item_gen:
+            if item.is_inst:
+                item.entity.gen_entity_sub(ent_list, ent_set)
 
     def gen_verilog(self, writer):
         """Verilog-HDL 記述を出力する．
@@ -0,0 +1,335 @@
+#! /usr/bin/env python3
+
+"""式の値を計算するクラス
+
+:file: evaluator.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.expr import OpType, UnaryOp, BinaryOp
+from rtlgen.expr import Constant, BitSelect, PartSelect, Concat, MultiConcat
+from rtlgen.net import Net
+from rtlgen.port import Port
+from rtlgen.cont_assign import ContAssign
+from rtlgen.traverse import operand_list
+from rtlgen.rtlerror import RtlError
+
+
+class Evaluator:
+    """式の値を計算するクラス
+
+    :param Entity ent: ネットの駆動元を調べるエンティティ(省略可)
+
+    値は符号なしの整数(int)で表し，データ型のビット幅でマスクする．
+    符号付きビットベクタの比較のみ2の補数として解釈する．
+    入力として値の与えられていないネットは ent の継続的代入文の
+    右辺をたどって計算する．
+    計算は明示的なスタックを用いて行うので，深い式でも再帰の上限に
+    かからない．
+    """
+
+    def __init__(self, ent=None):
+        if ent is None:
+            self.__index = None
+        else:
+            self.__index = ent.signal_index
+        # ネットの id をキーにして駆動する式を保持する辞書
+        self.__driver_dict = {}
+
+    def eval(self, expr, input_list=()):
+        """式の値を計算する．
+
+        :param Expr expr: 対象の式
+        :param list[(Net, int)] input_list: 入力のネットと値のリスト
+        :return: 値を返す．
+        """
+        return self.eval_list([expr], input_list)[0]
+
+    def eval_list(self, expr_list, input_list=()):
+        """複数の式の値をまとめて計算する．
+
+        :param list[Expr] expr_list: 対象の式のリスト
+        :param list[(Net, int)] input_list: 入力のネットと値のリスト
+        :return: 値のリストを返す．
+
+        共通の部分式は一度だけ計算される．
+        """
+        return self.__eval_list(expr_list, input_list, False)
+
+    def eval_partial_list(self, expr_list, input_list=()):
+        """一部の値が未知の場合に複数の式の値をまとめて計算する．
+
+        :param list[Expr] expr_list: 対象の式のリスト
+        :param list[(Net, int)] input_list: 入力のネットと値のリスト
+        :return: 値のリストを返す．値の求まらない式は None となる．
+
+        値の与えられていないポートと値も駆動元もないネットの値は
+        未知(None)とする．
+        未知の値をオペランドに持つ演算の値は未知となるが，
+        AND, MUL の 0, OR の全ビット1, LAND の 0, LOR の非0 のように
+        もう一方のオペランドで値が決まる場合は値を求める．
+        """
+        return self.__eval_list(expr_list, input_list, True)
+
+    def __eval_list(self, expr_list, input_list, partial):
+        memo = {}
+        for net, val in input_list:
+            memo[id(net)] = val & Evaluator.mask(net.data_type)
+        # 計算途中の式の id の集合(ループの検出用)
+        active = set()
+        for expr in expr_list:
+            stack = [(expr, False)]
+            while stack:
+                node, expanded = stack.pop()
+                key = id(node)
+                if key in memo:
+                    continue
+                if partial and self.__is_unknown(node):
+                    memo[key] = None
+                    continue
+                if not expanded:
+                    pending = [src for src in self.__operand_list(node)
+                               if id(src) not in memo]
+                    if pending:
+                        for src in pending:
+                            if id(src) in active:
+                                emsg = 'combinational loop detected'
+                                raise RtlError(emsg)
+                        active.add(key)
+                        stack.append((node, True))
+                        for src in pending:
+                            stack.append((src, False))
+                        continue
+                active.discard(key)
+                if partial:
+                    memo[key] = self.__eval_partial_node(node, memo)
+                else:
+                    memo[key] = self.__eval_node(node, memo)
+        return [memo[id(expr)] for expr in expr_list]
+
+    @staticmethod
+    def bit_width(data_type):
+        """データ型のビット幅を返す．
+
+        ビット幅を持たない型の場合は None を返す．
+        """
+        if data_type.is_bit_type:
+            return 1
+        if data_type.is_bitvector_type or data_type.is_signedbitvector_type:
+            return data_type.size
+        return None
+
+    @staticmethod
+    def mask(data_type):
+        """データ型のビット幅のマスクを返す．
+
+        ビット幅を持たない型の場合は -1 (全ビット)を返す．
+        """
+        bw = Evaluator.bit_width(data_type)
+        if bw is None:
+            return -1
+        return (1 << bw) - 1
+
+    @staticmethod
+    def to_signed(val, data_type):
+        """符号付きビットベクタの値を符号付き整数に変換する．
+
+        それ以外の型の場合はそのまま返す．
+        """
+        if data_type.is_signedbitvector_type:
+            bw = data_type.size
+            if val >> (bw - 1) & 1:
+                return val - (1 << bw)
+        return val
+
+    def __driver(self, net):
+        """ネットを駆動する継続的代入文の右辺を返す．
+
+        複数ある場合は最後のものを返す．ない場合は None を返す．
+        一度求めた結果は保持する．
+        """
+        key = id(net)
+        if key in self.__driver_dict:
+            return self.__driver_dict[key]
+        ans = None
+        if self.__index is not None:
+            for owner in reversed(self.__index.driver_list(net)):
+                if isinstance(owner, ContAssign) and owner.lhs is net:
+                    ans = owner.rhs
+                    break
+        self.__driver_dict[key] = ans
+        return ans
+
+    def __operand_list(self, expr):
+        """式のオペランドのリストを返す．"""
+        if isinstance(expr, Net):
+            driver = self.__driver(expr)
+            if driver is None:
+                emsg = f'{expr.name}: no value nor driver'
+                raise RtlError(emsg)
+            return [driver]
+        return operand_list(expr)
+
+    def __is_unknown(self, expr):
+        """値の与えられていないポートか駆動元のないネットの時 True を返す．"""
+        if isinstance(expr, Port):
+            return True
+        return isinstance(expr, Net) and self.__driver(expr) is None
+
+    def __eval_partial_node(self, expr, memo):
+        """オペランドの値が未知の場合を考慮して式の値を計算する．"""
+        val_list = [memo[id(src)] for src in self.__operand_list(expr)]
+        if None not in val_list:
+            return self.__eval_node(expr, memo)
+        if not isinstance(expr, BinaryOp):
+            return None
+        op_type = expr.op_type
+        for val in val_list:
+            if val is None:
+                continue
+            if op_type in (OpType.AND, OpType.MUL, OpType.LAND) and val == 0:
+                return 0
+            if op_type == OpType.OR and val == Evaluator.mask(expr.data_type):
+                return val
+            if op_type == OpType.LOR and val != 0:
+                return 1
+        return None
+
+    def __eval_node(self, expr, memo):
+        """オペランドの値が求まっている式の値を計算する．"""
+        if isinstance(expr, Constant):
+            return expr.value & Evaluator.mask(expr.data_type)
+        if isinstance(expr, Net):
+            val = memo[id(self.__driver(expr))]
+            return val & Evaluator.mask(expr.data_type)
+        if isinstance(expr, UnaryOp):
+            return Evaluator.__eval_unary(expr, memo[id(expr.operand1)])
+        if isinstance(expr, BinaryOp):
+            return Evaluator.__eval_binary(expr,
+                                           memo[id(expr.operand1)],
+                                           memo[id(expr.operand2)])
+        if isinstance(expr, BitSelect):
+            return memo[id(expr.primary)] >> memo[id(expr.index)] & 1
+        if isinstance(expr, PartSelect):
+            lsb = min(expr.left, expr.right)
+            bw = abs(expr.left - expr.right) + 1
+            return memo[id(expr.primary)] >> lsb & ((1 << bw) - 1)
+        if isinstance(expr, Concat):
+            return Evaluator.__concat(expr.src_list, memo)
+        if isinstance(expr, MultiConcat):
+            val = Evaluator.__concat(expr.src_list, memo)
+            bw = 0
+            for src in expr.src_list:
+                bw += Concat.src_size(src)
+            ans = 0
+            for _ in range(expr.rep_num):
+                ans = (ans << bw) | val
+            return ans
+        emsg = f'{type(expr).__name__}: cannot evaluate'
+        raise RtlError(emsg)
+
+    @staticmethod
+    def __concat(src_list, memo):
+        """連結演算の値を計算する．"""
+        ans = 0
+        for src in src_list:
+            bw = Concat.src_size(src)
+            ans = (ans << bw) | (memo[id(src)] & ((1 << bw) - 1))
+        return ans
+
+    @staticmethod
+    def __eval_unary(expr, val):
+        """単項演算の値を計算する．"""
+        src_mask = Evaluator.mask(expr.operand1.data_type)
+        mask = Evaluator.mask(expr.data_type)
+        op_type = expr.op_type
+        if op_type == OpType.NOT:
+            return ~val & mask
+        if op_type == OpType.COMPL:
+            return -val & mask
+        if op_type == OpType.LNOT:
+            return int(val == 0)
+        if op_type == OpType.RAND:
+            return int(val == src_mask)
+        if op_type == OpType.RNAND:
+            return int(val != src_mask)
+        if op_type == OpType.ROR:
+            return int(val != 0)
+        if op_type == OpType.RNOR:
+            return int(val == 0)
+        if op_type == OpType.RXOR:
+            return bin(val).count('1') & 1
+        if op_type == OpType.RXNOR:
+            return (bin(val).count('1') & 1) ^ 1
+        emsg = f'{op_type}: cannot evaluate'
+        raise RtlError(emsg)
+
+    @staticmethod
+    def __eval_binary(expr, val1, val2):
+        """二項演算の値を計算する．"""
+        mask = Evaluator.mask(expr.data_type)
+        op_type = expr.op_type
+        if op_type == OpType.AND:
+            return val1 & val2
+        if op_type == OpType.OR:
+            return val1 | val2
+        if op_type == OpType.XOR:
+            return val1 ^ val2
+        if op_type == OpType.NAND:
+            return ~(val1 & val2) & mask
+        if op_type == OpType.NOR:
+            return ~(val1 | val2) & mask
+        if op_type == OpType.XNOR:
+            return ~(val1 ^ val2) & mask
+        if op_type == OpType.ADD:
+            return (val1 + val2) & mask
+        if op_type == OpType.SUB:
+            return (val1 - val2) & mask
+        if op_type == OpType.MUL:
+            return (val1 * val2) & mask
+        if op_type in (OpType.DIV, OpType.MOD):
+            if val2 == 0:
+                return mask if op_type == OpType.DIV else val1
+            dt1 = expr.operand1.data_type
+            dt2 = expr.operand2.data_type
+            if dt1.is_signedbitvector_type and dt2.is_signedbitvector_type:
+                # 符号付きの場合は0方向に丸め，剰余は被除数の符号を持つ．
+                val1 = Evaluator.to_signed(val1, dt1)
+                val2 = Evaluator.to_signed(val2, dt2)
+                quo = abs(val1) // abs(val2)
+                if (val1 < 0) != (val2 < 0):
+                    quo = -quo
+                if op_type == OpType.DIV:
+                    return quo & mask
+                return (val1 - quo * val2) & mask
+            if op_type == OpType.DIV:
+                return (val1 // val2) & mask
+            return (val1 % val2) & mask
+        if op_type == OpType.LSFT:
+            bw = Evaluator.bit_width(expr.data_type)
+            if bw is not None and val2 >= bw:
+                # 巨大な整数を作らないように先に判定する．
+                return 0
+            return (val1 << val2) & mask
+        if op_type == OpType.RSFT:
+            return val1 >> val2
+        if op_type == OpType.EQ:
+            return int(val1 == val2)
+        if op_type == OpType.NE:
+            return int(val1 != val2)
+        if op_type in (OpType.LT, OpType.LE):
+            dt1 = expr.operand1.data_type
+            dt2 = expr.operand2.data_type
+            if dt1.is_signedbitvector_type and dt2.is_signedbitvector_type:
+                val1 = Evaluator.to_signed(val1, dt1)
+                val2 = Evaluator.to_signed(val2, dt2)
+            if op_type == OpType.LT:
+                return int(val1 < val2)
+            return int(val1 <= val2)
+        if op_type == OpType.LAND:
+            return int(val1 != 0 and val2 != 0)
+        if op_type == OpType.LOR:
+            return int(val1 != 0 or val2 != 0)
+        emsg = f'{op_type}: cannot evaluate'
+        raise RtlError(emsg)
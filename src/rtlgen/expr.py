@@ -10,6 +10,7 @@
 from enum import Enum
 import numpy as np
 from rtlgen.data_type import DataType
+from rtlgen.rtlerror import RtlError
 
 
 class OpType(Enum):
@@ -47,6 +48,24 @@ class OpType(Enum):
     LNOT = 31
 
 
+# 結合的な二項演算子の集合
+ASSOC_OP_SET = frozenset([OpType.AND, OpType.OR, OpType.XOR,
+                          OpType.ADD, OpType.MUL,
+                          OpType.LAND, OpType.LOR])
+
+# リダクション演算子の集合
+REDUCTION_OP_SET = frozenset([OpType.RAND, OpType.RNAND,
+                              OpType.ROR, OpType.RNOR,
+                              OpType.RXOR, OpType.RXNOR])
+
+# リダクション演算子と対応する二項演算子の辞書
+_REDUCTION_OP_DICT = {
+    OpType.RAND: OpType.AND,
+    OpType.ROR: OpType.OR,
+    OpType.RXOR: OpType.XOR,
+}
+
+
 class ExprHandle:
     """式を保持するオブジェクト"""
 
@@ -158,6 +177,94 @@ class Expr:
         """
         return BinaryOp(OpType.XNOR, opr1, opr2)
 
+    @staticmethod
+    def make_rand(opr1):
+        """リダクションAND演算を作る.
+
+        :param Expr opr1: オペランド
+        :return: 作成した演算子を返す．
+        :rtype: UnaryOp
+        """
+        return UnaryOp(OpType.RAND, opr1)
+
+    @staticmethod
+    def make_rnand(opr1):
+        """リダクションNAND演算を作る.
+
+        :param Expr opr1: オペランド
+        :return: 作成した演算子を返す．
+        :rtype: UnaryOp
+        """
+        return UnaryOp(OpType.RNAND, opr1)
+
+    @staticmethod
+    def make_ror(opr1):
+        """リダクションOR演算を作る.
+
+        :param Expr opr1: オペランド
+        :return: 作成した演算子を返す．
+        :rtype: UnaryOp
+        """
+        return UnaryOp(OpType.ROR, opr1)
+
+    @staticmethod
+    def make_rnor(opr1):
+        """リダクションNOR演算を作る.
+
+        :param Expr opr1: オペランド
+        :return: 作成した演算子を返す．
+        :rtype: UnaryOp
+        """
+        return UnaryOp(OpType.RNOR, opr1)
+
+    @staticmethod
+    def make_rxor(opr1):
+        """リダクションXOR演算を作る.
+
+        :param Expr opr1: オペランド
+        :return: 作成した演算子を返す．
+        :rtype: UnaryOp
+        """
+        return UnaryOp(OpType.RXOR, opr1)
+
+    @staticmethod
+    def make_rxnor(opr1):
+        """リダクションXNOR演算を作る.
+
+        :param Expr opr1: オペランド
+        :return: 作成した演算子を返す．
+        :rtype: UnaryOp
+        """
+        return UnaryOp(OpType.RXNOR, opr1)
+
+    @staticmethod
+    def reduce(op_type, expr_list):
+        """結合的な二項演算で式のリストを畳み込む．
+
+        :param OpType op_type: 演算子の型
+        :param list[Expr] expr_list: 式のリスト
+        :return: 作成した式を返す．
+
+        op_type は AND, OR, XOR, ADD, MUL, LAND, LOR のいずれか．
+        RAND, ROR, RXOR はそれぞれ AND, OR, XOR とみなす．
+        結果は段数が log2(n) の平衡木となる．
+        """
+        op_type = _REDUCTION_OP_DICT.get(op_type, op_type)
+        if op_type not in ASSOC_OP_SET:
+            raise RtlError(f'{op_type}: not an associative operator')
+        if not expr_list:
+            raise RtlError('expr_list is empty')
+        cur_list = list(expr_list)
+        while len(cur_list) > 1:
+            next_list = []
+            for i in range(0, len(cur_list) - 1, 2):
+                next_list.append(BinaryOp(op_type,
+                                          cur_list[i], cur_list[i + 1]))
+            if len(cur_list) % 2 == 1:
+                next_list.append(cur_list[-1])
+            cur_list = next_list
+        return cur_list[0]
+
     @staticmethod
     def make_uminus(opr1):
         """単項マイナス演算を作る.
@@ -741,8 +848,12 @@ class UnaryOp(OpBase):
     def data_type(self):
         """データ型を返す.
 
+        リダクション演算と論理否定の結果はビット型となる．
+
         :rtype: DataType
         """
+        if self.op_type in REDUCTION_OP_SET or self.op_type == OpType.LNOT:
+            return DataType.bit_type()
         return self.operand1.data_type
 
     @property
@@ -1111,7 +1222,7 @@ class PartSelect(Expr):
         self.__primary = primary
         self.__left = left
         self.__right = right
-        if left > right:
+        if left >= right:
             direction = "down"
         else:
             direction = "up"
@@ -1183,10 +1294,22 @@ class Concat(Expr):
         """
         bw = 0
         for src in self.__src_list:
-            assert src.data_type.is_bitvector_type
-            bw += src.data_type.size
+            bw += Concat.src_size(src)
         return DataType.bitvector_type(bw)
 
+    @staticmethod
+    def src_size(src):
+        """連結の要素のビット幅を返す．
+
+        :param Expr src: 要素
+        """
+        data_type = src.data_type
+        if data_type.is_bit_type:
+            return 1
+        assert data_type.is_bitvector_type \
+            or data_type.is_signedbitvector_type
+        return data_type.size
+
     @property
     def src_list(self):
         return self.__src_list
@@ -1230,8 +1353,10 @@ class MultiConcat(Expr):
 
         :rtype: DataType
         """
-        # 未完
-        assert False
+        bw = 0
+        for src in self.__src_list:
+            bw += Concat.src_size(src)
+        return DataType.bitvector_type(bw * self.__rep_num)
 
     @property
     def rep_num(self):
@@ -0,0 +1,527 @@
+#! /usr/bin/env python3
+
+"""有限状態機械を作るクラス
+
+:file: fsm.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from collections import deque
+from rtlgen.entity import Entity
+from rtlgen.data_type import DataType
+from rtlgen.expr import Expr
+from rtlgen.rtlerror import RtlError
+
+
+class Fsm:
+    """有限状態機械(Moore型)を作るクラス
+
+    :param Entity ent: 親のエンティティ
+    :param str name: 状態レジスタの名前
+    :param Expr clock: クロック信号
+    :param str clock_pol: クロックの極性 ("positive"/"negative")
+    :param Expr reset: リセット信号
+    :param str reset_pol: リセットの極性 ("positive"/"negative")
+
+    使い方は以下の通り．
+    1. add_state() で状態を，add_output() で出力を定義する．
+    2. add_transition() で状態遷移を定義する．
+       一つの状態からの遷移は追加された順に優先され，
+       どの条件も成り立たない場合は条件なしで追加された遷移先
+       (なければ自分自身)に遷移する．
+    3. build() で状態レジスタとプロセスを生成する．
+
+    build() の中では到達不能な状態を取り除き，等価な状態を
+    分割の細分化(partition refinement)によって併合したのち，
+    コストモデルにしたがって状態の符号化を選ぶ．
+    遷移条件の等価性は式のオブジェクトの同一性で判断するので，
+    同じ条件には同じ式(ネット)を用いること．
+    """
+
+    def __init__(self, ent, *,
+                 name=None,
+                 clock,
+                 clock_pol,
+                 reset=None,
+                 reset_pol=None):
+        self.__ent = ent
+        self.__name = name
+        self.__clock = clock
+        self.__clock_pol = clock_pol
+        self.__reset = reset
+        self.__reset_pol = reset_pol
+        # 状態名のリスト
+        self.__state_list = []
+        # 状態名をキーにして状態番号を保持する辞書
+        self.__state_dict = {}
+        # 状態ごとの (cond, dst) のリスト
+        self.__trans_list = []
+        # 状態ごとのデフォルトの遷移先
+        self.__default_list = []
+        # 状態ごとの出力値の辞書
+        self.__output_val_list = []
+        # (ネット, デフォルト値) のリスト
+        self.__output_list = []
+        self.__reset_state = None
+        self.__encoding = None
+        self.__code_dict = None
+        self.__state_net = None
+
+    def add_state(self, name, *, outputs=None):
+        """状態を追加する．
+
+        :param str name: 状態名
+        :param dict outputs: 出力番号をキーとして出力値を持つ辞書
+        :return: 状態名を返す．
+
+        最初に追加された状態がリセット状態となる．
+        """
+        if name in self.__state_dict:
+            emsg = f'{name}: duplicated state name'
+            raise RtlError(emsg)
+        self.__state_dict[name] = len(self.__state_list)
+        self.__state_list.append(name)
+        self.__trans_list.append([])
+        self.__default_list.append(None)
+        self.__output_val_list.append({})
+        if self.__reset_state is None:
+            self.__reset_state = name
+        if outputs is not None:
+            for oid, val in outputs.items():
+                self.set_output(name, oid, val)
+        return name
+
+    def set_reset_state(self, name):
+        """リセット状態を設定する．
+
+        :param str name: 状態名
+        """
+        self.__state_id(name)
+        self.__reset_state = name
+
+    def add_output(self, *, name=None, data_type=None, default=0):
+        """出力を追加する．
+
+        :param str name: 出力のネットの名前
+        :param DataType data_type: 出力のデータ型(省略時はビット型)
+        :param int default: 値が指定されていない状態での出力値
+        :return: (出力番号, 出力のネット) を返す．
+        """
+        if data_type is None:
+            data_type = DataType.bit_type()
+        net = self.__ent.add_net(name=name, data_type=data_type,
+                                 reg_type=True)
+        oid = len(self.__output_list)
+        self.__output_list.append((net, default))
+        return oid, net
+
+    def set_output(self, state, oid, val):
+        """状態の出力値を設定する．
+
+        :param str state: 状態名
+        :param int oid: 出力番号
+        :param int val: 出力値
+        """
+        sid = self.__state_id(state)
+        if not 0 <= oid < len(self.__output_list):
+            emsg = f'{oid}: output id out of range'
+            raise RtlError(emsg)
+        self.__output_val_list[sid][oid] = val
+
+    def add_transition(self, src, dst, cond=None):
+        """状態遷移を追加する．
+
+        :param str src: 遷移元の状態名
+        :param str dst: 遷移先の状態名
+        :param Expr cond: 遷移条件(None の場合は無条件)
+        """
+        sid = self.__state_id(src)
+        did = self.__state_id(dst)
+        if cond is None:
+            self.__default_list[sid] = did
+        else:
+            self.__trans_list[sid].append((cond, did))
+
+    @property
+    def state_num(self):
+        """状態数を返す．"""
+        return len(self.__state_list)
+
+    @property
+    def state_gen(self):
+        """状態名のジェネレータを返す．"""
+        for name in self.__state_list:
+            yield name
+
+    @property
+    def encoding(self):
+        """状態の符号化方式を返す．
+
+        build() の前は None を返す．
+        """
+        return self.__encoding
+
+    @property
+    def state_net(self):
+        """状態レジスタのネットを返す．
+
+        build() の前は None を返す．
+        """
+        return self.__state_net
+
+    def state_code(self, name):
+        """状態の符号を返す．
+
+        :param str name: 状態名
+
+        build() の後でのみ意味を持つ．
+        併合された状態は代表の状態と同じ符号を持つ．
+        """
+        return self.__code_dict[name]
+
+    def minimize(self):
+        """到達不能な状態を削除し，等価な状態を併合する．
+
+        :return: 状態名をキーとして代表の状態名を持つ辞書を返す．
+                 到達不能な状態は含まれない．
+
+        初期分割は出力値と遷移条件の列が等しい状態を同じブロックとし，
+        Hopcroft のアルゴリズムで遷移先のブロックが等しくなるまで
+        ブロックを細分化する．計算量は O(m log n) である．
+        """
+        n = self.state_num
+        if n == 0:
+            raise RtlError('no states')
+        # 到達可能な状態を求める．
+        reset_id = self.__state_dict[self.__reset_state]
+        reached = [False] * n
+        reached[reset_id] = True
+        queue = deque([reset_id])
+        while queue:
+            sid = queue.popleft()
+            for did in self.__succ_gen(sid):
+                if not reached[did]:
+                    reached[did] = True
+                    queue.append(did)
+        live_list = [sid for sid in range(n) if reached[sid]]
+
+        # 初期分割: 出力値と遷移条件の列が等しい状態を同じブロックとする．
+        # 同じブロックの状態は遷移の数と条件が等しいので，
+        # k 番目の遷移(最後はデフォルトの遷移)を文字 k とみなせる．
+        block = [0] * n
+        member_list = []
+        key_dict = {}
+        nletter = 0
+        for sid in live_list:
+            trans = self.__trans_list[sid]
+            key = (tuple(self.__output_vals(sid)),
+                   tuple(id(cond) for cond, _ in trans))
+            if key not in key_dict:
+                key_dict[key] = len(member_list)
+                member_list.append(set())
+            block[sid] = key_dict[key]
+            member_list[block[sid]].add(sid)
+            nletter = max(nletter, len(trans) + 1)
+
+        # 文字ごとの逆遷移
+        inv_list = [{} for _ in range(nletter)]
+        for sid in live_list:
+            trans = self.__trans_list[sid]
+            for k, (_, did) in enumerate(trans):
+                inv_list[k].setdefault(did, []).append(sid)
+            inv_list[len(trans)].setdefault(self.__default_of(sid),
+                                            []).append(sid)
+
+        # Hopcroft のアルゴリズムによる細分化
+        queue = deque()
+        in_queue = set()
+        for bid in range(len(member_list)):
+            for k in range(nletter):
+                queue.append((bid, k))
+                in_queue.add((bid, k))
+        while queue:
+            splitter = queue.popleft()
+            in_queue.discard(splitter)
+            bid, k = splitter
+            inv = inv_list[k]
+            # splitter に遷移する状態をブロックごとに集める．
+            hit_dict = {}
+            for did in list(member_list[bid]):
+                for sid in inv.get(did, ()):
+                    hit_dict.setdefault(block[sid], []).append(sid)
+            for bid1, hit_list in hit_dict.items():
+                members = member_list[bid1]
+                if len(hit_list) == len(members):
+                    continue
+                bid2 = len(member_list)
+                member_list.append(set(hit_list))
+                for sid in hit_list:
+                    members.discard(sid)
+                    block[sid] = bid2
+                for k1 in range(nletter):
+                    if (bid1, k1) in in_queue \
+                       or len(hit_list) <= len(members):
+                        new_splitter = (bid2, k1)
+                    else:
+                        new_splitter = (bid1, k1)
+                    queue.append(new_splitter)
+                    in_queue.add(new_splitter)
+        nblock = len(member_list)
+
+        # 各ブロックの先頭の状態を代表とする．
+        rep_list = [None] * nblock
+        for sid in live_list:
+            if rep_list[block[sid]] is None:
+                rep_list[block[sid]] = sid
+        rep_dict = {}
+        for sid in live_list:
+            rep_dict[self.__state_list[sid]] = \
+                self.__state_list[rep_list[block[sid]]]
+        return rep_dict
+
+    def estimate_cost(self, encoding, *, reg_cost=4):
+        """符号化方式ごとのコストを見積もる．
+
+        :param str encoding: 符号化方式('binary', 'gray', 'onehot')
+        :param int reg_cost: レジスタ1ビットあたりのコスト
+        :return: コストの見積もり値
+
+        コストは以下の和とする．
+        * レジスタのビット数 x reg_cost
+        * 'onehot' の場合: 遷移ごとに 2
+          (遷移元のビットの判定と遷移先のビットへの OR 入力)
+        * 'binary', 'gray' の場合: 状態数(状態のデコーダ) と
+          遷移ごとに 1 + 変化する状態ビットの数
+        """
+        rep_dict = self.minimize()
+        state_list = self.__rep_state_list(rep_dict)
+        code_dict, width = Fsm.__encode(state_list, encoding)
+        return self.__cost(state_list, rep_dict, code_dict, width,
+                           encoding, reg_cost)
+
+    def select_encoding(self, *, reg_cost=4):
+        """コストが最小となる符号化方式を返す．
+
+        :param int reg_cost: レジスタ1ビットあたりのコスト
+        """
+        rep_dict = self.minimize()
+        state_list = self.__rep_state_list(rep_dict)
+        return self.__select_encoding(state_list, rep_dict, reg_cost)
+
+    def build(self, *, encoding=None, minimize=True):
+        """状態レジスタとプロセスを生成する．
+
+        :param str encoding: 符号化方式('binary', 'gray', 'onehot')
+                             None の場合は符号化する状態に対して
+                             select_encoding() と同じ基準で選ぶ．
+        :param bool minimize: 状態の最小化を行う時に True にする．
+                              False の場合は到達不能な状態も符号化する．
+        :return: 状態レジスタのネットを返す．
+        """
+        if self.__state_net is not None:
+            raise RtlError('build() has already been called')
+        if minimize:
+            rep_dict = self.minimize()
+        else:
+            rep_dict = {name: name for name in self.__state_list}
+        state_list = self.__rep_state_list(rep_dict)
+        if encoding is None:
+            encoding = self.__select_encoding(state_list, rep_dict, 4)
+        code_dict, width = Fsm.__encode(state_list, encoding)
+        self.__encoding = encoding
+        self.__code_dict = {name: code_dict[rep_dict[name]]
+                            for name in rep_dict.keys()}
+
+        state_type = DataType.bitvector_type(width)
+        state = self.__ent.add_net(name=self.__name, data_type=state_type,
+                                   reg_type=True)
+        self.__state_net = state
+
+        def state_const(name):
+            return Expr.make_constant(data_type=state_type,
+                                      val=code_dict[rep_dict[name]])
+
+        # 状態遷移のプロセス
+        proc = self.__ent.add_clocked_process(clock=self.__clock,
+                                              clock_pol=self.__clock_pol,
+                                              asyncctl=self.__reset,
+                                              asyncctl_pol=self.__reset_pol)
+        if self.__reset is not None:
+            with proc.asyncctl_body() as _:
+                _.add_assign(state, state_const(self.__reset_state))
+        with proc.body() as body:
+            case_stmt = body.add_case(state)
+            for name in state_list:
+                sid = self.__state_dict[name]
+                with case_stmt.add_label(state_const(name)) as arm:
+                    for cond, did in self.__trans_list[sid]:
+                        if_stmt = arm.add_if(cond)
+                        with if_stmt.then_body() as _:
+                            dst = self.__state_list[did]
+                            _.add_assign(state, state_const(dst))
+                        with if_stmt.else_body() as else_body:
+                            arm = else_body
+                    dst = self.__state_list[self.__default_of(sid)]
+                    arm.add_assign(state, state_const(dst))
+            with case_stmt.add_default() as arm:
+                arm.add_assign(state, state_const(self.__reset_state))
+
+        # 出力のプロセス
+        if self.__output_list:
+            proc = self.__ent.add_comb_process()
+            with proc.body() as body:
+                for net, default in self.__output_list:
+                    body.add_assign(net, Fsm.__const(net, default))
+                case_stmt = body.add_case(state)
+                for name in state_list:
+                    sid = self.__state_dict[name]
+                    val_list = self.__output_vals(sid)
+                    if not val_list:
+                        continue
+                    with case_stmt.add_label(state_const(name)) as arm:
+                        for oid, val in val_list:
+                            net = self.__output_list[oid][0]
+                            arm.add_assign(net, Fsm.__const(net, val))
+        return state
+
+    def __state_id(self, name):
+        """状態名から状態番号を得る．"""
+        if name not in self.__state_dict:
+            emsg = f'{name}: no such state'
+            raise RtlError(emsg)
+        return self.__state_dict[name]
+
+    def __default_of(self, sid):
+        """デフォルトの遷移先を返す．"""
+        did = self.__default_list[sid]
+        if did is None:
+            return sid
+        return did
+
+    def __output_vals(self, sid):
+        """デフォルト値と異なる (出力番号, 出力値) のリストを返す．"""
+        return [(oid, val)
+                for oid, val in sorted(self.__output_val_list[sid].items())
+                if val != self.__output_list[oid][1]]
+
+    def __succ_gen(self, sid):
+        """遷移先の状態番号を返すジェネレータ"""
+        for _, did in self.__trans_list[sid]:
+            yield did
+        yield self.__default_of(sid)
+
+    def __rep_state_list(self, rep_dict):
+        """代表の状態名のリストをリセット状態からの幅優先順で返す．
+
+        幅優先順に符号を割り当てることで，Gray 符号では
+        隣り合う状態の符号が1ビットだけ異なりやすくなる．
+        到達不能な状態が rep_dict に含まれる場合は末尾に加える．
+        """
+        start = rep_dict[self.__reset_state]
+        mark = {start}
+        state_list = [start]
+        pos = 0
+        while pos < len(state_list):
+            sid = self.__state_dict[state_list[pos]]
+            pos += 1
+            for did in self.__succ_gen(sid):
+                dst = rep_dict[self.__state_list[did]]
+                if dst not in mark:
+                    mark.add(dst)
+                    state_list.append(dst)
+        for dst in rep_dict.values():
+            if dst not in mark:
+                mark.add(dst)
+                state_list.append(dst)
+        return state_list
+
+    def __select_encoding(self, state_list, rep_dict, reg_cost):
+        """state_list を符号化する時にコストが最小となる符号化方式を返す．"""
+        best_enc = None
+        best_cost = None
+        for encoding in ('binary', 'gray', 'onehot'):
+            code_dict, width = Fsm.__encode(state_list, encoding)
+            cost = self.__cost(state_list, rep_dict, code_dict, width,
+                               encoding, reg_cost)
+            if best_cost is None or cost < best_cost:
+                best_enc = encoding
+                best_cost = cost
+        return best_enc
+
+    def __cost(self, state_list, rep_dict, code_dict, width,
+               encoding, reg_cost):
+        """コストを計算する．"""
+        cost = reg_cost * width
+        if encoding != 'onehot':
+            cost += len(state_list)
+        for name in state_list:
+            sid = self.__state_dict[name]
+            src_code = code_dict[name]
+            for did in self.__succ_gen(sid):
+                if encoding == 'onehot':
+                    cost += 2
+                else:
+                    dst_code = code_dict[rep_dict[self.__state_list[did]]]
+                    cost += 1 + bin(src_code ^ dst_code).count('1')
+        return cost
+
+    @staticmethod
+    def __encode(state_list, encoding):
+        """状態の符号を決める．
+
+        :return: (状態名をキーとして符号を持つ辞書, ビット幅) を返す．
+        """
+        n = len(state_list)
+        if encoding == 'binary':
+            width = max(1, DataType.bitlen(n))
+            code_list = list(range(n))
+        elif encoding == 'gray':
+            width = max(1, DataType.bitlen(n))
+            code_list = [i ^ (i >> 1) for i in range(n)]
+        elif encoding == 'onehot':
+            width = n
+            code_list = [1 << i for i in range(n)]
+        else:
+            emsg = f'{encoding}: unknown encoding'
+            raise RtlError(emsg)
+        return dict(zip(state_list, code_list)), width
+
+    @staticmethod
+    def __const(net, val):
+        """出力の定数を作る．"""
+        return Expr.make_constant(data_type=net.data_type, val=val)
+
+
+def add_fsm(self, *,
+            name=None,
+            clock=None,
+            clock_pol=None,
+            reset=None,
+            reset_pol=None):
+    """有限状態機械を作るオブジェクトを返す．
+
+    :param str name: 状態レジスタの名前
+    :param Expr clock: クロック信号
+    :param str clock_pol: クロックの極性 ("positive"/"negative")
+    :param Expr reset: リセット信号
+    :param str reset_pol: リセットの極性 ("positive"/"negative")
+    :return: Fsm を返す．
+
+    詳細は Fsm を参照のこと．
+    """
+    if clock is None:
+        clock = self.default_clock
+    if clock_pol is None:
+        clock_pol = self.default_clock_pol
+    if reset is None:
+        reset = self.default_reset
+    if reset_pol is None:
+        reset_pol = self.default_reset_pol
+    return Fsm(self, name=name,
+               clock=clock, clock_pol=clock_pol,
+               reset=reset, reset_pol=reset_pol)
+
+
+# Entity のメンバ関数に追加する．
+Entity.add_fsm = add_fsm
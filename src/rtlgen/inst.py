@@ -71,6 +71,21 @@ class Inst(Item):
         for pos in range(self.port_num):
             yield self.port(pos)
 
+    def signal_link(self):
+        """信号の索引に登録する接続情報を返す．
+
+        入力ポートに接続されたネットを参照し，出力ポートに接続された
+        ネットを駆動する．双方向ポートの場合は両方とする．
+        """
+        read_list = []
+        drive_list = []
+        for oport, iport in self.port_gen:
+            if iport.is_input or iport.is_inout:
+                read_list.append(oport)
+            if iport.is_output or iport.is_inout:
+                drive_list.append(oport)
+        return read_list, drive_list, []
+
     def __getattr__(self, name):
         """ポートをアクセスするためのギミック"""
 
@@ -57,6 +57,25 @@ class Item:
         var = self.__parent.add_var(data_type, name=name)
         return var
 
+    def signal_link(self):
+        """信号の索引に登録する接続情報を返す．
+
+        :return: (参照する式のリスト, 駆動する式のリスト,
+                 ステートメントブロックのリスト) を返す．
+
+        信号を参照したり駆動したりする要素はこれをオーバーライドする．
+        """
+        return [], [], []
+
+    def gen_vhdl_decl(self, writer):
+        """VHDL のアーキテクチャ宣言部の記述を生成する．
+
+        :param VhdlWriter writer: VHDL出力器
+
+        型や定数などの宣言が必要な要素はこれをオーバーライドする．
+        """
+        pass
+
     def add_cont_assign(self, lhs, rhs):
         """継続的代入文を追加する．"""
         self.__parent.add_cont_assign(lhs, rhs)
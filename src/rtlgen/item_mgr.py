@@ -75,6 +75,21 @@ class ItemMgr:
         self.reg_name(net)
         return net
 
+    def del_nets(self, net_list):
+        """複数のネットをまとめて削除する．
+
+        :param list[Net] net_list: 削除するネットのリスト
+
+        ネットを参照している式は変更されない．
+        """
+        del_set = {id(net) for net in net_list}
+        self.__net_list = [net for net in self.__net_list
+                           if id(net) not in del_set]
+        for net in net_list:
+            if net.name is not None \
+               and self.__name_dict.get(net.name) is net:
+                del self.__name_dict[net.name]
+
     @property
     def var_num(self):
         """変数の数を返す．
@@ -120,7 +135,7 @@ class ItemMgr:
 
         :rtype: int
         """
-        return len(self.__inst_list)
+        return len(self.__item_list)
 
     def item(self, pos):
         """pos 番目の要素を返す.
@@ -146,6 +161,30 @@ class ItemMgr:
         self.__item_list.append(item)
         self.reg_name(item)
 
+    def del_item(self, item):
+        """要素を削除する．
+
+        :param Item item: 削除する要素
+
+        要素の持つネットは削除されない．
+        """
+        self.del_items([item])
+
+    def del_items(self, item_list):
+        """複数の要素をまとめて削除する．
+
+        :param list[Item] item_list: 削除する要素のリスト
+
+        要素の持つネットは削除されない．
+        """
+        del_set = {id(item) for item in item_list}
+        self.__item_list = [item for item in self.__item_list
+                            if id(item) not in del_set]
+        for item in item_list:
+            if item.name is not None \
+               and self.__name_dict.get(item.name) is item:
+                del self.__name_dict[item.name]
+
     @property
     def block_num(self):
         """名前付きブロックの数を返す．
@@ -228,7 +267,7 @@ class ItemMgr:
             if var.name is None:
                 while True:
                     name = var_template.format(var_id)
-                    net_id += 1
+                    var_id += 1
                     if name not in self.__name_dict:
                         var.set_name(name)
                         self.__name_dict[name] = var
@@ -7,9 +7,11 @@
 :copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
 """
 
+import numpy as np
 from rtlgen.entity import Entity
 from rtlgen.data_type import DataType
-from rtlgen.expr import Expr
+from rtlgen.expr import Expr, OpType
+from rtlgen.rtlerror import RtlError
 
 
 def add_linear_fsm(ent, *,
@@ -91,5 +93,140 @@ def add_linear_fsm(ent, *,
     return (_running, _count)
 
 
+def crc_matrix(poly, crc_width, data_width):
+    """CRC の並列な次状態関数の行列を求める．
+
+    :param int poly: 生成多項式(最上位の x^crc_width の項を除く)
+    :param int crc_width: CRC のビット幅
+    :param int data_width: 1サイクルで処理するデータのビット幅
+    :return: (state_mat, data_mat) を返す．
+
+    データは最上位ビットから順に1ビットずつシフトレジスタに入るものと
+    する(非反転)．1ビット分の遷移を c' = A c + b d とすると，
+    data_width ビット分の遷移は
+    c' = A^N c + sum_{j} A^j b d[j]
+    となる．state_mat は A^N (crc_width x crc_width)，
+    data_mat は A^j b を j 列目に持つ行列 (crc_width x data_width) で
+    ともに GF(2) 上の 0/1 の numpy 配列である．
+    A^N は2乗を繰り返して求める．
+    """
+    w = crc_width
+    poly_vec = np.array([(poly >> i) & 1 for i in range(w)], dtype=np.int64)
+    a_mat = np.zeros((w, w), dtype=np.int64)
+    for i in range(1, w):
+        a_mat[i, i - 1] = 1
+    a_mat[:, w - 1] ^= poly_vec
+
+    # A^N を求める．
+    state_mat = np.identity(w, dtype=np.int64)
+    base = a_mat
+    n = data_width
+    while n > 0:
+        if n & 1:
+            state_mat = (state_mat @ base) & 1
+        base = (base @ base) & 1
+        n >>= 1
+
+    # A^j b を求める．
+    # 2乗を繰り返して列のブロックを倍々に増やす．
+    data_mat = np.zeros((w, data_width), dtype=np.int64)
+    data_mat[:, 0] = poly_vec
+    pow_mat = a_mat
+    done = 1
+    while done < data_width:
+        num = min(done, data_width - done)
+        data_mat[:, done:done + num] = (pow_mat @ data_mat[:, :num]) & 1
+        done += num
+        pow_mat = (pow_mat @ pow_mat) & 1
+    return state_mat, data_mat
+
+
+def add_crc(ent, poly, data_width, *,
+            data_in,
+            clock, clock_pol,
+            reset=None, reset_pol=None,
+            enable=None,
+            crc_width=None,
+            init=0,
+            name=None):
+    """データを並列に処理する CRC 生成器を追加する．
+
+    :param Entity ent:        エンティティ
+    :param int    poly:       生成多項式
+    :param int    data_width: 1サイクルで処理するデータのビット幅
+    :param Expr   data_in:    データ入力
+    :param Net    clock:      クロック信号
+    :param str    clock_pol:  クロック信号のアクティブエッジ('positive'か'negative')
+    :param Net    reset:      リセット信号(省略可)
+    :param str    reset_pol:  リセット信号の極性('positive'か'negative')
+    :param Expr   enable:     イネーブル信号(省略可)
+    :param int    crc_width:  CRC のビット幅
+    :param int    init:       CRC レジスタの初期値
+    :param str    name:       CRC レジスタの名前
+
+    結果として (crc, crc_next) を返す．
+    * reg  [w - 1:0] crc:      CRC レジスタ
+    * wire [w - 1:0] crc_next: data_in を処理した後の CRC の値
+
+    crc_width を省略した場合は poly の最上位ビットを x^w の項とみなす．
+    例えば CRC-32 は poly=0x104C11DB7 か poly=0x04C11DB7, crc_width=32
+    で指定する．
+    data_in は最上位ビットから順に処理される．
+    次状態関数は crc_matrix() で求めた行列の各行を Expr.reduce() で
+    平衡な XOR 木にしたものとなる．
+    """
+    if crc_width is None:
+        crc_width = poly.bit_length() - 1
+    if crc_width < 1:
+        emsg = f'poly({poly}) is too small'
+        raise RtlError(emsg)
+    if data_in.data_type.is_bit_type:
+        in_width = 1
+    else:
+        in_width = data_in.data_type.size
+    if in_width != data_width:
+        emsg = 'data_in width mismatch'
+        raise RtlError(emsg)
+    state_mat, data_mat = crc_matrix(poly, crc_width, data_width)
+
+    crc_type = DataType.bitvector_type(crc_width)
+    crc = ent.add_net(name=name, data_type=crc_type, reg_type=True)
+
+    def bit(expr, pos):
+        if expr.data_type.is_bit_type:
+            return expr
+        return Expr.bit_select(expr, pos)
+
+    bit_list = []
+    for i in range(crc_width):
+        src_list = [bit(crc, j)
+                    for j in np.flatnonzero(state_mat[i]).tolist()]
+        src_list += [bit(data_in, j)
+                     for j in np.flatnonzero(data_mat[i]).tolist()]
+        if src_list:
+            bit_list.append(Expr.reduce(OpType.XOR, src_list))
+        else:
+            bit_list.append(Expr.make_zero())
+    bit_list.reverse()
+    crc_next = ent.add_net(data_type=crc_type, src=Expr.concat(bit_list))
+
+    main_proc = ent.add_clocked_process(clock=clock, clock_pol=clock_pol,
+                                        asyncctl=reset, asyncctl_pol=reset_pol)
+    if reset is not None:
+        with main_proc.asyncctl_body() as _:
+            _.add_assign(crc, Expr.make_constant(data_type=crc_type,
+                                                 val=init))
+    with main_proc.body() as _:
+        if enable is not None:
+            if_1 = _.add_if(enable)
+            with if_1.then_body() as _:
+                _.add_assign(crc, crc_next)
+        else:
+            _.add_assign(crc, crc_next)
+
+    return (crc, crc_next)
+
+
 # Entity のメンバ関数に追加する．
 Entity.add_linear_fsm = add_linear_fsm
+Entity.add_crc = add_crc
@@ -8,11 +8,15 @@ LookUpTable を表すクラス
 :copyright: Copyright (C) 2022 Yusuke Matsunaga, All rights reserved.
 """
 
+import os
+import numpy as np
 from rtlgen.expr import Expr
 from rtlgen.item import Item
-from rtlgen.data_type import BitVectorType
+from rtlgen.data_type import DataType, BitVectorType
 from rtlgen.entity import Entity
+from rtlgen.rtlerror import RtlError
 from rtlgen.writer_base import SimpleBlock
+from rtlgen.verilog_writer import VerilogWriter
 
 
 class Lut(Item):
@@ -21,10 +25,29 @@ class Lut(Item):
     :param int input_bw: 入力のビット幅
     :param DataType data_type: 出力のデータ型
     :param list[(Expr, Expr)] data_list: データのリスト
+    :param np.ndarray table: 入力値をインデックスとする出力値の配列
+    :param str rom_file: ROM モードで用いるメモリ初期化ファイル名
 
     入出力の仕様
     * input: 入力．データ型は BitVectorType(input_bw)
     * output: 出力．データ型は data_type
+
+    表の内容は Constant ではなく整数値として保持する．
+    table で与えられた配列は密な表としてそのまま(コピーせずに)保持し，
+    data_list や add_data() で与えられたデータは入力値をキーとする
+    疎な表として保持する．両方に同じ入力値がある場合には後者が優先される．
+    Constant は HDL 記述を出力する時に必要な分だけ作られる．
+
+    rom_file が指定された場合は ROM モードとなり，case 文の代わりに
+    メモリ配列の宣言とその読み出しを出力する．
+    表の内容は rom_file に16進数形式で書き出され，
+    Verilog-HDL では $readmemh で，VHDL では初期化関数で読み込まれる．
+    そのため HDL 記述の長さは表の大きさによらない．
+    rom_file は出力器の output_dir からの相対パスとして書き出され，
+    HDL 記述中にはそのままの文字列が埋め込まれる．
+    出力先が標準出力や StringIO の場合は output_dir を明示する必要がある．
+    VHDL の初期化関数は ieee.std_logic_1164.hread() を用いるので
+    VHDL-2008 が必要となる．
     """
 
     def __init__(self, parent, *,
@@ -32,23 +55,26 @@ class Lut(Item):
                  input_bw=None,
                  input=None,
                  data_type,
-                 data_list=[]):
+                 data_list=[],
+                 table=None,
+                 rom_file=None):
         super().__init__(parent, name=name)
-        self.__data_list = []
         if input is None:
-            assert input_bw is not None
+            if input_bw is None:
+                assert table is not None
+                input_bw = max(1, DataType.bitlen(len(table)))
             ibv = BitVectorType(input_bw)
             self.__input = self.add_net(data_type=ibv)
         else:
             self.__input = input
-            ibv = input.data_type
         self.__output = self.add_net(data_type=data_type, reg_type=True)
+        self.__table = None
+        self.__data_dict = {}
+        self.__rom_file = rom_file
+        if table is not None:
+            self.set_table(table)
         for idata, odata in data_list:
-            if not isinstance(idata, Expr):
-                idata = Expr.make_constant(data_type=ibv, val=idata)
-            if not isinstance(odata, Expr):
-                odata = Expr.make_constant(data_type=data_type, val=odata)
-            self.__data_list.append((idata, odata))
+            self.add_data(idata, odata)
 
     @property
     def input(self):
@@ -60,70 +86,543 @@ class Lut(Item):
         """出力のネットを返す．"""
         return self.__output
 
+    def signal_link(self):
+        """信号の索引に登録する接続情報を返す．"""
+        return [self.__input], [self.__output], []
+
+    @property
+    def input_bw(self):
+        """入力のビット幅を返す．"""
+        return Lut.bit_width(self.__input.data_type)
+
+    @property
+    def output_bw(self):
+        """出力のビット幅を返す．"""
+        return Lut.bit_width(self.__output.data_type)
+
+    @property
+    def rom_file(self):
+        """ROM モードのメモリ初期化ファイル名を返す．
+
+        ROM モードでない場合は None を返す．
+        """
+        return self.__rom_file
+
+    def set_rom_file(self, rom_file):
+        """ROM モードのメモリ初期化ファイル名を設定する．
+
+        :param str rom_file: ファイル名(None の場合は ROM モードを解除する)
+        """
+        self.__rom_file = rom_file
+
+    @property
+    def entry_num(self):
+        """値の定義されている入力値の数を返す．"""
+        n = 0 if self.__table is None else len(self.__table)
+        ans = n
+        for ival in self.__data_dict.keys():
+            if ival >= n:
+                ans += 1
+        return ans
+
+    def value(self, ival):
+        """入力値に対応する出力値を返す．
+
+        :param int ival: 入力値
+        :return: 出力値を返す．定義されていない場合は None を返す．
+        """
+        if ival in self.__data_dict:
+            return self.__data_dict[ival]
+        if self.__table is not None and 0 <= ival < len(self.__table):
+            return int(self.__table[ival])
+        return None
+
+    @property
+    def value_gen(self):
+        """(入力値, 出力値) のタプルを入力値の昇順に返すジェネレータ
+
+        値は int で返される．
+        """
+        n = 0 if self.__table is None else len(self.__table)
+        chunk = 1 << 16
+        for base in range(0, n, chunk):
+            # memmap の場合もまとめて読み出す．
+            vals = self.__table[base:base + chunk].tolist()
+            for i, oval in enumerate(vals, base):
+                if i in self.__data_dict:
+                    oval = self.__data_dict[i]
+                yield i, oval
+        for ival in sorted(self.__data_dict.keys()):
+            if ival >= n:
+                yield ival, self.__data_dict[ival]
+
     @property
     def data_gen(self):
-        for indata, outdata in self.__data_list:
+        """(入力値, 出力値) を Constant のタプルで返すジェネレータ
+
+        Constant はここで作られる．
+        """
+        itype = self.__input.data_type
+        otype = self.__output.data_type
+        for ival, oval in self.value_gen:
+            indata = Expr.make_constant(data_type=itype, val=ival)
+            outdata = Expr.make_constant(data_type=otype, val=oval)
             yield indata, outdata
 
     def add_data(self, indata, outdata):
         """データを追加する．
 
-        :param Expr indata: 入力値
-        :param Expr outdata: 出力値
+        :param Expr indata: 入力値(int も可)
+        :param Expr outdata: 出力値(int も可)
+        """
+        if isinstance(indata, Expr):
+            assert indata.data_type == self.__input.data_type
+            indata = indata.value
+        if isinstance(outdata, Expr):
+            assert outdata.data_type == self.__output.data_type
+            outdata = outdata.value
+        ival = int(indata)
+        if ival < 0 or ival >= (1 << self.input_bw):
+            emsg = f'input value {ival} is out of range'
+            raise RtlError(emsg)
+        oval = int(outdata)
+        lo, hi = self.__output_range()
+        if oval < lo or oval >= hi:
+            emsg = f'output value {oval} is out of range'
+            raise RtlError(emsg)
+        self.__data_dict[ival] = oval
+
+    def set_table(self, table):
+        """密な表を設定する．
+
+        :param np.ndarray table: 入力値をインデックスとする出力値の配列
+
+        以前に設定された密な表は置き換えられる．
+        table は整数型の1次元配列でなければならない．
+        出力値がデータ型の範囲に収まらない場合には RtlError となる．
+        要素の型で範囲が保証されない場合には全要素を走査して検査するが，
+        np.memmap を与えた場合でも内容はメモリ上に保持されない．
+        """
+        table = np.asarray(table)
+        if table.ndim != 1:
+            emsg = 'table should be a 1-dimensional array'
+            raise RtlError(emsg)
+        if not np.issubdtype(table.dtype, np.integer):
+            emsg = 'table should be an array of integers'
+            raise RtlError(emsg)
+        if len(table) > (1 << self.input_bw):
+            emsg = f'table size {len(table)} exceeds 2^{self.input_bw}'
+            raise RtlError(emsg)
+        lo, hi = self.__output_range()
+        info = np.iinfo(table.dtype)
+        if len(table) > 0 and (info.min < lo or info.max >= hi):
+            vmin = int(table.min())
+            vmax = int(table.max())
+            if vmin < lo:
+                emsg = f'output value {vmin} is out of range'
+                raise RtlError(emsg)
+            if vmax >= hi:
+                emsg = f'output value {vmax} is out of range'
+                raise RtlError(emsg)
+        self.__table = table
+
+    def __output_range(self):
+        """出力値の範囲を返す．
+
+        :return: (最小値, 最大値 + 1) のタプル
+        """
+        obw = self.output_bw
+        if self.__output.data_type.is_signedbitvector_type:
+            return -(1 << (obw - 1)), 1 << (obw - 1)
+        return 0, 1 << obw
+
+    def to_array(self):
+        """内容を密な配列に変換する．
+
+        :return: (値の配列, 値が定義されているかを表す配列) のタプル
+
+        配列の大きさは 2^input_bw となる．
+        未定義の要素の値は 0 である．
+        """
+        size = 1 << self.input_bw
+        vals = np.zeros(size, dtype=Lut.numpy_dtype(self.__output.data_type))
+        valid = np.zeros(size, dtype=bool)
+        if self.__table is not None:
+            n = len(self.__table)
+            vals[:n] = self.__table
+            valid[:n] = True
+        for ival, oval in self.__data_dict.items():
+            vals[ival] = oval
+            valid[ival] = True
+        return vals, valid
+
+    @staticmethod
+    def bit_width(data_type):
+        """データ型のビット幅を返す．
+
+        :param DataType data_type: データ型
+        """
+        if data_type.is_bit_type:
+            return 1
+        return data_type.size
+
+    @staticmethod
+    def numpy_dtype(data_type):
+        """出力値を保持するための numpy の型を返す．
+
+        :param DataType data_type: 出力のデータ型
+
+        64ビットを超える場合には object (Python の int) となる．
+        """
+        bw = Lut.bit_width(data_type)
+        if bw > 64:
+            return object
+        if data_type.is_signedbitvector_type:
+            return np.int64
+        return np.uint64
+
+    @staticmethod
+    def load_table(filename, *, dtype=None, offset=0):
+        """ファイルから表を読み込む．
+
+        :param str filename: ファイル名
+        :param dtype: 要素の型(生のバイナリファイルの場合のみ必要)
+        :param int offset: 先頭のバイトオフセット(生のバイナリファイルの場合のみ)
+        :return: np.memmap を返す．
+
+        拡張子が '.npy' の場合は numpy の形式とみなす．
+        それ以外の場合は dtype の配列が並んだ生のバイナリファイルとみなす．
+        いずれの場合も読み込み専用のメモリマップとして開く．
         """
-        assert indata.data_type == self.__input.data_type
-        assert outdata.data_type == self.__output.data_type
-        self.__data_list.append((indata, outdata))
+        if filename.endswith('.npy'):
+            return np.load(filename, mmap_mode='r')
+        if dtype is None:
+            emsg = f'{filename}: dtype is required for raw binary files'
+            raise RtlError(emsg)
+        return np.memmap(filename, dtype=dtype, mode='r', offset=offset)
+
+    def write_rom_file(self, filename):
+        """メモリ初期化ファイルを書き出す．
+
+        :param str filename: ファイル名
+
+        1行に1語ずつ，入力値の昇順に16進数で書き出す．
+        未定義の要素の値は 0 とする．
+        """
+        obw = self.output_bw
+        mask = (1 << obw) - 1
+        fmt = f'{{:0{(obw + 3) // 4}x}}'
+        vals, _ = self.to_array()
+        with open(filename, 'w') as fout:
+            chunk = 1 << 16
+            for base in range(0, len(vals), chunk):
+                lines = [fmt.format(int(v) & mask)
+                         for v in vals[base:base + chunk].tolist()]
+                fout.write('\n'.join(lines))
+                fout.write('\n')
+
+    def __write_rom(self, writer):
+        """ROM モードのメモリ初期化ファイルを出力器の場所に書き出す．"""
+        if writer.output_dir is None:
+            emsg = f'{self.__rom_file}: output_dir must be specified '
+            emsg += 'to write the ROM file'
+            raise RtlError(emsg)
+        self.write_rom_file(os.path.join(writer.output_dir, self.__rom_file))
+
+    @property
+    def __rom_name(self):
+        """ROM モードのメモリ配列名を返す．"""
+        return f'{self.name}_rom'
 
     def gen_verilog(self, writer):
         """Verilog-HDL記述を生成する．
 
         :param VerilogWriter writer: Verilog-DL出力器
         """
+        if self.__rom_file is not None:
+            self.__gen_verilog_rom(writer)
+            return
+        arm_list, default_val = self.make_case_arms()
+        has_dc = any(mask != 0
+                     for cube_list, _ in arm_list
+                     for _, mask in cube_list)
+        case_str = 'casez' if has_dc else 'case'
+        ibw = self.input_bw
+        otype = self.__output.data_type
+        out_str = self.__output.verilog_str
         header = "always @* begin"
         footer = "end\n"
         with SimpleBlock(writer, header, footer):
-            header = f'case ( {self.__input.verilog_str} )'
+            header = f'{case_str} ( {self.__input.verilog_str} )'
             footer = 'endcase'
             with SimpleBlock(writer, header, footer):
-                lines = []
-                for indata, outdata in self.__data_list:
-                    line = [f'{indata.verilog_str}:'
-                            f'{self.__output.verilog_str} <= {outdata.verilog_str}']
-                    lines.append(line)
-                line = ['default:', '']
-                lines.append(line)
-                writer.write_lines(lines, end=';')
+                for cube_list, oval in arm_list:
+                    label_list = [f"{ibw}'b" + Lut.cube_str(cube, ibw, '?')
+                                  for cube in cube_list]
+                    outdata = Expr.make_constant(data_type=otype, val=oval)
+                    tail = f': {out_str} <= {outdata.verilog_str};'
+                    Lut.__write_labels(writer, label_list, ', ', tail)
+                if default_val is None:
+                    writer.write_line('default: ;')
+                else:
+                    outdata = Expr.make_constant(data_type=otype,
+                                                 val=default_val)
+                    writer.write_line(f'default: {out_str} <= '
+                                      f'{outdata.verilog_str};')
+
+    def make_case_arms(self):
+        """case 文の分岐を作る．
+
+        :return: (分岐のリスト, default 節の出力値) のタプルを返す．
+
+        分岐は (キューブのリスト, 出力値) のタプルで表される．
+        キューブは (値, ドントケアのマスク) のタプルで表される．
+        出力値の等しい入力値をまとめて一つの分岐とし，
+        さらに隣接する入力値をドントケアを含むキューブにまとめる．
+        最も出現頻度の高い出力値は default 節とする．
+        表が空の場合には default 節の出力値は None となる．
+        未定義の入力値はドントケアとみなす．
+        異なる分岐のキューブは互いに交わらないので分岐の順序に意味はない．
+        """
+        group_dict = {}
+        for ival, oval in self.value_gen:
+            if oval not in group_dict:
+                group_dict[oval] = []
+            group_dict[oval].append(ival)
+        if len(group_dict) == 0:
+            return [], None
+        default_val = max(group_dict.keys(),
+                          key=lambda oval: len(group_dict[oval]))
+        arm_list = []
+        for oval, ival_list in group_dict.items():
+            if oval == default_val:
+                continue
+            cube_list = Lut.merge_cubes(ival_list, self.input_bw)
+            arm_list.append((cube_list, oval))
+        arm_list.sort(key=lambda arm: arm[0][0])
+        return arm_list, default_val
+
+    @staticmethod
+    def merge_cubes(ival_list, bw):
+        """入力値のリストをキューブのリストにまとめる．
+
+        :param list[int] ival_list: 入力値のリスト
+        :param int bw: 入力のビット幅
+        :return: (値, ドントケアのマスク) のリストを返す．
+
+        下位ビットから順に，そのビットのみが異なり同じマスクを持つ
+        キューブの対を併合する．結果のキューブは互いに交わらず，
+        その和集合は元の入力値の集合に等しい．
+        計算量は O(n * bw) である．
+        """
+        cube_set = set((ival, 0) for ival in ival_list)
+        for b in range(bw):
+            bit = 1 << b
+            next_set = set()
+            for val, mask in cube_set:
+                if mask & bit:
+                    next_set.add((val, mask))
+                elif val & bit:
+                    if (val & ~bit, mask) not in cube_set:
+                        next_set.add((val, mask))
+                elif (val | bit, mask) in cube_set:
+                    next_set.add((val, mask | bit))
+                else:
+                    next_set.add((val, mask))
+            cube_set = next_set
+        return sorted(cube_set)
+
+    @staticmethod
+    def cube_str(cube, bw, dc_char):
+        """キューブを表す '0', '1', dc_char の文字列を返す．
+
+        :param (int, int) cube: (値, ドントケアのマスク)
+        :param int bw: ビット幅
+        :param str dc_char: ドントケアを表す文字
+        """
+        val, mask = cube
+        ans = ''
+        for i in range(bw - 1, -1, -1):
+            bit = 1 << i
+            if mask & bit:
+                ans += dc_char
+            elif val & bit:
+                ans += '1'
+            else:
+                ans += '0'
+        return ans
+
+    @staticmethod
+    def __write_labels(writer, label_list, sep, tail, *, label_num=8):
+        """ラベルのリストを複数行に分けて出力する．
+
+        :param list[str] label_list: ラベルのリスト
+        :param str sep: ラベルの区切り文字列
+        :param str tail: 最後の行の末尾に付加する文字列
+        :param int label_num: 1行あたりのラベル数
+        """
+        n = len(label_list)
+        for pos in range(0, n, label_num):
+            line = sep.join(label_list[pos:pos + label_num])
+            if pos + label_num < n:
+                writer.write_line(line + sep.rstrip())
+            else:
+                writer.write_line(line + tail)
+
+    def __gen_verilog_rom(self, writer):
+        """ROM モードの Verilog-HDL記述を生成する．"""
+        self.__write_rom(writer)
+        signed_str, range_str = VerilogWriter.data_type_to_str(
+            self.__output.data_type)
+        size = 1 << self.input_bw
+        line = ['reg', signed_str, range_str,
+                f'{self.__rom_name} [0:{size - 1}]']
+        writer.write_lines([line], end=';')
+        writer.write_line(f'initial $readmemh("{self.__rom_file}", '
+                          f'{self.__rom_name});')
+        writer.write_line('')
+        header = "always @* begin"
+        footer = "end\n"
+        with SimpleBlock(writer, header, footer):
+            writer.write_line(f'{self.__output.verilog_str} <= '
+                              f'{self.__rom_name}[{self.__input.verilog_str}];')
+
+    def gen_vhdl_decl(self, writer):
+        """VHDL のアーキテクチャ宣言部の記述を生成する．
+
+        :param VhdlWriter writer: VHDL出力器
+
+        ROM モードの場合にメモリ配列の型と初期化関数を出力する．
+        初期化関数は VHDL-2008 の hread() を用いる．
+        配列の要素の型は出力が符号付きの場合は signed となる．
+        """
+        if self.__rom_file is None:
+            return
+        self.__write_rom(writer)
+        size = 1 << self.input_bw
+        # hread() は4の倍数のビット幅で読み込む．
+        word_bw = (self.output_bw + 3) // 4 * 4
+        word_str = f'std_logic_vector({word_bw - 1} downto 0)'
+        signed = self.__output.data_type.is_signedbitvector_type
+        if signed:
+            elem_str = f'ieee.numeric_std.signed({word_bw - 1} downto 0)'
+        else:
+            elem_str = word_str
+        rom_type = f'{self.__rom_name}_t'
+        writer.write_line('-- hread() requires VHDL-2008')
+        writer.write_line(f'type {rom_type} is array (0 to {size - 1}) of '
+                          f'{elem_str};')
+        header = f'impure function {self.__rom_name}_init return {rom_type} is'
+        with SimpleBlock(writer, header, None):
+            writer.write_line('file rom_file : std.textio.text open read_mode is '
+                              f'"{self.__rom_file}";')
+            writer.write_line('variable rom_line : std.textio.line;')
+            if signed:
+                writer.write_line(f'variable rom_word : {word_str};')
+            writer.write_line(f'variable rom : {rom_type};')
+        with SimpleBlock(writer, 'begin', 'end function;'):
+            header = "for i in rom'range loop"
+            with SimpleBlock(writer, header, 'end loop;'):
+                writer.write_line('std.textio.readline(rom_file, rom_line);')
+                if signed:
+                    writer.write_line('ieee.std_logic_1164.hread(rom_line, '
+                                      'rom_word);')
+                    writer.write_line('rom(i) := '
+                                      'ieee.numeric_std.signed(rom_word);')
+                else:
+                    writer.write_line('ieee.std_logic_1164.hread(rom_line, '
+                                      'rom(i));')
+            writer.write_line('return rom;')
+        writer.write_line(f'constant {self.__rom_name} : {rom_type} := '
+                          f'{self.__rom_name}_init;')
 
     def gen_vhdl(self, writer):
         """VHDL記述を生成する．
 
         :param VhdlWriter writer: VHDL出力器
         """
+        if self.__rom_file is not None:
+            if self.__output.data_type.is_bit_type:
+                range_str = '(0)'
+            else:
+                range_str = f'({self.output_bw - 1} downto 0)'
+            index_str = ('ieee.numeric_std.to_integer('
+                         f'ieee.numeric_std.unsigned({self.__input.vhdl_str}))')
+            writer.write_line(f'{self.__output.vhdl_str} <= '
+                              f'{self.__rom_name}({index_str}){range_str};')
+            writer.write_line('')
+            return
+        arm_list, default_val = self.make_case_arms()
+        has_dc = any(mask != 0
+                     for cube_list, _ in arm_list
+                     for _, mask in cube_list)
+        case_str = 'case?' if has_dc else 'case'
+        ibw = self.input_bw
+        otype = self.__output.data_type
+        out_str = self.__output.vhdl_str
         header = f'{self.name}: process ( {self.__input.vhdl_str} ) begin'
         footer = f'end process {self.name};\n'
         with SimpleBlock(writer, header, footer):
-            header = f'case {self.__input.vhdl_str} is'
-            footer = 'end case;'
+            header = f'{case_str} {self.__input.vhdl_str} is'
+            footer = f'end {case_str};'
             with SimpleBlock(writer, header, footer):
-                lines = []
-                for indata, outdata in self.__data_list:
-                    line = [f'when {indata.vhdl_str}',
-                            '=>',
-                            f'{self.__output.vhdl_str} <= {outdata.vhdl_str}']
-                    lines.append(line)
-                line = ['when others', '=>', 'null']
-                lines.append(line)
-                writer.write_lines(lines, end=';')
+                for cube_list, oval in arm_list:
+                    if self.__input.data_type.is_bit_type:
+                        label_list = [f"'{Lut.cube_str(cube, ibw, '-')}'"
+                                      for cube in cube_list]
+                    else:
+                        label_list = [f'"{Lut.cube_str(cube, ibw, "-")}"'
+                                      for cube in cube_list]
+                    label_list[0] = 'when ' + label_list[0]
+                    outdata = Expr.make_constant(data_type=otype, val=oval)
+                    tail = f' => {out_str} <= {outdata.vhdl_str};'
+                    Lut.__write_labels(writer, label_list, ' | ', tail)
+                if default_val is None:
+                    writer.write_line('when others => null;')
+                else:
+                    outdata = Expr.make_constant(data_type=otype,
+                                                 val=default_val)
+                    writer.write_line(f'when others => {out_str} <= '
+                                      f'{outdata.vhdl_str};')
 
 
 def add_lut(self, *,
+            name=None,
             input_bw=None, input=None,
             data_type,
-            data_list=[]):
-    lut = Lut(self, input_bw=input_bw, input=input,
+            data_list=[],
+            table=None,
+            table_file=None,
+            table_dtype=None,
+            table_offset=0,
+            rom_file=None):
+    """LUT を追加する．
+
+    :param str name: 名前
+    :param int input_bw: 入力のビット幅
+    :param Expr input: 入力
+    :param DataType data_type: 出力のデータ型
+    :param list[(Expr, Expr)] data_list: データのリスト
+    :param np.ndarray table: 入力値をインデックスとする出力値の配列
+    :param str table_file: 表を読み込むファイル名
+    :param table_dtype: table_file の要素の型(生のバイナリファイルの場合)
+    :param int table_offset: table_file の先頭のバイトオフセット
+    :param str rom_file: ROM モードで用いるメモリ初期化ファイル名
+    :return: 生成した Lut を返す．
+
+    table_file については Lut.load_table() を参照のこと．
+    """
+    if table_file is not None:
+        if table is not None:
+            emsg = 'table and table_file are mutually exclusive'
+            raise RtlError(emsg)
+        table = Lut.load_table(table_file, dtype=table_dtype,
+                               offset=table_offset)
+    lut = Lut(self, name=name, input_bw=input_bw, input=input,
               data_type=data_type,
-              data_list=data_list)
+              data_list=data_list,
+              table=table,
+              rom_file=rom_file)
     return lut
 
 
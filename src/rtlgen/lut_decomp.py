@@ -0,0 +1,256 @@
+#! /usr/bin/env python3
+
+"""入力数の多い Lut を小さな Lut の木に分解する関数
+
+:file: lut_decomp.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import numpy as np
+from rtlgen.entity import Entity
+from rtlgen.expr import Expr
+from rtlgen.data_type import DataType, BitVectorType
+from rtlgen.rtlerror import RtlError
+
+
+class LutDecomposer:
+    """Lut の分解を行うクラス
+
+    :param Entity ent: 対象のエンティティ
+    :param int max_input_bw: 分解後の Lut の入力の最大ビット幅
+
+    入力の上位ビットで Shannon 展開を行い，下位ビットを入力とする
+    部分表(コファクタ)に分割する．分割は部分表の入力が max_input_bw
+    以下になるまで繰り返す．
+    * 内容の等しい部分表は一つの Lut で共有する．
+      同じビット範囲を入力とする部分表は展開のレベルをまたいで共有される．
+    * 出力値が一定の部分表は Lut を作らずに定数とする．
+    * 部分表の種類数が少ない場合には上位ビットから種類番号を求める
+      Lut(関数分解の分解表)を作り，種類番号でマルチプレクサを制御する．
+    各段のマルチプレクサは CombProcess 中の case 文として作られる．
+    """
+
+    def __init__(self, ent, *, max_input_bw):
+        if max_input_bw < 1:
+            emsg = f'max_input_bw({max_input_bw}) must be positive'
+            raise RtlError(emsg)
+        self.__ent = ent
+        self.__max_bw = max_input_bw
+        self.__input = None
+        self.__memo = {}
+        self.__lut_list = []
+
+    def decompose(self, lut):
+        """Lut を分解する．
+
+        :param Lut lut: 対象の Lut
+        :return: 分解後に生成された Lut のリストを返す．
+
+        lut はエンティティから取り除かれ，lut.output は
+        分解後の回路で駆動されるようになる．
+        lut.input_bw が max_input_bw 以下の場合には何もしない．
+        ROM モードの指定は分解後の Lut には引き継がれない．
+        """
+        ibw = lut.input_bw
+        if ibw <= self.__max_bw:
+            return [lut]
+        vals, valid = lut.to_array()
+        input = lut.input
+        if not input.is_simple():
+            # 範囲選択を行うためにネットにしておく．
+            input = self.__ent.add_net(data_type=input.data_type, src=input)
+        self.__input = input
+        self.__memo = {}
+        self.__lut_list = []
+        out = lut.output
+        self.__ent.del_item(lut)
+        self.__build(vals, valid, 0, ibw, out.data_type, out)
+        return self.__lut_list
+
+    def __build(self, vals, valid, lsb, width, otype, out=None):
+        """部分表を実現する回路を作る．
+
+        :param np.ndarray vals: 出力値の配列
+        :param np.ndarray valid: 出力値が定義されているかを表す配列
+        :param int lsb: 部分表の入力の最下位ビットの位置
+        :param int width: 部分表の入力のビット幅
+        :param DataType otype: 出力のデータ型
+        :param Net out: 結果を代入するネット
+        :return: 出力のネットもしくは定数値(int)を返す．
+
+        out が指定された場合には out に結果を代入する．
+        """
+        cval = LutDecomposer.__const_value(vals, valid)
+        if cval is not None:
+            if out is not None:
+                self.__drive(out, cval, otype)
+            return cval
+
+        key = None
+        if out is None:
+            # 符号の有無も区別するためにデータ型の文字列をキーに含める．
+            key = (lsb, width, str(otype),
+                   LutDecomposer.__table_key(vals, valid))
+            if key in self.__memo:
+                return self.__memo[key]
+
+        if width <= self.__max_bw:
+            ans = self.__make_lut(vals, valid, lsb, width, otype)
+            if out is not None:
+                self.__drive(out, ans, otype)
+            else:
+                self.__memo[key] = ans
+            return ans
+
+        # 上位 sbw ビットで展開し，下位 fbw ビットを部分表の入力とする．
+        sbw = min(self.__max_bw, width - self.__max_bw)
+        fbw = width - sbw
+        nrow = 1 << sbw
+        rows = vals.reshape(nrow, 1 << fbw)
+        vrows = valid.reshape(nrow, 1 << fbw)
+
+        # 内容の等しい部分表をまとめる．
+        # 出力値が全く定義されていない行は cls_list 中で None とする．
+        cls_dict = {}
+        cls_rep = []
+        cls_list = []
+        for r in range(nrow):
+            if not vrows[r].any():
+                cls_list.append(None)
+                continue
+            rkey = LutDecomposer.__table_key(rows[r], vrows[r])
+            if rkey not in cls_dict:
+                cls_dict[rkey] = len(cls_rep)
+                cls_rep.append(r)
+            cls_list.append(cls_dict[rkey])
+        ncls = len(cls_rep)
+
+        sub_list = [self.__build(rows[r], vrows[r], lsb, fbw, otype)
+                    for r in cls_rep]
+        if ncls == 1:
+            ans = sub_list[0]
+            if out is not None:
+                self.__drive(out, ans, otype)
+            else:
+                self.__memo[key] = ans
+            return ans
+
+        # 最も多くの行に現れる部分表を default 節にする．
+        count = [0] * ncls
+        for c in cls_list:
+            if c is not None:
+                count[c] += 1
+        def_cls = max(range(ncls), key=lambda c: count[c])
+        if all(isinstance(sub, int) for sub in sub_list):
+            # 部分表がすべて定数の場合は上位ビットのみの関数となる．
+            hvals = np.array([0 if c is None else sub_list[c]
+                              for c in cls_list], dtype=vals.dtype)
+            hvalid = np.array([c is not None for c in cls_list], dtype=bool)
+            ans = self.__build(hvals, hvalid, lsb + fbw, sbw, otype, out)
+            if key is not None:
+                self.__memo[key] = ans
+            return ans
+        cls_list = [def_cls if c is None else c for c in cls_list]
+
+        kbw = max(1, DataType.bitlen(ncls))
+        if kbw < sbw:
+            # 上位ビットから部分表の種類番号を求める分解表を作る．
+            ktype = BitVectorType(kbw)
+            kvals = np.array(cls_list, dtype=np.uint64)
+            kvalid = np.ones(nrow, dtype=bool)
+            sel = self.__build(kvals, kvalid, lsb + fbw, sbw, ktype)
+            label_list = [(c, c) for c in range(ncls) if c != def_cls]
+        else:
+            ktype = BitVectorType(sbw)
+            sel = self.__select(lsb + fbw, sbw)
+            label_list = [(r, c) for r, c in enumerate(cls_list)
+                          if c != def_cls]
+
+        if out is None:
+            out = self.__ent.add_net(data_type=otype, reg_type=True)
+        proc = self.__ent.add_comb_process()
+        with proc.body() as body:
+            stmt = body.add_case(sel)
+            for lval, c in label_list:
+                label = Expr.make_constant(data_type=ktype, val=lval)
+                with stmt.add_label(label) as arm:
+                    arm.add_assign(out,
+                                   LutDecomposer.__operand(sub_list[c], otype))
+            with stmt.add_default() as arm:
+                arm.add_assign(out,
+                               LutDecomposer.__operand(sub_list[def_cls],
+                                                       otype))
+        if key is not None:
+            self.__memo[key] = out
+        return out
+
+    def __make_lut(self, vals, valid, lsb, width, otype):
+        """部分表を Lut として作る．"""
+        lut = self.__ent.add_lut(input=self.__select(lsb, width),
+                                 data_type=otype)
+        if valid.all() and vals.dtype != object:
+            lut.set_table(np.ascontiguousarray(vals))
+        else:
+            for ival in np.flatnonzero(valid).tolist():
+                lut.add_data(ival, int(vals[ival]))
+        self.__lut_list.append(lut)
+        return lut.output
+
+    def __drive(self, out, src, otype):
+        """out に src を代入するプロセスを作る．"""
+        proc = self.__ent.add_comb_process()
+        with proc.body() as body:
+            body.add_assign(out, LutDecomposer.__operand(src, otype))
+
+    def __select(self, lsb, width):
+        """入力の lsb ビット目から width ビットを取り出す式を返す．"""
+        return Expr.part_select(self.__input, lsb + width - 1, lsb)
+
+    @staticmethod
+    def __const_value(vals, valid):
+        """部分表の出力値が一定ならその値を返す．
+
+        一定でない場合は None を返す．
+        """
+        vvals = vals[valid]
+        if len(vvals) == 0:
+            return 0
+        val0 = int(vvals[0])
+        if (vvals == vvals[0]).all():
+            return val0
+        return None
+
+    @staticmethod
+    def __table_key(vals, valid):
+        """部分表の内容を表すハッシュ可能なキーを返す．"""
+        if vals.dtype == object:
+            return tuple(int(v) if f else None
+                         for v, f in zip(vals.tolist(), valid.tolist()))
+        vals = np.where(valid, vals, 0)
+        return (vals.tobytes(), np.packbits(valid).tobytes())
+
+    @staticmethod
+    def __operand(src, otype):
+        """__build() の結果を代入文の右辺に変換する．"""
+        if isinstance(src, int):
+            return Expr.make_constant(data_type=otype, val=src)
+        return src
+
+
+def decompose_lut(self, lut, *,
+                  max_input_bw=8):
+    """Lut を入力数の小さな Lut とマルチプレクサの木に分解する．
+
+    :param Lut lut: 対象の Lut
+    :param int max_input_bw: 分解後の Lut の入力の最大ビット幅
+    :return: 分解後に生成された Lut のリストを返す．
+
+    詳細は LutDecomposer を参照のこと．
+    """
+    decomp = LutDecomposer(self, max_input_bw=max_input_bw)
+    return decomp.decompose(lut)
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.decompose_lut = decompose_lut
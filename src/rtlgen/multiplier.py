@@ -0,0 +1,486 @@
+#! /usr/bin/env python3
+
+"""多オペランド加算と乗算のための圧縮木を作るクラス
+
+:file: multiplier.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.expr import Expr
+from rtlgen.data_type import DataType
+from rtlgen.adder import PrefixAdder
+from rtlgen.evaluator import Evaluator
+from rtlgen.bit_util import expr_bit_list, const_bit, to_expr, to_net
+from rtlgen.bit_util import new_vector, fold_not, fold_and, fold_or, fold_xor
+from rtlgen.rtlerror import RtlError
+
+
+class CompressorTree:
+    """ビットの行列(部分積)を圧縮して和を求めるクラス
+
+    :param Entity ent: 回路を作るエンティティ
+    :param int out_width: 出力のビット幅
+    :param str style: 圧縮木の構造
+
+    style は以下のいずれか
+    * 'wallace': 各段で全ての列を 3:2 (と 2:2) カウンタで圧縮する．
+    * 'dadda': 各段の目標の高さまでのみ圧縮する．カウンタ数が少ない．
+    * 'compressor42': 4:2 コンプレッサで圧縮する．
+
+    各列のビットは重み 2^pos を持つ．負の重みを持つビット x は
+    -x 2^k = (~x) 2^k - 2^k と書き換えて補数と定数で表す．
+    このため符号付きのオペランドも符号なしのビットのみで扱える．
+    結果は 2^out_width を法として計算される．
+    """
+
+    def __init__(self, ent, out_width, *, style='dadda'):
+        if out_width < 1:
+            emsg = f'out_width({out_width}) must be positive'
+            raise RtlError(emsg)
+        if style not in ('wallace', 'dadda', 'compressor42'):
+            emsg = f'{style}: unknown style'
+            raise RtlError(emsg)
+        self.__ent = ent
+        self.__out_width = out_width
+        self.__style = style
+        self.__column_list = [[] for _ in range(out_width)]
+        self.__const = 0
+        self.__stage_num = 0
+        self.__fa_num = 0
+        self.__ha_num = 0
+        self.__c42_num = 0
+        self.__max_height = 0
+        self.__adder = None
+        self.__output = None
+
+    @property
+    def out_width(self):
+        """出力のビット幅を返す．"""
+        return self.__out_width
+
+    @property
+    def style(self):
+        """圧縮木の構造を返す．"""
+        return self.__style
+
+    @property
+    def output(self):
+        """出力のネットを返す．"""
+        return self.__output
+
+    @property
+    def height(self):
+        """現在の列の高さの最大値を返す．"""
+        return max(len(column) for column in self.__column_list)
+
+    def add_bit(self, pos, bit, *, negative=False):
+        """ビットを追加する．
+
+        :param int pos: 位置
+        :param Expr bit: ビット型の式(0 か 1 の int も可)
+        :param bool negative: 負の重みを持つ時 True にする．
+        """
+        self.__check_open()
+        if pos < 0:
+            emsg = f'pos({pos}) must be non-negative'
+            raise RtlError(emsg)
+        if negative:
+            self.__const -= 1 << pos
+            bit = fold_not(self.__ent, bit)
+        if pos >= self.__out_width:
+            return
+        if isinstance(bit, int):
+            self.__const += bit << pos
+            return
+        self.__column_list[pos].append(to_net(self.__ent, bit))
+
+    def add_constant(self, val):
+        """定数を加える．
+
+        :param int val: 値(負の値も可)
+        """
+        self.__check_open()
+        self.__const += val
+
+    def add_operand(self, expr, *, shift=0, negate=False):
+        """オペランドを加える．
+
+        :param Expr expr: オペランド
+        :param int shift: 左シフト量
+        :param bool negate: 減算する時 True にする．
+
+        符号付きビットベクタ型の場合は最上位ビットが負の重みを持つ．
+        """
+        bit_list = expr_bit_list(self.__ent, expr)
+        signed = expr.data_type.is_signedbitvector_type
+        n = len(bit_list)
+        for i, bit in enumerate(bit_list):
+            negative = signed and i == n - 1
+            if negate:
+                negative = not negative
+            self.add_bit(shift + i, bit, negative=negative)
+
+    def add_product(self, a, b, *, booth=False, shift=0):
+        """a と b の積の部分積を加える．
+
+        :param Expr a: 被乗数
+        :param Expr b: 乗数
+        :param bool booth: 2次の Booth 符号化を用いる時 True にする．
+        :param int shift: 左シフト量
+        """
+        if booth:
+            self.__add_booth_product(a, b, shift)
+        else:
+            self.__add_array_product(a, b, shift)
+
+    def build(self, *, adder_style='sklansky', data_type=None, name=None):
+        """圧縮木と最終段の加算器を作る．
+
+        :param str adder_style: 最終段の PrefixAdder の構造
+        :param DataType data_type: 出力のデータ型(省略時はビットベクタ)
+        :param str name: 出力の名前
+        :return: 出力のネットを返す．
+        """
+        self.__check_open()
+        n = self.__out_width
+        const = self.__const & ((1 << n) - 1)
+        for pos in range(n):
+            if (const >> pos) & 1:
+                self.__column_list[pos].append(1)
+        self.__max_height = self.height
+        if self.__style == 'wallace':
+            while self.height > 2:
+                self.__wallace_stage()
+        elif self.__style == 'dadda':
+            d_list = [2]
+            while d_list[-1] < self.height:
+                d_list.append(d_list[-1] * 3 // 2)
+            for d in reversed(d_list[:-1]):
+                self.__dadda_stage(d)
+        else:
+            while self.height > 2:
+                if self.height >= 4:
+                    self.__c42_stage()
+                else:
+                    self.__dadda_stage(2)
+
+        # 最終段の加算器
+        row0 = [const_bit(0)] * n
+        row1 = [const_bit(0)] * n
+        lsb = n
+        for pos, column in enumerate(self.__column_list):
+            if len(column) >= 1:
+                row0[pos] = to_expr(column[0])
+            if len(column) == 2:
+                row1[pos] = to_expr(column[1])
+                lsb = min(lsb, pos)
+        if lsb < n:
+            bw = n - lsb
+            adder = PrefixAdder(bw, style=adder_style)
+            a = new_vector(self.__ent, row0[lsb:])
+            b = new_vector(self.__ent, row1[lsb:])
+            adder.build(self.__ent, a, b)
+            self.__adder = adder
+            if lsb == 0:
+                src = adder.sum
+            else:
+                src = Expr.concat([adder.sum] + list(reversed(row0[:lsb])))
+        else:
+            src = Expr.concat(list(reversed(row0)))
+        if data_type is None or data_type == src.data_type:
+            self.__output = self.__ent.add_net(name=name, src=src)
+        else:
+            self.__output = self.__ent.add_net(name=name,
+                                               data_type=data_type)
+            self.__ent.connect(self.__output, src)
+        return self.__output
+
+    def report(self):
+        """圧縮木の規模の情報を辞書で返す．"""
+        ans = {
+            'style': self.__style,
+            'out_width': self.__out_width,
+            'max_height': self.__max_height,
+            'stages': self.__stage_num,
+            'full_adders': self.__fa_num,
+            'half_adders': self.__ha_num,
+            'compressors_4_2': self.__c42_num,
+        }
+        if self.__adder is not None:
+            ans['adder'] = self.__adder.report()
+        return ans
+
+    def __check_open(self):
+        if self.__output is not None:
+            raise RtlError('build() has already been called')
+
+    def __wallace_stage(self):
+        """Wallace 木の1段分の圧縮を行う．"""
+        self.__stage_num += 1
+        new_list = [[] for _ in range(self.__out_width)]
+        for pos, column in enumerate(self.__column_list):
+            h = len(column)
+            # 2ビットの列は下位からキャリーが来る時のみ半加算器で圧縮する．
+            if h < 2 or h == 2 and not new_list[pos]:
+                new_list[pos].extend(column)
+                continue
+            i = 0
+            while h - i >= 3:
+                s, c = self.__fa(*column[i:i + 3])
+                self.__fa_num += 1
+                self.__push(new_list, pos, s, c)
+                i += 3
+            if h - i == 2:
+                s, c = self.__ha(*column[i:i + 2])
+                self.__ha_num += 1
+                self.__push(new_list, pos, s, c)
+                i += 2
+            new_list[pos].extend(column[i:])
+        self.__column_list = new_list
+
+    def __dadda_stage(self, d):
+        """Dadda 木の1段分の圧縮を行う．
+
+        :param int d: この段の目標の高さ
+        """
+        self.__stage_num += 1
+        new_list = [[] for _ in range(self.__out_width)]
+        for pos, column in enumerate(self.__column_list):
+            # new_list[pos] には下位の列からのキャリーが入っている．
+            h = len(column) + len(new_list[pos])
+            i = 0
+            while h > d and len(column) - i >= 2:
+                if h - d == 1 or len(column) - i == 2:
+                    s, c = self.__ha(*column[i:i + 2])
+                    self.__ha_num += 1
+                    i += 2
+                    h -= 1
+                else:
+                    s, c = self.__fa(*column[i:i + 3])
+                    self.__fa_num += 1
+                    i += 3
+                    h -= 2
+                self.__push(new_list, pos, s, c)
+            new_list[pos].extend(column[i:])
+        self.__column_list = new_list
+
+    def __c42_stage(self):
+        """4:2 コンプレッサによる1段分の圧縮を行う．
+
+        4:2 コンプレッサは2つの全加算器からなり，1つめの全加算器の
+        キャリーは同じ段の上位の列のコンプレッサの入力となる．
+        このキャリーは cin に依存しないので横方向の連鎖は生じない．
+        """
+        self.__stage_num += 1
+        n = self.__out_width
+        new_list = [[] for _ in range(n)]
+        cin_list = []
+        for pos, column in enumerate(self.__column_list):
+            next_cin_list = []
+            h = len(column)
+            i = 0
+            while h - i >= 4:
+                s1, c1 = self.__fa(*column[i:i + 3])
+                if cin_list:
+                    s, c = self.__fa(s1, column[i + 3], cin_list.pop(0))
+                else:
+                    s, c = self.__ha(s1, column[i + 3])
+                self.__c42_num += 1
+                if pos + 1 < n:
+                    next_cin_list.append(c1)
+                self.__push(new_list, pos, s, c)
+                i += 4
+            if h - i == 3:
+                s, c = self.__fa(*column[i:i + 3])
+                self.__fa_num += 1
+                self.__push(new_list, pos, s, c)
+                i += 3
+            new_list[pos].extend(column[i:])
+            new_list[pos].extend(cin_list)
+            cin_list = next_cin_list
+        self.__column_list = new_list
+
+    def __push(self, new_list, pos, s, c):
+        """和とキャリーを次の段に加える．"""
+        if not isinstance(s, int):
+            new_list[pos].append(s)
+        elif s:
+            new_list[pos].append(1)
+        if pos + 1 < self.__out_width:
+            if not isinstance(c, int):
+                new_list[pos + 1].append(c)
+            elif c:
+                new_list[pos + 1].append(1)
+
+    def __fa(self, x, y, z):
+        """全加算器を作る．"""
+        ent = self.__ent
+        t = fold_xor(ent, x, y)
+        s = fold_xor(ent, t, z)
+        c = fold_or(ent, fold_and(ent, x, y), fold_and(ent, t, z))
+        return s, c
+
+    def __ha(self, x, y):
+        """半加算器を作る．"""
+        ent = self.__ent
+        return fold_xor(ent, x, y), fold_and(ent, x, y)
+
+    def __add_array_product(self, a, b, shift):
+        """a と b の積の部分積を配列状に加える．"""
+        a_list = expr_bit_list(self.__ent, a)
+        b_list = expr_bit_list(self.__ent, b)
+        a_signed = a.data_type.is_signedbitvector_type
+        b_signed = b.data_type.is_signedbitvector_type
+        na = len(a_list)
+        nb = len(b_list)
+        for j, b_j in enumerate(b_list):
+            b_neg = b_signed and j == nb - 1
+            for i, a_i in enumerate(a_list):
+                a_neg = a_signed and i == na - 1
+                bit = fold_and(self.__ent, a_i, b_j)
+                self.add_bit(shift + i + j, bit, negative=a_neg != b_neg)
+
+    def __add_booth_product(self, a, b, shift):
+        """a と b の積の部分積を2次の Booth 符号化で加える．
+
+        乗数の3ビット (b[2k+1], b[2k], b[2k-1]) から桁
+        d = -2 b[2k+1] + b[2k] + b[2k-1] を求め，d * a を部分積とする．
+        部分積は |d| * a の各ビットと neg の排他的論理和に neg を加えた
+        ものとして表す．最上位ビットは負の重みを持つ．
+        """
+        ent = self.__ent
+        a_list = expr_bit_list(ent, a)
+        b_list = expr_bit_list(ent, b)
+        na = len(a_list)
+        nb = len(b_list)
+        a_ext = a_list[-1] if a.data_type.is_signedbitvector_type else 0
+        if b.data_type.is_signedbitvector_type:
+            b_ext = b_list[-1]
+            k_num = (nb + 1) // 2
+        else:
+            b_ext = 0
+            k_num = nb // 2 + 1
+
+        def a_bit(i):
+            if i < 0:
+                return 0
+            if i < na:
+                return a_list[i]
+            return a_ext
+
+        def b_bit(i):
+            if i < 0:
+                return 0
+            if i < nb:
+                return b_list[i]
+            return b_ext
+
+        for k in range(k_num):
+            b0 = b_bit(2 * k - 1)
+            b1 = b_bit(2 * k)
+            b2 = b_bit(2 * k + 1)
+            neg = to_net(ent, b2)
+            one = to_net(ent, fold_xor(ent, b1, b0))
+            nb1 = fold_not(ent, b1)
+            nb0 = fold_not(ent, b0)
+            two1 = fold_and(ent, b2, fold_and(ent, nb1, nb0))
+            nb2 = fold_not(ent, b2)
+            two2 = fold_and(ent, nb2, fold_and(ent, b1, b0))
+            two = to_net(ent, fold_or(ent, two1, two2))
+            pos0 = shift + 2 * k
+            for j in range(na + 2):
+                sel = fold_or(ent, fold_and(ent, one, a_bit(j)),
+                              fold_and(ent, two, a_bit(j - 1)))
+                bit = fold_xor(ent, sel, neg)
+                self.add_bit(pos0 + j, bit, negative=j == na + 1)
+            self.add_bit(pos0, neg)
+
+
+def add_multiplier(self, a, b, *,
+                   booth=False,
+                   style='dadda',
+                   adder_style='sklansky',
+                   out_width=None,
+                   name=None):
+    """乗算器を追加する．
+
+    :param Expr a: 被乗数
+    :param Expr b: 乗数
+    :param bool booth: 2次の Booth 符号化を用いる時 True にする．
+    :param str style: 圧縮木の構造('wallace', 'dadda', 'compressor42')
+    :param str adder_style: 最終段の PrefixAdder の構造
+    :param int out_width: 出力のビット幅(省略時は a と b のビット幅の和)
+    :param str name: 出力の名前
+    :return: 生成した CompressorTree を返す．
+
+    積は CompressorTree.output で得られる．
+    どちらかが符号付きビットベクタの場合は出力も符号付きとなる．
+    """
+    bw_a = Evaluator.bit_width(a.data_type)
+    bw_b = Evaluator.bit_width(b.data_type)
+    if bw_a is None or bw_b is None:
+        emsg = 'operand must be a bit or bitvector'
+        raise RtlError(emsg)
+    if out_width is None:
+        out_width = bw_a + bw_b
+    tree = CompressorTree(self, out_width, style=style)
+    tree.add_product(a, b, booth=booth)
+    signed = (a.data_type.is_signedbitvector_type or
+              b.data_type.is_signedbitvector_type)
+    tree.build(adder_style=adder_style,
+               data_type=_out_type(out_width, signed),
+               name=name)
+    return tree
+
+
+def add_multi_operand_adder(self, operand_list, *,
+                            style='dadda',
+                            adder_style='sklansky',
+                            out_width=None,
+                            name=None):
+    """多オペランドの加算器を追加する．
+
+    :param list[Expr] operand_list: オペランドのリスト
+    :param str style: 圧縮木の構造('wallace', 'dadda', 'compressor42')
+    :param str adder_style: 最終段の PrefixAdder の構造
+    :param int out_width: 出力のビット幅
+    :param str name: 出力の名前
+    :return: 生成した CompressorTree を返す．
+
+    out_width を省略した場合は桁あふれの生じないビット幅となる．
+    符号付きビットベクタのオペランドは符号拡張される．
+    """
+    if not operand_list:
+        emsg = 'operand_list is empty'
+        raise RtlError(emsg)
+    bw_list = [Evaluator.bit_width(opr.data_type) for opr in operand_list]
+    if None in bw_list:
+        emsg = 'operand must be a bit or bitvector'
+        raise RtlError(emsg)
+    signed = any(opr.data_type.is_signedbitvector_type
+                 for opr in operand_list)
+    if out_width is None:
+        out_width = max(bw_list) + DataType.bitlen(len(operand_list))
+        if signed and not all(opr.data_type.is_signedbitvector_type
+                              for opr in operand_list):
+            out_width += 1
+    tree = CompressorTree(self, out_width, style=style)
+    for opr in operand_list:
+        tree.add_operand(opr)
+    tree.build(adder_style=adder_style,
+               data_type=_out_type(out_width, signed),
+               name=name)
+    return tree
+
+
+def _out_type(bw, signed):
+    if signed:
+        return DataType.signed_bitvector_type(bw)
+    return DataType.bitvector_type(bw)
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.add_multiplier = add_multiplier
+Entity.add_multi_operand_adder = add_multi_operand_adder
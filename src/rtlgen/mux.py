@@ -9,7 +9,8 @@ Mux を追加するプログラム
 """
 
 from rtlgen.entity import Entity
-from rtlgen.expr import Expr
+from rtlgen.expr import Expr, Concat
+from rtlgen.rtlerror import RtlError
 
 
 def add_mux2(self, *,
@@ -41,17 +42,176 @@ def add_mux2(self, *,
             in0 = Expr.make_constant(data_type=in1.data_type, val=in0)
     else:
         if isinstance(in1, int):
-            in1 = Expr.make_constant(data_type=data_type, val=in1)
+            in1 = Expr.make_constant(data_type=in0.data_type, val=in1)
 
     assert in0.data_type == in1.data_type
 
     out = self.add_net(reg_type=True, data_type=in0.data_type, name=name)
-    mux_body = self.add_comb_body()
-    mux_if = mux_body.add_if(sel)
-    mux_if.then_body.add_assign(out, in1)
-    mux_if.else_body.add_assign(out, in0)
+    mux_proc = self.add_comb_process()
+    with mux_proc.body() as mux_body:
+        mux_if = mux_body.add_if(sel)
+        with mux_if.then_body() as _:
+            _.add_assign(out, in1)
+        with mux_if.else_body() as _:
+            _.add_assign(out, in0)
+    return out
+
+
+# add_mux() で 'case' を選ぶ入力の総ビット数の上限
+_MUX_CASE_LIMIT = 1024
+
+
+def add_mux(self, *,
+            sel,
+            inputs,
+            style=None,
+            data_type=None,
+            name=None):
+    """N入力MUX を追加する．
+
+    :param Expr sel: 選択信号線
+    :param list[Expr] inputs: 入力のリスト
+    :param str style: 構造('tree', 'case', 'onehot' のいずれか)
+    :param DataType data_type: 出力のデータ型
+    :param str name: 出力の名前
+    :return: 出力の信号線を返す．
+
+    style の意味は以下の通り．
+    * 'tree':   sel の各ビットで制御される2入力MUXの平衡木．
+                段ごとに一つのプロセスを作る．段数は log2(N)
+    * 'case':   一つのプロセス中の case 文
+    * 'onehot': sel を N ビットのワンホット信号とみなした AND-OR 構造．
+                sel の i ビット目が 1 の時に inputs[i] が選ばれる．
+    'onehot' 以外では sel は入力番号を表す2進数である．
+    style が None の場合は入力数とビット幅から 'case' か 'tree' を選ぶ．
+    入力が整数の場合は data_type もしくは他の入力のデータ型の定数となる．
+    どの実装も再帰を用いないので入力数が多くても構わない．
+    """
+    n = len(inputs)
+    if n == 0:
+        raise RtlError('inputs should not be empty')
+    if data_type is None:
+        for src in inputs:
+            if not isinstance(src, int):
+                data_type = src.data_type
+                break
+        else:
+            raise RtlError('data_type should be specified')
+    inputs = [Expr.make_constant(data_type=data_type, val=src)
+              if isinstance(src, int) else src
+              for src in inputs]
+    for src in inputs:
+        if src.data_type != data_type:
+            raise RtlError('data_type mismatch in inputs')
+
+    sel_bw = Concat.src_size(sel)
+    if style is None:
+        if n * Concat.src_size(inputs[0]) <= _MUX_CASE_LIMIT:
+            style = 'case'
+        else:
+            style = 'tree'
+    if style == 'onehot':
+        if sel_bw != n:
+            emsg = f'sel should have {n} bits for onehot style'
+            raise RtlError(emsg)
+    elif (1 << sel_bw) < n:
+        emsg = f'sel({sel_bw} bits) is too narrow for {n} inputs'
+        raise RtlError(emsg)
+
+    if style == 'tree':
+        src = _make_mux_tree(self, sel, inputs, data_type)
+    elif style == 'case':
+        src = _make_mux_case(self, sel, inputs, data_type)
+    elif style == 'onehot':
+        src = _make_mux_onehot(sel, inputs)
+    else:
+        emsg = f'{style}: unknown style'
+        raise RtlError(emsg)
+    if name is None and src.is_simple():
+        return src
+    out = self.add_net(data_type=data_type, name=name)
+    self.connect(out, src)
+    return out
+
+
+def _sel_bit(sel, pos):
+    """sel の pos ビット目を返す．"""
+    if sel.data_type.is_bit_type:
+        assert pos == 0
+        return sel
+    return Expr.bit_select(sel, pos)
+
+
+def _make_mux_tree(ent, sel, inputs, data_type):
+    """2入力MUXの平衡木を作る．
+
+    sel の下位ビットから順に1段ずつ作る．
+    対になる相手のない入力はそのまま次の段に送る．
+    """
+    level = 0
+    cur_list = inputs
+    while len(cur_list) > 1:
+        next_list = []
+        proc = ent.add_comb_process()
+        with proc.body() as body:
+            mux_if = body.add_if(_sel_bit(sel, level))
+            for i in range(0, len(cur_list) - 1, 2):
+                out = ent.add_net(data_type=data_type, reg_type=True)
+                with mux_if.then_body() as _:
+                    _.add_assign(out, cur_list[i + 1])
+                with mux_if.else_body() as _:
+                    _.add_assign(out, cur_list[i])
+                next_list.append(out)
+        if len(cur_list) % 2 == 1:
+            next_list.append(cur_list[-1])
+        cur_list = next_list
+        level += 1
+    return cur_list[0]
+
+
+def _make_mux_case(ent, sel, inputs, data_type):
+    """case 文を用いたMUXを作る．
+
+    最後の入力は default 節に割り当てる．
+    """
+    n = len(inputs)
+    if n == 1:
+        return inputs[0]
+    sel_type = sel.data_type
+    out = ent.add_net(data_type=data_type, reg_type=True)
+    proc = ent.add_comb_process()
+    with proc.body() as body:
+        case_stmt = body.add_case(sel)
+        for i in range(n - 1):
+            label = Expr.make_constant(data_type=sel_type, val=i)
+            with case_stmt.add_label(label) as _:
+                _.add_assign(out, inputs[i])
+        with case_stmt.add_default() as _:
+            _.add_assign(out, inputs[n - 1])
     return out
 
 
+def _make_mux_onehot(sel, inputs):
+    """ワンホットの選択信号を用いた AND-OR 構造を作る．
+
+    OR は平衡木の形にして式の深さを log2(N) に抑える．
+    """
+    bw = Concat.src_size(inputs[0])
+    term_list = []
+    for i, src in enumerate(inputs):
+        sbit = _sel_bit(sel, i)
+        if bw > 1:
+            sbit = Expr.multi_concat(bw, [sbit])
+        term_list.append(Expr.make_and(src, sbit))
+    while len(term_list) > 1:
+        next_list = [Expr.make_or(term_list[i], term_list[i + 1])
+                     for i in range(0, len(term_list) - 1, 2)]
+        if len(term_list) % 2 == 1:
+            next_list.append(term_list[-1])
+        term_list = next_list
+    return term_list[0]
+
+
 # Entity クラスにメンバ関数(インスタンスメソッド)を追加する．
 Entity.add_mux2 = add_mux2
+Entity.add_mux = add_mux
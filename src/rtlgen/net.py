@@ -35,6 +35,15 @@ class Net(Expr):
         """データタイプを返す．"""
         return self.__type
 
+    def set_data_type(self, data_type):
+        """データタイプを設定する．
+
+        :param DataType data_type: データタイプ
+
+        ネットを参照している式は変更されない．
+        """
+        self.__type = data_type
+
     @property
     def name(self):
         """名前を返す．"""
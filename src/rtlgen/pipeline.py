@@ -0,0 +1,280 @@
+#! /usr/bin/env python3
+
+"""組み合わせ回路にパイプラインレジスタを挿入するクラス
+
+:file: pipeline.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.expr import Constant
+from rtlgen.net import Net
+from rtlgen.port import Port
+from rtlgen.process import ClockedProcess
+from rtlgen.inst import Inst
+from rtlgen.timing import TimingAnalyzer, DelayModel
+from rtlgen.traverse import operand_list, clone_expr, expr_root_list
+from rtlgen.rtlerror import RtlError
+
+
+class Pipeliner:
+    """組み合わせ回路にパイプラインレジスタを挿入するクラス
+
+    :param Entity ent: 対象のエンティティ
+    :param int depth: 1段あたりの遅延の目標値
+    :param Expr clock: クロック入力
+    :param str clock_pol: クロックのアクティブエッジを表す文字列
+    :param Expr reset: リセット入力
+    :param str reset_pol: リセットの極性を表す文字列
+    :param DelayModel delay_model: 遅延モデル(省略時は DelayModel())
+
+    対象は出力ポートの継続的代入文の右辺から入力ポート，
+    レジスタの出力などの始点までの組み合わせ回路である．
+    遅延は TimingAnalyzer と同じ遅延モデルで見積もる．
+    最大の遅延 T に対して段数 S = ceil(T / depth) を求め，各段の
+    遅延が ceil(T / S) 以下となるように入力側から順に各部分式の段を
+    決める．段の異なるオペランドは Dff で遅らせて揃え，全ての出力も
+    同じ段数だけ遅らせる．
+    同じ式を同じ段数だけ遅らせた Dff は共有される．
+    継続的代入文で駆動されるネットはそのまま段の境界を通過させるが，
+    出力ポート以外(プロセスやインスタンス)からも参照されている
+    ネットは書き換えずに新しいネットを作る．
+    """
+
+    def __init__(self, ent, depth, *,
+                 clock=None, clock_pol=None,
+                 reset=None, reset_pol=None,
+                 delay_model=None):
+        if depth < 1:
+            emsg = f'depth({depth}) must be positive'
+            raise RtlError(emsg)
+        if clock is None:
+            clock = ent.default_clock
+        if clock_pol is None:
+            clock_pol = ent.default_clock_pol
+        if reset is None:
+            reset = ent.default_reset
+        if reset_pol is None:
+            reset_pol = ent.default_reset_pol
+        if clock is None:
+            emsg = 'clock is not specified'
+            raise RtlError(emsg)
+        if delay_model is None:
+            delay_model = DelayModel()
+        self.__ent = ent
+        self.__depth = depth
+        self.__clock = clock
+        self.__clock_pol = clock_pol
+        self.__reset = reset
+        self.__reset_pol = reset_pol
+        self.__delay_model = delay_model
+        self.__analyzer = TimingAnalyzer(ent, delay_model)
+        self.__dff_list = []
+
+    @property
+    def dff_list(self):
+        """挿入した Dff のリストを返す．"""
+        return self.__dff_list
+
+    def run(self):
+        """パイプラインレジスタを挿入する．
+
+        :return: 増加したレイテンシ(段数)を返す．
+        """
+        ent = self.__ent
+        # 出力ポートの継続的代入文のリスト
+        output_list = []
+        # ネットの id をキーにしてそのネットを駆動する継続的代入文を保持する辞書
+        # (ネット全体を1つの継続的代入文で駆動しているもののみ)
+        self.__driver_dict = {}
+        multi_set = set()
+        for ca in ent.cont_assign_gen:
+            lhs = ca.lhs
+            if isinstance(lhs, Port):
+                if lhs.is_output:
+                    output_list.append(ca)
+            elif isinstance(lhs, Net):
+                if id(lhs) in self.__driver_dict:
+                    multi_set.add(id(lhs))
+                self.__driver_dict[id(lhs)] = ca
+        for key in multi_set:
+            del self.__driver_dict[key]
+
+        total = 0
+        for ca in output_list:
+            total = max(total, self.__analyzer.arrival(ca.rhs))
+        if total <= self.__depth:
+            return 0
+        stage_num = (total + self.__depth - 1) // self.__depth
+        self.__limit = (total + stage_num - 1) // stage_num
+
+        self.__shared_set = self.__shared_net_set()
+        # 式の id をキーにして (段, 段内の到達時刻, 新しい式) を保持する辞書
+        self.__node_dict = {}
+        # (式の id, 段) をキーにして遅らせた式を保持する辞書
+        self.__delay_dict = {}
+        # 書き換える継続的代入文と新しい右辺のリスト
+        self.__update_list = []
+        for ca in output_list:
+            self.__stage(ca.rhs)
+        latency = 0
+        for ca in output_list:
+            latency = max(latency, self.__node_dict[id(ca.rhs)][0])
+        for ca in output_list:
+            self.__update_list.append((ca, self.__delayed(ca.rhs, latency)))
+        for ca, rhs in self.__update_list:
+            if rhs is not ca.rhs:
+                ca.set_rhs(rhs)
+        return latency
+
+    def __shared_net_set(self):
+        """出力ポート以外から参照されているネットの id の集合を返す．"""
+        root_list = []
+        for expr, _ in expr_root_list(self.__ent):
+            root_list.append(expr)
+        # expr_root_list() の先頭は継続的代入文なので除く．
+        root_list = root_list[self.__ent.cont_assign_num:]
+        for item in self.__ent.item_gen:
+            if isinstance(item, ClockedProcess):
+                root_list.append(item.clock)
+                if item.asyncctl is not None:
+                    root_list.append(item.asyncctl)
+            elif isinstance(item, Inst):
+                for oport, iport in item.port_gen:
+                    if iport.is_input:
+                        root_list.append(oport)
+        ans = set()
+        visited = set()
+        stack = list(root_list)
+        while stack:
+            expr = stack.pop()
+            key = id(expr)
+            if key in visited:
+                continue
+            visited.add(key)
+            if isinstance(expr, Net):
+                ans.add(key)
+                if key in self.__driver_dict:
+                    stack.append(self.__driver_dict[key].rhs)
+            else:
+                stack.extend(operand_list(expr))
+        return ans
+
+    def __src_list(self, expr):
+        if isinstance(expr, Net):
+            if id(expr) in self.__driver_dict:
+                return [self.__driver_dict[id(expr)].rhs]
+            return []
+        return operand_list(expr)
+
+    def __stage(self, root):
+        """root に至る全ての部分式の段を決める．"""
+        node_dict = self.__node_dict
+        stack = [(root, False)]
+        while stack:
+            expr, expanded = stack.pop()
+            key = id(expr)
+            if key in node_dict:
+                continue
+            src_list = self.__src_list(expr)
+            if not expanded:
+                pending = [src for src in src_list
+                           if id(src) not in node_dict]
+                if pending:
+                    stack.append((expr, True))
+                    for src in pending:
+                        stack.append((src, False))
+                    continue
+            if not src_list:
+                # 始点: 組み合わせプロセスで駆動されるネットなどは
+                # 到達時刻を引き継ぐ．
+                node_dict[key] = (0, self.__analyzer.arrival(expr), expr)
+                continue
+            if isinstance(expr, Net):
+                stage, arrival, new_src = node_dict[id(src_list[0])]
+                node_dict[key] = (stage, arrival,
+                                  self.__new_net(expr, new_src))
+                continue
+            stage = 0
+            for src in src_list:
+                if not isinstance(src, Constant):
+                    stage = max(stage, node_dict[id(src)][0])
+            local = 0
+            for src in src_list:
+                src_stage, src_arrival, _ = node_dict[id(src)]
+                if src_stage == stage:
+                    local = max(local, src_arrival)
+            delay = self.__delay_model.delay(expr)
+            if local > 0 and local + delay > self.__limit:
+                # オペランドを全てレジスタで受けて次の段に進む．
+                stage += 1
+                local = 0
+            new_list = [self.__delayed(src, stage) for src in src_list]
+            node_dict[key] = (stage, local + delay,
+                              clone_expr(expr, new_list))
+
+    def __new_net(self, net, new_src):
+        """段を割り当てたネットを返す．"""
+        ca = self.__driver_dict[id(net)]
+        if new_src is ca.rhs:
+            return net
+        if id(net) not in self.__shared_set:
+            self.__update_list.append((ca, new_src))
+            return net
+        new_net = self.__ent.add_net(data_type=net.data_type)
+        self.__ent.connect(new_net, new_src)
+        return new_net
+
+    def __delayed(self, expr, stage):
+        """expr の値を stage 段目で参照する式を返す．"""
+        if isinstance(expr, Constant):
+            return expr
+        cur_stage, _, cur = self.__node_dict[id(expr)]
+        while cur_stage < stage:
+            cur_stage += 1
+            key = (id(expr), cur_stage)
+            if key not in self.__delay_dict:
+                self.__delay_dict[key] = self.__add_reg(cur)
+            cur = self.__delay_dict[key]
+        return cur
+
+    def __add_reg(self, data_in):
+        """パイプラインレジスタを追加する．"""
+        reset_val = 0 if self.__reset is not None else None
+        dff = self.__ent.add_dff(data_in=data_in,
+                                 clock=self.__clock,
+                                 clock_pol=self.__clock_pol,
+                                 reset=self.__reset,
+                                 reset_pol=self.__reset_pol,
+                                 reset_val=reset_val)
+        self.__dff_list.append(dff)
+        return dff.output
+
+
+def pipeline(self, depth, *,
+             clock=None, clock_pol=None,
+             reset=None, reset_pol=None,
+             delay_model=None):
+    """出力ポートに至る組み合わせ回路にパイプラインレジスタを挿入する．
+
+    :param int depth: 1段あたりの遅延の目標値
+    :param Expr clock: クロック入力
+    :param str clock_pol: クロックのアクティブエッジを表す文字列
+    :param Expr reset: リセット入力
+    :param str reset_pol: リセットの極性を表す文字列
+    :param DelayModel delay_model: 遅延モデル(省略時は DelayModel())
+    :return: 増加したレイテンシ(段数)を返す．
+
+    クロックとリセットを省略した場合はエンティティのデフォルトを用いる．
+    詳細は Pipeliner を参照のこと．
+    """
+    pipeliner = Pipeliner(self, depth,
+                          clock=clock, clock_pol=clock_pol,
+                          reset=reset, reset_pol=reset_pol,
+                          delay_model=delay_model)
+    return pipeliner.run()
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.pipeline = pipeline
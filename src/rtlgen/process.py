@@ -41,6 +41,10 @@ class Process(Item):
         """本体を返す．"""
         return StmtContext(self.__body)
 
+    def signal_link(self):
+        """信号の索引に登録する接続情報を返す．"""
+        return [], [], [self.__body]
+
     def gen_verilog(self, writer):
         """Verilog-HDL記述の出力を行う．
 
@@ -144,6 +148,14 @@ class ClockedProcess(Process):
         """非同期制御の本体を返す．"""
         return self.__async_if.then_body()
 
+    def signal_link(self):
+        """信号の索引に登録する接続情報を返す．"""
+        read_list, drive_list, block_list = super().signal_link()
+        read_list.append(self.__clock)
+        if self.__async is not None:
+            read_list.append(self.__async)
+        return read_list, drive_list, block_list
+
     def verilog_header(self):
         header = 'always @( '
         sense_str = VerilogWriter.edge_str(self.__clock_pol)
@@ -0,0 +1,134 @@
+#! /usr/bin/env python3
+
+"""結合的な演算の連鎖を平衡木に組み直すクラス
+
+:file: rebalance.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.expr import Expr, BinaryOp, ASSOC_OP_SET
+from rtlgen.traverse import operand_list, clone_expr, expr_gen
+from rtlgen.traverse import expr_root_list
+
+
+class Rebalancer:
+    """結合的な演算の連鎖を平衡木に組み直すクラス
+
+    :param list[Expr] root_list: 対象となる式の根のリスト
+
+    同じ結合的な演算子(AND, OR, XOR, ADD, MUL, LAND, LOR)が連なった
+    部分を連鎖とみなし，その葉を Expr.reduce() で平衡木に組み直す．
+    複数の親から参照されている部分式は共有を保つために連鎖の葉とする．
+    葉の順序は変えないので交換則は用いない．
+    参照数は root_list 中の全ての式について数える．
+    """
+
+    def __init__(self, root_list):
+        # 部分式の id をキーにして親の数を保持する辞書
+        self.__fanout_dict = {}
+        for expr in expr_gen(root_list):
+            for opr in operand_list(expr):
+                key = id(opr)
+                self.__fanout_dict[key] = self.__fanout_dict.get(key, 0) + 1
+        # 部分式の id をキーにして新しい式を保持する辞書
+        self.__memo = {}
+        self.__chain_num = 0
+
+    @property
+    def chain_num(self):
+        """組み直した連鎖の数を返す．"""
+        return self.__chain_num
+
+    def rebalance(self, root):
+        """式を組み直す．
+
+        :param Expr root: 対象の式
+        :return: 組み直した式を返す．変化がない場合は root を返す．
+        """
+        # 連鎖の根の id をキーにして (葉のリスト, 段数) を保持する辞書
+        leaf_dict = {}
+        stack = [(root, False)]
+        while stack:
+            expr, expanded = stack.pop()
+            key = id(expr)
+            if key in self.__memo:
+                continue
+            if key not in leaf_dict:
+                leaf_dict[key] = self.__leaf_list(expr)
+            leaf_list, _ = leaf_dict[key]
+            if not expanded:
+                pending = [opr for opr in leaf_list
+                           if id(opr) not in self.__memo]
+                if pending:
+                    stack.append((expr, True))
+                    for opr in pending:
+                        stack.append((opr, False))
+                    continue
+            self.__memo[key] = self.__rebuild(expr, *leaf_dict[key])
+        return self.__memo[id(root)]
+
+    def __leaf_list(self, expr):
+        """連鎖の葉のリストと連鎖の段数を返す．
+
+        連鎖でない場合はオペランドのリストと None を返す．
+        """
+        if not isinstance(expr, BinaryOp) or expr.op_type not in ASSOC_OP_SET:
+            return operand_list(expr), None
+        op_type = expr.op_type
+        leaf_list = []
+        max_depth = 0
+        # 左から順に葉を取り出すために右のオペランドから積む．
+        stack = [(expr, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if node is expr or self.__is_chain_node(node, op_type):
+                stack.append((node.operand2, depth + 1))
+                stack.append((node.operand1, depth + 1))
+            else:
+                leaf_list.append(node)
+                max_depth = max(max_depth, depth)
+        return leaf_list, max_depth
+
+    def __is_chain_node(self, expr, op_type):
+        return (isinstance(expr, BinaryOp) and
+                expr.op_type == op_type and
+                self.__fanout_dict.get(id(expr), 0) == 1)
+
+    def __rebuild(self, expr, leaf_list, depth):
+        """葉が求まった式を作り直す．"""
+        new_list = [self.__memo[id(leaf)] for leaf in leaf_list]
+        if depth is None:
+            return clone_expr(expr, new_list)
+        n = len(new_list)
+        if n > 2 and depth > (n - 1).bit_length():
+            self.__chain_num += 1
+            return Expr.reduce(expr.op_type, new_list)
+        if len(leaf_list) == 2:
+            return clone_expr(expr, new_list)
+        if all(old is new for old, new in zip(leaf_list, new_list)):
+            return expr
+        # 既に平衡している連鎖の葉のみが変化した場合
+        return Expr.reduce(expr.op_type, new_list)
+
+
+def rebalance(self):
+    """結合的な演算の連鎖を平衡木に組み直す．
+
+    :return: 組み直した連鎖の数を返す．
+
+    対象は継続的代入文の右辺，プロセス中の代入文の右辺と
+    if 文，case 文の条件式である．
+    """
+    root_list = expr_root_list(self)
+    rebalancer = Rebalancer([expr for expr, _ in root_list])
+    for expr, setter in root_list:
+        new_expr = rebalancer.rebalance(expr)
+        if new_expr is not expr:
+            setter(new_expr)
+    return rebalancer.chain_num
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.rebalance = rebalance
@@ -0,0 +1,232 @@
+#! /usr/bin/env python3
+
+"""RegisterBank の定義
+
+:file: register_bank.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.process import ClockedProcess
+from rtlgen.entity import Entity
+from rtlgen.expr import Expr
+from rtlgen.dff import Dff
+from rtlgen.rtlerror import RtlError
+
+
+class RegisterBank(ClockedProcess):
+    """クロック，リセット，イネーブルを共有するレジスタの集まりを表すクラス
+
+    :param str name: 名前
+    :param Expr clock: クロック入力
+    :param str clock_pol: クロックのアクティブエッジを表す文字列
+                  'positive' か 'negative'
+    :param Expr reset: リセット入力
+    :param str reset_pol: リセットの極性を表す文字列
+                  'positive' か 'negative'
+    :param Expr enable: イネーブル入力
+    :param str enable_pol: イネーブル信号の極性を表す文字列
+                  'positive' か 'negative'
+
+    Dff を個別に作るとレジスタごとに一つのプロセスが作られるが，
+    RegisterBank では一つのプロセスの中にレジスタごとの代入文を並べる．
+    レジスタは add_register() で追加する．
+    """
+
+    def __init__(self, parent, *,
+                 name=None,
+                 clock,
+                 clock_pol="positive",
+                 reset=None,
+                 reset_pol=None,
+                 enable=None,
+                 enable_pol=None):
+        super().__init__(parent, name=name,
+                         clock=clock, clock_pol=clock_pol,
+                         asyncctl=reset, asyncctl_pol=reset_pol)
+        self.__enable = enable
+        self.__enable_pol = enable_pol
+        self.__reg_list = []
+        if enable is not None:
+            if self.__enable_pol == "positive":
+                val = 1
+            else:
+                val = 0
+            cond = Expr.make_eq(enable, Expr.make_constant(val=val))
+            with self.body() as _:
+                self.__enable_if = _.add_if(cond)
+        else:
+            self.__enable_if = None
+
+    def add_register(self, data_in, *,
+                     q=None,
+                     name=None,
+                     reset_val=None):
+        """レジスタを追加する．
+
+        :param Expr data_in: データ入力
+        :param Net q: 出力のネット(省略時は新たに作る)
+        :param str name: 出力のネットの名前
+        :param reset_val: リセット値(Expr か int，省略時は 0)
+        :return: 出力のネットを返す．
+        """
+        data_type = data_in.data_type
+        if q is None:
+            q = self.add_net(data_type, name=name, reg_type=True)
+        elif not q.reg_type:
+            emsg = f'{q.verilog_str} is not a reg type net'
+            raise RtlError(emsg)
+        if self.reset is not None:
+            if reset_val is None:
+                reset_val = 0
+            if isinstance(reset_val, int):
+                reset_val = Expr.make_constant(data_type=data_type,
+                                               val=reset_val)
+            with self.asyncctl_body() as _:
+                _.add_assign(q, reset_val)
+        if self.__enable_if is None:
+            with self.body() as _:
+                _.add_assign(q, data_in)
+        else:
+            with self.__enable_if.then_body() as _:
+                _.add_assign(q, data_in)
+        self.__reg_list.append((data_in, q))
+        return q
+
+    @property
+    def reset(self):
+        """リセットのネットを返す．"""
+        return self.asyncctl
+
+    @property
+    def reset_pol(self):
+        """リセットの極性を返す．"""
+        return self.asyncctl_pol
+
+    @property
+    def enable(self):
+        """イネーブルのネットを返す．"""
+        return self.__enable
+
+    @property
+    def enable_pol(self):
+        """イネーブルの極性を返す．"""
+        return self.__enable_pol
+
+    @property
+    def register_num(self):
+        """レジスタ数を返す．"""
+        return len(self.__reg_list)
+
+    @property
+    def register_gen(self):
+        """(データ入力, 出力) のタプルを返すジェネレータ"""
+        for reg in self.__reg_list:
+            yield reg
+
+    def key(self):
+        """併合の可否を判定するためのキーを返す．"""
+        return RegisterBank.make_key(self.clock, self.clock_pol,
+                                     self.reset, self.reset_pol,
+                                     self.enable, self.enable_pol)
+
+    @staticmethod
+    def make_key(clock, clock_pol, reset, reset_pol, enable, enable_pol):
+        """併合の可否を判定するためのキーを作る．
+
+        Expr は == を演算子として用いているので id() で比較する．
+        """
+        if reset is None:
+            reset_pol = None
+        if enable is None:
+            enable_pol = None
+        return (id(clock), clock_pol,
+                id(reset), reset_pol,
+                id(enable), enable_pol)
+
+
+def add_register_bank(self, *,
+                      name=None,
+                      clock=None,
+                      clock_pol=None,
+                      reset=None,
+                      reset_pol=None,
+                      enable=None,
+                      enable_pol=None):
+    """RegisterBank を追加する．
+
+    :param str name: 名前
+    :param Expr clock: クロック入力
+    :param str clock_pol: クロックのアクティブエッジを表す文字列
+                  'positive' か 'negative'
+    :param Expr reset: リセット入力
+    :param str reset_pol: リセットの極性を表す文字列
+                  'positive' か 'negative'
+    :param Expr enable: イネーブル入力
+    :param str enable_pol: イネーブル信号の極性を表す文字列
+                  'positive' か 'negative'
+    :return: 生成した RegisterBank を返す．
+    """
+    if clock is None:
+        clock = self.default_clock
+    if clock_pol is None:
+        clock_pol = self.default_clock_pol
+    if reset is None:
+        reset = self.default_reset
+    if reset_pol is None:
+        reset_pol = self.default_reset_pol
+    bank = RegisterBank(self, name=name,
+                        clock=clock, clock_pol=clock_pol,
+                        reset=reset, reset_pol=reset_pol,
+                        enable=enable, enable_pol=enable_pol)
+    return bank
+
+
+def merge_dffs(self, *, min_num=2):
+    """同じクロック，リセット，イネーブルを持つ Dff を RegisterBank にまとめる．
+
+    :param int min_num: まとめる Dff の最小数
+    :return: Dff を追加した RegisterBank のリストを返す．
+
+    (clock, clock_pol, reset, reset_pol, enable, enable_pol) が等しい
+    Dff を一つの RegisterBank に置き換える．
+    同じキーを持つ RegisterBank がすでにある場合にはそれに追加する．
+    Dff の出力のネットはそのまま RegisterBank の出力として用いられる．
+    """
+    bank_dict = {}
+    dff_dict = {}
+    for item in self.item_gen:
+        if isinstance(item, RegisterBank):
+            bank_dict.setdefault(item.key(), item)
+        elif isinstance(item, Dff):
+            key = RegisterBank.make_key(item.clock, item.clock_pol,
+                                        item.reset, item.asyncctl_pol,
+                                        item.enable, item.enable_pol)
+            dff_dict.setdefault(key, []).append(item)
+
+    bank_list = []
+    del_list = []
+    for key, dff_list in dff_dict.items():
+        if key in bank_dict:
+            bank = bank_dict[key]
+        elif len(dff_list) >= min_num:
+            dff0 = dff_list[0]
+            bank = RegisterBank(self,
+                                clock=dff0.clock, clock_pol=dff0.clock_pol,
+                                reset=dff0.reset,
+                                reset_pol=dff0.asyncctl_pol,
+                                enable=dff0.enable,
+                                enable_pol=dff0.enable_pol)
+        else:
+            continue
+        for dff in dff_list:
+            bank.add_register(dff.data_in, q=dff.q, reset_val=dff.reset_val)
+        del_list.extend(dff_list)
+        bank_list.append(bank)
+    self.del_items(del_list)
+    return bank_list
+
+
+# Entity クラスにメンバ関数(インスタンスメソッド)を追加する．
+Entity.add_register_bank = add_register_bank
+Entity.merge_dffs = merge_dffs
@@ -0,0 +1,613 @@
+#! /usr/bin/env python3
+
+"""レジスタのリタイミングを行うクラス
+
+:file: retime.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.expr import BitSelect, PartSelect, Constant
+from rtlgen.net import Net
+from rtlgen.port import Port
+from rtlgen.var import Var
+from rtlgen.dff import Dff, ShiftRegister
+from rtlgen.process import ClockedProcess
+from rtlgen.inst import Inst
+from rtlgen.statement import AssignBase, IfStatement, CaseStatement
+from rtlgen.timing import DelayModel
+from rtlgen.evaluator import Evaluator
+from rtlgen.traverse import operand_list, clone_expr, expr_gen
+from rtlgen.traverse import process_gen, statement_gen
+from rtlgen.rtlerror import RtlError
+
+
+class Retimer:
+    """レジスタのリタイミングを行うクラス
+
+    :param Entity ent: 対象のエンティティ
+    :param Expr clock: 対象のレジスタのクロック
+    :param DelayModel delay_model: 遅延モデル(省略時は DelayModel())
+
+    Leiserson-Saxe の FEAS アルゴリズムで周期を二分探索し，
+    最小の周期となるようにレジスタを組み合わせ回路の前後に移動させる．
+    グラフの節点は式の置かれる場所(継続的代入文で駆動されるネット，
+    Dff のデータ入力，出力ポートやプロセス中の式)で，節点の遅延は
+    その式の遅延(TimingAnalyzer と同じ遅延モデル)である．
+    枝の重みは Dff と ShiftRegister の段数である．
+
+    対象となるレジスタは clock で動作し，イネーブルを持たず，
+    クロックとリセットの信号と極性が全て等しいものに限る．
+    clock を省略した場合はエンティティのデフォルトのクロックか，
+    最初に見つかったレジスタのクロックを用いる．
+    それ以外のレジスタ，入出力ポート，プロセスとインスタンスの入出力は
+    固定された節点となり，入出力のレイテンシは変わらない．
+    リセットを持つレジスタは出力側への移動のみを行い，
+    移動後のリセット値は元のリセット値から計算する．
+    移動後のレジスタは同じ節点の出力の間で共有する．
+    """
+
+    def __init__(self, ent, *, clock=None, delay_model=None):
+        if delay_model is None:
+            delay_model = DelayModel()
+        self.__ent = ent
+        self.__delay_model = delay_model
+        self.__evaluator = Evaluator()
+        if clock is None:
+            clock = ent.default_clock
+        self.__clock = clock
+        self.__reg_list = []
+        self.__report = {
+            'period_before': 0,
+            'period_after': 0,
+            'registers_before': 0,
+            'registers_after': 0,
+        }
+
+    @property
+    def report(self):
+        """リタイミングの結果を表す辞書を返す．
+
+        * 'period_before':    リタイミング前の周期
+        * 'period_after':     リタイミング後の周期
+        * 'registers_before': 移動の対象となったレジスタの段数
+        * 'registers_after':  リタイミング後のレジスタの数
+        """
+        return dict(self.__report)
+
+    def run(self):
+        """リタイミングを行う．
+
+        :return: 結果を表す辞書を返す．(report を参照)
+        """
+        self.__find_registers()
+        self.__build_graph()
+        self.__check_loop()
+        r_list = [0] * len(self.__kind_list)
+        period = max(self.__delta(r_list, False), default=0)
+        self.__report['period_before'] = period
+        self.__report['period_after'] = period
+        if not self.__reg_list:
+            return self.report
+        self.__report['registers_before'] = sum(
+            self.__reg_delay(reg) for reg in self.__reg_list)
+
+        # 周期の下限は節点の遅延の最大値
+        lo = max(self.__delay_list, default=0)
+        hi = period
+        best = None
+        while lo < hi:
+            mid = (lo + hi) // 2
+            ans = self.__feas(mid)
+            if ans is None:
+                lo = mid + 1
+            else:
+                best = ans
+                hi = mid
+        if best is None:
+            # 改善できない場合はレジスタもそのまま残る．
+            self.__report['registers_after'] = \
+                self.__report['registers_before']
+            return self.report
+        self.__report['period_after'] = hi
+        self.__apply(*best)
+        return self.report
+
+    def __find_registers(self):
+        """移動の対象となるレジスタを求める．"""
+        ent = self.__ent
+        ctl_set = set()
+        cand_list = []
+        for item in ent.item_gen:
+            if not isinstance(item, ClockedProcess):
+                continue
+            ctl_set.add(id(item.clock))
+            if item.asyncctl is not None:
+                ctl_set.add(id(item.asyncctl))
+            if not isinstance(item, (Dff, ShiftRegister)):
+                continue
+            if item.enable is not None:
+                continue
+            if isinstance(item, Dff):
+                if item.reset is not None and \
+                   not isinstance(item.reset_val, Constant):
+                    continue
+            cand_list.append(item)
+        if self.__clock is None and cand_list:
+            self.__clock = cand_list[0].clock
+        reg0 = None
+        for reg in cand_list:
+            if reg.clock is not self.__clock:
+                continue
+            if reg0 is None:
+                reg0 = reg
+            elif reg.clock_pol != reg0.clock_pol or \
+                 reg.reset is not reg0.reset or \
+                 reg.asyncctl_pol != reg0.asyncctl_pol:
+                continue
+            if id(self.__reg_output(reg)) in ctl_set:
+                continue
+            self.__reg_list.append(reg)
+        if reg0 is not None:
+            self.__clock_pol = reg0.clock_pol
+            self.__reset = reg0.reset
+            self.__reset_pol = reg0.asyncctl_pol
+
+        # ShiftRegister のレジスタは最終段の出力としてのみ
+        # 参照されていなければならない．
+        reg_set = {id(reg) for reg in self.__reg_list}
+        sreg_dict = {}
+        for reg in self.__reg_list:
+            if isinstance(reg, ShiftRegister) and reg.delay > 1:
+                sreg_dict[id(reg.register)] = reg
+        self.__tap_dict = {}
+        bad_set = set()
+        root_list = [expr for expr, _ in self.__root_list(reg_set)]
+        root_list += [ca.rhs for ca in ent.cont_assign_gen]
+        for expr in root_list:
+            if id(expr) in sreg_dict:
+                bad_set.add(id(sreg_dict[id(expr)]))
+        for expr in expr_gen(root_list):
+            if not isinstance(expr, (BitSelect, PartSelect)):
+                for opr in operand_list(expr):
+                    if id(opr) in sreg_dict:
+                        bad_set.add(id(sreg_dict[id(opr)]))
+                continue
+            sreg = sreg_dict.get(id(expr.primary), None)
+            if sreg is None:
+                continue
+            if self.__is_output_tap(sreg, expr):
+                self.__tap_dict[id(expr)] = sreg
+            else:
+                bad_set.add(id(sreg))
+        self.__reg_list = [reg for reg in self.__reg_list
+                           if id(reg) not in bad_set]
+        self.__reg_dict = {}
+        for reg in self.__reg_list:
+            self.__reg_dict[id(self.__reg_output(reg))] = reg
+        self.__tap_dict = {key: sreg for key, sreg in self.__tap_dict.items()
+                           if id(sreg) not in bad_set}
+
+    @staticmethod
+    def __reg_output(reg):
+        """レジスタの出力のネットを返す．"""
+        if isinstance(reg, Dff):
+            return reg.q
+        return reg.register
+
+    @staticmethod
+    def __reg_delay(reg):
+        if isinstance(reg, Dff):
+            return 1
+        return reg.delay
+
+    @staticmethod
+    def __is_output_tap(sreg, expr):
+        """expr が ShiftRegister の最終段の出力と等しい時 True を返す．"""
+        tap = sreg.output
+        if isinstance(expr, BitSelect):
+            return isinstance(tap, BitSelect) and \
+                isinstance(expr.index, Constant) and \
+                expr.index.value == tap.index.value
+        return isinstance(tap, PartSelect) and \
+            expr.left == tap.left and expr.right == tap.right
+
+    def __reg_values(self, reg):
+        """レジスタの各段のリセット値のリストを返す．"""
+        if reg.reset is None:
+            val = None
+        elif isinstance(reg, Dff):
+            val = self.__evaluator.eval(reg.reset_val)
+        else:
+            val = reg.reset_val
+        return [val] * self.__reg_delay(reg)
+
+    def __root_list(self, reg_set):
+        """対象外のプロセス中の式の根と置き換え関数のリストを返す．"""
+        ans = []
+        for proc in process_gen(self.__ent):
+            if id(proc) in reg_set:
+                continue
+            with proc.process_body() as body:
+                for stmt in statement_gen(body):
+                    if isinstance(stmt, AssignBase):
+                        ans.append((stmt.rhs, stmt.set_rhs))
+                    elif isinstance(stmt, (IfStatement, CaseStatement)):
+                        ans.append((stmt.cond, stmt.set_cond))
+        return ans
+
+    def __is_leaf(self, expr):
+        """式の葉(ネットなどの参照)の時 True を返す．"""
+        return isinstance(expr, (Net, Port, Var)) or \
+            id(expr) in self.__tap_dict
+
+    def __leaf_list(self, expr):
+        """式の葉のリストを重複なく返す．"""
+        ans = []
+        visited = set()
+        stack = [expr]
+        while stack:
+            node = stack.pop()
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+            if self.__is_leaf(node):
+                ans.append(node)
+            else:
+                stack.extend(operand_list(node))
+        return ans
+
+    def __expr_delay(self, expr):
+        """葉から式の根までの遅延を返す．"""
+        delay_dict = {}
+        stack = [(expr, False)]
+        while stack:
+            node, expanded = stack.pop()
+            key = id(node)
+            if key in delay_dict:
+                continue
+            if self.__is_leaf(node):
+                delay_dict[key] = 0
+                continue
+            opr_list = operand_list(node)
+            if not expanded:
+                stack.append((node, True))
+                for opr in opr_list:
+                    if id(opr) not in delay_dict:
+                        stack.append((opr, False))
+                continue
+            delay = 0
+            for opr in opr_list:
+                delay = max(delay, delay_dict[id(opr)])
+            delay_dict[key] = delay + self.__delay_model.delay(node)
+        return delay_dict[id(expr)]
+
+    def __build_graph(self):
+        """レジスタグラフを作る．"""
+        ent = self.__ent
+        reg_set = {id(reg) for reg in self.__reg_list}
+        # 節点ごとの情報
+        # kind: 'net'(ネット), 'expr'(レジスタの入力の式),
+        #       'site'(固定された場所の式), 'source'(始点)
+        self.__kind_list = []
+        self.__obj_list = []
+        self.__expr_list = []
+        self.__setter_list = []
+        self.__delay_list = []
+        self.__fixed_list = []
+        # 枝ごとの情報
+        self.__src_list = []
+        self.__dst_list = []
+        self.__weight_list = []
+        self.__value_list = []
+        self.__in_list = []
+        self.__out_list = []
+        # 節点ごとに葉の id をキーにして枝番号を保持する辞書
+        self.__leaf_edge_list = []
+        # ネットなどの id をキーにして節点番号を保持する辞書
+        self.__vertex_dict = {}
+
+        driver_dict = {}
+        for ca in ent.cont_assign_gen:
+            if isinstance(ca.lhs, Net):
+                driver_dict.setdefault(id(ca.lhs), []).append(ca)
+        fixed_set = set()
+        for item in ent.item_gen:
+            if isinstance(item, Inst):
+                for oport, iport in item.port_gen:
+                    if iport.is_input:
+                        fixed_set.add(id(oport))
+        for ca in ent.cont_assign_gen:
+            lhs = ca.lhs
+            if isinstance(lhs, Net) and len(driver_dict[id(lhs)]) == 1:
+                v = self.__new_vertex('net', lhs, ca.rhs, ca.set_rhs,
+                                      id(lhs) in fixed_set)
+                self.__vertex_dict[id(lhs)] = v
+            else:
+                self.__new_vertex('site', None, ca.rhs, ca.set_rhs, True)
+        for expr, setter in self.__root_list(reg_set):
+            self.__new_vertex('site', None, expr, setter, True)
+
+        # 節点の式の葉から枝を作る．
+        # レジスタの入力の式の節点は途中で追加される．
+        self.__expr_vertex_dict = {}
+        v = 0
+        while v < len(self.__kind_list):
+            expr = self.__expr_list[v]
+            if expr is not None:
+                for leaf in self.__leaf_list(expr):
+                    u, value_list = self.__resolve(leaf)
+                    self.__new_edge(u, v, leaf, value_list)
+            v += 1
+
+    def __new_vertex(self, kind, obj, expr, setter, fixed):
+        v = len(self.__kind_list)
+        self.__kind_list.append(kind)
+        self.__obj_list.append(obj)
+        self.__expr_list.append(expr)
+        self.__setter_list.append(setter)
+        if expr is None:
+            self.__delay_list.append(0)
+        else:
+            self.__delay_list.append(self.__expr_delay(expr))
+        self.__fixed_list.append(fixed)
+        self.__leaf_edge_list.append({})
+        self.__in_list.append([])
+        self.__out_list.append([])
+        return v
+
+    def __new_edge(self, u, v, leaf, value_list):
+        e = len(self.__src_list)
+        self.__src_list.append(u)
+        self.__dst_list.append(v)
+        self.__weight_list.append(len(value_list))
+        self.__value_list.append(value_list)
+        self.__out_list[u].append(e)
+        self.__in_list[v].append(e)
+        self.__leaf_edge_list[v][id(leaf)] = e
+
+    def __resolve(self, leaf):
+        """葉からレジスタをたどって元の節点を求める．
+
+        :return: (節点番号, リセット値のリスト) を返す．
+
+        リセット値のリストは元の節点の側から並べる．
+        """
+        value_list = []
+        cur = leaf
+        while True:
+            if id(cur) in self.__tap_dict:
+                reg = self.__tap_dict[id(cur)]
+            else:
+                reg = self.__reg_dict.get(id(cur), None)
+            if reg is None:
+                break
+            value_list.extend(self.__reg_values(reg))
+            cur = reg.data_in
+            if not self.__is_leaf(cur):
+                # レジスタの入力の式を節点とする．
+                if id(reg) not in self.__expr_vertex_dict:
+                    self.__expr_vertex_dict[id(reg)] = \
+                        self.__new_vertex('expr', None, cur, None, False)
+                value_list.reverse()
+                return self.__expr_vertex_dict[id(reg)], value_list
+        if id(cur) not in self.__vertex_dict:
+            self.__vertex_dict[id(cur)] = \
+                self.__new_vertex('source', cur, None, None, True)
+        value_list.reverse()
+        return self.__vertex_dict[id(cur)], value_list
+
+    def __check_loop(self):
+        if self.__topological_order([0] * len(self.__kind_list)) is None:
+            emsg = 'combinational loop detected'
+            raise RtlError(emsg)
+
+    def __topological_order(self, r_list):
+        """重みが 0 の枝のみからなるグラフのトポロジカル順を返す．
+
+        ループがある場合は None を返す．
+        """
+        n = len(self.__kind_list)
+        count = [0] * n
+        zero_list = []
+        for e in range(len(self.__src_list)):
+            if self.__retimed_weight(e, r_list) == 0:
+                zero_list.append(e)
+                count[self.__dst_list[e]] += 1
+        zero_out = [[] for _ in range(n)]
+        for e in zero_list:
+            zero_out[self.__src_list[e]].append(self.__dst_list[e])
+        order = [v for v in range(n) if count[v] == 0]
+        pos = 0
+        while pos < len(order):
+            u = order[pos]
+            pos += 1
+            for v in zero_out[u]:
+                count[v] -= 1
+                if count[v] == 0:
+                    order.append(v)
+        if len(order) < n:
+            return None
+        return order
+
+    def __retimed_weight(self, e, r_list):
+        return self.__weight_list[e] + r_list[self.__dst_list[e]] \
+            - r_list[self.__src_list[e]]
+
+    def __delta(self, r_list, forward):
+        """重みが 0 の経路の遅延の最大値を節点ごとに求める．
+
+        forward が False の場合は節点に至る経路，True の場合は
+        節点から出る経路を考える．
+        """
+        order = self.__topological_order(r_list)
+        if forward:
+            order.reverse()
+        delta = [0] * len(self.__kind_list)
+        for v in order:
+            d = 0
+            edge_list = self.__out_list[v] if forward else self.__in_list[v]
+            for e in edge_list:
+                if self.__retimed_weight(e, r_list) != 0:
+                    continue
+                u = self.__dst_list[e] if forward else self.__src_list[e]
+                d = max(d, delta[u])
+            delta[v] = d + self.__delay_list[v]
+        return delta
+
+    def __feas(self, period):
+        """周期 period を実現するリタイミングを求める．
+
+        :return: (r のリスト, 出力側に移動させたか) を返す．
+                 見つからない場合は None を返す．
+
+        リセットを持つレジスタがある場合は出力側への移動のみを試す．
+        """
+        if self.__reset is None:
+            mode_list = [False, True]
+        else:
+            mode_list = [True]
+        for forward in mode_list:
+            r_list = self.__feas_sub(period, forward)
+            if r_list is not None:
+                return r_list, forward
+        return None
+
+    def __feas_sub(self, period, forward):
+        n = len(self.__kind_list)
+        step = -1 if forward else 1
+        r_list = [0] * n
+        for _ in range(n):
+            delta = self.__delta(r_list, forward)
+            bad_list = [v for v in range(n) if delta[v] > period]
+            if not bad_list:
+                return r_list
+            for v in bad_list:
+                if self.__fixed_list[v]:
+                    return None
+                r_list[v] += step
+        if max(self.__delta(r_list, forward)) > period:
+            return None
+        return r_list
+
+    def __apply(self, r_list, forward):
+        """リタイミングの結果に従ってエンティティを書き換える．"""
+        ent = self.__ent
+        n = len(self.__kind_list)
+        value_list = self.__value_list
+        if forward and self.__reset is not None:
+            self.__move_forward(r_list)
+        else:
+            value_list = [[None] * self.__retimed_weight(e, r_list)
+                          for e in range(len(self.__src_list))]
+
+        # 各節点の出力を表す式
+        out_list = list(self.__obj_list)
+        for v in range(n):
+            if self.__kind_list[v] == 'expr' and self.__out_list[v]:
+                out_list[v] = ent.add_net(
+                    data_type=self.__expr_list[v].data_type)
+        # 各節点の出力のレジスタを共有するための木
+        tree_list = [{} for _ in range(n)]
+        self.__new_reg_num = 0
+
+        def tap(e):
+            u = self.__src_list[e]
+            cur = out_list[u]
+            node = tree_list[u]
+            for val in value_list[e]:
+                if val not in node:
+                    node[val] = (self.__new_reg(cur, val), {})
+                cur, node = node[val]
+            return cur
+
+        update_list = []
+        for v in range(n):
+            expr = self.__expr_list[v]
+            if expr is None:
+                continue
+            leaf_edge = self.__leaf_edge_list[v]
+            new_dict = {}
+            for node in expr_gen([expr]):
+                key = id(node)
+                if key in new_dict:
+                    continue
+                if key in leaf_edge:
+                    new_dict[key] = tap(leaf_edge[key])
+                    continue
+                new_dict[key] = clone_expr(
+                    node, [new_dict[id(opr)] for opr in operand_list(node)])
+            update_list.append((v, new_dict[id(expr)]))
+        for v, new_expr in update_list:
+            if self.__kind_list[v] == 'expr':
+                if self.__out_list[v]:
+                    ent.connect(out_list[v], new_expr)
+            elif new_expr is not self.__expr_list[v]:
+                self.__setter_list[v](new_expr)
+        ent.del_items(self.__reg_list)
+        ent.del_nets([self.__reg_output(reg) for reg in self.__reg_list])
+        self.__report['registers_after'] = self.__new_reg_num
+
+    def __move_forward(self, r_list):
+        """レジスタを1段ずつ出力側に移動させてリセット値を求める．"""
+        n = len(self.__kind_list)
+        remain = [-r for r in r_list]
+        value_list = self.__value_list
+        while True:
+            progress = False
+            for v in range(n):
+                while remain[v] > 0 and \
+                      all(value_list[e] for e in self.__in_list[v]):
+                    val_list = []
+                    for e in self.__in_list[v]:
+                        val_list.append(value_list[e].pop())
+                    val = self.__eval_vertex(v, val_list)
+                    for e in self.__out_list[v]:
+                        value_list[e].insert(0, val)
+                    remain[v] -= 1
+                    progress = True
+            if not progress:
+                break
+        if any(remain):
+            emsg = 'failed to compute reset values'
+            raise RtlError(emsg)
+
+    def __eval_vertex(self, v, val_list):
+        """節点の式の値を入力の枝の値から計算する．"""
+        expr = self.__expr_list[v]
+        input_list = []
+        leaf_dict = {id(leaf): leaf for leaf in self.__leaf_list(expr)}
+        e_pos = {e: pos for pos, e in enumerate(self.__in_list[v])}
+        for leaf_key, e in self.__leaf_edge_list[v].items():
+            input_list.append((leaf_dict[leaf_key], val_list[e_pos[e]]))
+        return self.__evaluator.eval(expr, input_list)
+
+    def __new_reg(self, data_in, val):
+        """レジスタを追加する．"""
+        if self.__reset is None:
+            reset_val = None
+        else:
+            reset_val = val
+        dff = Dff(self.__ent, data_in=data_in,
+                  clock=self.__clock, clock_pol=self.__clock_pol,
+                  reset=self.__reset, reset_pol=self.__reset_pol,
+                  reset_val=reset_val)
+        self.__new_reg_num += 1
+        return dff.q
+
+
+def retime(self, *, clock=None, delay_model=None):
+    """レジスタを移動させて周期を最小化する．
+
+    :param Expr clock: 対象のレジスタのクロック
+    :param DelayModel delay_model: 遅延モデル(省略時は DelayModel())
+    :return: 結果を表す辞書を返す．(Retimer.report を参照)
+
+    詳細は Retimer を参照のこと．
+    """
+    return Retimer(self, clock=clock, delay_model=delay_model).run()
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.retime = retime
@@ -0,0 +1,287 @@
+#! /usr/bin/env python3
+
+"""排他的な分岐中の演算器を共有するクラス
+
+:file: share.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.expr import BinaryOp, Concat, OpType
+from rtlgen.net import Net
+from rtlgen.process import ClockedProcess
+from rtlgen.statement import AssignBase, BlockingAssign
+from rtlgen.statement import IfStatement, CaseStatement
+from rtlgen.evaluator import Evaluator
+from rtlgen.traverse import operand_list, clone_expr, expr_gen
+from rtlgen.traverse import statement_gen, sub_block_list, process_gen
+
+
+class ResourceSharer:
+    """排他的な分岐中の演算器を共有するクラス
+
+    :param Entity ent: 対象のエンティティ
+    :param int threshold: 共有を行う利得の下限
+
+    プロセス中の if 文，case 文の異なる分岐にある同じ種類で同じ
+    オペランドの型の演算(ADD, SUB, MUL, DIV, MOD)は同時に
+    実行されることはないので，一つの演算器を共有できる．
+    共有する演算器の出力はネットとし，各分岐の演算をそのネットに
+    置き換える．オペランドは新たに作る組み合わせプロセスの中で
+    元の if 文，case 文と同じ条件で選択する．
+    全ての分岐で同一のオペランドは選択しない．
+
+    演算器の面積は COST_DICT のビットあたりのコストにビット幅を
+    かけたもの(MUL, DIV, MOD はさらにビット幅をかける)とし，
+    マルチプレクサの面積は入力1つあたりビット幅とする．
+    削減される演算器の面積から増加するマルチプレクサの面積を
+    引いた利得が threshold を超える場合に共有する．
+
+    外側の if 文，case 文から順に共有する．
+    条件式とオペランドがプロセス中で代入されるネットを参照している
+    場合は，代入前の値を参照する可能性があるので対象としない．
+    """
+
+    # 演算器のビットあたりのコスト(2入力マルチプレクサ1ビットを1とする)
+    COST_DICT = {
+        OpType.ADD: 3,
+        OpType.SUB: 3,
+        OpType.MUL: 3,
+        OpType.DIV: 3,
+        OpType.MOD: 3,
+    }
+
+    def __init__(self, ent, *, threshold=0):
+        self.__ent = ent
+        self.__threshold = threshold
+        self.__shared_num = 0
+
+    @property
+    def shared_num(self):
+        """削減した演算器の数を返す．"""
+        return self.__shared_num
+
+    def run(self):
+        """演算器を共有する．
+
+        :return: 削減した演算器の数を返す．
+        """
+        for proc in list(process_gen(self.__ent)):
+            self.__share_process(proc)
+        return self.__shared_num
+
+    def __share_process(self, proc):
+        """プロセス中の演算器を共有する．"""
+        with proc.process_body() as body:
+            pass
+        # 式の根と置き換え関数と根を含むブロックの id の集合のリスト
+        root_list = []
+        # プロセス中で代入されるネットの id の集合
+        self.__lhs_set = set()
+        clocked = isinstance(proc, ClockedProcess)
+        stack = [(body, ())]
+        while stack:
+            block, block_path = stack.pop()
+            block_path = block_path + (id(block),)
+            for stmt in block.statement_gen:
+                if isinstance(stmt, AssignBase):
+                    root_list.append((stmt.rhs, stmt.set_rhs, block_path))
+                    if not clocked or isinstance(stmt, BlockingAssign):
+                        for expr in expr_gen([stmt.lhs]):
+                            if isinstance(expr, Net):
+                                self.__lhs_set.add(id(expr))
+                    continue
+                root_list.append((stmt.cond, stmt.set_cond, block_path))
+                for sub_block in sub_block_list(stmt):
+                    stack.append((sub_block, block_path))
+        # 演算の id をキーにしてその演算を含む根の数を保持する辞書
+        self.__root_count = {}
+        for expr, _, _ in root_list:
+            for node in expr_gen([expr]):
+                key = id(node)
+                self.__root_count[key] = self.__root_count.get(key, 0) + 1
+        self.__root_list = root_list
+        # 共有した演算の id の集合
+        self.__used_set = set()
+        # 演算の id をキーにして置き換えるネットを保持する辞書
+        self.__replace_dict = {}
+        for stmt in statement_gen(body):
+            if isinstance(stmt, (IfStatement, CaseStatement)):
+                self.__share_stmt(stmt)
+        if not self.__replace_dict:
+            return
+        memo = {}
+        for expr, setter, _ in root_list:
+            for node in expr_gen([expr]):
+                key = id(node)
+                if key in memo:
+                    continue
+                if key in self.__replace_dict:
+                    memo[key] = self.__replace_dict[key]
+                else:
+                    opr_list = [memo[id(opr)] for opr in operand_list(node)]
+                    memo[key] = clone_expr(node, opr_list)
+            new_expr = memo[id(expr)]
+            if new_expr is not expr:
+                setter(new_expr)
+
+    def __share_stmt(self, stmt):
+        """if 文もしくは case 文の分岐間で演算器を共有する．"""
+        if self.__refers_lhs(stmt.cond):
+            return
+        block_list = sub_block_list(stmt)
+        # (演算の種類, 第1オペランドの型, 第2オペランドの型, 分岐ごとの演算の
+        # リストのリスト) のリスト
+        group_list = []
+        for pos, block in enumerate(block_list):
+            for op in self.__candidate_list(block):
+                dt1 = op.operand1.data_type
+                dt2 = op.operand2.data_type
+                for op_type, g_dt1, g_dt2, op_list_list in group_list:
+                    if op_type == op.op_type and dt1 == g_dt1 and \
+                       dt2 == g_dt2:
+                        break
+                else:
+                    op_list_list = [[] for _ in block_list]
+                    group_list.append((op.op_type, dt1, dt2, op_list_list))
+                op_list_list[pos].append(op)
+        for _, _, _, op_list_list in group_list:
+            unit_num = max(len(op_list) for op_list in op_list_list)
+            for i in range(unit_num):
+                member_list = [(pos, op_list[i])
+                               for pos, op_list in enumerate(op_list_list)
+                               if i < len(op_list)]
+                if len(member_list) >= 2:
+                    self.__share_unit(stmt, member_list)
+
+    def __candidate_list(self, block):
+        """ブロック中でのみ参照されている共有可能な演算のリストを返す．"""
+        block_key = id(block)
+        # 演算の id をキーにしてブロック中の根の数を保持する辞書
+        count_dict = {}
+        op_list = []
+        for expr, _, block_path in self.__root_list:
+            if block_key not in block_path:
+                continue
+            for node in expr_gen([expr]):
+                key = id(node)
+                if key not in count_dict:
+                    count_dict[key] = 0
+                    if isinstance(node, BinaryOp) and \
+                       node.op_type in self.COST_DICT:
+                        op_list.append(node)
+                count_dict[key] += 1
+        ans = []
+        for op in op_list:
+            key = id(op)
+            if count_dict[key] != self.__root_count[key]:
+                continue
+            if Evaluator.bit_width(op.data_type) is None:
+                continue
+            if self.__refers_lhs(op.operand1) or \
+               self.__refers_lhs(op.operand2):
+                continue
+            ans.append(op)
+        return ans
+
+    def __share_unit(self, stmt, member_list):
+        """member_list 中の演算で一つの演算器を共有する．
+
+        :param Statement stmt: 分岐を持つステートメント
+        :param list[(int, BinaryOp)] member_list: (分岐の番号, 演算) のリスト
+        """
+        # 共有済みの演算を含むものは除く．
+        member_list = [(pos, op) for pos, op in member_list
+                       if not any(id(node) in self.__used_set
+                                  for node in expr_gen([op]))]
+        if len(member_list) < 2:
+            return
+        op0 = member_list[0][1]
+        n = len(member_list)
+        width = Evaluator.bit_width(op0.data_type)
+        op_cost = self.COST_DICT[op0.op_type] * width
+        if op0.op_type in (OpType.MUL, OpType.DIV, OpType.MOD):
+            op_cost *= width
+        # 全ての演算で同一でないオペランドの番号のリスト
+        sel_list = []
+        mux_cost = 0
+        for i, opr0 in enumerate(operand_list(op0)):
+            if any(operand_list(op)[i] is not opr0 for _, op in member_list):
+                sel_list.append(i)
+                mux_cost += (n - 1) * Concat.src_size(opr0)
+        gain = (n - 1) * op_cost - mux_cost
+        if gain <= self.__threshold:
+            return
+
+        ent = self.__ent
+        opr_list = operand_list(op0)
+        if sel_list:
+            mux_proc = ent.add_comb_process()
+            with mux_proc.body() as mux_body:
+                pass
+        for i in sel_list:
+            opr_list[i] = ent.add_net(data_type=opr_list[i].data_type,
+                                      reg_type=True)
+        if isinstance(stmt, IfStatement):
+            if sel_list:
+                mux_stmt = mux_body.add_if(stmt.cond)
+                for pos, op in member_list:
+                    if pos == 0:
+                        context = mux_stmt.then_body()
+                    else:
+                        context = mux_stmt.else_body()
+                    with context as block:
+                        self.__add_select(block, opr_list, sel_list, op)
+        elif sel_list:
+            mux_stmt = mux_body.add_case(stmt.cond)
+            label_list = [label for label, _ in stmt.case_gen]
+            # default節の演算がない場合は最初の演算を選ぶ．
+            default_op = member_list[0][1]
+            for pos, op in member_list:
+                if pos == len(label_list):
+                    default_op = op
+                    continue
+                with mux_stmt.add_label(label_list[pos]) as block:
+                    self.__add_select(block, opr_list, sel_list, op)
+            with mux_stmt.add_default() as block:
+                self.__add_select(block, opr_list, sel_list, default_op)
+        result = ent.add_net(data_type=op0.data_type,
+                             src=BinaryOp(op0.op_type, *opr_list))
+        for _, op in member_list:
+            self.__replace_dict[id(op)] = result
+            # 共有した演算のオペランド中の演算はもう共有しない．
+            for node in expr_gen([op]):
+                if operand_list(node):
+                    self.__used_set.add(id(node))
+        self.__shared_num += n - 1
+
+    @staticmethod
+    def __add_select(block, opr_list, sel_list, op):
+        """op のオペランドを選ぶ代入文を追加する．"""
+        src_list = operand_list(op)
+        for i in sel_list:
+            block.add_assign(opr_list[i], src_list[i], blocking=True)
+
+    def __refers_lhs(self, expr):
+        """プロセス中で代入されるネットを参照している時 True を返す．"""
+        for node in expr_gen([expr]):
+            if id(node) in self.__lhs_set:
+                return True
+        return False
+
+
+def share_resources(self, *, threshold=0):
+    """if 文，case 文の排他的な分岐中の演算器を共有する．
+
+    :param int threshold: 共有を行う利得の下限
+    :return: 削減した演算器の数を返す．
+
+    詳細は ResourceSharer を参照のこと．
+    """
+    sharer = ResourceSharer(self, threshold=threshold)
+    return sharer.run()
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.share_resources = share_resources
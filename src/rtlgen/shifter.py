@@ -0,0 +1,221 @@
+#! /usr/bin/env python3
+
+"""バレルシフタを作るクラス
+
+:file: shifter.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.expr import Expr, OpType
+from rtlgen.data_type import DataType
+from rtlgen.evaluator import Evaluator
+from rtlgen.rtlerror import RtlError
+
+
+class BarrelShifter:
+    """バレルシフタを表すクラス
+
+    :param Entity ent: エンティティ
+    :param Expr src: シフトされる値
+    :param Expr amount: シフト量(符号なし)
+    :param str op: シフトの種類
+    :param int pipeline: パイプラインレジスタを入れる段の間隔(0 なら入れない)
+    :param str name: 出力の名前
+
+    op は以下のいずれか
+    * 'lsl': 論理左シフト
+    * 'lsr': 論理右シフト
+    * 'asr': 算術右シフト
+    * 'rol': 左ローテート
+    * 'ror': 右ローテート
+
+    シフト量の k ビット目に対して 2^k ビットのシフトを行うかどうかを
+    選ぶ段を log2(w) 段並べる．各段は範囲選択と連結でシフトした値と
+    元の値をビットごとの AND-OR で選ぶ．
+    シフトの場合，2^k >= w となるシフト量の上位ビットはまとめて
+    1段で扱い，いずれかが 1 なら全ビットを 0 (算術右シフトの場合は
+    符号ビット)にする．
+    ローテートの場合は w を法としたシフト量を用いる．
+    """
+
+    def __init__(self, ent, src, amount, *,
+                 op='lsl',
+                 pipeline=0,
+                 clock=None, clock_pol=None,
+                 reset=None, reset_pol=None,
+                 name=None):
+        if op not in ('lsl', 'lsr', 'asr', 'rol', 'ror'):
+            emsg = f'{op}: unknown shift operation'
+            raise RtlError(emsg)
+        w = Evaluator.bit_width(src.data_type)
+        amt_bw = Evaluator.bit_width(amount.data_type)
+        if w is None or amt_bw is None:
+            emsg = 'src and amount must be a bit or bitvector'
+            raise RtlError(emsg)
+        if pipeline < 0:
+            emsg = f'pipeline({pipeline}) must be non-negative'
+            raise RtlError(emsg)
+        if clock is None:
+            clock = ent.default_clock
+        if clock_pol is None:
+            clock_pol = ent.default_clock_pol
+        if reset is None:
+            reset = ent.default_reset
+        if reset_pol is None:
+            reset_pol = ent.default_reset_pol
+        if pipeline > 0 and clock is None:
+            emsg = 'clock is not specified'
+            raise RtlError(emsg)
+        self.__ent = ent
+        self.__op = op
+        self.__width = w
+        self.__pipeline = pipeline
+        self.__clock = clock
+        self.__clock_pol = clock_pol
+        self.__reset = reset
+        self.__reset_pol = reset_pol
+        self.__dff_list = []
+
+        # 各段のシフト量とその選択信号のビット位置のリスト
+        stage_list = []
+        over_list = []
+        for k in range(amt_bw):
+            if op in ('rol', 'ror'):
+                s = (1 << k) % w
+                if s != 0:
+                    stage_list.append((s, [k]))
+            elif (1 << k) < w:
+                stage_list.append((1 << k, [k]))
+            else:
+                over_list.append(k)
+        if over_list:
+            stage_list.append((w, over_list))
+        self.__stage_num = len(stage_list)
+
+        vec_type = DataType.bitvector_type(w)
+        cur = src
+        if src.data_type != vec_type:
+            cur = ent.add_net(data_type=vec_type)
+            ent.connect(cur, src)
+        if amount.data_type.is_bit_type:
+            amt = ent.add_net(data_type=DataType.bitvector_type(1))
+            ent.connect(amt, amount)
+        else:
+            amt = amount
+        for pos, (s, bit_list) in enumerate(stage_list):
+            sel = Expr.bit_select(amt, bit_list[0])
+            if len(bit_list) > 1:
+                sel = Expr.reduce(OpType.OR, [Expr.bit_select(amt, k)
+                                              for k in bit_list])
+            sel = ent.add_net(src=sel)
+            shifted = self.__shift(cur, s)
+            sel_vec = Expr.multi_concat(w, [sel])
+            expr = (shifted & sel_vec) | (cur & ~sel_vec)
+            cur = ent.add_net(data_type=vec_type, src=expr)
+            if pipeline > 0 and (pos + 1) % pipeline == 0 and \
+               pos + 1 < len(stage_list):
+                cur = self.__add_reg(cur)
+                amt = self.__add_reg(amt)
+        if name is not None or src.data_type != vec_type:
+            self.__output = ent.add_net(name=name, data_type=src.data_type)
+            ent.connect(self.__output, cur)
+        else:
+            self.__output = cur
+
+    @property
+    def op(self):
+        """シフトの種類を返す．"""
+        return self.__op
+
+    @property
+    def stage_num(self):
+        """段数を返す．"""
+        return self.__stage_num
+
+    @property
+    def latency(self):
+        """パイプラインレジスタの段数を返す．"""
+        return len(self.__dff_list) // 2
+
+    @property
+    def dff_list(self):
+        """パイプラインレジスタのリストを返す．"""
+        return self.__dff_list
+
+    @property
+    def output(self):
+        """出力を返す．"""
+        return self.__output
+
+    def __shift(self, cur, s):
+        """cur を s ビットシフトした式を返す．"""
+        w = self.__width
+        op = self.__op
+        zero = Expr.make_constant(data_type=DataType.bitvector_type(s),
+                                  val=0)
+        if s >= w:
+            if op == 'asr':
+                return Expr.multi_concat(w, [Expr.bit_select(cur, w - 1)])
+            return Expr.make_constant(data_type=DataType.bitvector_type(w),
+                                      val=0)
+        if op == 'lsl':
+            return Expr.concat([Expr.part_select(cur, w - 1 - s, 0), zero])
+        if op == 'lsr':
+            return Expr.concat([zero, Expr.part_select(cur, w - 1, s)])
+        if op == 'asr':
+            sign = Expr.multi_concat(s, [Expr.bit_select(cur, w - 1)])
+            return Expr.concat([sign, Expr.part_select(cur, w - 1, s)])
+        if op == 'rol':
+            return Expr.concat([Expr.part_select(cur, w - 1 - s, 0),
+                                Expr.part_select(cur, w - 1, w - s)])
+        # ror
+        return Expr.concat([Expr.part_select(cur, s - 1, 0),
+                            Expr.part_select(cur, w - 1, s)])
+
+    def __add_reg(self, data_in):
+        """パイプラインレジスタを追加する．"""
+        reset_val = 0 if self.__reset is not None else None
+        dff = self.__ent.add_dff(data_in=data_in,
+                                 clock=self.__clock,
+                                 clock_pol=self.__clock_pol,
+                                 reset=self.__reset,
+                                 reset_pol=self.__reset_pol,
+                                 reset_val=reset_val)
+        self.__dff_list.append(dff)
+        return dff.output
+
+
+def add_barrel_shifter(self, src, amount, *,
+                       op='lsl',
+                       pipeline=0,
+                       clock=None, clock_pol=None,
+                       reset=None, reset_pol=None,
+                       name=None):
+    """バレルシフタを追加する．
+
+    :param Expr src: シフトされる値
+    :param Expr amount: シフト量(符号なし)
+    :param str op: シフトの種類('lsl', 'lsr', 'asr', 'rol', 'ror')
+    :param int pipeline: パイプラインレジスタを入れる段の間隔(0 なら入れない)
+    :param Expr clock: クロック入力
+    :param str clock_pol: クロックのアクティブエッジを表す文字列
+    :param Expr reset: リセット入力
+    :param str reset_pol: リセットの極性を表す文字列
+    :param str name: 出力の名前
+    :return: 生成した BarrelShifter を返す．
+
+    出力は BarrelShifter.output で得られる．
+    クロックとリセットを省略した場合はエンティティのデフォルトを用いる．
+    詳細は BarrelShifter を参照のこと．
+    """
+    shifter = BarrelShifter(self, src, amount, op=op, pipeline=pipeline,
+                            clock=clock, clock_pol=clock_pol,
+                            reset=reset, reset_pol=reset_pol,
+                            name=name)
+    return shifter
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.add_barrel_shifter = add_barrel_shifter
@@ -0,0 +1,270 @@
+#! /usr/bin/env python3
+
+"""信号の駆動元と参照元の索引
+
+:file: signal_index.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.expr import UnaryOp, BinaryOp
+from rtlgen.expr import Constant, BitSelect, PartSelect, Concat, MultiConcat
+from rtlgen.net import Net
+from rtlgen.port import Port
+from rtlgen.var import Var
+from rtlgen.cont_assign import ContAssign
+from rtlgen.statement import AssignBase, IfStatement, CaseStatement
+
+
+class SignalIndex:
+    """信号(ネット，ポート，変数)の駆動元と参照元の索引
+
+    :param Entity ent: 対象のエンティティ
+
+    駆動元と参照元(以下，所有者と呼ぶ)は以下のものである．
+    * 継続的代入文(ContAssign): 左辺を駆動し，右辺を参照する．
+    * 代入文(AssignBase): 左辺を駆動し，右辺を参照する．
+    * if 文，case 文: 条件式を参照する．
+    * 要素(Item): Item.signal_link() の返す式を駆動，参照する．
+    左辺の可変のビット選択の添字は参照とみなす．
+    エンティティの入力ポートは駆動元を持たない．
+
+    通常は Entity.signal_index で得られるものを用いる．
+    Entity.connect(), Entity.reg_item() やステートメントの追加，
+    右辺式，条件式の置き換えに合わせて更新される．
+    要素は登録時にはまだ内容が確定していないので，次に索引を
+    参照した時に登録する．
+    検索はいずれも信号あたり定数時間で行われる．
+    """
+
+    def __init__(self, ent):
+        # 信号の id をキーにして所有者の辞書(id をキーにする)を保持する辞書
+        self.__driver_dict = {}
+        self.__reader_dict = {}
+        # 所有者の id をキーにして駆動する信号のリストを保持する辞書
+        self.__drive_list_dict = {}
+        # 所有者の id をキーにして参照する信号のリストを保持する辞書
+        self.__read_list_dict = {}
+        # ステートメントの id をキーにしてそれを含むプロセスを保持する辞書
+        self.__stmt_item_dict = {}
+        # プロセスの id をキーにしてステートメントの辞書を保持する辞書
+        self.__item_stmt_dict = {}
+        # 登録待ちの要素のリスト
+        self.__pending_list = []
+        for ca in ent.cont_assign_gen:
+            self.add_cont_assign(ca)
+        for item in ent.item_gen:
+            self.add_item(item)
+
+    def driver_list(self, signal):
+        """信号を駆動する所有者のリストを返す．
+
+        :param Expr signal: 対象の信号(Net, Port, Var)
+        """
+        self.__flush()
+        return list(self.__driver_dict.get(id(signal), {}).values())
+
+    def reader_list(self, signal):
+        """信号を参照する所有者のリストを返す．
+
+        :param Expr signal: 対象の信号(Net, Port, Var)
+        """
+        self.__flush()
+        return list(self.__reader_dict.get(id(signal), {}).values())
+
+    def driver_num(self, signal):
+        """信号を駆動する所有者の数を返す．
+
+        :param Expr signal: 対象の信号(Net, Port, Var)
+        """
+        self.__flush()
+        return len(self.__driver_dict.get(id(signal), {}))
+
+    def reader_num(self, signal):
+        """信号を参照する所有者の数を返す．
+
+        :param Expr signal: 対象の信号(Net, Port, Var)
+        """
+        self.__flush()
+        return len(self.__reader_dict.get(id(signal), {}))
+
+    def owner_item(self, stmt):
+        """ステートメントを含むプロセスを返す．
+
+        :param Statement stmt: 対象のステートメント
+
+        索引に登録されていない場合は None を返す．
+        """
+        self.__flush()
+        return self.__stmt_item_dict.get(id(stmt), None)
+
+    def add_cont_assign(self, ca):
+        """継続的代入文を登録する．
+
+        :param ContAssign ca: 対象の継続的代入文
+        """
+        drive_list, read_list = _split_lhs(ca.lhs)
+        read_list.append(ca.rhs)
+        self.__link(ca, drive_list, read_list)
+        ca.set_index(self)
+
+    def add_item(self, item):
+        """要素を登録する．
+
+        :param Item item: 対象の要素
+
+        実際の登録は次に索引を参照した時に行う．
+        """
+        self.__pending_list.append(item)
+
+    def add_statement(self, stmt, item):
+        """ステートメントを登録する．
+
+        :param Statement stmt: 対象のステートメント
+        :param Item item: ステートメントを含むプロセス
+
+        StatementBlock から呼ばれる．
+        """
+        self.__stmt_item_dict[id(stmt)] = item
+        self.__item_stmt_dict.setdefault(id(item), {})[id(stmt)] = stmt
+        drive_list, read_list = _stmt_link(stmt)
+        self.__link(stmt, drive_list, read_list)
+
+    def update(self, owner):
+        """所有者の参照する式の変更を反映する．
+
+        :param owner: 継続的代入文かステートメント
+        """
+        if isinstance(owner, ContAssign):
+            _, read_list = _split_lhs(owner.lhs)
+            read_list.append(owner.rhs)
+        else:
+            _, read_list = _stmt_link(owner)
+        self.__unlink_list(owner, self.__read_list_dict, self.__reader_dict)
+        self.__link_list(owner, read_list,
+                         self.__read_list_dict, self.__reader_dict)
+
+    def remove_items(self, item_list):
+        """要素の登録を削除する．
+
+        :param list[Item] item_list: 削除する要素のリスト
+        """
+        del_set = {id(item) for item in item_list}
+        self.__pending_list = [item for item in self.__pending_list
+                               if id(item) not in del_set]
+        for item in item_list:
+            if id(item) not in self.__drive_list_dict:
+                continue
+            self.__unlink(item)
+            stmt_dict = self.__item_stmt_dict.pop(id(item), {})
+            for stmt in stmt_dict.values():
+                self.__unlink(stmt)
+                del self.__stmt_item_dict[id(stmt)]
+            _, _, block_list = item.signal_link()
+            for block in block_list:
+                block.set_index(None, None)
+
+    def remove_signals(self, signal_list):
+        """信号の登録を削除する．
+
+        :param list[Expr] signal_list: 削除する信号のリスト
+
+        信号を参照している所有者の登録は残る．
+        """
+        for signal in signal_list:
+            self.__driver_dict.pop(id(signal), None)
+            self.__reader_dict.pop(id(signal), None)
+
+    def __flush(self):
+        """登録待ちの要素を登録する．"""
+        pending_list = self.__pending_list
+        self.__pending_list = []
+        for item in pending_list:
+            read_list, drive_list, block_list = item.signal_link()
+            self.__link(item, drive_list, read_list)
+            for block in block_list:
+                block.set_index(self, item)
+
+    def __link(self, owner, drive_list, read_list):
+        """所有者を登録する．"""
+        self.__link_list(owner, drive_list,
+                         self.__drive_list_dict, self.__driver_dict)
+        self.__link_list(owner, read_list,
+                         self.__read_list_dict, self.__reader_dict)
+
+    def __unlink(self, owner):
+        """所有者の登録を削除する．"""
+        self.__unlink_list(owner, self.__drive_list_dict, self.__driver_dict)
+        self.__unlink_list(owner, self.__read_list_dict, self.__reader_dict)
+
+    @staticmethod
+    def __link_list(owner, expr_list, list_dict, owner_dict):
+        signal_list = _signal_list(expr_list)
+        list_dict[id(owner)] = signal_list
+        for signal in signal_list:
+            owner_dict.setdefault(id(signal), {})[id(owner)] = owner
+
+    @staticmethod
+    def __unlink_list(owner, list_dict, owner_dict):
+        for signal in list_dict.pop(id(owner), []):
+            sub_dict = owner_dict.get(id(signal), None)
+            if sub_dict is not None:
+                sub_dict.pop(id(owner), None)
+
+
+def _stmt_link(stmt):
+    """ステートメントの駆動する式と参照する式のリストを返す．"""
+    if isinstance(stmt, AssignBase):
+        drive_list, read_list = _split_lhs(stmt.lhs)
+        read_list.append(stmt.rhs)
+        return drive_list, read_list
+    if isinstance(stmt, (IfStatement, CaseStatement)):
+        return [], [stmt.cond]
+    return [], []
+
+
+def _split_lhs(lhs):
+    """左辺式を駆動する式と参照する式(可変の添字)のリストに分ける．"""
+    drive_list = []
+    read_list = []
+    stack = [lhs]
+    while stack:
+        expr = stack.pop()
+        if isinstance(expr, BitSelect):
+            if not isinstance(expr.index, Constant):
+                read_list.append(expr.index)
+            stack.append(expr.primary)
+        elif isinstance(expr, PartSelect):
+            stack.append(expr.primary)
+        elif isinstance(expr, Concat):
+            stack.extend(expr.src_list)
+        else:
+            drive_list.append(expr)
+    return drive_list, read_list
+
+
+def _signal_list(expr_list):
+    """式に含まれる信号を重複なく返す．"""
+    ans = []
+    visited = set()
+    stack = list(expr_list)
+    while stack:
+        expr = stack.pop()
+        if id(expr) in visited:
+            continue
+        visited.add(id(expr))
+        if isinstance(expr, (Net, Port, Var)):
+            ans.append(expr)
+        elif isinstance(expr, UnaryOp):
+            stack.append(expr.operand1)
+        elif isinstance(expr, BinaryOp):
+            stack.append(expr.operand1)
+            stack.append(expr.operand2)
+        elif isinstance(expr, BitSelect):
+            stack.append(expr.primary)
+            stack.append(expr.index)
+        elif isinstance(expr, PartSelect):
+            stack.append(expr.primary)
+        elif isinstance(expr, (Concat, MultiConcat)):
+            stack.extend(expr.src_list)
+    return ans
@@ -42,8 +42,24 @@ class Statement:
     """
 
     def __init__(self):
-        # 実はこの継承クラスにあまり用はない．
-        pass
+        self.__index = None
+        self.__item = None
+
+    def set_index(self, index, item):
+        """信号の索引を設定する．
+
+        :param SignalIndex index: 索引(None の時は登録を解除する)
+        :param Item item: ステートメントを含むプロセス
+        """
+        self.__index = index
+        self.__item = item
+        if index is not None:
+            index.add_statement(self, item)
+
+    def notify_index(self):
+        """参照する式の変更を索引に伝える．"""
+        if self.__index is not None:
+            self.__index.update(self)
 
 
 class AssignBase(Statement):
@@ -66,6 +82,14 @@ class AssignBase(Statement):
         """右辺式を返す．"""
         return self.__rhs
 
+    def set_rhs(self, rhs):
+        """右辺式を置き換える．
+
+        :param Expr rhs: 新しい右辺式
+        """
+        self.__rhs = self.__lhs.coerce(rhs)
+        self.notify_index()
+
 
 class BlockingAssign(AssignBase):
     """ブロッキング代入文を表すクラス
@@ -145,6 +169,24 @@ class IfStatement(Statement):
         """条件式を返す．"""
         return self.__cond
 
+    def set_cond(self, cond):
+        """条件式を置き換える．
+
+        :param Expr cond: 新しい条件式
+        """
+        self.__cond = cond
+        self.notify_index()
+
+    def set_index(self, index, item):
+        """信号の索引を設定する．
+
+        :param SignalIndex index: 索引(None の時は登録を解除する)
+        :param Item item: ステートメントを含むプロセス
+        """
+        super().set_index(index, item)
+        self.__then.set_index(index, item)
+        self.__else.set_index(index, item)
+
     def then_body(self):
         """Then節を返す．"""
         return StmtContext(self.__then)
@@ -176,13 +218,13 @@ class IfStatement(Statement):
             footer = ''
         with SimpleBlock(writer, header, footer):
             if self.__then.is_null:
-                writer.write_line(';')
+                writer.write_line('null;')
             else:
                 for stmt in self.__then.statement_gen:
                     stmt.gen_vhdl(writer)
         if not self.__else.is_null:
             header = 'else'
-            footer = 'end'
+            footer = 'end if;'
             with SimpleBlock(writer, header, footer):
                 for stmt in self.__else.statement_gen:
                     stmt.gen_vhdl(writer)
@@ -196,6 +238,9 @@ class CaseStatement(Statement):
         super().__init__()
         self.__cond = cond
         self.__case_list = []
+        self.__default = None
+        self.__index = None
+        self.__item = None
 
     @property
     def type(self):
@@ -207,21 +252,63 @@ class CaseStatement(Statement):
         """条件式を返す．"""
         return self.__cond
 
+    def set_cond(self, cond):
+        """条件式を置き換える．
+
+        :param Expr cond: 新しい条件式
+        """
+        self.__cond = cond
+        self.notify_index()
+
+    def set_index(self, index, item):
+        """信号の索引を設定する．
+
+        :param SignalIndex index: 索引(None の時は登録を解除する)
+        :param Item item: ステートメントを含むプロセス
+        """
+        super().set_index(index, item)
+        self.__index = index
+        self.__item = item
+        for _, block in self.__case_list:
+            block.set_index(index, item)
+        if self.__default is not None:
+            self.__default.set_index(index, item)
+
     def add_label(self, label):
         """case節のラベルを追加する．
 
         :param Expr label: ラベル
         """
         block = StatementBlock()
+        block.set_index(self.__index, self.__item)
         self.__case_list.append((label, block))
         return StmtContext(block)
 
+    def add_default(self):
+        """default節を追加する．
+
+        すでに default節がある場合にはそれを返す．
+        """
+        if self.__default is None:
+            self.__default = StatementBlock()
+            self.__default.set_index(self.__index, self.__item)
+        return StmtContext(self.__default)
+
     @property
     def case_gen(self):
         """case節のジェネレータを返す．"""
         for case in self.__case_list:
             yield case
 
+    def default_body(self):
+        """default節を返す．
+
+        default節がない場合は None を返す．
+        """
+        if self.__default is None:
+            return None
+        return StmtContext(self.__default)
+
     def gen_verilog(self, writer):
         """Verilog-HDL記述を生成する
 
@@ -231,10 +318,11 @@ class CaseStatement(Statement):
         footer = 'endcase'
         with SimpleBlock(writer, header, footer):
             for label, body in self.__case_list:
-                line = f'{label.verilog_str}:'
-                writer.write_line(line)
-                with SimpleBlock(writer, '', ''):
-                    body.gen_verilog(writer)
+                writer.write_line(f'{label.verilog_str}: ', no_nl=True)
+                body.gen_verilog(writer)
+            if self.__default is not None:
+                writer.write_line('default: ', no_nl=True)
+                self.__default.gen_verilog(writer)
 
     def gen_vhdl(self, writer):
         """VHDL記述を生成する
@@ -242,10 +330,23 @@ class CaseStatement(Statement):
         :param VhdlWriter writer: VHDL出力器
         """
         header = f'case {self.cond.vhdl_str} is'
-        footer = 'end case'
+        footer = 'end case;'
         with SimpleBlock(writer, header, footer):
             for label, body in self.__case_list:
-                pass
+                with SimpleBlock(writer, f'when {label.vhdl_str} =>', None):
+                    CaseStatement.__gen_vhdl_body(writer, body)
+            # VHDL ではすべての値を網羅する必要がある．
+            with SimpleBlock(writer, 'when others =>', None):
+                CaseStatement.__gen_vhdl_body(writer, self.__default)
+
+    @staticmethod
+    def __gen_vhdl_body(writer, body):
+        """case節の本体のVHDL記述を生成する．"""
+        if body is None or body.is_null:
+            writer.write_line('null;')
+        else:
+            for stmt in body.statement_gen:
+                stmt.gen_vhdl(writer)
 
 
 class StatementBlock:
@@ -254,6 +355,8 @@ class StatementBlock:
 
     def __init__(self):
         self.__statement_list = []
+        self.__index = None
+        self.__item = None
 
     @property
     def is_null(self):
@@ -267,6 +370,25 @@ class StatementBlock:
         for stmt in self.__statement_list:
             yield stmt
 
+    def set_index(self, index, item):
+        """信号の索引を設定する．
+
+        :param SignalIndex index: 索引(None の時は登録を解除する)
+        :param Item item: ブロックを含むプロセス
+
+        以降に追加されるステートメントも索引に登録される．
+        """
+        self.__index = index
+        self.__item = item
+        for stmt in self.__statement_list:
+            stmt.set_index(index, item)
+
+    def __add_stmt(self, stmt):
+        """ステートメントを追加する．"""
+        self.__statement_list.append(stmt)
+        if self.__index is not None:
+            stmt.set_index(self.__index, self.__item)
+
     def add_assign(self, lhs, rhs,
                    *, blocking=False):
         """代入文を追加する．
@@ -280,7 +402,7 @@ class StatementBlock:
             stmt = BlockingAssign(lhs, rhs)
         else:
             stmt = NonblockingAssign(lhs, rhs)
-        self.__statement_list.append(stmt)
+        self.__add_stmt(stmt)
         return stmt
 
     def add_if(self, cond):
@@ -290,7 +412,7 @@ class StatementBlock:
         :return: 生成したステートメントを返す．
         """
         stmt = IfStatement(cond)
-        self.__statement_list.append(stmt)
+        self.__add_stmt(stmt)
         return stmt
 
     def add_case(self, cond):
@@ -300,7 +422,7 @@ class StatementBlock:
         :return 生成したステートメントを返す．
         """
         stmt = CaseStatement(cond)
-        self.__statement_list.append(stmt)
+        self.__add_stmt(stmt)
         return stmt
 
     def gen_verilog(self, writer):
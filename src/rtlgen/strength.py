@@ -0,0 +1,279 @@
+#! /usr/bin/env python3
+
+"""定数による乗除算をシフトと加減算に置き換えるクラス
+
+:file: strength.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.data_type import DataType
+from rtlgen.expr import Expr, BinaryOp, Constant, OpType
+from rtlgen.evaluator import Evaluator
+from rtlgen.traverse import operand_list, clone_expr, expr_gen
+from rtlgen.traverse import expr_root_list
+
+
+class StrengthReducer:
+    """定数による乗除算をシフトと加減算に置き換えるクラス
+
+    :param Entity ent: 対象のエンティティ
+
+    一方のオペランドが定数の MUL, DIV, MOD を以下のように置き換える．
+
+    * 乗算: 定数を 2^s * f (f は奇数)に分解し，f 倍の値を
+      カノニカル符号付き桁(CSD)表現にしたがってシフトと加減算で作る．
+      同じオペランドに対する f 倍の値(基本値)はネットとして共有し，
+      既存の基本値1つの加減算で作れる場合はそれを用いる
+      (複数定数乗算)．
+    * 除算: 2のべき乗の場合は右シフト，それ以外は逆数の乗算
+      (x * m) >> (w + l) に置き換える．
+    * 剰余: 2のべき乗の場合はマスク，それ以外は x - (x / c) * c に
+      置き換える．
+
+    乗算の結果の型がもう一方のオペランドの型と等しいもの，
+    除算と剰余は符号なしで，定数が第2オペランドのものが対象である．
+    """
+
+    def __init__(self, ent):
+        self.__ent = ent
+        # 部分式の id をキーにして新しい式を保持する辞書
+        self.__memo = {}
+        # オペランドの id をキーにして 基本値をキーにした式の辞書を保持する辞書
+        self.__fund_dict = {}
+        # オペランドの id をキーにしてネットに置き換えた式を保持する辞書
+        self.__net_dict = {}
+        # (オペランドの id, 定数) をキーにして商を保持する辞書
+        self.__quot_dict = {}
+        # 置き換えた演算の数
+        self.__count_dict = {OpType.MUL: 0, OpType.DIV: 0, OpType.MOD: 0}
+
+    @property
+    def report(self):
+        """置き換えた演算の数を表す辞書を返す．
+
+        キーは 'mul', 'div', 'mod' である．
+        """
+        return {'mul': self.__count_dict[OpType.MUL],
+                'div': self.__count_dict[OpType.DIV],
+                'mod': self.__count_dict[OpType.MOD]}
+
+    def run(self):
+        """置き換えを行う．
+
+        :return: report と同じ辞書を返す．
+        """
+        root_list = expr_root_list(self.__ent)
+        for expr in expr_gen([expr for expr, _ in root_list]):
+            new_list = [self.__memo[id(opr)] for opr in operand_list(expr)]
+            new_expr = clone_expr(expr, new_list)
+            if isinstance(expr, BinaryOp):
+                ans = self.__reduce(new_expr)
+                if ans is not None:
+                    self.__count_dict[expr.op_type] += 1
+                    new_expr = ans
+            self.__memo[id(expr)] = new_expr
+        for expr, setter in root_list:
+            new_expr = self.__memo[id(expr)]
+            if new_expr is not expr:
+                setter(new_expr)
+        return self.report
+
+    def __reduce(self, expr):
+        """置き換えた式を返す．
+
+        対象外の場合は None を返す．
+        """
+        op_type = expr.op_type
+        opr1 = expr.operand1
+        opr2 = expr.operand2
+        if op_type == OpType.MUL:
+            if isinstance(opr2, Constant) and not isinstance(opr1, Constant):
+                src, const = opr1, opr2
+            elif isinstance(opr1, Constant) and not isinstance(opr2, Constant):
+                src, const = opr2, opr1
+            else:
+                return None
+            if src.data_type != expr.data_type:
+                return None
+            width = Evaluator.bit_width(src.data_type)
+            if width is None:
+                return None
+            val = const.value & ((1 << width) - 1)
+            return self.__mul(src, val, width)
+        if op_type not in (OpType.DIV, OpType.MOD):
+            return None
+        if not isinstance(opr2, Constant) or isinstance(opr1, Constant):
+            return None
+        src_type = opr1.data_type
+        if not src_type.is_bit_type and not src_type.is_bitvector_type:
+            return None
+        if src_type != expr.data_type:
+            return None
+        val = opr2.value
+        if val <= 0:
+            return None
+        width = Evaluator.bit_width(src_type)
+        if op_type == OpType.DIV:
+            return self.__div(opr1, val, width)
+        return self.__mod(opr1, val, width)
+
+    def __mul(self, src, val, width):
+        """src * val を表す式を返す．
+
+        val は 0 以上 2^width 未満である．
+        """
+        if val == 0:
+            return Constant(data_type=src.data_type, val=0)
+        shift = (val & -val).bit_length() - 1
+        return _lsft(self.__fundamental(src, val >> shift, width), shift)
+
+    def __div(self, src, val, width):
+        """src / val を表す式を返す．"""
+        if val >= (1 << width):
+            return Constant(data_type=src.data_type, val=0)
+        if val & (val - 1) == 0:
+            return _rsft(src, val.bit_length() - 1)
+        return self.__quotient(src, val, width)
+
+    def __mod(self, src, val, width):
+        """src % val を表す式を返す．"""
+        if val >= (1 << width):
+            return src
+        if val & (val - 1) == 0:
+            mask = Constant(data_type=src.data_type, val=val - 1)
+            return Expr.make_and(src, mask)
+        quot = self.__quotient(src, val, width)
+        return Expr.make_sub(src, self.__mul(quot, val, width))
+
+    def __quotient(self, src, val, width):
+        """逆数の乗算による src / val を返す．
+
+        l = ceil(log2(val)), m = floor(2^(width + l) / val) + 1 とすると
+        0 <= src < 2^width の範囲で src / val = (src * m) >> (width + l)
+        となる(Granlund-Montgomery)．
+        """
+        key = (id(src), val)
+        if key in self.__quot_dict:
+            return self.__quot_dict[key]
+        l = DataType.bitlen(val)
+        m = (1 << (width + l)) // val + 1
+        # val > 2^(l - 1) より m < 2^(width + 1) なので
+        # 積は 2 * width + 1 ビット(<= 2 * width + l + 1)に収まる．
+        ext_width = width * 2 + l + 1
+        ext_key = (id(src), ext_width)
+        if ext_key not in self.__net_dict:
+            ext_type = DataType.bitvector_type(ext_width)
+            pad = Constant(data_type=DataType.bitvector_type(ext_width - width),
+                           val=0)
+            self.__net_dict[ext_key] = self.__ent.add_net(
+                data_type=ext_type,
+                src=Expr.concat([pad, src]))
+        ext_src = self.__net_dict[ext_key]
+        prod = self.__to_net(self.__mul(ext_src, m, ext_width))
+        left = width * 2 + l - 1
+        right = width + l
+        ans = Expr.part_select(prod, left, right)
+        self.__quot_dict[key] = ans
+        return ans
+
+    def __fundamental(self, src, val, width):
+        """src の val 倍の値を返す．
+
+        val は奇数である．
+        """
+        if val == 1:
+            return src
+        src = self.__to_net(src)
+        fund_dict = self.__fund_dict.setdefault(id(src), {1: src})
+        if val in fund_dict:
+            return fund_dict[val]
+        expr = self.__fundamental_by_one_adder(fund_dict, val, width)
+        if expr is None:
+            expr = self.__csd(src, val)
+        ans = self.__ent.add_net(data_type=src.data_type, src=expr)
+        fund_dict[val] = ans
+        return ans
+
+    @staticmethod
+    def __fundamental_by_one_adder(fund_dict, val, width):
+        """既存の基本値の1回の加減算で val 倍を作る．
+
+        作れない場合は None を返す．
+        """
+        for val1, expr1 in fund_dict.items():
+            for shift in range(1, width):
+                sval = val1 << shift
+                if sval >= (1 << width) + val:
+                    break
+                for val2, expr2 in fund_dict.items():
+                    if sval + val2 == val:
+                        return Expr.make_add(_lsft(expr1, shift), expr2)
+                    if sval - val2 == val:
+                        return Expr.make_sub(_lsft(expr1, shift), expr2)
+                    if val2 - sval == val:
+                        return Expr.make_sub(expr2, _lsft(expr1, shift))
+        return None
+
+    @staticmethod
+    def __csd(src, val):
+        """CSD 表現にしたがって src の val 倍を作る．"""
+        pos_list = []
+        neg_list = []
+        pos = 0
+        while val:
+            if val & 1:
+                digit = 2 - (val & 3)
+                val -= digit
+                if digit > 0:
+                    pos_list.append(_lsft(src, pos))
+                else:
+                    neg_list.append(_lsft(src, pos))
+            val >>= 1
+            pos += 1
+        # 最上位の桁は必ず正である．
+        ans = Expr.reduce(OpType.ADD, pos_list)
+        if neg_list:
+            ans = Expr.make_sub(ans, Expr.reduce(OpType.ADD, neg_list))
+        return ans
+
+    def __to_net(self, expr):
+        """式を単純な式に置き換える．"""
+        if expr.is_simple():
+            return expr
+        key = id(expr)
+        if key not in self.__net_dict:
+            self.__net_dict[key] = self.__ent.add_net(data_type=expr.data_type,
+                                                      src=expr)
+        return self.__net_dict[key]
+
+
+def _lsft(expr, shift):
+    if shift == 0:
+        return expr
+    return Expr.make_lsft(expr, Expr.make_intconstant(shift))
+
+
+def _rsft(expr, shift):
+    if shift == 0:
+        return expr
+    return Expr.make_rsft(expr, Expr.make_intconstant(shift))
+
+
+def reduce_strength(self):
+    """定数による乗算，除算，剰余をシフトと加減算に置き換える．
+
+    :return: 置き換えた演算の数を 'mul', 'div', 'mod' をキーにした
+             辞書で返す．
+
+    対象は継続的代入文の右辺，プロセス中の代入文の右辺と
+    if 文，case 文の条件式である．
+    詳細は StrengthReducer を参照のこと．
+    """
+    reducer = StrengthReducer(self)
+    return reducer.run()
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.reduce_strength = reduce_strength
@@ -0,0 +1,419 @@
+#! /usr/bin/env python3
+
+"""定数レジスタと等価なレジスタを取り除くクラス
+
+:file: sweep.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.expr import Expr, OpType, UnaryOp, BinaryOp
+from rtlgen.expr import Constant, BitSelect, PartSelect, Concat, MultiConcat
+from rtlgen.net import Net
+from rtlgen.dff import Dff
+from rtlgen.inst import Inst
+from rtlgen.lut import Lut
+from rtlgen.process import ClockedProcess
+from rtlgen.statement import AssignBase
+from rtlgen.evaluator import Evaluator
+from rtlgen.rtlerror import RtlError
+from rtlgen.traverse import operand_list, clone_expr, expr_gen
+from rtlgen.traverse import statement_gen, process_gen, expr_root_list
+from rtlgen.traverse import scc_list
+
+
+# オペランドの順序によらない二項演算子の集合
+_COMMUTATIVE_OP_SET = frozenset([OpType.AND, OpType.OR, OpType.XOR,
+                                 OpType.ADD, OpType.MUL,
+                                 OpType.EQ, OpType.NE,
+                                 OpType.LAND, OpType.LOR])
+
+
+class RegisterSweeper:
+    """定数レジスタと等価なレジスタを取り除くクラス
+
+    :param Entity ent: 対象のエンティティ
+
+    対象は Dff のみである．
+
+    定数レジスタはリセットからの帰納法で求める．
+    リセット値を持つレジスタの出力がリセット値であると仮定して
+    データ入力の値を計算し，リセット値と一致しないレジスタを
+    候補から除くことを変化がなくなるまで繰り返す．
+    最後まで残ったレジスタは常にリセット値を保持する．
+
+    等価なレジスタはクロック，リセット，リセット値，データ型で
+    初期分割を行い，データ入力とイネーブルの構造的ハッシュ
+    (レジスタの出力は所属するクラスの番号で置き換える)で
+    変化がなくなるまで分割を細かくして求める．
+    同じクラスのレジスタは最初のものに併合する．
+    リセット値が定数でないレジスタと，リセットを持たずにループに
+    含まれるレジスタ(初期状態が定まらない)は併合しない．
+
+    インスタンスのポートや Lut の入出力，クロック，非同期制御，
+    イネーブル，代入文の左辺に現れるレジスタは対象としない．
+    """
+
+    def __init__(self, ent):
+        self.__ent = ent
+        self.__report = {'constant': 0, 'merged': 0}
+
+    @property
+    def report(self):
+        """取り除いたレジスタの数を表す辞書を返す．
+
+        'constant' は定数レジスタの数，'merged' は併合したレジスタの数
+        """
+        return self.__report
+
+    def run(self):
+        """定数レジスタと等価なレジスタを取り除く．
+
+        :return: report と同じ辞書を返す．
+        """
+        ent = self.__ent
+        pinned_set = self.__pinned_set()
+        self.__reg_list = [item for item in ent.item_gen
+                           if isinstance(item, Dff) and
+                           id(item.q) not in pinned_set]
+        # q の id をキーにしてレジスタの番号を保持する辞書
+        self.__reg_dict = {id(reg.q): i
+                           for i, reg in enumerate(self.__reg_list)}
+        # ネットの id をキーにして駆動する式を保持する辞書
+        self.__driver_dict = {}
+        for ca in ent.cont_assign_gen:
+            if isinstance(ca.lhs, Net):
+                self.__driver_dict[id(ca.lhs)] = ca.rhs
+        const_dict = self.__find_constant()
+        group_list = self.__find_equivalent(const_dict)
+        self.__rewrite(const_dict, group_list)
+        return self.__report
+
+    def __pinned_set(self):
+        """対象としないネットの id の集合を返す．"""
+        ans = set()
+
+        def add_all(expr):
+            for expr1 in expr_gen([expr]):
+                ans.add(id(expr1))
+
+        ent = self.__ent
+        for ca in ent.cont_assign_gen:
+            add_all(ca.lhs)
+        for proc in process_gen(ent):
+            if isinstance(proc, ClockedProcess):
+                add_all(proc.clock)
+                if proc.asyncctl is not None:
+                    add_all(proc.asyncctl)
+            if isinstance(proc, Dff):
+                if proc.enable is not None:
+                    add_all(proc.enable)
+                continue
+            with proc.process_body() as body:
+                for stmt in statement_gen(body):
+                    if isinstance(stmt, AssignBase):
+                        add_all(stmt.lhs)
+        for item in ent.item_gen:
+            if isinstance(item, Inst):
+                for oexpr, _ in item.port_gen:
+                    add_all(oexpr)
+            elif isinstance(item, Lut):
+                add_all(item.input)
+                add_all(item.output)
+        return ans
+
+    def __find_constant(self):
+        """定数レジスタを求める．
+
+        :return: レジスタの番号をキーにして値を保持する辞書を返す．
+        """
+        reg_list = self.__reg_list
+        const_dict = {}
+        for i, reg in enumerate(reg_list):
+            if reg.reset is None or not isinstance(reg.reset_val, Constant):
+                continue
+            if Evaluator.bit_width(reg.q.data_type) is None:
+                continue
+            mask = Evaluator.mask(reg.q.data_type)
+            const_dict[i] = reg.reset_val.value & mask
+        evaluator = Evaluator(self.__ent)
+        while const_dict:
+            pos_list = list(const_dict.keys())
+            input_list = [(reg_list[i].q, const_dict[i]) for i in pos_list]
+            val_list = evaluator.eval_partial_list(
+                [reg_list[i].data_in for i in pos_list], input_list)
+            new_dict = {i: const_dict[i]
+                        for i, val in zip(pos_list, val_list)
+                        if val == const_dict[i]}
+            if len(new_dict) == len(const_dict):
+                break
+            const_dict = new_dict
+        return const_dict
+
+    def __find_equivalent(self, const_dict):
+        """等価なレジスタのグループを求める．
+
+        :param dict[int, int] const_dict: 定数レジスタの辞書
+        :return: レジスタの番号のリストのリストを返す．
+
+        ループに含まれないレジスタはトポロジカル順に構造的ハッシュを
+        求めることで一度に分類できるので，これを初期分割とする．
+        ループに含まれるレジスタの初期分割はシグネチャのみで行う．
+        リセット値が定数でないものと，リセットを持たずにループに
+        含まれるものはそれぞれ単独のクラスとする．
+        その後，変化がなくなるまで分割を細かくする．
+        """
+        reg_list = self.__reg_list
+        pos_list = [i for i in range(len(reg_list)) if i not in const_dict]
+        acyclic_list, cyclic_set = self.__reg_order(const_dict)
+        # 初期分割
+        # レジスタの番号をキーにしてクラスの番号を保持する辞書
+        class_dict = {}
+        key_dict = {}
+        for i in pos_list:
+            reg = reg_list[i]
+            if reg.reset is not None and \
+               not isinstance(reg.reset_val, Constant):
+                # リセット値が定数でないものは併合しない．
+                key = ('U', i)
+            elif i not in cyclic_set:
+                continue
+            elif reg.reset is None:
+                # リセットを持たずループに含まれるものは初期状態が
+                # 定まらないので併合しない．
+                key = ('U', i)
+            else:
+                key = ('S', self.__signature(reg))
+            class_dict[i] = key_dict.setdefault(key, len(key_dict))
+        self.__key_table = {}
+        memo = {}
+        for i in acyclic_list:
+            if i in class_dict:
+                continue
+            key = ('K', self.__signature(reg_list[i])) + \
+                self.__next_key(reg_list[i], memo, class_dict, const_dict)
+            class_dict[i] = key_dict.setdefault(key, len(key_dict))
+        class_num = len(key_dict)
+        while True:
+            # 構造を表すタプルをキーにして番号を保持する辞書
+            self.__key_table = {}
+            memo = {}
+            key_dict = {}
+            new_dict = {}
+            for i in pos_list:
+                key = (class_dict[i],) + \
+                    self.__next_key(reg_list[i], memo, class_dict, const_dict)
+                new_dict[i] = key_dict.setdefault(key, len(key_dict))
+            class_dict = new_dict
+            if len(key_dict) == class_num:
+                break
+            class_num = len(key_dict)
+        group_dict = {}
+        for i in pos_list:
+            group_dict.setdefault(class_dict[i], []).append(i)
+        return [group for group in group_dict.values() if len(group) >= 2]
+
+    @staticmethod
+    def __signature(reg):
+        """レジスタの初期分割に用いるシグネチャを返す．"""
+        if isinstance(reg.reset_val, Constant):
+            reset_val = reg.reset_val.value
+        else:
+            reset_val = None
+        return (id(reg.clock), reg.clock_pol,
+                None if reg.reset is None else id(reg.reset),
+                reg.asyncctl_pol, reset_val, reg.enable_pol,
+                str(reg.q.data_type))
+
+    def __next_key(self, reg, memo, class_dict, const_dict):
+        """データ入力とイネーブルの構造的ハッシュのタプルを返す．"""
+        key = (self.__struct_key(reg.data_in, memo, class_dict, const_dict),)
+        if reg.enable is not None:
+            key += (self.__struct_key(reg.enable, memo,
+                                      class_dict, const_dict),)
+        return key
+
+    def __reg_order(self, const_dict):
+        """レジスタ間の依存関係を調べる．
+
+        :return: ループに含まれないレジスタの番号のトポロジカル順の
+                 リストとループに含まれるレジスタの番号の集合を返す．
+
+        レジスタの出力からデータ入力とイネーブルへの枝を加えたグラフの
+        強連結成分を求める．強連結成分は依存するものから順に求まる．
+        """
+        reg_list = self.__reg_list
+        reg_dict = self.__reg_dict
+
+        def succ_list(node):
+            pos = reg_dict.get(id(node))
+            if pos is None:
+                return self.__src_list(node)
+            if pos in const_dict:
+                return []
+            reg = reg_list[pos]
+            if reg.enable is None:
+                return [reg.data_in]
+            return [reg.data_in, reg.enable]
+
+        acyclic_list = []
+        cyclic_set = set()
+        for member_list in scc_list([reg.q for reg in reg_list], succ_list):
+            node = member_list[0]
+            if len(member_list) == 1 and \
+               all(child is not node for child in succ_list(node)):
+                if id(node) in reg_dict:
+                    acyclic_list.append(reg_dict[id(node)])
+                continue
+            for member in member_list:
+                if id(member) in reg_dict:
+                    cyclic_set.add(reg_dict[id(member)])
+        return acyclic_list, cyclic_set
+
+    def __src_list(self, expr):
+        """構造的ハッシュで子供となる式のリストを返す．
+
+        レジスタの出力は葉とし，ネットは駆動する式をたどる．
+        """
+        if isinstance(expr, Net):
+            if id(expr) in self.__reg_dict:
+                return []
+            if id(expr) in self.__driver_dict:
+                return [self.__driver_dict[id(expr)]]
+            return []
+        return operand_list(expr)
+
+    def __struct_key(self, expr, memo, class_dict, const_dict):
+        """式の構造的ハッシュの値を返す．
+
+        構造の等しい式は同じ値になる．
+        """
+        # 計算途中の式の id の集合(ループの検出用)
+        active = set()
+        stack = [(expr, False)]
+        while stack:
+            node, expanded = stack.pop()
+            key = id(node)
+            if key in memo:
+                continue
+            src_list = self.__src_list(node)
+            if not expanded:
+                pending = [src for src in src_list if id(src) not in memo]
+                if pending:
+                    for src in pending:
+                        if id(src) in active:
+                            emsg = 'combinational loop detected'
+                            raise RtlError(emsg)
+                    active.add(key)
+                    stack.append((node, True))
+                    for src in pending:
+                        stack.append((src, False))
+                    continue
+            active.discard(key)
+            key_list = [memo[id(src)] for src in src_list]
+            memo[key] = self.__make_key(node, key_list,
+                                        class_dict, const_dict)
+        return memo[id(expr)]
+
+    def __make_key(self, expr, key_list, class_dict, const_dict):
+        """子供のハッシュ値から式のハッシュ値を作る．"""
+        type_str = str(expr.data_type)
+        if isinstance(expr, Net):
+            pos = self.__reg_dict.get(id(expr))
+            if pos is not None:
+                if pos in const_dict:
+                    t = ('C', type_str, const_dict[pos])
+                else:
+                    t = ('R', class_dict[pos])
+            elif key_list:
+                # 駆動元の式と同一視する．
+                return key_list[0]
+            else:
+                t = ('L', id(expr))
+        elif isinstance(expr, Constant):
+            t = ('C', type_str, expr.value)
+        elif isinstance(expr, UnaryOp):
+            t = ('U', expr.op_type, type_str, key_list[0])
+        elif isinstance(expr, BinaryOp):
+            k1, k2 = key_list
+            if expr.op_type in _COMMUTATIVE_OP_SET and k2 < k1 and \
+               expr.operand1.data_type == expr.operand2.data_type:
+                k1, k2 = k2, k1
+            t = ('B', expr.op_type, type_str, k1, k2)
+        elif isinstance(expr, BitSelect):
+            t = ('BS', key_list[0], key_list[1])
+        elif isinstance(expr, PartSelect):
+            t = ('PS', expr.left, expr.right, key_list[0])
+        elif isinstance(expr, Concat):
+            t = ('CC',) + tuple(key_list)
+        elif isinstance(expr, MultiConcat):
+            t = ('MC', expr.rep_num) + tuple(key_list)
+        else:
+            t = ('L', id(expr))
+        return self.__key_table.setdefault(t, len(self.__key_table))
+
+    def __rewrite(self, const_dict, group_list):
+        """レジスタの出力を置き換えて不要なレジスタを削除する．"""
+        reg_list = self.__reg_list
+        # q の id をキーにして置き換える式を保持する辞書
+        replace_dict = {}
+        remove_list = []
+        for i, val in const_dict.items():
+            q = reg_list[i].q
+            replace_dict[id(q)] = Expr.make_constant(data_type=q.data_type,
+                                                     val=val)
+            remove_list.append(reg_list[i])
+        for group in group_list:
+            rep_q = reg_list[group[0]].q
+            for i in group[1:]:
+                replace_dict[id(reg_list[i].q)] = rep_q
+                remove_list.append(reg_list[i])
+        self.__report['constant'] = len(const_dict)
+        self.__report['merged'] = len(remove_list) - len(const_dict)
+        if not remove_list:
+            return
+
+        memo = {}
+
+        def rebuild(expr):
+            for node in expr_gen([expr]):
+                key = id(node)
+                if key in memo:
+                    continue
+                if key in replace_dict:
+                    memo[key] = replace_dict[key]
+                else:
+                    opr_list = [memo[id(opr)] for opr in operand_list(node)]
+                    memo[key] = clone_expr(node, opr_list)
+            return memo[id(expr)]
+
+        ent = self.__ent
+        for expr, setter in expr_root_list(ent):
+            new_expr = rebuild(expr)
+            if new_expr is not expr:
+                setter(new_expr)
+        remove_set = {id(reg) for reg in remove_list}
+        for reg in reg_list:
+            if id(reg) in remove_set:
+                continue
+            new_expr = rebuild(reg.data_in)
+            if new_expr is not reg.data_in:
+                reg.set_data_in(new_expr)
+        ent.del_items(remove_list)
+        ent.del_nets([reg.q for reg in remove_list])
+
+
+def sweep_registers(self):
+    """定数レジスタと等価なレジスタを取り除く．
+
+    :return: 取り除いたレジスタの数を表す辞書を返す．
+
+    詳細は RegisterSweeper を参照のこと．
+    """
+    sweeper = RegisterSweeper(self)
+    return sweeper.run()
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.sweep_registers = sweep_registers
@@ -0,0 +1,411 @@
+#! /usr/bin/env python3
+
+"""論理段数(遅延)を見積もるクラス
+
+:file: timing.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import heapq
+from rtlgen.entity import Entity
+from rtlgen.expr import OpType, OpBase, BinaryOp
+from rtlgen.expr import Constant, BitSelect, PartSelect, Concat
+from rtlgen.net import Net
+from rtlgen.port import Port
+from rtlgen.var import Var
+from rtlgen.process import Process, ClockedProcess
+from rtlgen.inst import Inst
+from rtlgen.lut import Lut
+from rtlgen.data_type import DataType
+from rtlgen.statement import AssignBase, IfStatement, CaseStatement
+from rtlgen.evaluator import Evaluator
+from rtlgen.traverse import operand_list, sub_block_list
+from rtlgen.rtlerror import RtlError
+
+
+class DelayModel:
+    """演算の遅延を見積もるクラス
+
+    遅延は2入力ゲートの段数を単位として表す．
+    ビット幅 w に依存する演算は以下のように見積もる．
+    * リダクション演算:       log2(w)
+    * 加減算，符号反転:       log2(w) + 2 (並列プレフィックス加算器)
+    * 等価比較:               log2(w) + 1
+    * 大小比較:               log2(w) + 2
+    * 乗算:                   2 * log2(w) + log2(2w) + 3 (圧縮木 + 加算器)
+    * 除算，剰余:             w * (log2(w) + 2)
+    * シフト，可変ビット選択: log2(w)
+    * Lut:                    入力のビット幅 (2^w 要素の可変ビット選択)
+    シフト量が定数のシフトと定数のビット選択，範囲選択，連結の遅延は 0 とする．
+    別の見積もりを用いる場合は op_delay() をオーバーライドする．
+    """
+
+    # 整数型のビット幅
+    INT_WIDTH = 32
+
+    def delay(self, expr):
+        """式の遅延を返す．
+
+        :param Expr expr: 対象の式(もしくは Lut)
+
+        オペランドの遅延は含まない．
+        """
+        if isinstance(expr, OpBase):
+            op_type = expr.op_type
+            if isinstance(expr, BinaryOp):
+                if op_type in (OpType.LSFT, OpType.RSFT) and \
+                   isinstance(expr.operand2, Constant):
+                    return 0
+                width = max(self.__width(expr.operand1),
+                            self.__width(expr.operand2))
+            else:
+                width = self.__width(expr.operand1)
+            return self.op_delay(op_type, width)
+        if isinstance(expr, BitSelect) and \
+           not isinstance(expr.index, Constant):
+            return self.op_delay(OpType.BSEL, self.__width(expr.primary))
+        if isinstance(expr, Lut):
+            return self.op_delay(OpType.BSEL, 1 << self.__width(expr.input))
+        return 0
+
+    def op_delay(self, op_type, width):
+        """演算の遅延を返す．
+
+        :param OpType op_type: 演算の種類
+        :param int width: オペランドのビット幅
+        """
+        lg = DataType.bitlen(width)
+        if op_type in (OpType.NOT, OpType.LNOT,
+                       OpType.AND, OpType.NAND, OpType.OR, OpType.NOR,
+                       OpType.XOR, OpType.XNOR, OpType.LAND, OpType.LOR):
+            return 1
+        if op_type in (OpType.RAND, OpType.RNAND, OpType.ROR, OpType.RNOR,
+                       OpType.RXOR, OpType.RXNOR):
+            return max(1, lg)
+        if op_type in (OpType.ADD, OpType.SUB, OpType.COMPL):
+            return lg + 2
+        if op_type in (OpType.EQ, OpType.NE):
+            return lg + 1
+        if op_type in (OpType.LT, OpType.LE):
+            return lg + 2
+        if op_type == OpType.MUL:
+            return 2 * lg + DataType.bitlen(2 * width) + 3
+        if op_type in (OpType.DIV, OpType.MOD):
+            return width * (lg + 2)
+        return max(1, lg)
+
+    def __width(self, expr):
+        width = Evaluator.bit_width(expr.data_type)
+        if width is None:
+            return DelayModel.INT_WIDTH
+        return width
+
+
+class TimingPath:
+    """クリティカルパスを表すクラス
+
+    :param str kind: 終点の種類('output', 'register', 'instance')
+    :param str end: 終点の名前
+    :param int delay: 遅延
+    :param list[(str, int)] point_list: 経路上の名前と到達時刻のリスト
+
+    point_list は始点から終点の順に並んでおり，名前を持つ
+    ネット，ポート，変数のみを含む．
+    """
+
+    def __init__(self, kind, end, delay, point_list):
+        self.__kind = kind
+        self.__end = end
+        self.__delay = delay
+        self.__point_list = point_list
+
+    @property
+    def kind(self):
+        """終点の種類を返す．"""
+        return self.__kind
+
+    @property
+    def start(self):
+        """始点の名前を返す．"""
+        return self.__point_list[0][0]
+
+    @property
+    def end(self):
+        """終点の名前を返す．"""
+        return self.__end
+
+    @property
+    def delay(self):
+        """遅延を返す．"""
+        return self.__delay
+
+    @property
+    def point_list(self):
+        """経路上の名前と到達時刻のリストを返す．"""
+        return self.__point_list
+
+    def __str__(self):
+        lines = [f'{self.__kind} {self.__end}: {self.__delay}']
+        for name, arrival in self.__point_list:
+            lines.append(f'  {arrival:4d} {name}')
+        return '\n'.join(lines)
+
+
+class TimingAnalyzer:
+    """組み合わせ回路部分の遅延を見積もるクラス
+
+    :param Entity ent: 対象のエンティティ
+    :param DelayModel delay_model: 遅延モデル(省略時は DelayModel())
+
+    始点は駆動元を持たないネット(入力ポート，レジスタの出力，
+    インスタンスの出力)と定数である．
+    終点は出力ポート，クロック付きプロセス(Dff を含む)中の代入文と
+    インスタンスの入力である．
+    ネットの駆動元は継続的代入文の右辺と，組み合わせプロセス中の
+    代入文の右辺およびそれを囲む if 文，case 文の条件式と，
+    Lut の出力の場合は Lut そのもの(入力に依存する)である．
+    クロック付きプロセス中の代入文の終点も条件式を含む．
+    各部分式の到達時刻を一度だけ計算するので計算量は回路の大きさに
+    比例する．組み合わせ回路のループがある場合は例外を送出する．
+    """
+
+    def __init__(self, ent, delay_model=None):
+        if delay_model is None:
+            delay_model = DelayModel()
+        self.__delay_model = delay_model
+        ent.make_names()
+        # ネットの id をキーにして駆動元の式のリストを保持する辞書
+        self.__driver_dict = {}
+        # (種類, 終点の式, 駆動元の式のリスト) のリスト
+        self.__endpoint_list = []
+        for ca in ent.cont_assign_gen:
+            for net in _lhs_net_list(ca.lhs):
+                self.__add_driver(net, [ca.rhs])
+        for port in ent.port_gen:
+            if port.is_output:
+                self.__endpoint_list.append(('output', port, [port]))
+        for item in ent.item_gen:
+            if isinstance(item, ClockedProcess):
+                for lhs, src_list in _assign_list(item):
+                    self.__endpoint_list.append(('register', lhs, src_list))
+            elif isinstance(item, Process):
+                for lhs, src_list in _assign_list(item):
+                    for net in _lhs_net_list(lhs):
+                        self.__add_driver(net, src_list)
+            elif isinstance(item, Inst):
+                for oport, iport in item.port_gen:
+                    if iport.is_input:
+                        self.__endpoint_list.append(('instance', oport,
+                                                     [oport]))
+            elif isinstance(item, Lut):
+                self.__add_driver(item.output, [item])
+
+        # 式の id をキーにして到達時刻を保持する辞書
+        self.__arrival_dict = {}
+        # 式の id をキーにして到達時刻を決めた駆動元を保持する辞書
+        self.__pred_dict = {}
+        self.__levelize()
+
+    @property
+    def max_delay(self):
+        """終点の到達時刻の最大値を返す．"""
+        ans = 0
+        for _, _, src_list in self.__endpoint_list:
+            ans = max(ans, self.__max_arrival(src_list)[0])
+        return ans
+
+    def arrival(self, expr):
+        """式の到達時刻を返す．
+
+        :param Expr expr: 対象の式(エンティティ中の式の部分式)
+        """
+        key = id(expr)
+        if key not in self.__arrival_dict:
+            self.__levelize_sub(expr)
+        return self.__arrival_dict[key]
+
+    def critical_paths(self, n=1):
+        """遅延の大きい順に終点ごとのクリティカルパスを返す．
+
+        :param int n: 求めるパスの数
+        :return: TimingPath のリストを返す．
+        """
+        cand_list = []
+        for pos, (_, _, src_list) in enumerate(self.__endpoint_list):
+            delay, _ = self.__max_arrival(src_list)
+            cand_list.append((delay, -pos))
+        ans = []
+        for delay, neg_pos in heapq.nlargest(n, cand_list):
+            kind, end, src_list = self.__endpoint_list[-neg_pos]
+            _, src = self.__max_arrival(src_list)
+            ans.append(TimingPath(kind, _point_name(end), delay,
+                                  self.__trace(src)))
+        return ans
+
+    def __add_driver(self, net, src_list):
+        key = id(net)
+        if key not in self.__driver_dict:
+            self.__driver_dict[key] = []
+        self.__driver_dict[key].extend(src_list)
+
+    def __src_list(self, expr):
+        """到達時刻を決める駆動元のリストを返す．"""
+        if isinstance(expr, (Net, Port, Var)):
+            return self.__driver_dict.get(id(expr), [])
+        if isinstance(expr, Lut):
+            return [expr.input]
+        if isinstance(expr, _CondNode):
+            return expr.src_list
+        return operand_list(expr)
+
+    def __max_arrival(self, src_list):
+        """到達時刻の最大値とそれを与える式を返す．"""
+        ans = 0
+        ans_src = None
+        for src in src_list:
+            arrival = self.__arrival_dict[id(src)]
+            if ans_src is None or arrival > ans:
+                ans = arrival
+                ans_src = src
+        return ans, ans_src
+
+    def __levelize(self):
+        for _, _, src_list in self.__endpoint_list:
+            for src in src_list:
+                self.__levelize_sub(src)
+
+    def __levelize_sub(self, root):
+        """root に至る全ての式の到達時刻を求める．"""
+        arrival_dict = self.__arrival_dict
+        # 計算途中の式の id の集合(ループの検出用)
+        active = set()
+        stack = [(root, False)]
+        while stack:
+            expr, expanded = stack.pop()
+            key = id(expr)
+            if key in arrival_dict:
+                continue
+            src_list = self.__src_list(expr)
+            if not expanded:
+                pending = [src for src in src_list
+                           if id(src) not in arrival_dict]
+                if pending:
+                    for src in pending:
+                        if id(src) in active:
+                            emsg = 'combinational loop detected at '
+                            emsg += f'{_point_name(src)}'
+                            raise RtlError(emsg)
+                    active.add(key)
+                    stack.append((expr, True))
+                    for src in pending:
+                        stack.append((src, False))
+                    continue
+            active.discard(key)
+            arrival, pred = self.__max_arrival(src_list)
+            arrival_dict[key] = arrival + self.__delay_model.delay(expr)
+            if pred is not None:
+                self.__pred_dict[key] = pred
+
+    def __trace(self, expr):
+        """expr に至るクリティカルパスを始点から順に返す．"""
+        node_list = []
+        while expr is not None:
+            node_list.append(expr)
+            expr = self.__pred_dict.get(id(expr), None)
+        ans = []
+        for pos, node in enumerate(reversed(node_list)):
+            if pos == 0 or isinstance(node, (Net, Port, Var)):
+                ans.append((_point_name(node),
+                            self.__arrival_dict[id(node)]))
+        return ans
+
+
+def _lhs_net_list(lhs):
+    """左辺式に含まれるネットのリストを返す．"""
+    ans = []
+    stack = [lhs]
+    while stack:
+        expr = stack.pop()
+        if isinstance(expr, (BitSelect, PartSelect)):
+            stack.append(expr.primary)
+        elif isinstance(expr, Concat):
+            stack.extend(expr.src_list)
+        else:
+            ans.append(expr)
+    return ans
+
+
+class _CondNode:
+    """if 文，case 文の条件式を表す依存関係のグラフのノード
+
+    条件式と，外側の if 文，case 文のノードに依存する．
+    遅延は 0 である．
+    """
+
+    def __init__(self, cond, parent):
+        self.cond = cond
+        if parent is None:
+            self.src_list = [cond]
+        else:
+            self.src_list = [cond, parent]
+
+
+def _assign_list(proc):
+    """プロセス中の代入文の左辺と，右辺および条件式のリストを返す．
+
+    条件式は最も内側の if 文，case 文のノード(_CondNode)で表す．
+    """
+    ans = []
+    with proc.process_body() as body:
+        stack = [(body, None)]
+    while stack:
+        block, cond_node = stack.pop()
+        for stmt in block.statement_gen:
+            if isinstance(stmt, AssignBase):
+                if cond_node is None:
+                    ans.append((stmt.lhs, [stmt.rhs]))
+                else:
+                    ans.append((stmt.lhs, [stmt.rhs, cond_node]))
+            elif isinstance(stmt, (IfStatement, CaseStatement)):
+                sub_cond_node = _CondNode(stmt.cond, cond_node)
+                for sub_block in sub_block_list(stmt):
+                    stack.append((sub_block, sub_cond_node))
+    return ans
+
+
+def _point_name(expr):
+    """経路上の点の名前を返す．"""
+    if isinstance(expr, (Net, Port, Var)):
+        return expr.name
+    if isinstance(expr, _CondNode):
+        return _point_name(expr.cond)
+    if isinstance(expr, Lut):
+        return _point_name(expr.output)
+    return expr.verilog_str
+
+
+def critical_paths(self, n=1, *, delay_model=None):
+    """遅延の大きい順にクリティカルパスを求める．
+
+    :param int n: 求めるパスの数
+    :param DelayModel delay_model: 遅延モデル(省略時は DelayModel())
+    :return: TimingPath のリストを返す．
+
+    無名のネットには make_names() で名前をつける．
+    詳細は TimingAnalyzer を参照のこと．
+    """
+    return TimingAnalyzer(self, delay_model).critical_paths(n)
+
+
+def logic_depth(self, *, delay_model=None):
+    """組み合わせ回路部分の最大の遅延を返す．
+
+    :param DelayModel delay_model: 遅延モデル(省略時は DelayModel())
+    """
+    return TimingAnalyzer(self, delay_model).max_delay
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.critical_paths = critical_paths
+Entity.logic_depth = logic_depth
@@ -0,0 +1,237 @@
+#! /usr/bin/env python3
+
+"""式とステートメントをたどるための関数群
+
+:file: traverse.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+
+深い式でも再帰の上限にかからないように，全ての関数は明示的な
+スタックを用いて実装している．
+"""
+
+from rtlgen.expr import UnaryOp, BinaryOp
+from rtlgen.expr import BitSelect, PartSelect, Concat, MultiConcat
+from rtlgen.statement import AssignBase, IfStatement, CaseStatement
+from rtlgen.process import Process
+from rtlgen.dff import Dff
+from rtlgen.rtlerror import RtlError
+
+
+def operand_list(expr):
+    """式のオペランドのリストを返す．
+
+    :param Expr expr: 対象の式
+    :return: オペランドのリストを返す．
+
+    ネットや定数の場合は空のリストを返す．
+    """
+    if isinstance(expr, UnaryOp):
+        return [expr.operand1]
+    if isinstance(expr, BinaryOp):
+        return [expr.operand1, expr.operand2]
+    if isinstance(expr, BitSelect):
+        return [expr.primary, expr.index]
+    if isinstance(expr, PartSelect):
+        return [expr.primary]
+    if isinstance(expr, (Concat, MultiConcat)):
+        return list(expr.src_list)
+    return []
+
+
+def clone_expr(expr, opr_list):
+    """オペランドを置き換えた式を作る．
+
+    :param Expr expr: 元の式
+    :param list[Expr] opr_list: 新しいオペランドのリスト
+    :return: 作成した式を返す．
+
+    opr_list は operand_list(expr) と同じ形でなければならない．
+    オペランドが全て同一の場合は expr をそのまま返す．
+    """
+    old_list = operand_list(expr)
+    if len(old_list) != len(opr_list):
+        emsg = 'operand number mismatch'
+        raise RtlError(emsg)
+    if all(old is new for old, new in zip(old_list, opr_list)):
+        return expr
+    if isinstance(expr, UnaryOp):
+        return UnaryOp(expr.op_type, opr_list[0])
+    if isinstance(expr, BinaryOp):
+        return BinaryOp(expr.op_type, opr_list[0], opr_list[1])
+    if isinstance(expr, BitSelect):
+        return BitSelect(opr_list[0], opr_list[1])
+    if isinstance(expr, PartSelect):
+        return PartSelect(opr_list[0], expr.left, expr.right)
+    if isinstance(expr, Concat):
+        return Concat(opr_list)
+    return MultiConcat(expr.rep_num, opr_list)
+
+
+def expr_gen(root_list):
+    """式に含まれる部分式を重複なくたどるジェネレータ
+
+    :param list[Expr] root_list: 根の式のリスト
+
+    各部分式はそのオペランドよりも後に生成される(トポロジカル順)．
+    """
+    visited = set()
+    for root in root_list:
+        stack = [(root, False)]
+        while stack:
+            expr, expanded = stack.pop()
+            if expanded:
+                yield expr
+                continue
+            if id(expr) in visited:
+                continue
+            visited.add(id(expr))
+            stack.append((expr, True))
+            for opr in reversed(operand_list(expr)):
+                if id(opr) not in visited:
+                    stack.append((opr, False))
+
+
+def scc_list(root_list, succ_list):
+    """強連結成分のリストを返す．
+
+    :param list root_list: 探索を始めるノードのリスト
+    :param succ_list: ノードを引数にとり後続のノードのリストを返す関数
+    :return: 強連結成分(ノードのリスト)のリストを返す．
+
+    Tarjan のアルゴリズムを明示的なスタックを用いて実装している．
+    ノードは id() で区別する．
+    強連結成分は後続の強連結成分よりも後に生成される．
+    計算量はノード数と枝数の和に比例する．
+    """
+    ans = []
+    index_dict = {}
+    low_dict = {}
+    scc_stack = []
+    on_stack = set()
+    for root in root_list:
+        if id(root) in index_dict:
+            continue
+        work = [(root, iter(succ_list(root)))]
+        index_dict[id(root)] = low_dict[id(root)] = len(index_dict)
+        scc_stack.append(root)
+        on_stack.add(id(root))
+        while work:
+            node, child_iter = work[-1]
+            key = id(node)
+            for child in child_iter:
+                ckey = id(child)
+                if ckey not in index_dict:
+                    index_dict[ckey] = low_dict[ckey] = len(index_dict)
+                    scc_stack.append(child)
+                    on_stack.add(ckey)
+                    work.append((child, iter(succ_list(child))))
+                    break
+                if ckey in on_stack:
+                    low_dict[key] = min(low_dict[key], index_dict[ckey])
+            else:
+                work.pop()
+                if work:
+                    pkey = id(work[-1][0])
+                    low_dict[pkey] = min(low_dict[pkey], low_dict[key])
+                if low_dict[key] != index_dict[key]:
+                    continue
+                member_list = []
+                while True:
+                    member = scc_stack.pop()
+                    on_stack.discard(id(member))
+                    member_list.append(member)
+                    if member is node:
+                        break
+                ans.append(member_list)
+    return ans
+
+
+def expr_depth(expr):
+    """式の段数を返す．
+
+    :param Expr expr: 対象の式
+
+    ネットや定数の段数は 0 とする．
+    """
+    depth_dict = {}
+    for node in expr_gen([expr]):
+        depth = 0
+        for opr in operand_list(node):
+            depth = max(depth, depth_dict[id(opr)] + 1)
+        depth_dict[id(node)] = depth
+    return depth_dict[id(expr)]
+
+
+def statement_gen(block):
+    """ステートメントブロック中のステートメントを再帰的にたどる
+    ジェネレータ
+
+    :param StatementBlock block: 対象のブロック
+    """
+    stack = [block]
+    while stack:
+        cur_block = stack.pop()
+        for stmt in cur_block.statement_gen:
+            yield stmt
+            for sub_block in reversed(sub_block_list(stmt)):
+                stack.append(sub_block)
+
+
+def sub_block_list(stmt):
+    """ステートメントの直下のブロックのリストを返す．
+
+    :param Statement stmt: 対象のステートメント
+    """
+    if isinstance(stmt, IfStatement):
+        with stmt.then_body() as then_blk:
+            pass
+        with stmt.else_body() as else_blk:
+            pass
+        return [then_blk, else_blk]
+    if isinstance(stmt, CaseStatement):
+        ans = [block for _, block in stmt.case_gen]
+        default_body = stmt.default_body()
+        if default_body is not None:
+            with default_body as default_blk:
+                ans.append(default_blk)
+        return ans
+    return []
+
+
+def process_gen(ent):
+    """エンティティ中のプロセスをたどるジェネレータ
+
+    :param Entity ent: 対象のエンティティ
+    """
+    for item in ent.item_gen:
+        if isinstance(item, Process):
+            yield item
+
+
+def expr_root_list(ent):
+    """エンティティ中の式の根とその置き換え関数のリストを返す．
+
+    :param Entity ent: 対象のエンティティ
+    :return: (式, 置き換え関数) のリストを返す．
+
+    対象は継続的代入文の右辺，プロセス中の代入文の右辺と
+    if 文，case 文の条件式である．
+    置き換え関数は新しい式を引数にとる．
+    Dff のデータ入力の代入文の置き換え関数は Dff.set_data_in() とし，
+    Dff.data_in も合わせて置き換える．
+    """
+    ans = []
+    for ca in ent.cont_assign_gen:
+        ans.append((ca.rhs, ca.set_rhs))
+    for proc in process_gen(ent):
+        with proc.process_body() as body:
+            for stmt in statement_gen(body):
+                if isinstance(stmt, AssignBase):
+                    if isinstance(proc, Dff) and stmt.rhs is proc.data_in:
+                        ans.append((stmt.rhs, proc.set_data_in))
+                    else:
+                        ans.append((stmt.rhs, stmt.set_rhs))
+                elif isinstance(stmt, (IfStatement, CaseStatement)):
+                    ans.append((stmt.cond, stmt.set_cond))
+    return ans
@@ -31,10 +31,11 @@ class VerilogWriter(WriterBase):
 
     :param fout: 出力先のファイルオブジェクト(名前付きの引数)
     :type fout: file_object
+    :param str output_dir: 付随するファイルの出力先(名前付きのオプション引数)
     """
 
-    def __init__(self, *, fout):
-        super().__init__(fout=fout)
+    def __init__(self, *, fout, output_dir=None):
+        super().__init__(fout=fout, output_dir=output_dir)
 
     def __call__(self, entity):
         """Entity の内容を出力する.
@@ -170,12 +171,16 @@ def item_mgr_gen_verilog(item_mgr, writer):
 ItemMgr.gen_verilog = item_mgr_gen_verilog
 
 
-def write_verilog(self, *, fout=None):
+def write_verilog(self, *, fout=None, output_dir=None):
     """内容を Verilog-HDL 形式で出力する．
 
     :param file_object fout: 出力先のファイルオブジェクト
+    :param str output_dir: 付随するファイルの出力先ディレクトリ
+
+    ROM モードの Lut を含む場合，fout が通常のファイルでなければ
+    output_dir を指定する必要がある．
     """
-    vw = VerilogWriter(fout=fout)
+    vw = VerilogWriter(fout=fout, output_dir=output_dir)
     vw(self)
 
 
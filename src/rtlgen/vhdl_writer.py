@@ -16,10 +16,11 @@ class VhdlWriter(WriterBase):
 
     :param fout: 出力先のファイルオブジェクト
     :type: fout file_object
+    :param str output_dir: 付随するファイルの出力先(名前付きのオプション引数)
     """
 
-    def __init__(self, *, fout):
-        super().__init__(fout=fout)
+    def __init__(self, *, fout, output_dir=None):
+        super().__init__(fout=fout, output_dir=output_dir)
 
     def __call__(self, entity):
         """Entity の内容を出力する.
@@ -96,6 +97,10 @@ class VhdlWriter(WriterBase):
                 lines.append(line)
             self.write_lines(lines, end=';')
 
+            # 要素固有の宣言の出力
+            for item in entity.item_gen:
+                item.gen_vhdl_decl(self)
+
         # アーキテクチャ記述の本体
         with SimpleBlock(self, 'begin',
                          f'end architecture {arch_name};'):
@@ -131,12 +136,16 @@ class VhdlWriter(WriterBase):
         return None
 
 
-def write_vhdl(self, *, fout=None):
+def write_vhdl(self, *, fout=None, output_dir=None):
     """内容を VHDL 形式で出力する．
 
     :param file_object fout: 出力先のファイルオブジェクト
+    :param str output_dir: 付随するファイルの出力先ディレクトリ
+
+    ROM モードの Lut を含む場合，fout が通常のファイルでなければ
+    output_dir を指定する必要がある．
     """
-    vw = VhdlWriter(fout=fout)
+    vw = VhdlWriter(fout=fout, output_dir=output_dir)
     vw(self)
 
 
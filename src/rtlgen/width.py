@@ -0,0 +1,553 @@
+#! /usr/bin/env python3
+
+"""値の範囲からビット幅を推論して縮小するクラス
+
+:file: width.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.entity_mgr import EntityMgr
+from rtlgen.data_type import DataType
+from rtlgen.expr import UnaryOp, BinaryOp, BitSelect, PartSelect, Concat
+from rtlgen.expr import Constant, OpType, REDUCTION_OP_SET
+from rtlgen.net import Net
+from rtlgen.cont_assign import ContAssign
+from rtlgen.port import Port
+from rtlgen.process import ClockedProcess
+from rtlgen.inst import Inst
+from rtlgen.lut import Lut
+from rtlgen.statement import AssignBase
+from rtlgen.evaluator import Evaluator
+from rtlgen.traverse import operand_list, clone_expr, expr_gen
+from rtlgen.traverse import statement_gen, process_gen, expr_root_list
+from rtlgen.rtlerror import RtlError
+
+
+# 結果がビットとなる二項演算子の集合
+_BOOL_OP_SET = frozenset([OpType.EQ, OpType.NE, OpType.LT, OpType.LE,
+                          OpType.LAND, OpType.LOR])
+
+# 結果の下位ビットがオペランドの下位ビットのみで決まる二項演算子の集合
+_LOW_BIT_OP_SET = frozenset([OpType.ADD, OpType.SUB, OpType.MUL,
+                             OpType.AND, OpType.OR, OpType.XOR,
+                             OpType.LSFT])
+
+# オペランドの値のみで結果が決まる二項演算子の集合
+_VALUE_OP_SET = frozenset([OpType.DIV, OpType.MOD, OpType.RSFT,
+                           OpType.EQ, OpType.NE, OpType.LT, OpType.LE])
+
+# 上位の0を無視できる単項演算子の集合
+_ZERO_SAFE_OP_SET = frozenset([OpType.ROR, OpType.RNOR,
+                               OpType.RXOR, OpType.RXNOR,
+                               OpType.LNOT])
+
+
+class RangeAnalyzer:
+    """式の値の範囲を求めるクラス
+
+    :param Entity ent: 対象のエンティティ
+
+    ビット型と符号なしのビットベクタ型の式について，とりうる値の
+    範囲 (最小値, 最大値) を定数，ネットを駆動する継続的代入文，
+    範囲選択，連結，比較演算，算術演算を通して伝搬させる．
+    桁あふれの可能性がある場合はデータ型の全範囲とする．
+    範囲の求まらない型の式は None となる．
+    ネットを1つの継続的代入文で駆動している場合は右辺の範囲を用いる．
+    """
+
+    def __init__(self, ent):
+        self.__index = ent.signal_index
+        # 式の id をキーにして範囲を保持する辞書
+        self.__range_dict = {}
+        # 式の id をキーにして解析時のビット幅を保持する辞書
+        self.__width_dict = {}
+        # 範囲を求めた順(トポロジカル順)の式のリスト
+        self.__expr_list = []
+
+    @property
+    def expr_list(self):
+        """範囲を求めた式のリストを返す．
+
+        各式はそのオペランド(ネットの場合は駆動する式)よりも後に現れる．
+        """
+        return self.__expr_list
+
+    def driver(self, net):
+        """ネットを駆動する継続的代入文を返す．
+
+        :param Expr net: 対象のネット
+        :return: ネット全体を1つの継続的代入文で駆動している場合は
+                 その継続的代入文を返す．それ以外は None を返す．
+        """
+        driver_list = self.__index.driver_list(net)
+        if len(driver_list) != 1:
+            return None
+        ca = driver_list[0]
+        if not isinstance(ca, ContAssign) or ca.lhs is not net:
+            return None
+        return ca
+
+    def width(self, expr):
+        """解析時の式のビット幅を返す．
+
+        :param Expr expr: 対象の式
+        """
+        self.value_range(expr)
+        return self.__width_dict[id(expr)]
+
+    def value_range(self, root):
+        """式のとりうる値の範囲を返す．
+
+        :param Expr root: 対象の式
+        :return: (最小値, 最大値) のタプルを返す．
+                 範囲の求まらない場合は None を返す．
+        """
+        range_dict = self.__range_dict
+        # 展開中の式の id の集合
+        active_set = set()
+        stack = [(root, False)]
+        while stack:
+            expr, expanded = stack.pop()
+            key = id(expr)
+            if key in range_dict:
+                continue
+            src_list = self.__src_list(expr)
+            if not expanded:
+                if key in active_set:
+                    emsg = 'combinational loop detected'
+                    raise RtlError(emsg)
+                pending = [src for src in src_list
+                           if id(src) not in range_dict]
+                if pending:
+                    active_set.add(key)
+                    stack.append((expr, True))
+                    for src in pending:
+                        stack.append((src, False))
+                    continue
+            active_set.discard(key)
+            src_range_list = [range_dict[id(src)] for src in src_list]
+            self.__width_dict[key] = Evaluator.bit_width(expr.data_type)
+            range_dict[key] = self.__calc_range(expr, src_range_list)
+            self.__expr_list.append(expr)
+        return range_dict[id(root)]
+
+    def __src_list(self, expr):
+        if isinstance(expr, Net):
+            ca = self.driver(expr)
+            if ca is not None:
+                return [ca.rhs]
+            return []
+        return operand_list(expr)
+
+    def __calc_range(self, expr, src_range_list):
+        """オペランドの範囲から式の範囲を求める．"""
+        data_type = expr.data_type
+        width = Evaluator.bit_width(data_type)
+        if _is_unsigned(data_type):
+            full = (0, (1 << width) - 1)
+        else:
+            full = None
+        if isinstance(expr, Constant):
+            val = expr.value
+            if width is None:
+                if val < 0:
+                    return None
+                return (val, val)
+            if full is None:
+                return None
+            val &= full[1]
+            return (val, val)
+        if isinstance(expr, UnaryOp):
+            if expr.op_type in REDUCTION_OP_SET or \
+               expr.op_type == OpType.LNOT:
+                return (0, 1)
+            return full
+        if isinstance(expr, BinaryOp):
+            if expr.op_type in _BOOL_OP_SET:
+                return (0, 1)
+            if full is None:
+                return None
+            range1, range2 = src_range_list
+            if range1 is None or range2 is None:
+                return full
+            return _clip(_binary_range(expr.op_type, range1, range2, width),
+                         full)
+        if isinstance(expr, BitSelect):
+            return (0, 1)
+        if isinstance(expr, PartSelect):
+            src_range = src_range_list[0]
+            if expr.left < expr.right or src_range is None:
+                return full
+            lo, hi = src_range
+            if hi >> (expr.left + 1) != 0:
+                return full
+            return (lo >> expr.right, hi >> expr.right)
+        if isinstance(expr, Concat):
+            lo = 0
+            hi = 0
+            for src, src_range in zip(expr.src_list, src_range_list):
+                src_width = Concat.src_size(src)
+                src_mask = (1 << src_width) - 1
+                if src_range is None or src_range[1] > src_mask:
+                    src_range = (0, src_mask)
+                lo = (lo << src_width) + src_range[0]
+                hi = (hi << src_width) + src_range[1]
+            return (lo, hi)
+        if src_range_list:
+            # ネットを駆動する式
+            return _clip(src_range_list[0], full)
+        return full
+
+
+class WidthNarrower:
+    """値の範囲からビット幅を推論して縮小するクラス
+
+    :param Entity ent: 対象のエンティティ
+
+    RangeAnalyzer で求めた値の範囲をもとに以下の縮小を行う．
+
+    * 1つの継続的代入文で駆動される符号なしのビットベクタ型の
+      ネットを値を表すのに必要なビット幅に縮小する．
+    * 桁あふれしない ADD, SUB, MUL, AND, OR, XOR, LSFT と
+      DIV, MOD, RSFT, 比較演算をオペランドの必要なビット幅で計算する．
+
+    縮小した式を元のビット幅で参照する箇所には0拡張(連結)を挿入し，
+    オペランドを切り詰める場合は範囲選択を用いる．
+    縮小したネットの定数のビット選択，範囲選択は縮小後のネットに
+    対するものに置き換える．
+    プロセスやインスタンス，LUT から直接参照されるネットや
+    可変のビット選択の対象となるネットは縮小しない．
+    符号付きの型は対象としない．
+    """
+
+    def __init__(self, ent):
+        self.__ent = ent
+        self.__analyzer = RangeAnalyzer(ent)
+        # 式の id をキーにして新しい式を保持する辞書
+        self.__new_dict = {}
+        # 縮小したネットの継続的代入文の id をキーにして新しい右辺を保持する辞書
+        self.__update_dict = {}
+        self.__saved_bits = 0
+
+    @property
+    def saved_bits(self):
+        """削減したビット数を返す．
+
+        縮小したネットのビット数と縮小した演算のビット数の合計である．
+        """
+        return self.__saved_bits
+
+    def run(self):
+        """ビット幅を縮小する．
+
+        :return: 削減したビット数を返す．
+        """
+        ent = self.__ent
+        analyzer = self.__analyzer
+        root_list = expr_root_list(ent)
+        for expr, _ in root_list:
+            analyzer.value_range(expr)
+        self.__fixed_set = self.__fixed_expr_set(root_list)
+        # ネットのデータ型は順に書き換えるので元のビット幅は
+        # analyzer.width() で得る．
+        for expr in analyzer.expr_list:
+            self.__new_dict[id(expr)] = self.__narrow(expr)
+
+        for ca in ent.cont_assign_gen:
+            if id(ca) in self.__update_dict:
+                ca.set_rhs(self.__update_dict[id(ca)])
+                continue
+            new_rhs = self.__full(ca.rhs)
+            if new_rhs is not ca.rhs:
+                ca.set_rhs(new_rhs)
+        for expr, setter in root_list[ent.cont_assign_num:]:
+            new_expr = self.__full(expr)
+            if new_expr is not expr:
+                setter(new_expr)
+        return self.__saved_bits
+
+    def __fixed_expr_set(self, root_list):
+        """ビット幅を変えてはならない式の id の集合を返す．"""
+        ans = set()
+
+        def add_all(expr):
+            for expr1 in expr_gen([expr]):
+                ans.add(id(expr1))
+
+        for expr in expr_gen([expr for expr, _ in root_list]):
+            if isinstance(expr, BitSelect):
+                if not isinstance(expr.primary, Net) or \
+                   not isinstance(expr.index, Constant):
+                    ans.add(id(expr.primary))
+            elif isinstance(expr, PartSelect):
+                if not isinstance(expr.primary, Net) or \
+                   expr.left < expr.right:
+                    ans.add(id(expr.primary))
+        for ca in self.__ent.cont_assign_gen:
+            if self.__analyzer.driver(ca.lhs) is not ca:
+                add_all(ca.lhs)
+        for proc in process_gen(self.__ent):
+            with proc.process_body() as body:
+                for stmt in statement_gen(body):
+                    if isinstance(stmt, AssignBase):
+                        add_all(stmt.lhs)
+            if isinstance(proc, ClockedProcess):
+                add_all(proc.clock)
+                if proc.asyncctl is not None:
+                    add_all(proc.asyncctl)
+        for item in self.__ent.item_gen:
+            if isinstance(item, Inst):
+                for oexpr, _ in item.port_gen:
+                    add_all(oexpr)
+            elif isinstance(item, Lut):
+                add_all(item.input)
+                add_all(item.output)
+        return ans
+
+    def __narrow(self, expr):
+        """縮小した式を返す．"""
+        if isinstance(expr, Net):
+            self.__narrow_net(expr)
+            return expr
+        if isinstance(expr, UnaryOp):
+            if expr.op_type in _ZERO_SAFE_OP_SET and \
+               _is_unsigned(expr.operand1.data_type):
+                return clone_expr(expr, [self.__new(expr.operand1)])
+        elif isinstance(expr, BinaryOp):
+            new_expr = self.__narrow_binary(expr)
+            if new_expr is not None:
+                return new_expr
+            if expr.op_type in (OpType.LAND, OpType.LOR):
+                return clone_expr(expr, [self.__new(opr)
+                                         for opr in operand_list(expr)])
+        elif isinstance(expr, BitSelect):
+            primary = expr.primary
+            if isinstance(primary, Net):
+                if isinstance(expr.index, Constant) and \
+                   expr.index.value >= self.__cur_width(primary):
+                    return Constant(data_type=DataType.bit_type(), val=0)
+                # 縮小したネットはそのまま参照する．
+                return clone_expr(expr, [primary, self.__full(expr.index)])
+        elif isinstance(expr, PartSelect):
+            primary = expr.primary
+            if isinstance(primary, Net) and expr.left >= expr.right:
+                return self.__narrow_part_select(expr)
+        return clone_expr(expr, [self.__full(opr)
+                                 for opr in operand_list(expr)])
+
+    def __narrow_net(self, net):
+        """ネットのビット幅を縮小する．"""
+        ca = self.__analyzer.driver(net)
+        if ca is None or id(net) in self.__fixed_set or \
+           not net.data_type.is_bitvector_type:
+            return
+        width = self.__analyzer.width(net)
+        _, hi = self.__analyzer.value_range(net)
+        new_width = _bit_num(hi)
+        new_rhs = self.__new(ca.rhs)
+        fit_rhs = _fit(new_rhs, new_width)
+        if fit_rhs is None:
+            new_width = self.__cur_width(new_rhs)
+            fit_rhs = new_rhs
+        if new_width >= width:
+            return
+        net.set_data_type(DataType.bitvector_type(new_width))
+        self.__update_dict[id(ca)] = fit_rhs
+        self.__saved_bits += width - new_width
+
+    def __narrow_binary(self, expr):
+        """二項演算を縮小する．
+
+        縮小できない場合は None を返す．
+        """
+        op_type = expr.op_type
+        if op_type not in _LOW_BIT_OP_SET and op_type not in _VALUE_OP_SET:
+            return None
+        if id(expr) in self.__fixed_set:
+            return None
+        opr1 = expr.operand1
+        opr2 = expr.operand2
+        analyzer = self.__analyzer
+        if op_type in (OpType.LSFT, OpType.RSFT):
+            fit_list = [opr1]
+        else:
+            fit_list = [opr1, opr2]
+        if not all(_is_unsigned(opr.data_type) for opr in fit_list):
+            return None
+        if op_type == OpType.DIV and analyzer.value_range(opr2)[0] == 0:
+            # 0 除算の結果はビット幅に依存する．
+            return None
+        width = max(analyzer.width(opr) for opr in fit_list)
+        if op_type in _LOW_BIT_OP_SET:
+            new_width = _bit_num(analyzer.value_range(expr)[1])
+        else:
+            new_width = max(_bit_num(analyzer.value_range(opr)[1])
+                            for opr in fit_list)
+        new_list = [self.__new(opr) for opr in fit_list]
+        for new_opr in new_list:
+            if _fit(new_opr, new_width) is None:
+                new_width = max(new_width, self.__cur_width(new_opr))
+        if new_width >= width:
+            return None
+        opr_list = [_fit(new_opr, new_width) for new_opr in new_list]
+        if len(opr_list) == 1:
+            opr_list.append(self.__new(opr2))
+        self.__saved_bits += width - new_width
+        return BinaryOp(op_type, *opr_list)
+
+    def __narrow_part_select(self, expr):
+        """縮小したネットの範囲選択を作る．"""
+        primary = expr.primary
+        width = self.__cur_width(primary)
+        left = expr.left
+        right = expr.right
+        if left < width:
+            return expr
+        if right >= width:
+            return Constant(data_type=expr.data_type, val=0)
+        pad_type = DataType.bitvector_type(left - width + 1)
+        return Concat([Constant(data_type=pad_type, val=0),
+                       PartSelect(primary, width - 1, right)])
+
+    def __new(self, expr):
+        """縮小した式を返す．"""
+        return self.__new_dict[id(expr)]
+
+    def __full(self, expr):
+        """元のビット幅に拡張した縮小した式を返す．"""
+        new_expr = self.__new(expr)
+        width = self.__analyzer.width(expr)
+        if width is None or self.__cur_width(new_expr) >= width:
+            return new_expr
+        return _fit(new_expr, width)
+
+    @staticmethod
+    def __cur_width(expr):
+        """現在のビット幅を返す．"""
+        return Evaluator.bit_width(expr.data_type)
+
+
+def _is_unsigned(data_type):
+    """ビット型か符号なしのビットベクタ型の時 True を返す．"""
+    return data_type.is_bit_type or data_type.is_bitvector_type
+
+
+def _bit_num(val):
+    """val を表すのに必要なビット数を返す．"""
+    return max(1, val.bit_length())
+
+
+def _clip(expr_range, full):
+    """桁あふれする場合は全範囲にする．"""
+    if full is None:
+        return None
+    if expr_range is None:
+        return full
+    lo, hi = expr_range
+    if lo < 0 or hi > full[1]:
+        return full
+    return expr_range
+
+
+def _binary_range(op_type, range1, range2, width):
+    """二項演算の値の範囲を求める．
+
+    :param int width: 結果のビット幅
+
+    桁あふれは考慮しない．求まらない場合は None を返す．
+    """
+    lo1, hi1 = range1
+    lo2, hi2 = range2
+    if op_type == OpType.ADD:
+        return (lo1 + lo2, hi1 + hi2)
+    if op_type == OpType.SUB:
+        return (lo1 - hi2, hi1 - lo2)
+    if op_type == OpType.MUL:
+        return (lo1 * lo2, hi1 * hi2)
+    if op_type == OpType.AND:
+        return (0, min(hi1, hi2))
+    if op_type in (OpType.OR, OpType.XOR):
+        hi = (1 << max(hi1.bit_length(), hi2.bit_length())) - 1
+        if op_type == OpType.OR:
+            return (max(lo1, lo2), hi)
+        return (0, hi)
+    if op_type == OpType.DIV:
+        if lo2 == 0:
+            return None
+        return (lo1 // hi2, hi1 // lo2)
+    if op_type == OpType.MOD:
+        if lo2 == 0:
+            return (0, hi1)
+        return (0, min(hi1, hi2 - 1))
+    if op_type == OpType.LSFT:
+        if hi1 == 0:
+            return (0, 0)
+        if hi2 >= width:
+            # 巨大な整数を作らないように全範囲とする．
+            return None
+        return (lo1 << lo2, hi1 << hi2)
+    if op_type == OpType.RSFT:
+        return (lo1 >> hi2, hi1 >> lo2)
+    return None
+
+
+def _fit(expr, width):
+    """式をちょうど width ビットにする．
+
+    拡張は上位に0を連結し，切り詰めは範囲選択で行う．
+    切り詰められない場合は None を返す．
+    """
+    cur_width = Evaluator.bit_width(expr.data_type)
+    if cur_width == width:
+        return expr
+    if isinstance(expr, Constant):
+        val = expr.value & ((1 << width) - 1)
+        return Constant(data_type=DataType.bitvector_type(width), val=val)
+    if cur_width < width:
+        pad_type = DataType.bitvector_type(width - cur_width)
+        return Concat([Constant(data_type=pad_type, val=0), expr])
+    if isinstance(expr, (Net, Port)):
+        return PartSelect(expr, width - 1, 0)
+    if isinstance(expr, Concat):
+        # 上位の0の定数を取り除く．
+        src_list = list(expr.src_list)
+        while len(src_list) > 1 and isinstance(src_list[0], Constant) and \
+              src_list[0].value == 0:
+            cur_width -= Concat.src_size(src_list[0])
+            del src_list[0]
+            if cur_width <= width:
+                if len(src_list) == 1:
+                    return _fit(src_list[0], width)
+                return _fit(Concat(src_list), width)
+    return None
+
+
+def narrow_width(self):
+    """値の範囲からネットと演算のビット幅を縮小する．
+
+    :return: 削減したビット数を返す．
+
+    詳細は WidthNarrower を参照のこと．
+    """
+    narrower = WidthNarrower(self)
+    return narrower.run()
+
+
+def mgr_narrow_width(self, top):
+    """top から使われている全てのエンティティのビット幅を縮小する．
+
+    :param Entity top: 最上位のエンティティ
+    :return: エンティティ名をキーにして削減したビット数を保持する辞書を返す．
+    """
+    ans = {}
+    for ent in EntityMgr.get_entity_list(top):
+        ans[ent.name] = narrow_width(ent)
+    return ans
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.narrow_width = narrow_width
+# EntityMgr にメンバ関数(インスタンスメソッド)を追加する．
+EntityMgr.narrow_width = mgr_narrow_width
@@ -7,6 +7,7 @@
 :copyright: (C) 2021 Yusuke Matsunaga, All rights reserved.
 """
 
+import os
 import sys
 
 
@@ -56,14 +57,33 @@ class WriterBase:
 
     :param fout: 出力先(名前付き引数)
     :type fout: file_object
+    :param str output_dir: 付随するファイルの出力先ディレクトリ(名前付き引数)
+
+    output_dir はメモリ初期化ファイルのように HDL 記述とは別に
+    出力されるファイルの置き場所を表す．
+    省略された場合，fout が通常のファイルならそのファイルと同じディレクトリ，
+    そうでなければ(標準出力や StringIO の場合) None となる．
     """
 
-    def __init__(self, *, fout):
+    def __init__(self, *, fout, output_dir=None):
         if fout is None:
             fout = sys.stdout
         self.__fout = fout
         self.__indent = 0
         self.__suspended = False
+        if output_dir is None:
+            fname = getattr(fout, 'name', None)
+            if isinstance(fname, str) and os.path.isfile(fname):
+                output_dir = os.path.dirname(os.path.abspath(fname))
+        self.__output_dir = output_dir
+
+    @property
+    def output_dir(self):
+        """付随するファイルの出力先ディレクトリを返す．
+
+        定まらない場合は None を返す．
+        """
+        return self.__output_dir
 
     def write_line(self, line, *, no_nl=False):
         """一行分の出力を行う．
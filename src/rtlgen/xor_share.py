@@ -0,0 +1,343 @@
+#! /usr/bin/env python3
+
+"""XOR の共通部分を括り出すクラス
+
+:file: xor_share.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen.entity import Entity
+from rtlgen.expr import Expr, OpType, BinaryOp
+from rtlgen.expr import Constant, BitSelect, PartSelect
+from rtlgen.traverse import operand_list, clone_expr, expr_gen
+from rtlgen.traverse import expr_root_list
+
+
+class XorSharer:
+    """XOR の共通部分を括り出すクラス
+
+    :param Entity ent: 対象のエンティティ
+
+    XOR のみからなる部分 DAG (クラスタ)を取り出し，各クラスタを
+    葉の変数の GF(2) 上の線形結合(行列の1行)で表す．
+    この行列に対して Paar のアルゴリズムを適用し，2つ以上の行に
+    現れる変数の対を新しいネットとして括り出す．
+    残りの変数は Expr.reduce() で平衡な XOR 木にする．
+
+    クラスタの根は継続的代入文やステートメントの式の根か，XOR 以外の
+    親を持つ XOR 演算である．葉のデータ型が根と異なるクラスタは
+    ビット幅の扱いが変わらないように対象外とする．
+    """
+
+    def __init__(self, ent):
+        self.__ent = ent
+        self.__root_list = expr_root_list(ent)
+        # クラスタの根の id をキーにして (データ型, 葉のキーのリスト) を
+        # 保持する辞書
+        self.__cluster_dict = {}
+        # 葉のキーをキーにして式を保持する辞書
+        self.__leaf_dict = {}
+        # クラスタの内部の XOR 演算の id の集合
+        self.__inner_set = set()
+        self.__before = 0
+        self.__after = 0
+        self.__shared = 0
+
+    def run(self):
+        """最適化を行う．
+
+        :return: XOR 演算の数の変化などを表す辞書を返す．
+        """
+        self.__find_clusters()
+        # データ型ごとに行列を作る．
+        group_list = []
+        for root_id, (data_type, leaf_list) in self.__cluster_dict.items():
+            for group_type, row_list in group_list:
+                if group_type == data_type:
+                    row_list.append((root_id, leaf_list))
+                    break
+            else:
+                group_list.append((data_type, [(root_id, leaf_list)]))
+
+        # クラスタの根の id をキーにして (列の定義のリスト, 行) を保持する辞書
+        self.__row_dict = {}
+        for data_type, row_list in group_list:
+            self.__optimize(data_type, row_list)
+
+        if self.__after < self.__before:
+            self.__rebuild()
+        else:
+            self.__after = self.__before
+            self.__shared = 0
+        return self.report
+
+    @property
+    def report(self):
+        """XOR 演算の数の変化などを表す辞書を返す．
+
+        * 'before': 最適化前の2入力 XOR の数
+        * 'after':  最適化後の2入力 XOR の数
+        * 'shared': 括り出したネットの数
+        * 'clusters': クラスタの数
+        """
+        return {
+            'before': self.__before,
+            'after': self.__after,
+            'shared': self.__shared,
+            'clusters': len(self.__cluster_dict),
+        }
+
+    def __find_clusters(self):
+        """クラスタを求める．"""
+        root_expr_list = [expr for expr, _ in self.__root_list]
+        node_list = list(expr_gen(root_expr_list))
+        # XOR 以外の親を持つ(か式の根である) XOR 演算がクラスタの根となる．
+        root_set = set()
+        for expr in root_expr_list:
+            if self.__is_xor(expr):
+                root_set.add(id(expr))
+        for node in node_list:
+            if self.__is_xor(node):
+                continue
+            for opr in operand_list(node):
+                if self.__is_xor(opr):
+                    root_set.add(id(opr))
+        xor_set = set()
+        skip_set = set()
+        for node in node_list:
+            if id(node) not in root_set:
+                continue
+            leaf_list = self.__flatten(node)
+            if leaf_list is None:
+                self.__collect_xor(node, skip_set)
+                continue
+            self.__cluster_dict[id(node)] = (node.data_type, leaf_list)
+            self.__collect_xor(node, xor_set)
+        self.__before = len(xor_set)
+        self.__inner_set = xor_set - skip_set - set(self.__cluster_dict)
+
+    @staticmethod
+    def __is_xor(expr):
+        return isinstance(expr, BinaryOp) and expr.op_type == OpType.XOR
+
+    def __flatten(self, root):
+        """クラスタの葉の集合を求める．
+
+        同じ葉に至る経路が偶数本の場合は打ち消し合う．
+        葉のデータ型が根と異なる場合は None を返す．
+        """
+        order = [node for node in self.__xor_gen(root)]
+        parity = {id(root): 1}
+        leaf_parity = {}
+        # 根から順に経路数の偶奇を伝搬させる．
+        for node in reversed(order):
+            p = parity.get(id(node), 0)
+            for opr in (node.operand1, node.operand2):
+                if self.__is_xor(opr):
+                    parity[id(opr)] = parity.get(id(opr), 0) ^ p
+                else:
+                    if opr.data_type != root.data_type:
+                        return None
+                    key = self.__leaf_key(opr)
+                    if key not in self.__leaf_dict:
+                        self.__leaf_dict[key] = opr
+                    leaf_parity[key] = leaf_parity.get(key, 0) ^ p
+        return [key for key, p in leaf_parity.items() if p]
+
+    @staticmethod
+    def __leaf_key(expr):
+        """葉を識別するキーを返す．
+
+        定数の位置のビット選択と範囲選択は別々に作られることが多いので
+        対象の式と位置で識別する．
+        """
+        if isinstance(expr, BitSelect) and isinstance(expr.index, Constant):
+            return ('bit', id(expr.primary), expr.index.value)
+        if isinstance(expr, PartSelect):
+            return ('part', id(expr.primary), expr.left, expr.right)
+        return id(expr)
+
+    def __xor_gen(self, root):
+        """root から XOR 演算のみをたどって，オペランドが先になる順で
+        XOR 演算を生成する．"""
+        visited = set()
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                yield node
+                continue
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+            stack.append((node, True))
+            for opr in (node.operand1, node.operand2):
+                if self.__is_xor(opr) and id(opr) not in visited:
+                    stack.append((opr, False))
+
+    def __collect_xor(self, root, xor_set):
+        for node in self.__xor_gen(root):
+            xor_set.add(id(node))
+
+    def __optimize(self, data_type, row_list):
+        """Paar のアルゴリズムで共通の変数の対を括り出す．
+
+        :param DataType data_type: データ型
+        :param list row_list: (クラスタの根の id, 葉の id のリスト) のリスト
+        """
+        # 列は変数 ('leaf', 葉のキー) か，2つの列の XOR ('pair', i, j) である．
+        col_def_list = []
+        col_dict = {}
+        rows = []
+        for _, leaf_list in row_list:
+            row = set()
+            for leaf_id in leaf_list:
+                if leaf_id not in col_dict:
+                    col_dict[leaf_id] = len(col_def_list)
+                    col_def_list.append(('leaf', leaf_id))
+                row.add(col_dict[leaf_id])
+            rows.append(row)
+        # 列ごとに現れる行の集合
+        col_rows = [set() for _ in col_def_list]
+        for r, row in enumerate(rows):
+            for c in row:
+                col_rows[c].add(r)
+        # 列の対ごとの出現数
+        pair_count = {}
+        for row in rows:
+            col_list = sorted(row)
+            for x in range(len(col_list)):
+                i = col_list[x]
+                for y in range(x + 1, len(col_list)):
+                    key = (i, col_list[y])
+                    pair_count[key] = pair_count.get(key, 0) + 1
+        # 出現数ごとの対の集合(出現数が2以上のもののみ)
+        # 挿入順で選ぶために値を持たない辞書を用いる．
+        bucket_list = [{} for _ in range(len(rows) + 1)]
+        for key, cnt in pair_count.items():
+            if cnt >= 2:
+                bucket_list[cnt][key] = None
+
+        def update(i, j, delta):
+            key = (i, j) if i < j else (j, i)
+            old_cnt = pair_count.get(key, 0)
+            cnt = old_cnt + delta
+            if cnt == 0:
+                del pair_count[key]
+            else:
+                pair_count[key] = cnt
+            if old_cnt >= 2:
+                del bucket_list[old_cnt][key]
+            if cnt >= 2:
+                bucket_list[cnt][key] = None
+
+        max_cnt = len(rows)
+        while True:
+            while max_cnt >= 2 and not bucket_list[max_cnt]:
+                max_cnt -= 1
+            if max_cnt < 2:
+                break
+            i, j = next(iter(bucket_list[max_cnt]))
+            k = len(col_def_list)
+            col_def_list.append(('pair', i, j))
+            col_rows.append(set())
+            for r in col_rows[i] & col_rows[j]:
+                row = rows[r]
+                row.discard(i)
+                row.discard(j)
+                update(i, j, -1)
+                for v in row:
+                    update(i, v, -1)
+                    update(j, v, -1)
+                for v in row:
+                    update(k, v, 1)
+                row.add(k)
+                col_rows[i].discard(r)
+                col_rows[j].discard(r)
+                col_rows[k].add(r)
+            self.__shared += 1
+            self.__after += 1
+
+        for (root_id, _), row in zip(row_list, rows):
+            if row:
+                self.__after += len(row) - 1
+            self.__row_dict[root_id] = (data_type, col_def_list, sorted(row))
+
+    def __rebuild(self):
+        """最適化結果に従って式を作り直す．"""
+        # 列の定義のリストの id と列番号の対をキーにして式を保持する辞書
+        col_expr_dict = {}
+        new_dict = {}
+        root_expr_list = [expr for expr, _ in self.__root_list]
+        for node in expr_gen(root_expr_list):
+            key = id(node)
+            if key in self.__inner_set:
+                continue
+            if key in self.__row_dict:
+                data_type, col_def_list, row = self.__row_dict[key]
+                src_list = [self.__col_expr(col_def_list, c, data_type,
+                                            col_expr_dict, new_dict)
+                            for c in row]
+                if src_list:
+                    new_dict[key] = Expr.reduce(OpType.XOR, src_list)
+                else:
+                    new_dict[key] = Expr.make_constant(data_type=data_type,
+                                                       val=0)
+                continue
+            new_dict[key] = clone_expr(node, [new_dict[id(opr)]
+                                              for opr in operand_list(node)])
+        for expr, setter in self.__root_list:
+            new_expr = new_dict[id(expr)]
+            if new_expr is not expr:
+                setter(new_expr)
+
+    def __col_expr(self, col_def_list, col, data_type,
+                   col_expr_dict, new_dict):
+        """列を表す式を返す．
+
+        括り出した対はネットにする．
+        列の定義は必ず番号の小さい列を参照するので番号順に作ればよい．
+        """
+        key = (id(col_def_list), col)
+        if key in col_expr_dict:
+            return col_expr_dict[key]
+        stack = [col]
+        while stack:
+            c = stack[-1]
+            ckey = (id(col_def_list), c)
+            if ckey in col_expr_dict:
+                stack.pop()
+                continue
+            col_def = col_def_list[c]
+            if col_def[0] == 'leaf':
+                leaf = self.__leaf_dict[col_def[1]]
+                col_expr_dict[ckey] = new_dict[id(leaf)]
+                stack.pop()
+                continue
+            _, i, j = col_def
+            pending = [x for x in (i, j)
+                       if (id(col_def_list), x) not in col_expr_dict]
+            if pending:
+                stack.extend(pending)
+                continue
+            src = Expr.make_xor(col_expr_dict[(id(col_def_list), i)],
+                                col_expr_dict[(id(col_def_list), j)])
+            col_expr_dict[ckey] = self.__ent.add_net(data_type=data_type,
+                                                     src=src)
+            stack.pop()
+        return col_expr_dict[key]
+
+
+def share_xor(self):
+    """XOR の共通部分をネットとして括り出す．
+
+    :return: XOR 演算の数の変化などを表す辞書を返す．
+
+    詳細は XorSharer を参照のこと．
+    """
+    return XorSharer(self).run()
+
+
+# Entity にメンバ関数(インスタンスメソッド)を追加する．
+Entity.share_xor = share_xor
@@ -0,0 +1,75 @@
+#! /usr/bin/env python3
+
+"""PrefixAdder のテスト
+
+:file: adder_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+import io
+from rtlgen import EntityMgr, DataType
+from rtlgen.adder import PrefixAdder
+from rtlgen.rtlerror import RtlError
+
+
+STYLE_LIST = ['kogge_stone', 'brent_kung', 'sklansky', 'han_carlson']
+
+
+def make_adder(n, style, use_cin):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('adder_test')
+    if n == 1:
+        data_type = DataType.bit_type()
+    else:
+        data_type = DataType.bitvector_type(n)
+    a = ent.add_input_port(name='a', data_type=data_type)
+    b = ent.add_input_port(name='b', data_type=data_type)
+    cin = ent.add_input_port(name='cin') if use_cin else None
+    adder = ent.add_prefix_adder(a, b, cin=cin, style=style, name='s')
+    return ent, adder
+
+
+@pytest.mark.parametrize('style', STYLE_LIST)
+@pytest.mark.parametrize('n', [1, 2, 3, 5, 6, 8, 13, 32])
+@pytest.mark.parametrize('use_cin', [False, True])
+def test_prefix_adder(style, n, use_cin):
+    ent, adder = make_adder(n, style, use_cin)
+    assert adder.self_check() == []
+
+
+def test_prefix_adder_report():
+    n = 64
+    report_dict = {style: PrefixAdder(n, style=style).report()
+                   for style in STYLE_LIST}
+    assert report_dict['kogge_stone']['prefix_depth'] == 6
+    assert report_dict['sklansky']['prefix_depth'] == 6
+    assert report_dict['han_carlson']['prefix_depth'] == 7
+    assert report_dict['brent_kung']['prefix_depth'] == 11
+    assert report_dict['kogge_stone']['prefix_cells'] == 321
+    assert report_dict['sklansky']['prefix_cells'] == 192
+    assert report_dict['brent_kung']['prefix_cells'] == 120
+    assert report_dict['han_carlson']['prefix_cells'] == 192
+
+
+def test_prefix_adder_verilog():
+    ent, adder = make_adder(2, 'sklansky', False)
+    buff = io.StringIO()
+    ent.write_verilog(fout=buff)
+    contents = buff.getvalue()
+    buff.close()
+    assert 'assign net5 = (net4 | (net3 & net2));' in contents
+    assert 'assign net7 = (net3 ^ net2);' in contents
+    assert 'assign s    = {net7, net1};' in contents
+
+
+def test_prefix_adder_errors():
+    with pytest.raises(RtlError):
+        PrefixAdder(8, style='ripple')
+    mgr = EntityMgr()
+    ent = mgr.add_entity('adder_test')
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(4))
+    b = ent.add_input_port(name='b', data_type=DataType.bitvector_type(3))
+    with pytest.raises(RtlError):
+        ent.add_prefix_adder(a, b)
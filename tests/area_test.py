@@ -0,0 +1,83 @@
+#! /usr/bin/env python3
+
+"""AreaEstimator のテスト
+
+:file: area_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen import EntityMgr, DataType, Expr
+from rtlgen.expr import OpType
+from rtlgen.area import AreaEstimator
+
+
+def make_leaf(mgr):
+    ent = mgr.add_entity('leaf')
+    clock = ent.add_input_port(name='clock')
+    reset = ent.add_input_port(name='reset')
+    ent.set_default_clock(clock, 'positive')
+    ent.set_default_reset(reset, 'positive')
+    vec_type = DataType.bitvector_type(8)
+    a = ent.add_input_port(name='a', data_type=vec_type)
+    b = ent.add_input_port(name='b', data_type=vec_type)
+    en = ent.add_input_port(name='en')
+    s = a + b
+    # 同じ部分式は一度だけ数える．
+    n1 = ent.add_net(data_type=vec_type, src=s)
+    n2 = ent.add_net(data_type=vec_type, src=s & a)
+    dff1 = ent.add_dff(data_in=n1, reset_val=0)
+    dff2 = ent.add_dff(data_in=n2, reset_val=0, enable=en,
+                       enable_pol='positive')
+    ent.add_output_port(name='x', src=dff1.output ^ dff2.output)
+    ent.add_output_port(name='y', src=Expr.make_eq(a, b))
+    return ent
+
+
+def test_area_leaf():
+    mgr = EntityMgr()
+    leaf = make_leaf(mgr)
+    report = leaf.estimate_area()
+    assert report.op_dict == {
+        (OpType.ADD, 8): 1,
+        (OpType.AND, 8): 1,
+        (OpType.XOR, 8): 1,
+        (OpType.EQ, 8): 1,
+        # イネーブルの条件式
+        (OpType.EQ, 1): 1,
+    }
+    assert report.op_num == 5
+    assert report.op_count(OpType.EQ) == 2
+    assert report.flop_bits == 16
+    # イネーブルの if 文のみ(非同期リセットは数えない)
+    assert report.mux_inputs == 2
+    assert report.lut_bits == 0
+    assert report.inst_num == 0
+
+
+def test_area_hierarchy():
+    mgr = EntityMgr()
+    leaf = make_leaf(mgr)
+    mid = mgr.add_entity('mid')
+    for _ in range(3):
+        mid.add_inst(leaf)
+    mid.add_lut(input_bw=4, data_type=DataType.bitvector_type(3),
+                data_list=[])
+    top = mgr.add_entity('top')
+    for _ in range(10000):
+        top.add_inst(mid)
+    top.add_shift_register(top.add_input_port(name='d'), 4,
+                           clock=top.add_input_port(name='clock'))
+
+    estimator = AreaEstimator()
+    report = top.estimate_area(estimator=estimator)
+    assert report.flop_bits == 16 * 3 * 10000 + 4
+    assert report.lut_bits == (1 << 4) * 3 * 10000
+    assert report.op_count(OpType.ADD) == 3 * 10000
+    assert report.inst_num == 10000 + 3 * 10000
+    assert estimator.local(leaf).flop_bits == 16
+    assert estimator.total(mid).flop_bits == 48
+
+    report_dict = mgr.estimate_area(top, estimator=estimator)
+    assert list(report_dict.keys()) == ['top', 'mid', 'leaf']
+    assert report_dict['top'] is report
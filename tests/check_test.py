@@ -0,0 +1,170 @@
+#! /usr/bin/env python3
+
+"""DesignChecker のテスト
+
+:file: check_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+import contextlib
+from rtlgen import EntityMgr, DataType, Expr
+
+
+def make_entity():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('check_test')
+    vec_type = DataType.bitvector_type(8)
+    a = ent.add_input_port(name='a', data_type=vec_type)
+    b = ent.add_input_port(name='b', data_type=vec_type)
+    return mgr, ent, a, b
+
+
+def test_check_ok():
+    mgr, ent, a, b = make_entity()
+    clock = ent.add_input_port(name='clock')
+    n1 = ent.add_net(name='n1', data_type=a.data_type, src=a + b)
+    # レジスタを介したループはループではない．
+    dff = ent.add_dff(data_type=a.data_type, clock=clock)
+    ent.connect(dff.data_in, dff.q + n1)
+    ent.add_output_port(name='x', src=dff.q)
+    report = ent.check_design()
+    assert report.is_ok
+    assert report.loop_list == []
+    assert report.multi_driver_list == []
+
+
+def test_check_loop():
+    mgr, ent, a, b = make_entity()
+    vec_type = a.data_type
+    n1 = ent.add_net(name='n1', data_type=vec_type)
+    n2 = ent.add_net(name='n2', data_type=vec_type)
+    n3 = ent.add_net(name='n3', data_type=vec_type, reg_type=True)
+    ent.connect(n1, a + n3)
+    ent.connect(n2, n1 & b)
+    proc = ent.add_comb_process()
+    with proc.body() as body:
+        if_stmt = body.add_if(Expr.make_eq(n2, a))
+        with if_stmt.then_body() as _:
+            _.add_assign(n3, a)
+        with if_stmt.else_body() as _:
+            _.add_assign(n3, b)
+    # 自己ループ
+    n4 = ent.add_net(name='n4', data_type=vec_type)
+    ent.connect(n4, n4 ^ a)
+    ent.add_output_port(name='x', src=n3 + n4)
+    report = ent.check_design()
+    assert not report.is_ok
+    assert len(report.loop_list) == 2
+    loop_set = {frozenset(name_list) for name_list in report.loop_list}
+    assert loop_set == {frozenset(['n1', 'n2', 'n3']), frozenset(['n4'])}
+    assert report.multi_driver_list == []
+
+
+def test_check_lut_loop():
+    mgr, ent, a, b = make_entity()
+    lut = ent.add_lut(input_bw=2, data_type=DataType.bitvector_type(2))
+    ent.connect(lut.input, lut.output)
+    report = ent.check_design()
+    assert len(report.loop_list) == 1
+
+
+def test_check_multi_driver():
+    mgr, ent, a, b = make_entity()
+    vec_type = a.data_type
+    n1 = ent.add_net(name='n1', data_type=vec_type, src=a)
+    ent.connect(n1, b)
+    # 重ならない範囲への代入は多重駆動ではない．
+    n2 = ent.add_net(name='n2', data_type=vec_type)
+    ent.connect(Expr.part_select(n2, 3, 0), Expr.part_select(a, 3, 0))
+    ent.connect(Expr.part_select(n2, 7, 4), Expr.part_select(b, 3, 0))
+    # 重なる範囲への代入
+    n3 = ent.add_net(name='n3', data_type=vec_type)
+    ent.connect(Expr.part_select(n3, 4, 0), Expr.part_select(a, 4, 0))
+    ent.connect(Expr.part_select(n3, 7, 4), Expr.part_select(b, 3, 0))
+    # 同じプロセス中の複数の代入は一つの駆動元
+    n4 = ent.add_net(name='n4', data_type=vec_type, reg_type=True)
+    proc = ent.add_comb_process()
+    with proc.body() as body:
+        body.add_assign(n4, a)
+        body.add_assign(n4, b)
+    # プロセスと継続的代入文
+    n5 = ent.add_net(name='n5', data_type=vec_type, reg_type=True)
+    ent.connect(n5, a)
+    with proc.body() as body:
+        body.add_assign(n5, b)
+    # 入力ポートへの代入
+    ent.connect(a, b)
+    report = ent.check_design()
+    assert report.loop_list == []
+    assert sorted(report.multi_driver_list) == [('a', 2), ('n1', 2),
+                                                ('n3', 2), ('n5', 2)]
+
+
+def test_check_inst():
+    mgr, ent, a, b = make_entity()
+    child = mgr.add_entity('check_child')
+    c = child.add_input_port(name='c', data_type=a.data_type)
+    child.add_output_port(name='d', src=c)
+    inst = ent.add_inst(child)
+    ent.connect(inst.c, a)
+    # インスタンスの出力への代入は多重駆動
+    ent.connect(inst.d, b)
+    # インスタンスの内部はたどらない．
+    inst2 = ent.add_inst(child)
+    ent.connect(inst2.c, inst2.d)
+    report = ent.check_design()
+    assert report.loop_list == []
+    assert len(report.multi_driver_list) == 1
+
+
+@pytest.mark.parametrize('n', [100000])
+def test_check_large(n):
+    mgr, ent, a, b = make_entity()
+    # 長い鎖の最後で先頭に戻るループ
+    first = ent.add_net(data_type=a.data_type)
+    prev = first
+    for _ in range(n):
+        prev = ent.add_net(data_type=a.data_type, src=prev ^ a)
+    ent.connect(first, prev)
+    report = ent.check_design()
+    assert len(report.loop_list) == 1
+    assert len(report.loop_list[0]) == n + 1
+
+
+@pytest.mark.parametrize('n', [10000])
+def test_check_nested_if(n):
+    mgr, ent, a, b = make_entity()
+    vec_type = a.data_type
+    x = ent.add_net(name='x', data_type=vec_type, reg_type=True)
+    n1 = ent.add_net(name='n1', data_type=vec_type, src=x & b)
+    # 深く入れ子になった if 文の各段で代入する．
+    proc = ent.add_comb_process()
+    with contextlib.ExitStack() as stack:
+        block = stack.enter_context(proc.body())
+        block.add_assign(x, a)
+        for i in range(n):
+            if_stmt = block.add_if(Expr.bit_select(a, i % 8))
+            block = stack.enter_context(if_stmt.then_body())
+            block.add_assign(x, b)
+        # 最も内側の条件式だけがループを作る．
+        if_stmt = block.add_if(Expr.make_eq(n1, a))
+        with if_stmt.then_body() as _:
+            _.add_assign(x, a)
+    report = ent.check_design()
+    assert len(report.loop_list) == 1
+    assert set(report.loop_list[0]) == {'x', 'n1'}
+
+
+def test_check_unnamed_vars():
+    mgr, ent, a, b = make_entity()
+    v1 = ent.add_var(data_type=a.data_type)
+    v2 = ent.add_var(data_type=a.data_type)
+    proc = ent.add_comb_process()
+    with proc.body() as _:
+        _.add_assign(v1, a, blocking=True)
+        _.add_assign(v2, v1 & b, blocking=True)
+    report = ent.check_design()
+    assert report.is_ok
+    assert (v1.name, v2.name) == ('var1', 'var2')
@@ -0,0 +1,54 @@
+#! /usr/bin/env python3
+
+"""テストで共通に用いる関数
+
+:file: conftest.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import io
+from rtlgen.dff import Dff
+from rtlgen.evaluator import Evaluator
+
+
+def make_verilog(ent):
+    """エンティティの Verilog-HDL 記述を文字列で返す．"""
+    buff = io.StringIO()
+    ent.write_verilog(fout=buff)
+    contents = buff.getvalue()
+    buff.close()
+    return contents
+
+
+def simulate(ent, input_list, output_list, pattern_list):
+    """Dff を含むエンティティをサイクルごとに計算する．
+
+    :param Entity ent: 対象のエンティティ
+    :param list[Port] input_list: 入力ポートのリスト
+    :param list[Port] output_list: 出力ポートのリスト
+    :param list[list[int]] pattern_list: サイクルごとの入力値のリスト
+    :return: サイクルごとの出力値のリストを返す．
+
+    Dff の初期値はリセット値(ない場合は 0)とする．
+    """
+    dff_list = [item for item in ent.item_gen if isinstance(item, Dff)]
+    evaluator = Evaluator(ent)
+    # 出力ポートは駆動する式に置き換える．
+    rhs_dict = {id(ca.lhs): ca.rhs for ca in ent.cont_assign_gen}
+    output_list = [rhs_dict[id(port)] for port in output_list]
+    state = []
+    for dff in dff_list:
+        if dff.reset_val is None:
+            state.append(0)
+        else:
+            state.append(evaluator.eval(dff.reset_val))
+    ans = []
+    for pattern in pattern_list:
+        val_list = list(zip(input_list, pattern))
+        val_list += [(dff.output, val) for dff, val in zip(dff_list, state)]
+        expr_list = output_list + [dff.data_in for dff in dff_list]
+        result = evaluator.eval_list(expr_list, val_list)
+        ans.append(result[:len(output_list)])
+        state = result[len(output_list):]
+    return ans
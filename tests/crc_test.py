@@ -0,0 +1,120 @@
+#! /usr/bin/env python3
+
+"""add_crc() のテスト
+
+:file: crc_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+import io
+import random
+import time
+from rtlgen import EntityMgr, DataType
+from rtlgen.lfsm import crc_matrix
+from rtlgen.evaluator import Evaluator
+from rtlgen.rtlerror import RtlError
+
+
+def serial_crc(crc, data, data_width, poly, crc_width):
+    """1ビットずつ CRC を計算する．"""
+    mask = (1 << crc_width) - 1
+    for j in reversed(range(data_width)):
+        fb = ((crc >> (crc_width - 1)) ^ (data >> j)) & 1
+        crc = (crc << 1) & mask
+        if fb:
+            crc ^= poly & mask
+    return crc
+
+
+def make_crc(poly, data_width, crc_width=None):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('crc_test')
+    clock = ent.add_input_port(name='clock')
+    reset = ent.add_input_port(name='reset')
+    if data_width == 1:
+        data_type = DataType.bit_type()
+    else:
+        data_type = DataType.bitvector_type(data_width)
+    data_in = ent.add_input_port(name='data_in', data_type=data_type)
+    crc, crc_next = ent.add_crc(poly, data_width,
+                                data_in=data_in,
+                                clock=clock, clock_pol='positive',
+                                reset=reset, reset_pol='positive',
+                                crc_width=crc_width,
+                                init=(1 << 4) - 1,
+                                name='crc')
+    return ent, data_in, crc, crc_next
+
+
+@pytest.mark.parametrize('poly, crc_width', [(0x107, None),
+                                             (0x1021, 16),
+                                             (0x104C11DB7, None)])
+@pytest.mark.parametrize('data_width', [1, 5, 8, 32, 64])
+def test_crc(poly, crc_width, data_width):
+    ent, data_in, crc, crc_next = make_crc(poly, data_width, crc_width)
+    w = crc.data_type.size
+    if crc_width is not None:
+        assert w == crc_width
+    evaluator = Evaluator(ent)
+    rng = random.Random(data_width)
+    for _ in range(50):
+        c = rng.getrandbits(w)
+        d = rng.getrandbits(data_width)
+        exp_val = serial_crc(c, d, data_width, poly, w)
+        assert evaluator.eval(crc_next, [(crc, c), (data_in, d)]) == exp_val
+
+
+def test_crc_matrix():
+    # CRC-8 (x^8 + x^2 + x + 1) の1ビット分の行列
+    state_mat, data_mat = crc_matrix(0x07, 8, 1)
+    assert state_mat[0].tolist() == [0, 0, 0, 0, 0, 0, 0, 1]
+    assert state_mat[3].tolist() == [0, 0, 1, 0, 0, 0, 0, 0]
+    assert data_mat[:, 0].tolist() == [1, 1, 1, 0, 0, 0, 0, 0]
+
+
+def test_crc_verilog():
+    ent, data_in, crc, crc_next = make_crc(0x7, 2)
+    buff = io.StringIO()
+    ent.write_verilog(fout=buff)
+    contents = buff.getvalue()
+    buff.close()
+
+    exp_text = """  always @( posedge clock or posedge reset ) begin
+    if ( reset ) begin
+      crc <= 2'b11;
+    end
+    else begin
+      crc <= net1;
+    end
+  end
+"""
+
+    assert exp_text in contents
+
+
+def test_crc_wide():
+    start = time.time()
+    ent, data_in, crc, crc_next = make_crc(0x104C11DB7, 1024)
+    assert time.time() - start < 10.0
+    evaluator = Evaluator(ent)
+    rng = random.Random(0)
+    c = rng.getrandbits(32)
+    d = rng.getrandbits(1024)
+    exp_val = serial_crc(c, d, 1024, 0x104C11DB7, 32)
+    assert evaluator.eval(crc_next, [(crc, c), (data_in, d)]) == exp_val
+
+
+def test_crc_errors():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('crc_test')
+    clock = ent.add_input_port(name='clock')
+    data_in = ent.add_input_port(name='data_in',
+                                 data_type=DataType.bitvector_type(8))
+    with pytest.raises(RtlError):
+        ent.add_crc(0x107, 16, data_in=data_in,
+                    clock=clock, clock_pol='positive')
+    with pytest.raises(RtlError):
+        ent.add_crc(0x1, 8, data_in=data_in,
+                    clock=clock, clock_pol='positive')
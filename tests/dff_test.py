@@ -308,3 +308,109 @@ end architecture rtl;
 """
 
     assert contents == exp_text
+
+
+def test_delay():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('delay_test')
+    clock = ent.add_input_port(name='clock')
+    reset = ent.add_input_port(name='reset')
+    data_in = ent.add_input_port(name='data_in',
+                                 data_type=DataType.bitvector_type(4))
+    data_out = ent.add_output_port(name='data_out',
+                                   data_type=DataType.bitvector_type(4))
+    out = ent.add_delay(data_in, 3,
+                        clock=clock, clock_pol='positive',
+                        reset=reset, reset_pol='positive')
+    ent.connect(data_out, out)
+
+    buff = io.StringIO()
+    ent.write_verilog(fout=buff)
+    contents = buff.getvalue()
+    buff.close()
+
+    exp_text = """module delay_test(
+  input        clock,
+  input        reset,
+  input  [3:0] data_in,
+  output [3:0] data_out
+);
+  wire [3:0]  net1;
+  reg  [11:0] net2;
+
+  always @( posedge clock or posedge reset ) begin
+    if ( reset ) begin
+      net2 <= {3{4'b0000}};
+    end
+    else begin
+      net2 <= {net2[7:0], data_in};
+    end
+  end
+
+  assign net1     = net2[11:8];
+  assign data_out = net1;
+endmodule // delay_test
+"""
+
+    assert contents == exp_text
+
+
+def test_delay_signed():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('delay_test')
+    clock = ent.add_input_port(name='clock')
+    s8 = DataType.signed_bitvector_type(8)
+    data_in = ent.add_input_port(name='data_in', data_type=s8)
+    data_out = ent.add_output_port(name='data_out', data_type=s8)
+    out = ent.add_delay(data_in, 3, clock=clock, clock_pol='positive')
+    ent.connect(data_out, out)
+    # 符号付きの入力に対してはレジスタも符号付きになる．
+    assert out.data_type.is_signedbitvector_type
+    sreg = list(ent.item_gen)[0]
+    assert sreg.register.data_type.is_signedbitvector_type
+    assert sreg.register.data_type.size == 24
+
+    buff = io.StringIO()
+    ent.write_vhdl(fout=buff)
+    contents = buff.getvalue()
+    buff.close()
+
+    exp_text = """  signal net1 : signed(7 downto 0);
+  signal net2 : signed(23 downto 0);
+"""
+
+    assert exp_text in contents
+
+
+def test_shift_register_srl():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('srl_test')
+    clock = ent.add_input_port(name='clock')
+    reset = ent.add_input_port(name='reset')
+    enable = ent.add_input_port(name='enable')
+    data_in = ent.add_input_port(name='data_in')
+    sreg = ent.add_shift_register(data_in, 1000,
+                                  clock=clock, clock_pol='positive',
+                                  reset=reset, reset_pol='positive',
+                                  enable=enable, enable_pol='positive',
+                                  srl=True)
+    assert sreg.reset is None
+    assert ent.item_num == 1
+    assert ent.net_num == 1
+
+    buff = io.StringIO()
+    ent.write_verilog(fout=buff)
+    contents = buff.getvalue()
+    buff.close()
+
+    assert sreg.output.verilog_str == 'net1[999]'
+    assert sreg.tap(1).verilog_str == 'net1[0]'
+
+    exp_text = """  always @( posedge clock ) begin
+    if ( (enable == 1'b1) ) begin
+      net1 <= {net1[998:0], data_in};
+    end
+  end
+"""
+
+    assert exp_text in contents
@@ -0,0 +1,113 @@
+#! /usr/bin/env python3
+
+"""プライオリティエンコーダ等のテスト
+
+:file: encoder_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+import random
+from rtlgen import EntityMgr, DataType
+from rtlgen.evaluator import Evaluator
+from rtlgen.rtlerror import RtlError
+
+
+def make_entity(n):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('encoder_test')
+    if n == 1:
+        data_type = DataType.bit_type()
+    else:
+        data_type = DataType.bitvector_type(n)
+    src = ent.add_input_port(name='src', data_type=data_type)
+    return ent, src
+
+
+def pattern_list(n, num=100):
+    if n <= 8:
+        return list(range(1 << n))
+    rng = random.Random(n)
+    pat_list = [0, (1 << n) - 1, 1, 1 << (n - 1)]
+    for _ in range(num):
+        # 1のビットの少ないパタンも作る．
+        val = rng.getrandbits(n)
+        for _ in range(rng.randrange(4)):
+            val &= rng.getrandbits(n)
+        pat_list.append(val)
+    return pat_list
+
+
+WIDTH_LIST = [1, 2, 3, 5, 8, 13, 32, 100]
+
+
+@pytest.mark.parametrize('n', WIDTH_LIST)
+@pytest.mark.parametrize('lsb_first', [False, True])
+def test_priority_encoder(n, lsb_first):
+    ent, src = make_entity(n)
+    index, valid = ent.add_priority_encoder(src, lsb_first=lsb_first)
+    evaluator = Evaluator(ent)
+    for val in pattern_list(n):
+        idx_val, valid_val = evaluator.eval_list([index, valid], [(src, val)])
+        assert valid_val == int(val != 0)
+        if val != 0:
+            if lsb_first:
+                exp_val = (val & -val).bit_length() - 1
+            else:
+                exp_val = val.bit_length() - 1
+            assert idx_val == exp_val
+
+
+@pytest.mark.parametrize('n', WIDTH_LIST)
+@pytest.mark.parametrize('ones', [False, True])
+def test_leading_zero_counter(n, ones):
+    ent, src = make_entity(n)
+    count = ent.add_leading_zero_counter(src, ones=ones)
+    assert count.data_type.size == n.bit_length()
+    evaluator = Evaluator(ent)
+    for val in pattern_list(n):
+        if ones:
+            exp_val = n - (val ^ ((1 << n) - 1)).bit_length()
+        else:
+            exp_val = n - val.bit_length()
+        assert evaluator.eval(count, [(src, val)]) == exp_val
+
+
+@pytest.mark.parametrize('n', WIDTH_LIST)
+def test_popcount(n):
+    ent, src = make_entity(n)
+    count = ent.add_popcount(src)
+    evaluator = Evaluator(ent)
+    for val in pattern_list(n):
+        assert evaluator.eval(count, [(src, val)]) == bin(val).count('1')
+
+
+def test_find_first_set():
+    ent, src = make_entity(8)
+    index, valid = ent.add_find_first_set(src, name='ffs')
+    evaluator = Evaluator(ent)
+    assert evaluator.eval_list([index, valid], [(src, 0x28)]) == [3, 1]
+    assert evaluator.eval(valid, [(src, 0)]) == 0
+
+
+def test_large():
+    n = 1024
+    ent, src = make_entity(n)
+    count = ent.add_leading_zero_counter(src)
+    # ネットの数は O(n) で，段数は O(log n)
+    assert ent.net_num < 8 * n
+    evaluator = Evaluator(ent)
+    val = 1 << 700
+    assert evaluator.eval(count, [(src, val)]) == n - 701
+    pop = ent.add_popcount(src)
+    evaluator = Evaluator(ent)
+    assert evaluator.eval(pop, [(src, val | 0xFF)]) == 9
+
+
+def test_bad_src():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('encoder_test')
+    src = ent.add_input_port(name='src', data_type=DataType.integer_type())
+    with pytest.raises(RtlError):
+        ent.add_popcount(src)
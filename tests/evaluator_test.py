@@ -0,0 +1,87 @@
+#! /usr/bin/env python3
+
+"""Evaluator のテスト
+
+:file: evaluator_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+from rtlgen import EntityMgr, Expr, DataType
+from rtlgen.evaluator import Evaluator
+from rtlgen.rtlerror import RtlError
+
+
+def test_evaluator():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('eval_test')
+    bv4 = DataType.bitvector_type(4)
+    a = ent.add_input_port(name='a', data_type=bv4)
+    b = ent.add_input_port(name='b', data_type=bv4)
+    s = ent.add_net(data_type=bv4, src=a + b)
+    c = ent.add_net(data_type=DataType.bitvector_type(8),
+                    src=Expr.concat([s, ~a]))
+    evaluator = Evaluator(ent)
+    input_list = [(a, 9), (b, 12)]
+    assert evaluator.eval(s, input_list) == 5
+    assert evaluator.eval(c, input_list) == 0x56
+    assert evaluator.eval(Expr.part_select(c, 6, 3), input_list) == 0xA
+    assert evaluator.eval(Expr.bit_select(a, 3), input_list) == 1
+    assert evaluator.eval(Expr.multi_concat(2, [s]), input_list) == 0x55
+    assert evaluator.eval(a < b, input_list) == 1
+
+
+def test_evaluator_signed():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('eval_test')
+    sbv4 = DataType.signed_bitvector_type(4)
+    a = ent.add_input_port(name='a', data_type=sbv4)
+    b = ent.add_input_port(name='b', data_type=sbv4)
+    evaluator = Evaluator(ent)
+    # -2 < 3
+    assert evaluator.eval(Expr.make_lt(a, b), [(a, -2), (b, 3)]) == 1
+    assert evaluator.eval(Expr.make_uminus(a), [(a, 3)]) == 13
+    # 符号付きの除算は0方向に丸め，剰余は被除数の符号を持つ．
+    sbv8 = DataType.signed_bitvector_type(8)
+    c = ent.add_input_port(name='c', data_type=sbv8)
+    d = ent.add_input_port(name='d', data_type=sbv8)
+    input_list = [(c, -7), (d, 2)]
+    assert evaluator.eval(Expr.make_div(c, d), input_list) == 253
+    assert evaluator.eval(Expr.make_mod(c, d), input_list) == 255
+    input_list = [(c, 7), (d, -2)]
+    assert evaluator.eval(Expr.make_div(c, d), input_list) == 253
+    assert evaluator.eval(Expr.make_mod(c, d), input_list) == 1
+
+
+def test_evaluator_shift():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('eval_test')
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(8))
+    s = ent.add_input_port(name='s', data_type=DataType.bitvector_type(64))
+    evaluator = Evaluator(ent)
+    expr = Expr.make_lsft(a, s)
+    assert evaluator.eval(expr, [(a, 0x81), (s, 1 << 62)]) == 0
+    assert evaluator.eval(expr, [(a, 0x81), (s, 8)]) == 0
+    assert evaluator.eval(expr, [(a, 0x81), (s, 1)]) == 0x02
+
+
+def test_evaluator_deep():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('eval_test')
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(16))
+    expr = a
+    for _ in range(500):
+        expr = Expr.make_add(expr, Expr.make_constant(
+            data_type=DataType.bitvector_type(16), val=1))
+    assert Evaluator().eval(expr, [(a, 10)]) == 510
+
+
+def test_evaluator_undriven():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('eval_test')
+    a = ent.add_input_port(name='a')
+    x = ent.add_net()
+    y = ent.add_net(src=a & x)
+    with pytest.raises(RtlError):
+        Evaluator(ent).eval(y, [(a, 1)])
@@ -0,0 +1,214 @@
+#! /usr/bin/env python3
+
+"""Fsm のテスト
+
+:file: fsm_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+import random
+from rtlgen import EntityMgr, DataType
+from rtlgen.rtlerror import RtlError
+from conftest import make_verilog
+
+
+def make_fsm():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('fsm_test')
+    clock = ent.add_input_port(name='clock')
+    reset = ent.add_input_port(name='reset')
+    fsm = ent.add_fsm(name='state', clock=clock, clock_pol='positive',
+                      reset=reset, reset_pol='positive')
+    return ent, fsm
+
+
+def test_fsm_build():
+    ent, fsm = make_fsm()
+    go = ent.add_input_port(name='go')
+    stop = ent.add_input_port(name='stop')
+    busy = ent.add_output_port(name='busy')
+    oid, busy_r = fsm.add_output(name='busy_r')
+    fsm.add_state('IDLE')
+    fsm.add_state('RUN1', outputs={oid: 1})
+    fsm.add_state('RUN2', outputs={oid: 1})
+    fsm.add_state('DEAD', outputs={oid: 1})
+    fsm.add_transition('IDLE', 'RUN1', go)
+    fsm.add_transition('RUN1', 'IDLE', stop)
+    fsm.add_transition('RUN1', 'RUN2')
+    fsm.add_transition('RUN2', 'IDLE', stop)
+    fsm.add_transition('RUN2', 'RUN1')
+    ent.connect(busy, busy_r)
+
+    # DEAD は到達不能，RUN1 と RUN2 は等価
+    assert fsm.minimize() == {'IDLE': 'IDLE', 'RUN1': 'RUN1', 'RUN2': 'RUN1'}
+    fsm.build(encoding='binary')
+    assert fsm.encoding == 'binary'
+    assert fsm.state_code('RUN2') == fsm.state_code('RUN1')
+
+    exp_text = """  always @( posedge clock or posedge reset ) begin
+    if ( reset ) begin
+      state <= 1'b0;
+    end
+    else begin
+      case ( state )
+        1'b0: begin
+          if ( go ) begin
+            state <= 1'b1;
+          end
+          else begin
+            state <= 1'b0;
+          end
+        end
+        1'b1: begin
+          if ( stop ) begin
+            state <= 1'b0;
+          end
+          else begin
+            state <= 1'b1;
+          end
+        end
+        default: begin
+          state <= 1'b0;
+        end
+      endcase
+    end
+  end
+
+  always @* begin
+    busy_r <= 1'b0;
+    case ( state )
+      1'b1: begin
+        busy_r <= 1'b1;
+      end
+    endcase
+  end
+"""
+
+    assert exp_text in make_verilog(ent)
+
+
+def test_fsm_build_no_minimize():
+    ent, fsm = make_fsm()
+    go = ent.add_input_port(name='go')
+    fsm.add_state('IDLE')
+    fsm.add_state('RUN')
+    fsm.add_state('DEAD')
+    fsm.add_transition('IDLE', 'RUN', go)
+    fsm.add_transition('RUN', 'IDLE')
+    # 到達不能な DEAD も符号化される．
+    fsm.build(encoding='binary', minimize=False)
+    assert fsm.state_net.data_type.size == 2
+    code_list = [fsm.state_code(name) for name in ('IDLE', 'RUN', 'DEAD')]
+    assert code_list == [0, 1, 2]
+    assert "2'b10: begin" in make_verilog(ent)
+
+
+def test_fsm_select_no_minimize():
+    ent, fsm = make_fsm()
+    go = ent.add_input_port(name='go')
+    oid, _ = fsm.add_output(data_type=DataType.bitvector_type(2))
+    for i, name in enumerate(('IDLE', 'RUN', 'D0', 'D1')):
+        fsm.add_state(name, outputs={oid: i})
+    fsm.add_transition('IDLE', 'RUN', go)
+    fsm.add_transition('RUN', 'IDLE')
+    fsm.add_transition('D0', 'D1')
+    fsm.add_transition('D1', 'IDLE')
+    # 最小化後の状態だけなら binary と gray は同じコスト
+    assert fsm.select_encoding() == 'binary'
+    # 到達不能な状態も符号化する場合は D1 -> IDLE の変化ビットが少ない gray
+    fsm.build(minimize=False)
+    assert fsm.encoding == 'gray'
+    code_list = [fsm.state_code(name) for name in ('IDLE', 'RUN', 'D0', 'D1')]
+    assert code_list == [0, 1, 3, 2]
+
+
+def test_fsm_encoding():
+    ent, fsm = make_fsm()
+    go = ent.add_input_port(name='go')
+    n = 16
+    oid, _ = fsm.add_output(data_type=DataType.bitvector_type(4))
+    for i in range(n):
+        fsm.add_state(f's{i}', outputs={oid: i})
+    for i in range(n):
+        fsm.add_transition(f's{i}', f's{(i + 1) % n}', go)
+    # 環状の遷移では Gray 符号の変化ビット数が最小になる．
+    assert fsm.estimate_cost('gray') < fsm.estimate_cost('binary')
+    assert fsm.select_encoding() == 'gray'
+    # ワンホットのコストはレジスタと遷移ごとの 2
+    assert fsm.estimate_cost('onehot', reg_cost=1) == n + 2 * (2 * n)
+    fsm.build(encoding='onehot')
+    assert fsm.state_net.data_type.size == n
+    assert fsm.state_code('s3') == 8
+
+
+def refine(fsm_def, out_list):
+    """素朴な細分化で等価な状態のクラスを求める．"""
+    n = len(out_list)
+    block = list(out_list)
+    while True:
+        sig = [(block[s], tuple((c, block[d]) for c, d in fsm_def[s][0]),
+                block[fsm_def[s][1]])
+               for s in range(n)]
+        ids = {}
+        new_block = [ids.setdefault(x, len(ids)) for x in sig]
+        if len(ids) == len(set(block)):
+            return new_block
+        block = new_block
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_fsm_minimize_random(seed):
+    rng = random.Random(seed)
+    ent, fsm = make_fsm()
+    cond_list = [ent.add_input_port(name=f'c{i}') for i in range(2)]
+    n = 200
+    oid, _ = fsm.add_output()
+    out_list = [rng.randrange(2) for _ in range(n)]
+    fsm_def = []
+    for i in range(n):
+        fsm.add_state(f's{i}', outputs={oid: out_list[i]})
+    for i in range(n):
+        trans = [(c, rng.randrange(n)) for c in range(rng.randrange(3))]
+        default = rng.randrange(n)
+        for c, d in trans:
+            fsm.add_transition(f's{i}', f's{d}', cond_list[c])
+        fsm.add_transition(f's{i}', f's{default}')
+        fsm_def.append((trans, default))
+
+    rep_dict = fsm.minimize()
+    block = refine(fsm_def, out_list)
+    for name, rep in rep_dict.items():
+        i = int(name[1:])
+        j = int(rep[1:])
+        assert block[i] == block[j]
+    # 代表同士は等価でない．
+    rep_set = set(rep_dict.values())
+    assert len({block[int(rep[1:])] for rep in rep_set}) == len(rep_set)
+
+
+def test_fsm_large():
+    ent, fsm = make_fsm()
+    go = ent.add_input_port(name='go')
+    n = 3000
+    oid, _ = fsm.add_output(data_type=DataType.bitvector_type(11))
+    for i in range(n):
+        fsm.add_state(f's{i}', outputs={oid: i % 2048})
+    for i in range(n):
+        fsm.add_transition(f's{i}', f's{(i + 1) % n}', go)
+    assert len(set(fsm.minimize().values())) == n
+    fsm.build()
+    assert fsm.encoding == 'gray'
+
+
+def test_fsm_errors():
+    ent, fsm = make_fsm()
+    fsm.add_state('A')
+    with pytest.raises(RtlError):
+        fsm.add_state('A')
+    with pytest.raises(RtlError):
+        fsm.add_transition('A', 'B')
+    fsm.build()
+    with pytest.raises(RtlError):
+        fsm.build()
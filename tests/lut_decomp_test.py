@@ -0,0 +1,145 @@
+#! /usr/bin/env python3
+
+"""Lut の分解のテスト
+
+:file: lut_decomp_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+import io
+import numpy as np
+from rtlgen import EntityMgr, DataType
+from rtlgen.lut import Lut
+from rtlgen.process import CombProcess
+from rtlgen.statement import CaseStatement
+from rtlgen.net import Net
+from rtlgen.expr import Constant, PartSelect
+
+
+def simulate(ent, input, ival, output):
+    """分解後の回路で output の値を求める．"""
+    driver_dict = {}
+    for item in ent.item_gen:
+        if isinstance(item, Lut):
+            driver_dict[id(item.output)] = item
+        elif isinstance(item, CombProcess):
+            with item.body() as body:
+                stmt = next(body.statement_gen)
+                if isinstance(stmt, CaseStatement):
+                    with stmt.default_body() as arm:
+                        lhs = next(arm.statement_gen).lhs
+                else:
+                    lhs = stmt.lhs
+                driver_dict[id(lhs)] = body
+
+    def eval_block(block):
+        for stmt in block.statement_gen:
+            if isinstance(stmt, CaseStatement):
+                cval = eval_expr(stmt.cond)
+                for label, arm in stmt.case_gen:
+                    if label.value == cval:
+                        return eval_block(arm)
+                with stmt.default_body() as arm:
+                    return eval_block(arm)
+            else:
+                return eval_expr(stmt.rhs)
+
+    def eval_expr(expr):
+        if expr is input:
+            return ival
+        if isinstance(expr, Constant):
+            return expr.value
+        if isinstance(expr, PartSelect):
+            w = expr.left - expr.right + 1
+            return (eval_expr(expr.primary) >> expr.right) & ((1 << w) - 1)
+        assert isinstance(expr, Net)
+        driver = driver_dict[id(expr)]
+        if isinstance(driver, Lut):
+            return driver.value(eval_expr(driver.input))
+        return eval_block(driver)
+
+    return eval_expr(output)
+
+
+def make_lut(table, obw, *, ibw=None):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('decomp_test')
+    if ibw is None:
+        ibw = DataType.bitlen(len(table))
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(ibw))
+    o = ent.add_output_port(name='o', data_type=DataType.bitvector_type(obw))
+    lut = ent.add_lut(input=a, data_type=DataType.bitvector_type(obw),
+                      table=table)
+    ent.connect(o, lut.output)
+    return ent, a, lut
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_decompose_random(seed):
+    rng = np.random.default_rng(seed)
+    ibw = 10
+    table = rng.integers(0, 16, size=1 << ibw, dtype=np.uint8)
+    ent, a, lut = make_lut(table, 4)
+    out = lut.output
+    lut_list = ent.decompose_lut(lut, max_input_bw=4)
+    assert lut not in list(ent.item_gen)
+    for sub in lut_list:
+        assert sub.input_bw <= 4
+    for i in range(1 << ibw):
+        assert simulate(ent, a, i, out) == table[i]
+
+
+def test_decompose_shared():
+    # 上位ビットに依存しない関数は一つの Lut になる．
+    ibw = 12
+    table = np.tile(np.arange(256, dtype=np.uint16) * 3 & 0xFF, 16)
+    ent, a, lut = make_lut(table, 8)
+    out = lut.output
+    lut_list = ent.decompose_lut(lut, max_input_bw=8)
+    assert len(lut_list) == 1
+    for i in range(0, 1 << ibw, 7):
+        assert simulate(ent, a, i, out) == table[i]
+
+
+def test_decompose_class_index():
+    # コファクタが2種類しかないので分解表が作られる．
+    ibw = 8
+    low = np.arange(16, dtype=np.uint8)
+    table = np.concatenate([low if (r * 5) % 3 == 0 else 15 - low
+                            for r in range(16)])
+    ent, a, lut = make_lut(table, 4)
+    out = lut.output
+    lut_list = ent.decompose_lut(lut, max_input_bw=4)
+    # コファクタ2つと分解表
+    assert len(lut_list) == 3
+    assert sorted(sub.output_bw for sub in lut_list) == [1, 4, 4]
+    for i in range(1 << ibw):
+        assert simulate(ent, a, i, out) == table[i]
+
+
+def test_decompose_sparse():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('decomp_test')
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(9))
+    data_list = [(3, 1), (100, 2), (257, 3), (511, 1)]
+    lut = ent.add_lut(input=a, data_type=DataType.bitvector_type(2),
+                      data_list=data_list)
+    out = lut.output
+    ent.decompose_lut(lut, max_input_bw=3)
+    for i, v in data_list:
+        assert simulate(ent, a, i, out) == v
+
+    buff = io.StringIO()
+    ent.write_verilog(fout=buff)
+    contents = buff.getvalue()
+    buff.close()
+    assert 'default: ' in contents
+
+
+def test_decompose_small():
+    table = np.arange(16, dtype=np.uint8)
+    ent, a, lut = make_lut(table, 4)
+    assert ent.decompose_lut(lut, max_input_bw=4) == [lut]
+    assert ent.item_num == 1
@@ -0,0 +1,322 @@
+#! /usr/bin/env python3
+
+"""Lut のテスト
+
+:file: lut_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2022 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+import io
+import numpy as np
+from rtlgen import EntityMgr, Expr, DataType
+from rtlgen.rtlerror import RtlError
+from conftest import make_verilog
+
+
+def test_lut_table():
+    ibw = 3
+    obw = 8
+    input_type = DataType.bitvector_type(ibw)
+    output_type = DataType.bitvector_type(obw)
+
+    mgr = EntityMgr()
+    ent1 = mgr.add_entity('lut_test')
+    lut1 = ent1.add_lut(input_bw=ibw, data_type=output_type)
+    for i in range(1 << ibw):
+        indata = Expr.make_constant(data_type=input_type, val=i)
+        outdata = Expr.make_constant(data_type=output_type, val=(i * 3))
+        lut1.add_data(indata, outdata)
+
+    mgr = EntityMgr()
+    ent2 = mgr.add_entity('lut_test')
+    table = np.arange(1 << ibw, dtype=np.uint8) * 3
+    lut2 = ent2.add_lut(input_bw=ibw, data_type=output_type, table=table)
+
+    assert lut1.entry_num == 8
+    assert lut2.entry_num == 8
+    assert list(lut1.value_gen) == list(lut2.value_gen)
+    assert make_verilog(ent1) == make_verilog(ent2)
+
+
+def test_lut_input_bw():
+    table = np.arange(16, dtype=np.uint16)
+    mgr = EntityMgr()
+    ent = mgr.add_entity('lut_test')
+    lut = ent.add_lut(data_type=DataType.bitvector_type(4), table=table)
+    assert lut.input_bw == 4
+    assert lut.output_bw == 4
+
+
+def test_lut_overlay():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('lut_test')
+    table = np.array([1, 2, 3], dtype=np.uint32)
+    lut = ent.add_lut(input_bw=3, data_type=DataType.bitvector_type(4),
+                      table=table)
+    lut.add_data(1, 7)
+    lut.add_data(6, 5)
+    assert lut.entry_num == 4
+    assert list(lut.value_gen) == [(0, 1), (1, 7), (2, 3), (6, 5)]
+    assert lut.value(6) == 5
+    assert lut.value(5) is None
+    vals, valid = lut.to_array()
+    assert vals.tolist() == [1, 7, 3, 0, 0, 0, 5, 0]
+    assert valid.tolist() == [True, True, True, False,
+                              False, False, True, False]
+
+
+def test_lut_npy_file(tmp_path):
+    table = (np.arange(256, dtype=np.uint16) * 7) & 0xFF
+    filename = str(tmp_path / 'table.npy')
+    np.save(filename, table)
+
+    mgr = EntityMgr()
+    ent = mgr.add_entity('lut_test')
+    lut = ent.add_lut(input_bw=8, data_type=DataType.bitvector_type(8),
+                      table_file=filename)
+    assert lut.entry_num == 256
+    assert list(lut.value_gen) == list(enumerate(table.tolist()))
+
+
+def test_lut_raw_file(tmp_path):
+    table = np.arange(100, dtype=np.uint32)
+    filename = str(tmp_path / 'table.bin')
+    table.tofile(filename)
+
+    mgr = EntityMgr()
+    ent = mgr.add_entity('lut_test')
+    with pytest.raises(RtlError):
+        ent.add_lut(input_bw=7, data_type=DataType.bitvector_type(8),
+                    table_file=filename)
+    lut = ent.add_lut(input_bw=7, data_type=DataType.bitvector_type(8),
+                      table_file=filename, table_dtype=np.uint32)
+    assert lut.entry_num == 100
+    assert lut.value(99) == 99
+
+
+def test_lut_bad_table():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('lut_test')
+    table = np.arange(16, dtype=np.uint8)
+    with pytest.raises(RtlError):
+        ent.add_lut(input_bw=3, data_type=DataType.bitvector_type(8),
+                    table=table)
+
+
+def test_lut_bad_output():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('lut_test')
+    u4 = DataType.bitvector_type(4)
+    s4 = DataType.signed_bitvector_type(4)
+    # 出力のビット幅に収まらない値
+    with pytest.raises(RtlError):
+        ent.add_lut(input_bw=2, data_type=u4,
+                    table=np.array([0, 16], dtype=np.uint8))
+    # 符号なしの出力に負の値
+    with pytest.raises(RtlError):
+        ent.add_lut(input_bw=2, data_type=u4,
+                    table=np.array([0, -1], dtype=np.int8))
+    with pytest.raises(RtlError):
+        ent.add_lut(input_bw=2, data_type=s4,
+                    table=np.array([-9, 7], dtype=np.int8))
+    lut = ent.add_lut(input_bw=2, data_type=s4,
+                      table=np.array([-8, 7], dtype=np.int8))
+    assert list(lut.value_gen) == [(0, -8), (1, 7)]
+    with pytest.raises(RtlError):
+        lut.add_data(2, 8)
+    with pytest.raises(RtlError):
+        lut.add_data(2, -9)
+    lut = ent.add_lut(input_bw=2, data_type=u4)
+    with pytest.raises(RtlError):
+        lut.add_data(0, 16)
+    with pytest.raises(RtlError):
+        lut.add_data(0, -1)
+    lut.add_data(0, 15)
+    assert lut.value(0) == 15
+
+
+def test_lut_rom(tmp_path):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('rom_test')
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(4))
+    o = ent.add_output_port(name='o', data_type=DataType.bitvector_type(6))
+    table = np.arange(16, dtype=np.uint8) * 3
+    lut = ent.add_lut(input=a, data_type=DataType.bitvector_type(6),
+                      table=table, rom_file='rom.hex')
+    ent.connect(o, lut.output)
+
+    filename = str(tmp_path / 'rom_test.v')
+    with open(filename, 'w') as fout:
+        ent.write_verilog(fout=fout)
+    with open(filename) as fin:
+        contents = fin.read()
+
+    exp_text = """module rom_test(
+  input  [3:0] a,
+  output [5:0] o
+);
+  reg [5:0] net1;
+
+  reg [5:0] item1_rom [0:15];
+  initial $readmemh("rom.hex", item1_rom);
+
+  always @* begin
+    net1 <= item1_rom[a];
+  end
+
+  assign o = net1;
+endmodule // rom_test
+"""
+
+    assert contents == exp_text
+
+    with open(str(tmp_path / 'rom.hex')) as fin:
+        words = fin.read().split()
+    assert words == [f'{v:02x}' for v in table.tolist()]
+
+
+def test_lut_rom_vhdl(tmp_path):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('rom_test')
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(2))
+    o = ent.add_output_port(name='o', data_type=DataType.bitvector_type(4))
+    lut = ent.add_lut(input=a, data_type=DataType.bitvector_type(4),
+                      data_list=[(0, 1), (2, 15)])
+    lut.set_rom_file('rom2.hex')
+    ent.connect(o, lut.output)
+
+    buff = io.StringIO()
+    ent.write_vhdl(fout=buff, output_dir=str(tmp_path))
+    contents = buff.getvalue()
+    buff.close()
+
+    assert 'constant item1_rom : item1_rom_t := item1_rom_init;' in contents
+    assert 'open read_mode is "rom2.hex";' in contents
+    with open(str(tmp_path / 'rom2.hex')) as fin:
+        words = fin.read().split()
+    assert words == ['1', '0', 'f', '0']
+
+
+def test_lut_rom_signed(tmp_path):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('rom_test')
+    s6 = DataType.signed_bitvector_type(6)
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(2))
+    o = ent.add_output_port(name='o', data_type=s6)
+    lut = ent.add_lut(input=a, data_type=s6,
+                      data_list=[(0, -1), (1, 5)], rom_file='rom3.hex')
+    ent.connect(o, lut.output)
+
+    buff = io.StringIO()
+    ent.write_vhdl(fout=buff, output_dir=str(tmp_path))
+    contents = buff.getvalue()
+    buff.close()
+
+    # 符号付きの出力の場合は要素の型も符号付きになる．
+    assert ('type item1_rom_t is array (0 to 3) of '
+            'ieee.numeric_std.signed(7 downto 0);') in contents
+    assert 'rom(i) := ieee.numeric_std.signed(rom_word);' in contents
+    assert '-- hread() requires VHDL-2008' in contents
+    with open(str(tmp_path / 'rom3.hex')) as fin:
+        words = fin.read().split()
+    assert words == ['3f', '05', '00', '00']
+
+
+def test_lut_rom_output_dir():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('rom_test')
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(2))
+    lut = ent.add_lut(input=a, data_type=DataType.bitvector_type(4),
+                      data_list=[(0, 1)], rom_file='rom4.hex')
+    # ファイルでない出力先の場合は output_dir が必要
+    with pytest.raises(RtlError):
+        ent.write_verilog(fout=io.StringIO())
+    with pytest.raises(RtlError):
+        ent.write_vhdl(fout=io.StringIO())
+
+
+def test_lut_case_arms():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('lut_test')
+    ibw = 4
+    input_type = DataType.bitvector_type(ibw)
+    output_type = DataType.bitvector_type(3)
+    input = ent.add_input_port(name='input', data_type=input_type)
+    output = ent.add_output_port(name='output', data_type=output_type)
+    # プライオリティエンコーダ
+    table = np.array([i.bit_length() for i in range(1 << ibw)],
+                     dtype=np.uint8)
+    lut = ent.add_lut(input=input, data_type=output_type, table=table)
+    ent.connect(output, lut.output)
+
+    exp_text = """module lut_test(
+  input  [3:0] input,
+  output [2:0] output
+);
+  reg [2:0] net1;
+
+  always @* begin
+    casez ( input )
+      4'b0000: net1 <= 3'b000;
+      4'b0001: net1 <= 3'b001;
+      4'b001?: net1 <= 3'b010;
+      4'b01??: net1 <= 3'b011;
+      default: net1 <= 3'b100;
+    endcase
+  end
+
+  assign output = net1;
+endmodule // lut_test
+"""
+
+    assert make_verilog(ent) == exp_text
+
+    buff = io.StringIO()
+    ent.write_vhdl(fout=buff)
+    contents = buff.getvalue()
+    buff.close()
+
+    exp_text = """  item1: process ( input ) begin
+    case? input is
+      when "0000" => net1 <= "000";
+      when "0001" => net1 <= "001";
+      when "001-" => net1 <= "010";
+      when "01--" => net1 <= "011";
+      when others => net1 <= "100";
+    end case?;
+  end process item1;
+"""
+
+    assert exp_text in contents
+
+
+def test_lut_multi_label():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('lut_test')
+    output_type = DataType.bitvector_type(2)
+    lut = ent.add_lut(input_bw=3, data_type=output_type,
+                      data_list=[(0, 1), (3, 1), (5, 2), (6, 1), (7, 0)])
+
+    contents = make_verilog(ent)
+    assert "case ( net1 )" in contents
+    assert "3'b101: net2 <= 2'b10;" in contents
+    assert "3'b111: net2 <= 2'b00;" in contents
+    assert "default: net2 <= 2'b01;" in contents
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_lut_merge_cubes(seed):
+    from rtlgen.lut import Lut
+    rng = np.random.default_rng(seed)
+    bw = 8
+    ival_list = sorted(set(rng.integers(0, 1 << bw, size=100).tolist()))
+    cube_list = Lut.merge_cubes(ival_list, bw)
+    covered = []
+    for val, mask in cube_list:
+        for i in range(1 << bw):
+            if (i & ~mask) == val:
+                covered.append(i)
+    assert sorted(covered) == ival_list
+    assert len(cube_list) <= len(ival_list)
@@ -0,0 +1,126 @@
+#! /usr/bin/env python3
+
+"""CompressorTree のテスト
+
+:file: multiplier_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+import random
+from rtlgen import EntityMgr, DataType
+from rtlgen.evaluator import Evaluator
+from rtlgen.rtlerror import RtlError
+
+
+STYLE_LIST = ['wallace', 'dadda', 'compressor42']
+
+
+def make_type(bw, signed):
+    if signed:
+        return DataType.signed_bitvector_type(bw)
+    if bw == 1:
+        return DataType.bit_type()
+    return DataType.bitvector_type(bw)
+
+
+def to_int(val, bw, signed):
+    if signed and (val >> (bw - 1)) & 1:
+        return val - (1 << bw)
+    return val
+
+
+def pattern_list(bw_list, num=200):
+    if sum(bw_list) <= 10:
+        pat_list = [[]]
+        for bw in bw_list:
+            pat_list = [pat + [v] for pat in pat_list for v in range(1 << bw)]
+        return pat_list
+    rng = random.Random(0)
+    return [[rng.getrandbits(bw) for bw in bw_list] for _ in range(num)]
+
+
+@pytest.mark.parametrize('style', STYLE_LIST)
+@pytest.mark.parametrize('booth', [False, True])
+@pytest.mark.parametrize('na, nb', [(1, 1), (2, 3), (4, 4), (5, 3), (8, 8)])
+@pytest.mark.parametrize('sa, sb', [(False, False), (True, True),
+                                    (True, False), (False, True)])
+def test_multiplier(style, booth, na, nb, sa, sb):
+    if sa and na == 1 or sb and nb == 1:
+        pytest.skip('1 bit signed operand')
+    mgr = EntityMgr()
+    ent = mgr.add_entity('mult_test')
+    a = ent.add_input_port(name='a', data_type=make_type(na, sa))
+    b = ent.add_input_port(name='b', data_type=make_type(nb, sb))
+    tree = ent.add_multiplier(a, b, booth=booth, style=style, name='p')
+    n = na + nb
+    assert tree.out_width == n
+    assert tree.output.data_type.is_signedbitvector_type == (sa or sb)
+    evaluator = Evaluator(ent)
+    for x, y in pattern_list([na, nb]):
+        exp_val = to_int(x, na, sa) * to_int(y, nb, sb)
+        assert evaluator.eval(tree.output, [(a, x), (b, y)]) == \
+            exp_val & ((1 << n) - 1)
+
+
+@pytest.mark.parametrize('style', STYLE_LIST)
+def test_multi_operand_adder(style):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('sum_test')
+    bw_list = [4, 6, 3, 5, 8, 2, 7]
+    signed_list = [False, True, False, True, True, False, False]
+    opr_list = [ent.add_input_port(name=f'x{i}',
+                                   data_type=make_type(bw, signed))
+                for i, (bw, signed) in enumerate(zip(bw_list, signed_list))]
+    tree = ent.add_multi_operand_adder(opr_list, style=style)
+    n = tree.out_width
+    evaluator = Evaluator(ent)
+    for val_list in pattern_list(bw_list):
+        exp_val = sum(to_int(v, bw, signed)
+                      for v, bw, signed in zip(val_list, bw_list, signed_list))
+        got = evaluator.eval(tree.output, list(zip(opr_list, val_list)))
+        assert to_int(got, n, True) == exp_val
+
+
+def test_tree_depth():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('sum_test')
+    opr_list = [ent.add_input_port(name=f'x{i}',
+                                   data_type=DataType.bitvector_type(8))
+                for i in range(64)]
+    report = {}
+    for style in STYLE_LIST:
+        report[style] = ent.add_multi_operand_adder(opr_list,
+                                                    style=style).report()
+    # Dadda の段数は高さ 64 (> 63) に対して 10 段
+    assert report['dadda']['max_height'] == 64
+    assert report['dadda']['stages'] == 10
+    assert report['wallace']['stages'] <= 11
+    assert report['compressor42']['stages'] <= 7
+    assert report['dadda']['full_adders'] <= report['wallace']['full_adders']
+
+
+def test_booth_rows():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('mult_test')
+    a = ent.add_input_port(name='a', data_type=make_type(16, True))
+    b = ent.add_input_port(name='b', data_type=make_type(16, True))
+    array = ent.add_multiplier(a, b).report()
+    booth = ent.add_multiplier(a, b, booth=True).report()
+    assert array['max_height'] == 16
+    assert booth['max_height'] == 9
+    assert booth['stages'] < array['stages']
+
+
+def test_compressor_tree_errors():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('mult_test')
+    with pytest.raises(RtlError):
+        ent.add_multi_operand_adder([])
+    a = ent.add_input_port(name='a', data_type=make_type(4, False))
+    with pytest.raises(RtlError):
+        ent.add_multiplier(a, a, style='carry_save')
+    tree = ent.add_multiplier(a, a)
+    with pytest.raises(RtlError):
+        tree.add_constant(1)
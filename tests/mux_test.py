@@ -0,0 +1,114 @@
+#! /usr/bin/env python3
+
+"""Mux のテスト
+
+:file: mux_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+from rtlgen import EntityMgr, DataType
+from rtlgen.rtlerror import RtlError
+from conftest import make_verilog
+
+
+def make_mux_entity(n, sel_bw, data_bw):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('mux_test')
+    sel = ent.add_input_port(name='sel',
+                             data_type=DataType.bitvector_type(sel_bw))
+    data_type = DataType.bitvector_type(data_bw)
+    inputs = [ent.add_input_port(name=f'i{k}', data_type=data_type)
+              for k in range(n)]
+    o = ent.add_output_port(name='o', data_type=data_type)
+    return ent, sel, inputs, o
+
+
+def test_mux2():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('mux_test')
+    sel = ent.add_input_port(name='sel')
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(2))
+    o = ent.add_output_port(name='o', data_type=DataType.bitvector_type(2))
+    ent.connect(o, ent.add_mux2(sel=sel, in0=a, in1=3))
+
+    exp_text = """  always @* begin
+    if ( sel ) begin
+      net1 <= 2'b11;
+    end
+    else begin
+      net1 <= a;
+    end
+  end
+"""
+
+    assert exp_text in make_verilog(ent)
+
+
+def test_mux_case():
+    ent, sel, inputs, o = make_mux_entity(3, 2, 4)
+    ent.connect(o, ent.add_mux(sel=sel, inputs=inputs))
+
+    exp_text = """  always @* begin
+    case ( sel )
+      2'b00: begin
+        net1 <= i0;
+      end
+      2'b01: begin
+        net1 <= i1;
+      end
+      default: begin
+        net1 <= i2;
+      end
+    endcase
+  end
+"""
+
+    assert exp_text in make_verilog(ent)
+
+
+def test_mux_tree():
+    ent, sel, inputs, o = make_mux_entity(5, 3, 4)
+    ent.connect(o, ent.add_mux(sel=sel, inputs=inputs, style='tree'))
+    assert ent.item_num == 3
+
+    contents = make_verilog(ent)
+    exp_text = """  always @* begin
+    if ( sel[2] ) begin
+      net4 <= i4;
+    end
+    else begin
+      net4 <= net3;
+    end
+  end
+"""
+
+    assert exp_text in contents
+
+
+def test_mux_tree_large():
+    n = 1500
+    ent, sel, inputs, o = make_mux_entity(n, 11, 8)
+    ent.connect(o, ent.add_mux(sel=sel, inputs=inputs))
+    # 段数分のプロセスのみが作られる．
+    assert ent.item_num == 11
+    contents = make_verilog(ent)
+    assert contents.count('always') == 11
+
+
+def test_mux_onehot():
+    ent, sel, inputs, o = make_mux_entity(1200, 1200, 1)
+    ent.connect(o, ent.add_mux(sel=sel, inputs=inputs, style='onehot'))
+    assert ent.item_num == 0
+    contents = make_verilog(ent)
+    assert '(i0 & sel[0])' in contents
+    assert '(i1199 & sel[1199])' in contents
+
+
+def test_mux_bad_sel():
+    ent, sel, inputs, o = make_mux_entity(5, 2, 4)
+    with pytest.raises(RtlError):
+        ent.add_mux(sel=sel, inputs=inputs)
+    with pytest.raises(RtlError):
+        ent.add_mux(sel=sel, inputs=inputs, style='onehot')
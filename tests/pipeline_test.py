@@ -0,0 +1,98 @@
+#! /usr/bin/env python3
+
+"""Pipeliner のテスト
+
+:file: pipeline_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+import random
+from rtlgen import EntityMgr, DataType, Expr
+from rtlgen.dff import Dff
+from rtlgen.pipeline import Pipeliner
+from rtlgen.rtlerror import RtlError
+from conftest import simulate
+
+
+def make_chain(n, width):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('pipeline_test')
+    clock = ent.add_input_port(name='clock')
+    ent.set_default_clock(clock, 'positive')
+    vec_type = DataType.bitvector_type(width)
+    input_list = [ent.add_input_port(name=f'a{i}', data_type=vec_type)
+                  for i in range(n)]
+    cur = input_list[0]
+    for i in range(1, n):
+        if i % 2 == 1:
+            cur = ent.add_net(data_type=vec_type, src=cur + input_list[i])
+        else:
+            cur = ent.add_net(data_type=vec_type, src=cur ^ input_list[i])
+    x = ent.add_output_port(name='x', src=cur)
+    y = ent.add_output_port(name='y', src=input_list[0] & input_list[1])
+    return ent, input_list, [x, y]
+
+
+def test_pipeline_chain():
+    ent, input_list, output_list = make_chain(8, 8)
+    depth0 = ent.logic_depth()
+    random.seed(1)
+    pattern_list = [[random.randrange(256) for _ in input_list]
+                    for _ in range(20)]
+    golden = simulate(ent, input_list, output_list, pattern_list)
+
+    latency = ent.pipeline(10)
+    assert latency == (depth0 + 9) // 10
+    assert ent.logic_depth() <= (depth0 + latency - 1) // latency
+    result = simulate(ent, input_list, output_list, pattern_list)
+    assert result[latency:] == golden[:len(golden) - latency]
+
+
+def test_pipeline_shallow():
+    ent, input_list, output_list = make_chain(3, 4)
+    assert ent.pipeline(100) == 0
+    assert not [item for item in ent.item_gen if isinstance(item, Dff)]
+
+
+def test_pipeline_shared_net():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('pipeline_test')
+    clock = ent.add_input_port(name='clock')
+    a = ent.add_input_port(name='a')
+    b = ent.add_input_port(name='b')
+    c = ent.add_input_port(name='c')
+    n1 = ent.add_net(name='n1', src=Expr.make_and(a, b))
+    n2 = ent.add_net(name='n2', src=Expr.make_or(n1, c))
+    n3 = ent.add_net(name='n3', src=Expr.make_xor(n2, a))
+    # n2 は Dff からも参照されているので書き換えてはならない．
+    dff = ent.add_dff(data_in=n2, clock=clock)
+    x = ent.add_output_port(name='x', src=Expr.make_not(n3))
+    y = ent.add_output_port(name='y', src=dff.output)
+
+    pipeliner = Pipeliner(ent, 2, clock=clock)
+    assert pipeliner.run() == 1
+    assert len(pipeliner.dff_list) == 3
+    assert dff.data_in is n2
+    pattern_list = [[i & 1, (i >> 1) & 1, (i >> 2) & 1] for i in range(8)] * 2
+    result = simulate(ent, [a, b, c], [x, y], pattern_list)
+    for pos in range(2, len(pattern_list)):
+        va, vb, vc = pattern_list[pos - 1]
+        n2_val = (va & vb) | vc
+        assert result[pos][0] == 1 - (n2_val ^ va)
+        # y も同じレイテンシだけ遅れる．
+        va, vb, vc = pattern_list[pos - 2]
+        assert result[pos][1] == (va & vb) | vc
+
+
+def test_pipeline_errors():
+    ent, input_list, output_list = make_chain(4, 4)
+    with pytest.raises(RtlError):
+        ent.pipeline(0)
+    mgr = EntityMgr()
+    ent = mgr.add_entity('pipeline_test')
+    a = ent.add_input_port(name='a')
+    ent.add_output_port(name='x', src=Expr.make_not(a))
+    with pytest.raises(RtlError):
+        ent.pipeline(1)
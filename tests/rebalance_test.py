@@ -0,0 +1,128 @@
+#! /usr/bin/env python3
+
+"""Expr.reduce() と Entity.rebalance() のテスト
+
+:file: rebalance_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+from rtlgen import EntityMgr, DataType, Expr
+from rtlgen.expr import OpType
+from rtlgen.evaluator import Evaluator
+from rtlgen.traverse import expr_depth
+from rtlgen.rtlerror import RtlError
+from conftest import make_verilog
+
+
+def test_reduce():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('reduce_test')
+    input_list = [ent.add_input_port(name=f'i{k}') for k in range(5)]
+    o = ent.add_output_port(name='o')
+    ent.connect(o, Expr.reduce(OpType.XOR, input_list))
+
+    exp_text = """  assign o = (((i0 ^ i1) ^ (i2 ^ i3)) ^ i4);
+"""
+
+    assert exp_text in make_verilog(ent)
+    with pytest.raises(RtlError):
+        Expr.reduce(OpType.SUB, input_list)
+    with pytest.raises(RtlError):
+        Expr.reduce(OpType.AND, [])
+    assert Expr.reduce(OpType.RAND, input_list[:1]) is input_list[0]
+
+
+def test_reduction_op():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('reduce_test')
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(4))
+    expr = Expr.make_rxor(a)
+    assert expr.data_type.is_bit_type
+    assert expr.verilog_str == '^a'
+    evaluator = Evaluator()
+    assert evaluator.eval(Expr.make_rand(a), [(a, 15)]) == 1
+    assert evaluator.eval(Expr.make_ror(a), [(a, 0)]) == 0
+    assert evaluator.eval(expr, [(a, 7)]) == 1
+    assert evaluator.eval(Expr.make_rxnor(a), [(a, 7)]) == 0
+
+
+def test_rebalance():
+    n = 4096
+    mgr = EntityMgr()
+    ent = mgr.add_entity('rebalance_test')
+    input_list = [ent.add_input_port(name=f'i{k}') for k in range(n)]
+    o = ent.add_output_port(name='o')
+    expr = input_list[0]
+    for k in range(1, n):
+        expr = expr & input_list[k]
+    ent.connect(o, expr)
+    assert expr_depth(expr) == n - 1
+
+    assert ent.rebalance() == 1
+    new_expr = next(ent.cont_assign_gen).rhs
+    assert expr_depth(new_expr) == 12
+    evaluator = Evaluator()
+    val_list = [1] * n
+    assert evaluator.eval(new_expr, list(zip(input_list, val_list))) == 1
+    val_list[1234] = 0
+    assert evaluator.eval(new_expr, list(zip(input_list, val_list))) == 0
+    contents = make_verilog(ent)
+    assert 'assign o = ' in contents
+    # 2回目は何もしない．
+    assert ent.rebalance() == 0
+
+
+def test_rebalance_shared():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('rebalance_test')
+    bv8 = DataType.bitvector_type(8)
+    a, b, c, d, e = [ent.add_input_port(name=name, data_type=bv8)
+                     for name in 'abcde']
+    o1 = ent.add_output_port(name='o1', data_type=bv8)
+    o2 = ent.add_output_port(name='o2', data_type=bv8)
+    shared = (a + b) + c
+    ent.connect(o1, ((shared + d) + e) + a)
+    ent.connect(o2, shared | e)
+    clock = ent.add_input_port(name='clock')
+    proc = ent.add_clocked_process(clock=clock, clock_pol='positive')
+    with proc.body() as body:
+        if_stmt = body.add_if(((a ^ b) ^ c) ^ d)
+
+    # 加算の連鎖と if 文の条件式の XOR の連鎖が組み直される．
+    assert ent.rebalance() == 2
+    rhs1, rhs2 = [ca.rhs for ca in ent.cont_assign_gen]
+    # 共有された部分式はそのまま残る．
+    assert rhs2.operand1 is shared
+    assert rhs1.operand1.operand1 is shared
+    evaluator = Evaluator()
+    input_list = [(a, 200), (b, 100), (c, 50), (d, 25), (e, 12)]
+    assert evaluator.eval(rhs1, input_list) == (200 * 2 + 187) & 255
+    assert expr_depth(if_stmt.cond) == 2
+    assert ent.rebalance() == 0
+
+
+def test_rebalance_dff():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('rebalance_test')
+    clock = ent.add_input_port(name='clock')
+    enable = ent.add_input_port(name='enable')
+    input_list = [ent.add_input_port(name=f'i{k}') for k in range(8)]
+    expr = input_list[0]
+    for k in range(1, 8):
+        expr = expr | input_list[k]
+    dff = ent.add_dff(data_in=expr, clock=clock,
+                      enable=enable, enable_pol='positive')
+    ent.add_output_port(name='o', src=dff.q)
+
+    assert ent.rebalance() == 1
+    # Dff.data_in も組み直した式に置き換えられる．
+    assert dff.data_in is not expr
+    assert expr_depth(dff.data_in) == 3
+    with dff.body() as body:
+        if_stmt = list(body.statement_gen)[0]
+    with if_stmt.then_body() as then_body:
+        stmt = list(then_body.statement_gen)[0]
+    assert stmt.rhs is dff.data_in
+    assert ent.rebalance() == 0
@@ -0,0 +1,107 @@
+#! /usr/bin/env python3
+
+"""RegisterBank のテスト
+
+:file: register_bank_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen import EntityMgr, Expr, DataType
+from rtlgen.dff import Dff
+from rtlgen.register_bank import RegisterBank
+from conftest import make_verilog
+
+
+def test_register_bank():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('bank_test')
+    clock = ent.add_input_port(name='clock')
+    reset = ent.add_input_port(name='reset')
+    enable = ent.add_input_port(name='enable')
+    a = ent.add_input_port(name='a')
+    b = ent.add_input_port(name='b', data_type=DataType.bitvector_type(4))
+    bank = ent.add_register_bank(clock=clock, clock_pol='positive',
+                                 reset=reset, reset_pol='negative',
+                                 enable=enable, enable_pol='positive')
+    qa = bank.add_register(a, name='qa')
+    qb = bank.add_register(b, name='qb', reset_val=5)
+    assert bank.register_num == 2
+
+    exp_text = """module bank_test(
+  input       clock,
+  input       reset,
+  input       enable,
+  input       a,
+  input [3:0] b
+);
+  reg       qa;
+  reg [3:0] qb;
+
+  always @( posedge clock or negedge reset ) begin
+    if ( !reset ) begin
+      qa <= 1'b0;
+      qb <= 4'b0101;
+    end
+    else begin
+      if ( (enable == 1'b1) ) begin
+        qa <= a;
+        qb <= b;
+      end
+    end
+  end
+
+endmodule // bank_test
+"""
+
+    assert make_verilog(ent) == exp_text
+
+
+def test_merge_dffs():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('merge_test')
+    clock = ent.add_input_port(name='clock')
+    clock2 = ent.add_input_port(name='clock2')
+    reset = ent.add_input_port(name='reset')
+    bit = DataType.bit_type()
+    zero = Expr.make_constant(data_type=bit, val=0)
+    in_list = [ent.add_input_port(name=f'd{i}') for i in range(4)]
+    q_list = []
+    for i in range(3):
+        dff = ent.add_dff(clock=clock, clock_pol='positive',
+                          reset=reset, reset_pol='positive',
+                          reset_val=zero, data_in=in_list[i])
+        q_list.append(dff.q)
+    dff = ent.add_dff(clock=clock2, clock_pol='positive',
+                      data_in=in_list[3])
+
+    bank_list = ent.merge_dffs()
+    assert len(bank_list) == 1
+    bank = bank_list[0]
+    assert bank.register_num == 3
+    assert [q for _, q in bank.register_gen] == q_list
+    item_list = list(ent.item_gen)
+    assert len(item_list) == 2
+    assert item_list[0] is dff
+    assert isinstance(item_list[1], RegisterBank)
+
+    contents = make_verilog(ent)
+    assert contents.count('always') == 2
+    for q in q_list:
+        assert f'{q.verilog_str} <= 1\'b0;' in contents
+    assert 'net1 <= d0;\n      net2 <= d1;\n      net3 <= d2;' in contents
+
+
+def test_merge_dffs_existing_bank():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('merge_test')
+    clock = ent.add_input_port(name='clock')
+    d0 = ent.add_input_port(name='d0')
+    d1 = ent.add_input_port(name='d1')
+    bank = ent.add_register_bank(clock=clock, clock_pol='positive')
+    bank.add_register(d0)
+    ent.add_dff(clock=clock, clock_pol='positive', data_in=d1)
+    assert ent.merge_dffs() == [bank]
+    assert bank.register_num == 2
+    assert ent.item_num == 1
+    assert not any(isinstance(item, Dff) for item in ent.item_gen)
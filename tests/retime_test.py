@@ -0,0 +1,129 @@
+#! /usr/bin/env python3
+
+"""Retimer のテスト
+
+:file: retime_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+import io
+import random
+from rtlgen import EntityMgr, DataType, Expr
+from rtlgen.dff import Dff, ShiftRegister
+from rtlgen.retime import Retimer
+from rtlgen.rtlerror import RtlError
+from conftest import simulate
+
+
+def make_adder_chain(n, *, reg_pos, reg_num, reset=False):
+    """n 個の加算器の連鎖の全ての入力か出力に reg_num 段のレジスタを置く．"""
+    mgr = EntityMgr()
+    ent = mgr.add_entity('retime_test')
+    clock = ent.add_input_port(name='clock')
+    ent.set_default_clock(clock, 'positive')
+    if reset:
+        rst = ent.add_input_port(name='reset')
+        ent.set_default_reset(rst, 'positive')
+    vec_type = DataType.bitvector_type(8)
+    input_list = [ent.add_input_port(name=f'a{i}', data_type=vec_type)
+                  for i in range(n + 1)]
+    reset_val = 3 if reset else None
+    src_list = list(input_list)
+    if reg_pos == 'input':
+        for _ in range(reg_num):
+            src_list = [ent.add_dff(data_in=src, reset_val=reset_val).output
+                        for src in src_list]
+    cur = src_list[0]
+    for i in range(1, n + 1):
+        cur = ent.add_net(data_type=vec_type, src=cur + src_list[i])
+    if reg_pos == 'output':
+        for _ in range(reg_num):
+            cur = ent.add_dff(data_in=cur, reset_val=reset_val).output
+    x = ent.add_output_port(name='x', src=cur)
+    return ent, input_list, [x]
+
+
+def random_patterns(input_list, num):
+    random.seed(2)
+    return [[random.randrange(256) for _ in input_list] for _ in range(num)]
+
+
+def test_retime_backward():
+    ent, input_list, output_list = make_adder_chain(4, reg_pos='output',
+                                                    reg_num=3)
+    pattern_list = random_patterns(input_list, 30)
+    golden = simulate(ent, input_list, output_list, pattern_list)
+    report = ent.retime()
+    assert report['period_before'] == 20
+    assert report['period_after'] == 5
+    assert report['registers_before'] == 3
+    assert ent.logic_depth() == 5
+    result = simulate(ent, input_list, output_list, pattern_list)
+    assert result[3:] == golden[3:]
+    buff = io.StringIO()
+    ent.write_verilog(fout=buff)
+    assert buff.getvalue().count('always') == report['registers_after']
+
+
+def test_retime_forward_reset():
+    ent, input_list, output_list = make_adder_chain(4, reg_pos='input',
+                                                    reg_num=3, reset=True)
+    pattern_list = random_patterns(input_list, 30)
+    golden = simulate(ent, input_list, output_list, pattern_list)
+    report = ent.retime()
+    assert report['period_before'] == 20
+    assert report['period_after'] == 5
+    # リセット値も含めて全てのサイクルで一致する．
+    result = simulate(ent, input_list, output_list, pattern_list)
+    assert result == golden
+    for item in ent.item_gen:
+        if isinstance(item, Dff):
+            assert item.reset is not None
+
+
+def test_retime_shift_register():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('retime_test')
+    clock = ent.add_input_port(name='clock')
+    ent.set_default_clock(clock, 'positive')
+    vec_type = DataType.bitvector_type(8)
+    a = ent.add_input_port(name='a', data_type=vec_type)
+    b = ent.add_input_port(name='b', data_type=vec_type)
+    n1 = ent.add_net(data_type=vec_type, src=a * b)
+    n2 = ent.add_net(data_type=vec_type, src=n1 * b)
+    out = ent.add_delay(n2, 2)
+    ent.add_output_port(name='x', src=out)
+    report = ent.retime()
+    assert report['registers_before'] == 2
+    assert report['period_after'] < report['period_before']
+    assert not [item for item in ent.item_gen
+                if isinstance(item, ShiftRegister)]
+    assert ent.logic_depth() == report['period_after']
+
+
+def test_retime_fixed():
+    # 組み合わせ回路のみの経路は周期を小さくできない．
+    ent, input_list, output_list = make_adder_chain(2, reg_pos='input',
+                                                    reg_num=1)
+    a = ent.find_port('a1')
+    ent.add_output_port(name='y', src=a + a + a + a)
+    report = Retimer(ent).run()
+    assert report['period_after'] == report['period_before']
+    assert report['registers_before'] == 3
+    assert report['registers_after'] == report['registers_before']
+
+
+def test_retime_loop():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('retime_test')
+    clock = ent.add_input_port(name='clock')
+    a = ent.add_input_port(name='a')
+    n1 = ent.add_net(name='n1')
+    n2 = ent.add_net(name='n2', src=Expr.make_and(a, n1))
+    ent.connect(n1, Expr.make_not(n2))
+    dff = ent.add_dff(data_in=n2, clock=clock)
+    ent.add_output_port(name='x', src=dff.output)
+    with pytest.raises(RtlError):
+        ent.retime()
@@ -0,0 +1,207 @@
+#! /usr/bin/env python3
+
+"""ResourceSharer のテスト
+
+:file: share_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+from rtlgen import EntityMgr, DataType, Expr
+from rtlgen.expr import OpType
+from conftest import make_verilog
+
+
+def make_entity(width=8):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('share_test')
+    vec_type = DataType.bitvector_type(width)
+    input_list = [ent.add_input_port(name=name, data_type=vec_type)
+                  for name in ('a', 'b', 'c', 'd')]
+    return mgr, ent, input_list
+
+
+def test_share_if():
+    mgr, ent, (a, b, c, d) = make_entity()
+    sel = ent.add_input_port(name='sel')
+    y = ent.add_net(name='y', data_type=a.data_type, reg_type=True)
+    ent.add_output_port(name='x', src=y)
+    proc = ent.add_comb_process()
+    with proc.body() as body:
+        if_stmt = body.add_if(sel)
+        with if_stmt.then_body() as _:
+            _.add_assign(y, a + b)
+        with if_stmt.else_body() as _:
+            _.add_assign(y, c + d)
+    area0 = ent.estimate_area()
+    assert ent.share_resources() == 1
+    area1 = ent.estimate_area()
+    assert area0.op_count(OpType.ADD) == 2
+    assert area1.op_count(OpType.ADD) == 1
+    assert area1.mux_inputs == area0.mux_inputs + 2
+    exp_str = """module share_test(
+  input  [7:0] a,
+  input  [7:0] b,
+  input  [7:0] c,
+  input  [7:0] d,
+  input        sel,
+  output [7:0] x
+);
+  reg  [7:0] y;
+  reg  [7:0] net1;
+  reg  [7:0] net2;
+  wire [7:0] net3;
+
+  always @* begin
+    if ( sel ) begin
+      y <= net3;
+    end
+    else begin
+      y <= net3;
+    end
+  end
+
+  always @* begin
+    if ( sel ) begin
+      net1 = a;
+      net2 = b;
+    end
+    else begin
+      net1 = c;
+      net2 = d;
+    end
+  end
+
+  assign x    = y;
+  assign net3 = (net1 + net2);
+endmodule // share_test
+"""
+    assert make_verilog(ent) == exp_str
+
+
+def test_share_case():
+    mgr, ent, (a, b, c, d) = make_entity()
+    sel_type = DataType.bitvector_type(2)
+    sel = ent.add_input_port(name='sel', data_type=sel_type)
+    y = ent.add_net(name='y', data_type=a.data_type, reg_type=True)
+    ent.add_output_port(name='x', src=y)
+    proc = ent.add_comb_process()
+    with proc.body() as body:
+        case_stmt = body.add_case(sel)
+        label0 = Expr.make_constant(data_type=sel_type, val=0)
+        with case_stmt.add_label(label0) as _:
+            _.add_assign(y, a * b)
+        label1 = Expr.make_constant(data_type=sel_type, val=1)
+        with case_stmt.add_label(label1) as _:
+            _.add_assign(y, a * c + d)
+        with case_stmt.add_default() as _:
+            _.add_assign(y, a * d)
+    assert ent.share_resources() == 2
+    exp_str = """module share_test(
+  input  [7:0] a,
+  input  [7:0] b,
+  input  [7:0] c,
+  input  [7:0] d,
+  input  [1:0] sel,
+  output [7:0] x
+);
+  reg  [7:0] y;
+  reg  [7:0] net1;
+  wire [7:0] net2;
+
+  always @* begin
+    case ( sel )
+      2'b00: begin
+        y <= net2;
+      end
+      2'b01: begin
+        y <= (net2 + d);
+      end
+      default: begin
+        y <= net2;
+      end
+    endcase
+  end
+
+  always @* begin
+    case ( sel )
+      2'b00: begin
+        net1 = b;
+      end
+      2'b01: begin
+        net1 = c;
+      end
+      default: begin
+        net1 = d;
+      end
+    endcase
+  end
+
+  assign x    = y;
+  assign net2 = (a * net1);
+endmodule // share_test
+"""
+    assert make_verilog(ent) == exp_str
+
+
+def test_share_clocked():
+    mgr, ent, (a, b, c, d) = make_entity()
+    clock = ent.add_input_port(name='clock')
+    sel = ent.add_input_port(name='sel')
+    y = ent.add_net(name='y', data_type=a.data_type, reg_type=True)
+    z = ent.add_net(name='z', data_type=a.data_type, reg_type=True)
+    ent.add_output_port(name='x', src=y)
+    ent.add_output_port(name='w', src=z)
+    proc = ent.add_clocked_process(clock=clock, clock_pol='positive')
+    with proc.body() as body:
+        if_stmt = body.add_if(sel)
+        with if_stmt.then_body() as _:
+            _.add_assign(y, a - b)
+            _.add_assign(z, y + c)
+        with if_stmt.else_body() as _:
+            _.add_assign(y, c - d)
+            _.add_assign(z, a + d)
+    # レジスタの値を参照していても共有できる．
+    assert ent.share_resources() == 2
+    assert ent.estimate_area().op_count(OpType.SUB) == 1
+    assert ent.estimate_area().op_count(OpType.ADD) == 1
+
+
+def test_share_not_exclusive():
+    mgr, ent, (a, b, c, d) = make_entity()
+    sel = ent.add_input_port(name='sel')
+    y = ent.add_net(name='y', data_type=a.data_type, reg_type=True)
+    t = ent.add_net(name='t', data_type=a.data_type, reg_type=True)
+    ent.add_output_port(name='x', src=y)
+    proc = ent.add_comb_process()
+    with proc.body() as body:
+        body.add_assign(t, a + c, blocking=True)
+        if_stmt = body.add_if(sel)
+        add1 = a + b
+        with if_stmt.then_body() as _:
+            _.add_assign(y, add1)
+        with if_stmt.else_body() as _:
+            # 両方の分岐で参照されている演算
+            _.add_assign(y, add1 + d)
+            # プロセス中で代入されるネットを参照している演算
+            _.add_assign(y, t + b)
+    assert ent.share_resources() == 0
+
+
+@pytest.mark.parametrize('width, threshold, exp_num',
+                         [(8, 0, 1), (8, 16, 0), (2, 0, 1), (2, 4, 0)])
+def test_share_threshold(width, threshold, exp_num):
+    mgr, ent, (a, b, c, d) = make_entity(width)
+    sel = ent.add_input_port(name='sel')
+    y = ent.add_net(name='y', data_type=a.data_type, reg_type=True)
+    ent.add_output_port(name='x', src=y)
+    proc = ent.add_comb_process()
+    with proc.body() as body:
+        if_stmt = body.add_if(sel)
+        with if_stmt.then_body() as _:
+            _.add_assign(y, a + b)
+        with if_stmt.else_body() as _:
+            _.add_assign(y, a + d)
+    # 利得は 3 * width - width (オペランド1つ分のマルチプレクサ)
+    assert ent.share_resources(threshold=threshold) == exp_num
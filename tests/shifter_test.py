@@ -0,0 +1,111 @@
+#! /usr/bin/env python3
+
+"""BarrelShifter のテスト
+
+:file: shifter_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+from rtlgen import EntityMgr, DataType
+from rtlgen.evaluator import Evaluator
+from rtlgen.rtlerror import RtlError
+from conftest import make_verilog
+
+
+def exp_shift(op, val, amt, w):
+    mask = (1 << w) - 1
+    if op == 'lsl':
+        return (val << amt) & mask
+    if op == 'lsr':
+        return val >> amt
+    if op == 'asr':
+        if (val >> (w - 1)) & 1:
+            val -= 1 << w
+        return (val >> amt) & mask
+    amt %= w
+    if op == 'rol':
+        return ((val << amt) | (val >> (w - amt))) & mask
+    return ((val >> amt) | (val << (w - amt))) & mask
+
+
+@pytest.mark.parametrize('op', ['lsl', 'lsr', 'asr', 'rol', 'ror'])
+@pytest.mark.parametrize('w, amt_bw', [(8, 3), (8, 4), (5, 3), (6, 2),
+                                       (2, 1), (13, 5)])
+def test_barrel_shifter(op, w, amt_bw):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('shifter_test')
+    src = ent.add_input_port(name='src',
+                             data_type=DataType.bitvector_type(w))
+    amt = ent.add_input_port(name='amt',
+                             data_type=DataType.bitvector_type(amt_bw))
+    shifter = ent.add_barrel_shifter(src, amt, op=op, name='dst')
+    evaluator = Evaluator(ent)
+    for val in range(0, 1 << w, max(1, (1 << w) // 64)):
+        for a in range(1 << amt_bw):
+            assert evaluator.eval(shifter.output, [(src, val), (amt, a)]) \
+                == exp_shift(op, val, a, w), f'{val}, {a}'
+
+
+def test_barrel_shifter_verilog():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('shifter_test')
+    src = ent.add_input_port(name='src', data_type=DataType.bitvector_type(4))
+    amt = ent.add_input_port(name='amt', data_type=DataType.bitvector_type(2))
+    shifter = ent.add_barrel_shifter(src, amt, op='ror', name='dst')
+    assert shifter.stage_num == 2
+    contents = make_verilog(ent)
+    assert 'assign net2 = (({src[0:0], src[3:1]} & {4{net1}}) | ' \
+        '(src & (~{4{net1}})));' in contents
+
+
+def test_barrel_shifter_pipeline():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('shifter_test')
+    clock = ent.add_input_port(name='clock')
+    reset = ent.add_input_port(name='reset')
+    src = ent.add_input_port(name='src',
+                             data_type=DataType.signed_bitvector_type(32))
+    amt = ent.add_input_port(name='amt', data_type=DataType.bitvector_type(5))
+    shifter = ent.add_barrel_shifter(src, amt, op='asr', pipeline=2,
+                                     clock=clock, clock_pol='positive',
+                                     reset=reset, reset_pol='positive')
+    assert shifter.stage_num == 5
+    assert shifter.latency == 2
+    assert len(shifter.dff_list) == 4
+    assert shifter.output.data_type.is_signedbitvector_type
+    assert make_verilog(ent).count('always') == 4
+
+
+def test_barrel_shifter_default_reset():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('shifter_test')
+    clock = ent.add_input_port(name='clock')
+    reset = ent.add_input_port(name='reset')
+    ent.set_default_clock(clock, 'positive')
+    ent.set_default_reset(reset, 'negative')
+    src = ent.add_input_port(name='src', data_type=DataType.bitvector_type(8))
+    amt = ent.add_input_port(name='amt', data_type=DataType.bitvector_type(3))
+    # クロックとリセットはエンティティのデフォルトを用いる．
+    shifter = ent.add_barrel_shifter(src, amt, pipeline=1)
+    assert shifter.latency == 2
+    for dff in shifter.dff_list:
+        assert dff.clock is clock
+        assert dff.reset is reset
+        assert dff.reset_val.value == 0
+    assert 'negedge reset' in make_verilog(ent)
+
+
+def test_barrel_shifter_errors():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('shifter_test')
+    src = ent.add_input_port(name='src', data_type=DataType.bitvector_type(8))
+    amt = ent.add_input_port(name='amt', data_type=DataType.bitvector_type(3))
+    with pytest.raises(RtlError):
+        ent.add_barrel_shifter(src, amt, op='rcl')
+    with pytest.raises(RtlError):
+        ent.add_barrel_shifter(src, amt, pipeline=-1)
+    # パイプラインにはクロックが必要
+    with pytest.raises(RtlError):
+        ent.add_barrel_shifter(src, amt, pipeline=1)
@@ -0,0 +1,134 @@
+#! /usr/bin/env python3
+
+"""SignalIndex のテスト
+
+:file: signal_index_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen import EntityMgr, DataType, Expr
+from rtlgen.cont_assign import ContAssign
+from rtlgen.statement import AssignBase, IfStatement
+
+
+def make_entity():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('index_test')
+    vec_type = DataType.bitvector_type(8)
+    a = ent.add_input_port(name='a', data_type=vec_type)
+    b = ent.add_input_port(name='b', data_type=vec_type)
+    return mgr, ent, a, b
+
+
+def test_cont_assign():
+    mgr, ent, a, b = make_entity()
+    n1 = ent.add_net(name='n1', data_type=a.data_type, src=a + b)
+    x = ent.add_output_port(name='x', src=n1)
+    # 既存の回路から作られる．
+    driver_list = ent.driver_list(n1)
+    assert len(driver_list) == 1
+    ca1 = driver_list[0]
+    assert isinstance(ca1, ContAssign)
+    assert ent.reader_list(a) == [ca1]
+    assert ent.driver_list(a) == []
+    # 作成後の接続も反映される．
+    n2 = ent.add_net(name='n2', data_type=a.data_type, src=n1 - a)
+    ca2 = ent.driver_list(n2)[0]
+    assert ent.reader_list(a) == [ca1, ca2]
+    assert len(ent.reader_list(n1)) == 2
+    # 右辺の置き換えも反映される．
+    ca2.set_rhs(b)
+    assert ent.reader_list(a) == [ca1]
+    assert ent.reader_list(b) == [ca1, ca2]
+    assert ent.signal_index.reader_num(n1) == 1
+    assert ent.signal_index.driver_num(x) == 1
+
+
+def test_process():
+    mgr, ent, a, b = make_entity()
+    sel = ent.add_input_port(name='sel')
+    ent.signal_index
+    y = ent.add_net(name='y', data_type=a.data_type, reg_type=True)
+    proc = ent.add_comb_process()
+    with proc.body() as body:
+        if_stmt = body.add_if(sel)
+        with if_stmt.then_body() as _:
+            stmt1 = _.add_assign(y, a)
+    # 索引を作成した後に追加されたステートメント
+    with if_stmt.else_body() as _:
+        stmt2 = _.add_assign(y, b)
+    assert ent.driver_list(y) == [stmt1, stmt2]
+    assert ent.reader_list(sel) == [if_stmt]
+    assert ent.signal_index.owner_item(stmt2) is proc
+    # 索引を参照した後に追加されたステートメント
+    with proc.body() as body:
+        case_stmt = body.add_case(a)
+        label = Expr.make_constant(data_type=a.data_type, val=0)
+        with case_stmt.add_label(label) as _:
+            stmt3 = _.add_assign(y, b, blocking=True)
+        with case_stmt.add_default() as _:
+            stmt4 = _.add_assign(y, sel & sel)
+    assert ent.driver_list(y) == [stmt1, stmt2, stmt3, stmt4]
+    assert ent.reader_list(a) == [stmt1, case_stmt]
+    if_stmt.set_cond(~sel)
+    stmt4.set_rhs(a)
+    assert ent.reader_list(sel) == [if_stmt]
+    assert ent.reader_list(a) == [stmt1, case_stmt, stmt4]
+    # 要素の削除
+    ent.del_item(proc)
+    assert ent.driver_list(y) == []
+    assert ent.reader_list(a) == []
+    stmt1.set_rhs(b)
+    assert ent.reader_list(b) == []
+
+
+def test_items():
+    mgr, ent, a, b = make_entity()
+    clock = ent.add_input_port(name='clock')
+    reset = ent.add_input_port(name='reset')
+    ent.signal_index
+    dff = ent.add_dff(data_in=a, clock=clock, reset=reset, reset_val=0)
+    driver_list = ent.driver_list(dff.q)
+    assert len(driver_list) == 2
+    assert all(isinstance(stmt, AssignBase) for stmt in driver_list)
+    assert dff in ent.reader_list(clock)
+    reader_list = ent.reader_list(reset)
+    assert dff in reader_list
+    assert any(isinstance(stmt, IfStatement) for stmt in reader_list)
+    # Dff.set_data_in() も反映される．
+    dff.set_data_in(b)
+    assert len(ent.reader_list(b)) == 1
+    assert ent.reader_list(a) == []
+
+    child = mgr.add_entity('index_child')
+    c = child.add_input_port(name='c', data_type=a.data_type)
+    child.add_output_port(name='d', src=c)
+    inst = ent.add_inst(child)
+    ent.connect(inst.c, a)
+    assert ent.reader_list(inst.c) == [inst]
+    assert ent.driver_list(inst.d) == [inst]
+
+    lut = ent.add_lut(input_bw=2, data_type=DataType.bitvector_type(2))
+    assert ent.reader_list(lut.input) == [lut]
+    assert ent.driver_list(lut.output) == [lut]
+
+
+def test_del_nets():
+    mgr, ent, a, b = make_entity()
+    n1 = ent.add_net(name='n1', data_type=a.data_type, src=a)
+    assert len(ent.driver_list(n1)) == 1
+    ent.del_nets([n1])
+    assert ent.driver_list(n1) == []
+
+
+def test_lhs_index():
+    mgr, ent, a, b = make_entity()
+    i = ent.add_input_port(name='i', data_type=DataType.bitvector_type(3))
+    y = ent.add_net(name='y', data_type=a.data_type, reg_type=True)
+    proc = ent.add_comb_process()
+    with proc.body() as body:
+        stmt1 = body.add_assign(y, a)
+        stmt2 = body.add_assign(Expr.bit_select(y, i), Expr.bit_select(b, 0))
+    assert ent.driver_list(y) == [stmt1, stmt2]
+    assert ent.reader_list(i) == [stmt2]
@@ -0,0 +1,99 @@
+#! /usr/bin/env python3
+
+"""StrengthReducer のテスト
+
+:file: strength_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+from rtlgen import EntityMgr, DataType, Expr
+from rtlgen.expr import BinaryOp, OpType
+from rtlgen.evaluator import Evaluator
+from rtlgen.traverse import expr_gen, expr_root_list
+
+
+def op_count(ent, op_type):
+    root_list = [expr for expr, _ in expr_root_list(ent)]
+    return len([expr for expr in expr_gen(root_list)
+                if isinstance(expr, BinaryOp) and expr.op_type == op_type])
+
+
+def make_entity(width, op_type, val_list):
+    mgr = EntityMgr()
+    ent = mgr.add_entity('strength_test')
+    vec_type = DataType.bitvector_type(width)
+    a = ent.add_input_port(name='a', data_type=vec_type)
+    output_list = []
+    for i, val in enumerate(val_list):
+        const = Expr.make_constant(data_type=vec_type, val=val)
+        net = ent.add_net(name=f'n{i}', data_type=vec_type,
+                          src=BinaryOp(op_type, a, const))
+        ent.add_output_port(name=f'x{i}', src=net)
+        output_list.append(net)
+    return ent, a, output_list
+
+
+def check(ent, a, output_list, width, func_list):
+    evaluator = Evaluator(ent)
+    mask = (1 << width) - 1
+    for va in range(1 << width):
+        result = evaluator.eval_list(output_list, [(a, va)])
+        expected = [func(va) & mask for func in func_list]
+        assert result == expected
+
+
+@pytest.mark.parametrize('val_list', [[3, 5, 7, 11, 13, 45, 0, 1, 8, 255]])
+def test_strength_mul(val_list):
+    width = 8
+    ent, a, output_list = make_entity(width, OpType.MUL, val_list)
+    report = ent.reduce_strength()
+    assert report == {'mul': len(val_list), 'div': 0, 'mod': 0}
+    assert op_count(ent, OpType.MUL) == 0
+    func_list = [lambda x, v=v: x * v for v in val_list]
+    check(ent, a, output_list, width, func_list)
+
+
+@pytest.mark.parametrize('op_type', [OpType.DIV, OpType.MOD])
+def test_strength_div_mod(op_type):
+    width = 6
+    val_list = [1, 2, 3, 5, 7, 10, 16, 63, 64]
+    ent, a, output_list = make_entity(width, op_type, val_list)
+    report = ent.reduce_strength()
+    assert sum(report.values()) == len(val_list)
+    assert op_count(ent, OpType.DIV) == 0
+    assert op_count(ent, OpType.MOD) == 0
+    assert op_count(ent, OpType.MUL) == 0
+    if op_type == OpType.DIV:
+        func_list = [lambda x, v=v: x // v for v in val_list]
+    else:
+        func_list = [lambda x, v=v: x % v for v in val_list]
+    check(ent, a, output_list, width, func_list)
+
+
+def test_strength_sharing():
+    width = 8
+    # 6 倍，12 倍は 3 倍の値をシフトして作る．
+    ent, a, output_list = make_entity(width, OpType.MUL, [3, 6, 12, 9])
+    ent.reduce_strength()
+    # 3 倍(= a + (a << 1))と 9 倍(= a + (a << 3))の2つだけ
+    assert op_count(ent, OpType.ADD) + op_count(ent, OpType.SUB) == 2
+    check(ent, a, output_list, width,
+          [lambda x: x * 3, lambda x: x * 6,
+           lambda x: x * 12, lambda x: x * 9])
+
+
+def test_strength_unchanged():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('strength_test')
+    vec_type = DataType.bitvector_type(4)
+    svec_type = DataType.signed_bitvector_type(4)
+    a = ent.add_input_port(name='a', data_type=vec_type)
+    b = ent.add_input_port(name='b', data_type=vec_type)
+    s = ent.add_input_port(name='s', data_type=svec_type)
+    ent.add_output_port(name='x', data_type=vec_type, src=a * b)
+    ent.add_output_port(name='y', data_type=svec_type, src=s / 3)
+    assert ent.reduce_strength() == {'mul': 0, 'div': 0, 'mod': 0}
+    assert op_count(ent, OpType.MUL) == 1
+    assert op_count(ent, OpType.DIV) == 1
@@ -0,0 +1,193 @@
+#! /usr/bin/env python3
+
+"""RegisterSweeper のテスト
+
+:file: sweep_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+from rtlgen import EntityMgr, DataType, Expr
+from rtlgen.dff import Dff
+from conftest import make_verilog
+
+
+def dff_num(ent):
+    return len([item for item in ent.item_gen if isinstance(item, Dff)])
+
+
+def make_entity():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('sweep_test')
+    clock = ent.add_input_port(name='clock')
+    reset = ent.add_input_port(name='reset')
+    return mgr, ent, clock, reset
+
+
+def test_sweep_constant():
+    mgr, ent, clock, reset = make_entity()
+    vec_type = DataType.bitvector_type(4)
+    a = ent.add_input_port(name='a', data_type=vec_type)
+    # 自分自身を保持し続けるレジスタ
+    dff1 = ent.add_dff(data_type=vec_type, clock=clock,
+                       reset=reset, reset_val=3)
+    ent.connect(dff1.data_in, dff1.q)
+    # 定数レジスタとの AND で 0 になるレジスタ
+    dff2 = ent.add_dff(data_type=vec_type, clock=clock,
+                       reset=reset, reset_val=0)
+    zero = Expr.make_constant(data_type=vec_type, val=0)
+    ent.connect(dff2.data_in, (a & dff2.q) | zero)
+    # 入力に依存するので定数ではない．
+    dff3 = ent.add_dff(data_type=vec_type, clock=clock,
+                       reset=reset, reset_val=0)
+    ent.connect(dff3.data_in, a + dff1.q)
+    ent.add_output_port(name='x', src=dff1.q + dff2.q)
+    ent.add_output_port(name='y', src=dff3.q)
+    report = ent.sweep_registers()
+    assert report == {'constant': 2, 'merged': 0}
+    assert dff_num(ent) == 1
+    rhs_list = [ca.rhs.verilog_str for ca in ent.cont_assign_gen]
+    assert "(4'b0011 + 4'b0000)" in rhs_list
+    assert "(a + 4'b0011)" in rhs_list
+
+
+def test_sweep_constant_induction():
+    mgr, ent, clock, reset = make_entity()
+    a = ent.add_input_port(name='a')
+    # 2つのレジスタが互いの値を保持し合う．
+    dff1 = ent.add_dff(clock=clock, reset=reset, reset_val=0)
+    dff2 = ent.add_dff(clock=clock, reset=reset, reset_val=0)
+    ent.connect(dff1.data_in, dff2.q)
+    ent.connect(dff2.data_in, dff1.q & a)
+    # リセット値と異なる値を取り込むレジスタに依存する．
+    dff3 = ent.add_dff(clock=clock, reset=reset, reset_val=0)
+    dff4 = ent.add_dff(clock=clock, reset=reset, reset_val=0)
+    ent.connect(dff3.data_in, ~dff3.q)
+    ent.connect(dff4.data_in, dff3.q)
+    ent.add_output_port(name='x', src=dff1.q)
+    ent.add_output_port(name='y', src=dff4.q)
+    report = ent.sweep_registers()
+    assert report['constant'] == 2
+    assert dff_num(ent) == 2
+
+
+def test_sweep_equivalent():
+    mgr, ent, clock, reset = make_entity()
+    vec_type = DataType.bitvector_type(8)
+    a = ent.add_input_port(name='a', data_type=vec_type)
+    b = ent.add_input_port(name='b', data_type=vec_type)
+    # 同じ入力のレジスタ(可換な演算のオペランドの順序は問わない)
+    dff1 = ent.add_dff(data_in=a + b, clock=clock)
+    dff2 = ent.add_dff(data_in=b + a, clock=clock)
+    # 互いに等価なレジスタを参照するカウンタ
+    dff3 = ent.add_dff(data_type=vec_type, clock=clock,
+                       reset=reset, reset_val=0)
+    dff4 = ent.add_dff(data_type=vec_type, clock=clock,
+                       reset=reset, reset_val=0)
+    ent.connect(dff3.data_in, dff3.q + dff1.q)
+    ent.connect(dff4.data_in, dff4.q + dff2.q)
+    # リセットが異なるので併合しない．
+    dff5 = ent.add_dff(data_in=a + b, clock=clock,
+                       reset=reset, reset_val=0)
+    ent.add_output_port(name='x', src=dff3.q)
+    ent.add_output_port(name='y', src=dff4.q)
+    ent.add_output_port(name='z', src=dff5.q)
+    report = ent.sweep_registers()
+    assert report == {'constant': 0, 'merged': 2}
+    assert dff_num(ent) == 3
+    rhs_dict = {ca.lhs.name: ca.rhs for ca in ent.cont_assign_gen}
+    assert rhs_dict['y'] is dff3.q
+    # データ入力も置き換えられている．
+    assert dff3.q is rhs_dict[dff3.data_in.name].operand1
+    assert dff1.q is rhs_dict[dff3.data_in.name].operand2
+
+
+def test_sweep_verilog():
+    mgr, ent, clock, reset = make_entity()
+    a = ent.add_input_port(name='a')
+    dff1 = ent.add_dff(data_in=a, clock=clock)
+    dff2 = ent.add_dff(data_in=a, clock=clock)
+    ent.add_output_port(name='x', src=dff1.q & dff2.q)
+    assert ent.sweep_registers() == {'constant': 0, 'merged': 1}
+    exp_str = """module sweep_test(
+  input  clock,
+  input  reset,
+  input  a,
+  output x
+);
+  reg net1;
+
+  always @( posedge clock ) begin
+    net1 <= a;
+  end
+
+  assign x = (net1 & net1);
+endmodule // sweep_test
+"""
+    assert make_verilog(ent) == exp_str
+
+
+def test_sweep_pinned():
+    mgr, ent, clock, reset = make_entity()
+    a = ent.add_input_port(name='a')
+    dff1 = ent.add_dff(data_in=a, clock=clock)
+    dff2 = ent.add_dff(data_in=a, clock=clock)
+    # クロックとして使われているレジスタは対象外
+    dff3 = ent.add_dff(data_in=a, clock=dff2.q)
+    ent.add_output_port(name='x', src=dff1.q)
+    ent.add_output_port(name='y', src=dff3.q)
+    assert ent.sweep_registers() == {'constant': 0, 'merged': 0}
+    assert dff_num(ent) == 3
+
+
+@pytest.mark.parametrize('n', [1000])
+def test_sweep_large(n):
+    mgr, ent, clock, reset = make_entity()
+    a = ent.add_input_port(name='a')
+    # 同じ入力を持つ n 段のシフトレジスタ2本
+    q_list = []
+    for _ in range(2):
+        prev = a
+        for _ in range(n):
+            prev = ent.add_dff(data_in=prev, clock=clock).q
+        q_list.append(prev)
+    ent.add_output_port(name='x', src=q_list[0] ^ q_list[1])
+    assert ent.sweep_registers() == {'constant': 0, 'merged': n}
+    assert dff_num(ent) == n
+
+
+def test_sweep_reset_expr():
+    mgr, ent, clock, reset = make_entity()
+    a = ent.add_input_port(name='a')
+    p = ent.add_input_port(name='p')
+    q = ent.add_input_port(name='q')
+    # リセット値が異なる信号のレジスタは併合しない．
+    dff1 = ent.add_dff(data_in=a, clock=clock, reset=reset, reset_val=p)
+    dff2 = ent.add_dff(data_in=a, clock=clock, reset=reset, reset_val=q)
+    ent.add_output_port(name='x', src=dff1.q)
+    ent.add_output_port(name='y', src=dff2.q)
+    assert ent.sweep_registers() == {'constant': 0, 'merged': 0}
+    assert dff_num(ent) == 2
+
+
+def test_sweep_no_reset_loop():
+    mgr, ent, clock, reset = make_entity()
+    # 初期状態の異なりうるトグルレジスタは併合しない．
+    dff1 = ent.add_dff(clock=clock)
+    dff2 = ent.add_dff(clock=clock)
+    ent.connect(dff1.data_in, ~dff1.q)
+    ent.connect(dff2.data_in, ~dff2.q)
+    ent.add_output_port(name='x', src=dff1.q)
+    ent.add_output_port(name='y', src=dff2.q)
+    assert ent.sweep_registers() == {'constant': 0, 'merged': 0}
+    assert dff_num(ent) == 2
+    # リセットを持つ場合は併合する．
+    mgr, ent, clock, reset = make_entity()
+    dff1 = ent.add_dff(clock=clock, reset=reset, reset_val=0)
+    dff2 = ent.add_dff(clock=clock, reset=reset, reset_val=0)
+    ent.connect(dff1.data_in, ~dff1.q)
+    ent.connect(dff2.data_in, ~dff2.q)
+    ent.add_output_port(name='x', src=dff1.q)
+    ent.add_output_port(name='y', src=dff2.q)
+    assert ent.sweep_registers() == {'constant': 0, 'merged': 1}
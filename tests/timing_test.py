@@ -0,0 +1,203 @@
+#! /usr/bin/env python3
+
+"""TimingAnalyzer のテスト
+
+:file: timing_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import pytest
+import contextlib
+from rtlgen import EntityMgr, DataType, Expr
+from rtlgen.expr import OpType
+from rtlgen.timing import TimingAnalyzer, DelayModel
+from rtlgen.rtlerror import RtlError
+
+
+def test_timing_simple():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('timing_test')
+    a = ent.add_input_port(name='a')
+    b = ent.add_input_port(name='b')
+    c = ent.add_input_port(name='c')
+    n1 = ent.add_net(name='n1', src=Expr.make_and(a, b))
+    n2 = ent.add_net(src=Expr.make_or(n1, c))
+    ent.add_output_port(name='x', src=Expr.make_not(n2))
+    ent.add_output_port(name='y', src=n1)
+
+    assert ent.logic_depth() == 3
+    path_list = ent.critical_paths(2)
+    assert len(path_list) == 2
+    path = path_list[0]
+    assert path.kind == 'output'
+    assert path.end == 'x'
+    assert path.delay == 3
+    assert path.start == 'a'
+    assert path.point_list == [('a', 0), ('n1', 1), ('net1', 2), ('x', 3)]
+    assert path_list[1].end == 'y'
+    assert path_list[1].delay == 1
+
+
+def test_timing_width():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('timing_test')
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(32))
+    b = ent.add_input_port(name='b', data_type=DataType.bitvector_type(32))
+    s = ent.add_input_port(name='s', data_type=DataType.bitvector_type(5))
+    ent.add_output_port(name='sum', src=a + b)
+    ent.add_output_port(name='eq', src=Expr.make_eq(a, b))
+    ent.add_output_port(name='sft', src=Expr.make_lsft(a, s))
+    ent.add_output_port(name='sft3',
+                        src=Expr.make_lsft(a, Expr.make_intconstant(3)))
+    ent.add_output_port(name='red', src=Expr.make_rxor(a))
+
+    analyzer = TimingAnalyzer(ent)
+    delay_dict = {path.end: path.delay
+                  for path in analyzer.critical_paths(10)}
+    assert delay_dict == {'sum': 7, 'eq': 6, 'sft': 5, 'sft3': 0, 'red': 5}
+    assert analyzer.max_delay == 7
+
+
+def test_timing_register():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('timing_test')
+    clock = ent.add_input_port(name='clock')
+    a = ent.add_input_port(name='a')
+    b = ent.add_input_port(name='b')
+    en = ent.add_input_port(name='en')
+    cond = Expr.make_not(Expr.make_not(Expr.make_not(en)))
+    dff1 = ent.add_dff(data_in=Expr.make_and(a, b), clock=clock)
+    dff2 = ent.add_dff(data_in=Expr.make_xor(dff1.output, a), clock=clock,
+                       enable=cond, enable_pol='positive')
+    ent.add_output_port(name='x', src=dff2.output)
+
+    path_list = ent.critical_paths(3)
+    assert [path.kind for path in path_list] == \
+        ['register', 'register', 'output']
+    # イネーブル付きの Dff は条件式(NOT x 3 と EQ)の経路が最長となる．
+    assert path_list[0].delay == 4
+    assert path_list[0].start == 'en'
+    assert path_list[0].end == dff2.output.name
+    assert path_list[1].delay == 1
+    assert path_list[2].delay == 0
+
+
+def test_timing_comb_process():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('timing_test')
+    a = ent.add_input_port(name='a')
+    b = ent.add_input_port(name='b')
+    sel = ent.add_input_port(name='sel')
+    out = ent.add_net(name='out', reg_type=True)
+    proc = ent.add_comb_process()
+    with proc.body() as _:
+        if_stmt = _.add_if(Expr.make_not(Expr.make_not(sel)))
+        with if_stmt.then_body() as _:
+            _.add_assign(out, a)
+        with if_stmt.else_body() as _:
+            _.add_assign(out, Expr.make_and(a, b))
+    ent.add_output_port(name='x', src=Expr.make_not(out))
+
+    path = ent.critical_paths()[0]
+    assert path.delay == 3
+    assert path.point_list == [('sel', 0), ('out', 2), ('x', 3)]
+
+
+def test_timing_delay_model():
+
+    class UnitDelay(DelayModel):
+
+        def op_delay(self, op_type, width):
+            if op_type == OpType.ADD:
+                return width
+            return 1
+
+    mgr = EntityMgr()
+    ent = mgr.add_entity('timing_test')
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(16))
+    b = ent.add_input_port(name='b', data_type=DataType.bitvector_type(16))
+    ent.add_output_port(name='x', src=~(a + b))
+    assert ent.logic_depth(delay_model=UnitDelay()) == 17
+
+
+def test_timing_loop():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('timing_test')
+    a = ent.add_input_port(name='a')
+    n1 = ent.add_net(name='n1')
+    n2 = ent.add_net(name='n2', src=Expr.make_and(a, n1))
+    ent.connect(n1, Expr.make_not(n2))
+    ent.add_output_port(name='x', src=n2)
+    with pytest.raises(RtlError):
+        ent.logic_depth()
+
+
+def test_timing_deep():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('timing_test')
+    a = ent.add_input_port(name='a')
+    cur = a
+    n = 20000
+    for _ in range(n):
+        cur = ent.add_net(src=Expr.make_not(cur))
+    ent.add_output_port(name='x', src=cur)
+    path = ent.critical_paths()[0]
+    assert path.delay == n
+    assert len(path.point_list) == n + 2
+
+
+def test_timing_lut():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('timing_test')
+    a = ent.add_input_port(name='a', data_type=DataType.bitvector_type(4))
+    n1 = ent.add_net(name='n1', data_type=a.data_type, src=~a)
+    lut = ent.add_lut(input=n1, data_type=DataType.bitvector_type(2))
+    ent.add_output_port(name='x', src=~lut.output)
+    # Lut の遅延は入力のビット幅
+    path = ent.critical_paths()[0]
+    assert path.delay == 6
+    assert path.point_list == [('a', 0), ('n1', 1),
+                               (lut.output.name, 5), ('x', 6)]
+
+
+def test_timing_nested_if():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('timing_test')
+    a = ent.add_input_port(name='a')
+    b = ent.add_input_port(name='b')
+    out = ent.add_net(name='out', reg_type=True)
+    n = 10000
+    proc = ent.add_comb_process()
+    with contextlib.ExitStack() as stack:
+        block = stack.enter_context(proc.body())
+        cond = a
+        for _ in range(n):
+            block.add_assign(out, b)
+            cond = ent.add_net(src=Expr.make_not(cond))
+            if_stmt = block.add_if(cond)
+            block = stack.enter_context(if_stmt.then_body())
+        block.add_assign(out, a)
+    ent.add_output_port(name='x', src=out)
+    # 最も内側の代入文は全ての条件式に依存する．
+    path = ent.critical_paths()[0]
+    assert path.delay == n
+    assert path.start == 'a'
+
+
+def test_timing_unnamed_vars():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('timing_test')
+    a = ent.add_input_port(name='a')
+    v1 = ent.add_var(data_type=DataType.bit_type())
+    v2 = ent.add_var(data_type=DataType.bit_type())
+    out = ent.add_net(name='out', reg_type=True)
+    proc = ent.add_comb_process()
+    with proc.body() as _:
+        _.add_assign(v1, Expr.make_not(a), blocking=True)
+        _.add_assign(v2, Expr.make_not(v1), blocking=True)
+        _.add_assign(out, v2)
+    ent.add_output_port(name='x', src=out)
+    # 無名の変数が複数あっても名前がつけられる．
+    assert ent.logic_depth() == 2
+    assert (v1.name, v2.name) == ('var1', 'var2')
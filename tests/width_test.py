@@ -0,0 +1,158 @@
+#! /usr/bin/env python3
+
+"""RangeAnalyzer, WidthNarrower のテスト
+
+:file: width_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+from rtlgen import EntityMgr, DataType, Expr
+from rtlgen.width import RangeAnalyzer
+from rtlgen.evaluator import Evaluator
+from conftest import make_verilog
+
+
+def evaluate(ent, output_list, input_list, val_list):
+    """出力ポートの値を計算する．"""
+    evaluator = Evaluator(ent)
+    rhs_dict = {id(ca.lhs): ca.rhs for ca in ent.cont_assign_gen}
+    expr_list = [rhs_dict[id(port)] for port in output_list]
+    return evaluator.eval_list(expr_list, list(zip(input_list, val_list)))
+
+
+def zext(expr, width):
+    n = width - expr.data_type.size
+    pad = Expr.make_constant(data_type=DataType.bitvector_type(n), val=0)
+    return Expr.concat([pad, expr])
+
+
+def make_entity():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('width_test')
+    vec4 = DataType.bitvector_type(4)
+    vec16 = DataType.bitvector_type(16)
+    a = ent.add_input_port(name='a', data_type=vec4)
+    b = ent.add_input_port(name='b', data_type=vec4)
+    n1 = ent.add_net(name='n1', data_type=vec16, src=zext(a, 16))
+    n2 = ent.add_net(name='n2', data_type=vec16, src=n1 + zext(b, 16))
+    n3 = ent.add_net(name='n3', data_type=vec16, src=n2 * n1)
+    n4 = ent.add_net(name='n4', data_type=vec16,
+                     src=Expr.make_div(n3, Expr.make_constant(data_type=vec16,
+                                                              val=3)))
+    output_list = []
+    output_list.append(ent.add_output_port(name='x', data_type=vec16,
+                                           src=n3 - n4))
+    sft = Expr.make_lsft(n2, Expr.make_intconstant(4))
+    output_list.append(ent.add_output_port(name='y', data_type=vec16,
+                                           src=sft))
+    vec8 = DataType.bitvector_type(8)
+    output_list.append(ent.add_output_port(name='z', data_type=vec8,
+                                           src=Expr.part_select(n4, 11, 4)))
+    lt = Expr.make_lt(n1, n2)
+    output_list.append(ent.add_output_port(name='w', data_type=vec16,
+                                           src=lt + n1))
+    return mgr, ent, [a, b], output_list, [n1, n2, n3, n4]
+
+
+def test_value_range():
+    mgr, ent, input_list, output_list, net_list = make_entity()
+    analyzer = RangeAnalyzer(ent)
+    n1, n2, n3, n4 = net_list
+    assert analyzer.value_range(n1) == (0, 15)
+    assert analyzer.value_range(n2) == (0, 30)
+    assert analyzer.value_range(n3) == (0, 450)
+    assert analyzer.value_range(n4) == (0, 150)
+    assert analyzer.value_range(n2 - n1) == (0, 0xffff)
+    assert analyzer.value_range(Expr.part_select(n4, 7, 4)) == (0, 9)
+    assert analyzer.value_range(Expr.make_eq(n1, n2)) == (0, 1)
+    assert analyzer.width(n1) == 16
+    # シフト量が結果のビット幅以上になりうる場合は全範囲
+    c = ent.add_input_port(name='c', data_type=DataType.bitvector_type(64))
+    assert analyzer.value_range(Expr.make_lsft(n1, c)) == (0, 0xffff)
+    sft = Expr.make_lsft(n1, Expr.make_intconstant(4))
+    assert analyzer.value_range(sft) == (0, 240)
+
+
+def test_narrow_width():
+    mgr, ent, input_list, output_list, net_list = make_entity()
+    golden = [evaluate(ent, output_list, input_list, [va, vb])
+              for va in range(16) for vb in range(16)]
+    saved = ent.narrow_width()
+    assert saved > 0
+    assert [net.data_type.size for net in net_list] == [4, 5, 9, 9]
+    assert [port.data_type.size for port in output_list] == [16, 16, 8, 16]
+    result = [evaluate(ent, output_list, input_list, [va, vb])
+              for va in range(16) for vb in range(16)]
+    assert result == golden
+    # 縮小した後は変化しない．
+    assert ent.narrow_width() == 0
+
+
+def test_narrow_width_verilog():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('width_test')
+    vec4 = DataType.bitvector_type(4)
+    vec8 = DataType.bitvector_type(8)
+    a = ent.add_input_port(name='a', data_type=vec8)
+    n1 = ent.add_net(name='n1', data_type=vec8,
+                     src=a & Expr.make_constant(data_type=vec8, val=7))
+    ent.add_output_port(name='x', data_type=vec8, src=n1 + n1)
+    ent.add_output_port(name='y', data_type=vec4,
+                        src=Expr.part_select(n1, 5, 2))
+    # n1: 8 -> 3, (n1 + n1): 8 -> 4, (a & 7): 8 -> 3
+    assert ent.narrow_width() == 5 + 4 + 5
+    exp_str = """module width_test(
+  input  [7:0] a,
+  output [7:0] x,
+  output [3:0] y
+);
+  wire [2:0] n1;
+
+  assign n1 = (a[2:0] & 3'b111);
+  assign x  = {4'b0000, ({1'b0, n1} + {1'b0, n1})};
+  assign y  = {3'b000, n1[2:2]};
+endmodule // width_test
+"""
+    assert make_verilog(ent) == exp_str
+
+
+def test_narrow_width_fixed():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('width_test')
+    vec4 = DataType.bitvector_type(4)
+    vec8 = DataType.bitvector_type(8)
+    a = ent.add_input_port(name='a', data_type=vec4)
+    i = ent.add_input_port(name='i', data_type=vec4)
+    # 可変のビット選択の対象は縮小しない．
+    n1 = ent.add_net(name='n1', data_type=vec8, src=zext(a, 8))
+    ent.add_output_port(name='x', src=Expr.bit_select(n1, i))
+    # Dff の入力は縮小できるが出力は変わらない．
+    clock = ent.add_input_port(name='clock')
+    n2 = ent.add_net(name='n2', data_type=vec8, src=zext(a, 8))
+    dff = ent.add_dff(data_in=n2, clock=clock)
+    ent.add_output_port(name='y', src=dff.output)
+    assert ent.narrow_width() == 4
+    assert n1.data_type.size == 8
+    assert n2.data_type.size == 4
+    assert dff.output.data_type.size == 8
+    # Dff.data_in は0拡張した式に置き換えられる．
+    assert dff.data_in.data_type.size == 8
+    assert dff.data_in.src_list[1] is n2
+    with dff.body() as body:
+        stmt = list(body.statement_gen)[0]
+    assert stmt.rhs is dff.data_in
+
+
+def test_narrow_width_mgr():
+    mgr, ent, input_list, output_list, net_list = make_entity()
+    child = mgr.add_entity('width_child')
+    vec8 = DataType.bitvector_type(8)
+    c = child.add_input_port(name='c', data_type=vec8)
+    child.add_output_port(name='d', data_type=vec8, src=c)
+    inst = ent.add_inst(child)
+    ent.connect(inst.c, Expr.part_select(net_list[2], 7, 0))
+    ans = mgr.narrow_width(ent)
+    assert set(ans.keys()) == {'width_test', 'width_child'}
+    assert ans['width_child'] == 0
+    assert ans['width_test'] > 0
@@ -0,0 +1,107 @@
+#! /usr/bin/env python3
+
+"""XorSharer のテスト
+
+:file: xor_share_test.py
+:author: Yusuke Matsunaga (松永 裕介)
+:copyright: Copyright (C) 2024 Yusuke Matsunaga, All rights reserved.
+"""
+
+import random
+from rtlgen import EntityMgr, DataType
+from rtlgen.evaluator import Evaluator
+from conftest import make_verilog
+
+
+def test_share_xor():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('xor_test')
+    a, b, c, d = [ent.add_input_port(name=name) for name in 'abcd']
+    o1, o2, o3 = [ent.add_output_port(name=name) for name in ('o1', 'o2', 'o3')]
+    ent.connect(o1, a ^ b ^ c)
+    ent.connect(o2, a ^ b ^ d)
+    ent.connect(o3, (a ^ b ^ c ^ d) & c)
+
+    report = ent.share_xor()
+    # (a ^ b) と (a ^ b ^ c) が括り出される．
+    assert report == {'before': 7, 'after': 4, 'shared': 2, 'clusters': 3}
+
+    exp_text = """  assign o1   = net2;
+  assign o2   = (d ^ net1);
+  assign o3   = ((d ^ net2) & c);
+  assign net1 = (a ^ b);
+  assign net2 = (c ^ net1);
+"""
+
+    assert exp_text in make_verilog(ent)
+
+
+def test_share_xor_cancel():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('xor_test')
+    bv4 = DataType.bitvector_type(4)
+    a, b, c = [ent.add_input_port(name=name, data_type=bv4) for name in 'abc']
+    o1 = ent.add_output_port(name='o1', data_type=bv4)
+    o2 = ent.add_output_port(name='o2', data_type=bv4)
+    t = a ^ b
+    ent.connect(o1, (t ^ c) ^ (t ^ a))
+    ent.connect(o2, c ^ (b ^ a))
+
+    report = ent.share_xor()
+    assert report['before'] == 6
+    assert report['after'] == 2
+    rhs1, rhs2 = [ca.rhs for ca in ent.cont_assign_gen
+                  if ca.lhs is o1 or ca.lhs is o2]
+    evaluator = Evaluator(ent)
+    input_list = [(a, 3), (b, 5), (c, 9)]
+    assert evaluator.eval(rhs1, input_list) == 9 ^ 3
+    assert evaluator.eval(rhs2, input_list) == 9 ^ 5 ^ 3
+
+
+def test_share_xor_width():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('xor_test')
+    bv4 = DataType.bitvector_type(4)
+    bv8 = DataType.bitvector_type(8)
+    a = ent.add_input_port(name='a', data_type=bv8)
+    b = ent.add_input_port(name='b', data_type=bv4)
+    c = ent.add_input_port(name='c', data_type=bv8)
+    o1 = ent.add_output_port(name='o1', data_type=bv8)
+    o2 = ent.add_output_port(name='o2', data_type=bv8)
+    # ビット幅の異なる葉を持つクラスタは対象外
+    expr1 = a ^ b ^ c
+    expr2 = a ^ b ^ c
+    ent.connect(o1, expr1)
+    ent.connect(o2, expr2)
+    report = ent.share_xor()
+    assert report['clusters'] == 0
+    rhs1, rhs2 = [ca.rhs for ca in ent.cont_assign_gen]
+    assert rhs1 is expr1
+    assert rhs2 is expr2
+
+
+def test_share_xor_crc():
+    mgr = EntityMgr()
+    ent = mgr.add_entity('crc_test')
+    clock = ent.add_input_port(name='clock')
+    data_in = ent.add_input_port(name='data_in',
+                                 data_type=DataType.bitvector_type(64))
+    crc, crc_next = ent.add_crc(0x104C11DB7, 64,
+                                data_in=data_in,
+                                clock=clock, clock_pol='positive')
+    evaluator = Evaluator(ent)
+    rng = random.Random(0)
+    pat_list = [(rng.getrandbits(32), rng.getrandbits(64)) for _ in range(20)]
+    exp_list = [evaluator.eval(crc_next, [(crc, c), (data_in, d)])
+                for c, d in pat_list]
+
+    report = ent.share_xor()
+    assert report['clusters'] == 32
+    assert report['after'] * 2 < report['before']
+
+    evaluator = Evaluator(ent)
+    for (c, d), exp_val in zip(pat_list, exp_list):
+        assert evaluator.eval(crc_next, [(crc, c), (data_in, d)]) == exp_val
+    # 2回目はほとんど変化しない．
+    report2 = ent.share_xor()
+    assert report2['after'] <= report2['before'] <= report['after']